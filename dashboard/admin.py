@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Auditoria
+from .models import Auditoria, AuditoriaArchivo, EmailSaliente, ExportJob, ImportJob
 
 @admin.register(Auditoria)
 class AuditoriaAdmin(admin.ModelAdmin):
@@ -8,3 +8,37 @@ class AuditoriaAdmin(admin.ModelAdmin):
     search_fields = ('detalle', 'usuario__username', 'usuario__nombre')
     date_hierarchy = 'fecha_hora'
     ordering = ('-fecha_hora',)
+
+
+@admin.register(AuditoriaArchivo)
+class AuditoriaArchivoAdmin(admin.ModelAdmin):
+    list_display = ('fecha_hora', 'usuario', 'accion', 'entidad', 'detalle')
+    list_filter = ('accion', 'entidad')
+    date_hierarchy = 'fecha_hora'
+    ordering = ('-fecha_hora',)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'formato', 'estado', 'filas_procesadas', 'total_filas', 'usuario', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo', 'formato')
+    readonly_fields = ('huella', 'parametros', 'archivo', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+    ordering = ('-fecha_creacion',)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'nombre_archivo', 'estado', 'filas_procesadas', 'filas_guardadas', 'filas_con_error', 'usuario', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('archivo', 'reporte', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+    ordering = ('-fecha_creacion',)
+
+
+@admin.register(EmailSaliente)
+class EmailSalienteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'asunto', 'estado', 'intentos', 'proximo_intento', 'fecha_creacion', 'fecha_envio')
+    list_filter = ('estado',)
+    search_fields = ('asunto',)
+    exclude = ('cuerpo', 'cuerpo_html')
+    readonly_fields = ('fecha_creacion', 'fecha_envio', 'reclamado_por', 'fecha_reclamo', 'ultimo_error')
+    ordering = ('-fecha_creacion',)
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from django.db import close_old_connections
+        from .auditoria import vaciar_auditoria
+        # Los eventos de auditoría en lote se escriben al cerrar cada respuesta, antes de
+        # que Django cierre las conexiones del request (si no, la escritura abriría una
+        # conexión nueva que quedaría abierta hasta el request siguiente)
+        request_finished.disconnect(close_old_connections)
+        request_finished.connect(vaciar_auditoria, dispatch_uid='dashboard_vaciar_auditoria')
+        request_finished.connect(close_old_connections)
+        # Métricas: los deltas del proceso se suman al archivo compartido cada pocos segundos
+        from .metricas import volcar_metricas
+        request_finished.connect(volcar_metricas, dispatch_uid='dashboard_volcar_metricas')
+        # Cache de fragmentos: Producto, Inventario y Auditoria invalidan sus versiones
+        from .senales import conectar_senales
+        conectar_senales()
@@ -0,0 +1,224 @@
+"""
+Archivo mensual de la auditoría.
+
+El comando `archivar_auditoria` saca de la tabla `auditoria` los meses
+cerrados con más de N meses de antigüedad y los deja:
+
+- en la tabla `auditoria_archivo` (filas comprimidas en MySQL), o
+- en archivos `auditoria_AAAA_MM.ndjson.gz` bajo AUDITORIA_ARCHIVO_DIR.
+
+Cada lote se copia y se borra dentro de la misma transacción. En modo NDJSON
+el lote se escribe antes del borrado en un miembro gzip aparte
+(`auditoria_AAAA_MM.ndjson.gz.<primer id>.pendiente`) que se agrega al archivo
+del mes recién después del commit; si la transacción falla se descarta, y los
+que deja una corrida interrumpida se resuelven al comenzar la siguiente. El
+borrado no carga las filas ni emite señales: el cache de la actividad se
+invalida una vez por lote.
+
+La lista de auditorías consulta también la tabla de archivo cuando el rango de
+fechas pedido llega a meses ya archivados en la tabla (los archivos NDJSON
+quedan fuera de línea).
+"""
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Auditoria, AuditoriaArchivo
+
+MESES_RETENCION_DEFECTO = 12
+TAMANO_LOTE_DEFECTO = 5000
+DESTINO_TABLA = 'tabla'
+DESTINO_NDJSON = 'ndjson'
+DESTINOS = (DESTINO_TABLA, DESTINO_NDJSON)
+
+CAMPOS = ('id', 'usuario_id', 'fecha_hora', 'accion', 'entidad', 'detalle')
+SUFIJO_PENDIENTE = '.pendiente'
+
+
+def directorio_archivo():
+    return Path(getattr(settings, 'AUDITORIA_ARCHIVO_DIR', Path(settings.BASE_DIR) / 'archivo_auditoria'))
+
+
+def fecha_corte(meses, ahora=None):
+    """Inicio (hora local) del mes que quedó `meses` meses atrás; lo anterior se archiva."""
+    ahora = timezone.localtime(ahora or timezone.now())
+    total = ahora.year * 12 + (ahora.month - 1) - meses
+    anio, mes = divmod(total, 12)
+    return timezone.make_aware(datetime(anio, mes + 1, 1))
+
+
+def _mes(fecha_hora):
+    local = timezone.localtime(fecha_hora)
+    return f'{local.year:04d}_{local.month:02d}'
+
+
+def _preparar_ndjson(filas, directorio):
+    """Escribe las filas de cada mes en un miembro gzip pendiente. Devuelve [(pendiente, destino)]."""
+    directorio.mkdir(parents=True, exist_ok=True)
+    por_mes = {}
+    for fila in filas:
+        por_mes.setdefault(_mes(fila['fecha_hora']), []).append(fila)
+    preparados = []
+    for mes, filas_mes in por_mes.items():
+        destino = directorio / f'auditoria_{mes}.ndjson.gz'
+        pendiente = directorio / f'{destino.name}.{filas_mes[0]["id"]}{SUFIJO_PENDIENTE}'
+        preparados.append((pendiente, destino))
+        with gzip.open(pendiente, 'wt', encoding='utf-8') as archivo:
+            for fila in filas_mes:
+                archivo.write(json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False))
+                archivo.write('\n')
+    return preparados
+
+
+def _confirmar_ndjson(pendiente, destino):
+    """Agrega el miembro pendiente al archivo del mes (varios miembros gzip concatenados son un gzip válido)."""
+    with open(pendiente, 'rb') as origen, open(destino, 'ab') as salida:
+        shutil.copyfileobj(origen, salida)
+        salida.flush()
+        os.fsync(salida.fileno())
+    pendiente.unlink()
+
+
+def _recuperar_pendientes(directorio):
+    """Resuelve los pendientes de una corrida interrumpida.
+
+    El primer id de cada pendiente indica si su lote llegó a borrarse: si ya
+    no está en `auditoria` la transacción se confirmó y se agrega; si sigue,
+    se revirtió y se descarta (el lote se vuelve a archivar).
+    """
+    if not directorio.is_dir():
+        return
+    for pendiente in sorted(directorio.glob(f'auditoria_*.ndjson.gz.*{SUFIJO_PENDIENTE}')):
+        nombre, resto = pendiente.name.split('.ndjson.gz.', 1)
+        primer_id = int(resto[:-len(SUFIJO_PENDIENTE)])
+        if Auditoria.objects.filter(id=primer_id).exists():
+            pendiente.unlink()
+        else:
+            _confirmar_ndjson(pendiente, directorio / f'{nombre}.ndjson.gz')
+
+
+def _borrar_lote(ids):
+    """DELETE explícito: Auditoria tiene un receptor post_delete, así que QuerySet.delete()
+    cargaría las filas y emitiría la señal por cada una."""
+    from .cache_fragmentos import GRUPO_AUDITORIA, invalidar_fragmentos
+    conexion = connections[Auditoria.objects.db]
+    tabla = conexion.ops.quote_name(Auditoria._meta.db_table)
+    columna = conexion.ops.quote_name(Auditoria._meta.pk.column)
+    marcadores = ', '.join(['%s'] * len(ids))
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({marcadores})', list(ids))
+    transaction.on_commit(lambda: invalidar_fragmentos(GRUPO_AUDITORIA))
+
+
+def archivar_auditoria(meses=None, destino=DESTINO_TABLA, directorio=None, lote=TAMANO_LOTE_DEFECTO,
+                       simular=False):
+    """Archiva los eventos anteriores al corte. Devuelve {'AAAA_MM': cantidad}."""
+    if meses is None:
+        meses = getattr(settings, 'AUDITORIA_MESES_RETENCION', MESES_RETENCION_DEFECTO)
+    if destino not in DESTINOS:
+        raise ValueError(f'Destino no válido: {destino}')
+    directorio = Path(directorio) if directorio else directorio_archivo()
+    corte = fecha_corte(meses)
+    pendientes = Auditoria.objects.filter(fecha_hora__lt=corte).order_by('fecha_hora', 'id')
+
+    resumen = {}
+    if simular:
+        for fecha_hora in pendientes.values_list('fecha_hora', flat=True).iterator(chunk_size=lote):
+            mes = _mes(fecha_hora)
+            resumen[mes] = resumen.get(mes, 0) + 1
+        return resumen
+
+    if destino == DESTINO_NDJSON:
+        _recuperar_pendientes(directorio)
+    while True:
+        preparados = []
+        try:
+            with transaction.atomic():
+                filas = list(pendientes.values(*CAMPOS)[:lote])
+                if not filas:
+                    break
+                if destino == DESTINO_TABLA:
+                    AuditoriaArchivo.objects.bulk_create(
+                        [AuditoriaArchivo(**fila) for fila in filas], ignore_conflicts=True
+                    )
+                else:
+                    preparados = _preparar_ndjson(filas, directorio)
+                _borrar_lote([fila['id'] for fila in filas])
+        except BaseException:
+            # El lote sigue en la tabla: sus miembros pendientes no deben agregarse
+            for pendiente, _ in preparados:
+                pendiente.unlink(missing_ok=True)
+            raise
+        for pendiente, destino_mes in preparados:
+            _confirmar_ndjson(pendiente, destino_mes)
+        for fila in filas:
+            mes = _mes(fila['fecha_hora'])
+            resumen[mes] = resumen.get(mes, 0) + 1
+    return resumen
+
+
+# --- Consulta ---
+
+def limite_archivo():
+    """Fecha del evento archivado más reciente (None si la tabla de archivo está vacía)."""
+    return AuditoriaArchivo.objects.aggregate(limite=Max('fecha_hora'))['limite']
+
+
+def rango_fechas(desde, hasta):
+    """Convierte fechas 'AAAA-MM-DD' en un rango [inicio, fin) en hora local."""
+    def _parsear(valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+        except ValueError:
+            return None
+    inicio, fin = _parsear(desde), _parsear(hasta)
+    if inicio:
+        inicio = timezone.make_aware(datetime.combine(inicio, time.min))
+    if fin:
+        fin = timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def filtrar_auditorias(queryset, accion=None, entidad=None, usuario_id=None, inicio=None, fin=None):
+    if accion:
+        queryset = queryset.filter(accion=accion)
+    if entidad:
+        queryset = queryset.filter(entidad__icontains=entidad)
+    if usuario_id:
+        queryset = queryset.filter(usuario_id=usuario_id)
+    if inicio:
+        queryset = queryset.filter(fecha_hora__gte=inicio)
+    if fin:
+        queryset = queryset.filter(fecha_hora__lt=fin)
+    return queryset
+
+
+def consulta_auditorias(accion=None, entidad=None, usuario_id=None, inicio=None, fin=None):
+    """Devuelve (queryset, combinado) según el rango pedido.
+
+    - Sin fecha de inicio, o si el inicio es posterior al archivo: solo `auditoria`.
+    - Si el rango completo cae en meses archivados: solo `auditoria_archivo`.
+    - Si cruza el límite: UNION ALL de ambas tablas (combinado=True; admite
+      count() y slicing, pero no más filtros ni select_related).
+    """
+    filtros = {'accion': accion, 'entidad': entidad, 'usuario_id': usuario_id, 'inicio': inicio, 'fin': fin}
+    vivas = filtrar_auditorias(Auditoria.objects.select_related('usuario'), **filtros)
+    if inicio is None:
+        return vivas, False
+    limite = limite_archivo()
+    if limite is None or inicio > limite:
+        return vivas, False
+    archivadas = filtrar_auditorias(AuditoriaArchivo.objects.select_related('usuario'), **filtros)
+    if fin is not None and fin <= limite:
+        return archivadas, False
+    combinado = vivas.select_related(None).order_by().union(archivadas.select_related(None).order_by(), all=True)
+    return combinado.order_by('-fecha_hora', '-id'), True
@@ -0,0 +1,141 @@
+"""
+Registro de auditoría en lotes.
+
+`registrar_auditoria()` reemplaza a `Auditoria.objects.create()` en las
+vistas: el evento se toma con su hora real, se agrega a un buffer del proceso
+cuando la transacción en curso se confirma (si se revierte, el evento se
+descarta, igual que antes) y se escribe con `bulk_create`:
+
+- al terminar cada request (señal `request_finished`, después de enviar la
+  respuesta al cliente),
+- cuando el buffer alcanza AUDITORIA_TAMANO_LOTE eventos,
+- cuando el evento más antiguo supera AUDITORIA_INTERVALO_SEGUNDOS,
+- después de cada trabajo en los workers (procesar_importaciones, ...),
+- al terminar el proceso (atexit), para comandos y scripts.
+
+Si el bulk_create del lote falla se reintenta evento por evento y solo se
+descartan (con el error impreso) los que vuelven a fallar.
+
+Con AUDITORIA_SINCRONA = True (pruebas) se escribe de inmediato, como antes.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+TAMANO_LOTE_DEFECTO = 100
+INTERVALO_DEFECTO = 2.0
+
+
+class BufferAuditoria:
+    """Eventos pendientes de escribir, compartido por los hilos del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = []
+        self._desde = None
+
+    def __len__(self):
+        return len(self._pendientes)
+
+    def agregar(self, evento):
+        self.agregar_varios([evento])
+
+    def agregar_varios(self, eventos):
+        with self._lock:
+            if not self._pendientes:
+                self._desde = time.monotonic()
+            self._pendientes.extend(eventos)
+            lleno = len(self._pendientes) >= getattr(settings, 'AUDITORIA_TAMANO_LOTE', TAMANO_LOTE_DEFECTO)
+            vencido = time.monotonic() - self._desde >= getattr(
+                settings, 'AUDITORIA_INTERVALO_SEGUNDOS', INTERVALO_DEFECTO
+            )
+        if lleno or vencido:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe todos los eventos pendientes en un solo bulk_create. Devuelve cuántos."""
+        with self._lock:
+            eventos, self._pendientes, self._desde = self._pendientes, [], None
+        if not eventos:
+            return 0
+        from .models import Auditoria
+        try:
+            Auditoria.objects.bulk_create(eventos, batch_size=500)
+            guardados = len(eventos)
+        except Exception:
+            # Una fila inválida no debe perder el lote: reintentar de a una
+            guardados = self._guardar_de_a_uno(eventos)
+        if guardados:
+            # bulk_create no emite post_save: invalidar aquí la actividad cacheada
+            from .cache_fragmentos import GRUPO_AUDITORIA, invalidar_fragmentos
+            invalidar_fragmentos(GRUPO_AUDITORIA)
+        return guardados
+
+    @staticmethod
+    def _guardar_de_a_uno(eventos):
+        from .models import Auditoria
+        guardados = 0
+        for evento in eventos:
+            # El lote revertido pudo dejar asignada la pk (motores con RETURNING)
+            evento.pk = None
+            evento._state.adding = True
+            try:
+                with transaction.atomic():
+                    Auditoria.objects.bulk_create([evento])
+                guardados += 1
+            except Exception:
+                import traceback
+                print(f"Error guardando evento de auditoría ({evento.accion} {evento.entidad}): "
+                      f"{traceback.format_exc()}")
+        return guardados
+
+
+buffer_auditoria = BufferAuditoria()
+
+
+def registrar_auditoria(usuario, accion, entidad, detalle=''):
+    """Registra un evento de auditoría (en lote salvo con AUDITORIA_SINCRONA)."""
+    from .models import Auditoria
+    if usuario is not None and not getattr(usuario, 'is_authenticated', True):
+        usuario = None
+    evento = Auditoria(
+        usuario=usuario, accion=accion, entidad=entidad, detalle=detalle, fecha_hora=timezone.now()
+    )
+    if getattr(settings, 'AUDITORIA_SINCRONA', False):
+        evento.save()
+        return evento
+    transaction.on_commit(lambda: buffer_auditoria.agregar(evento))
+    return evento
+
+
+def registrar_auditorias(usuario, accion, entidad, detalles):
+    """Como registrar_auditoria para varios eventos (mismo usuario, acción y entidad)."""
+    from .models import Auditoria
+    if usuario is not None and not getattr(usuario, 'is_authenticated', True):
+        usuario = None
+    ahora = timezone.now()
+    eventos = [
+        Auditoria(usuario=usuario, accion=accion, entidad=entidad, detalle=detalle, fecha_hora=ahora)
+        for detalle in detalles
+    ]
+    if not eventos:
+        return eventos
+    if getattr(settings, 'AUDITORIA_SINCRONA', False):
+        Auditoria.objects.bulk_create(eventos, batch_size=500)
+        from .cache_fragmentos import GRUPO_AUDITORIA, invalidar_fragmentos
+        transaction.on_commit(lambda: invalidar_fragmentos(GRUPO_AUDITORIA))
+        return eventos
+    transaction.on_commit(lambda: buffer_auditoria.agregar_varios(eventos))
+    return eventos
+
+
+def vaciar_auditoria(**kwargs):
+    """Receptor de `request_finished` y atexit: escribe lo pendiente."""
+    return buffer_auditoria.vaciar()
+
+
+atexit.register(vaciar_auditoria)
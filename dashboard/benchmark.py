@@ -0,0 +1,218 @@
+"""
+Benchmark de los caminos calientes del dashboard sobre datos de stress.
+
+Para cada tamaño (cantidad de productos) se hace crecer el conjunto de datos
+con `generador_stress` (todas las tablas) y se miden con el cliente de pruebas de Django:
+
+- listados en una página profunda (90% del recorrido) con búsqueda o filtro,
+  pedida con su cursor como al avanzar con "siguiente",
+- las cuatro exportaciones completas (all=true), consumiendo todo el stream,
+- el login y el registro de un movimiento de inventario.
+
+Por cada caso se guardan percentiles de tiempo y el número de consultas
+(incluidas las que ocurren mientras se envía una respuesta en streaming).
+`comparar()` contrasta dos resultados y lista los casos que empeoraron.
+"""
+import time
+
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .exportacion import EXPORTACIONES
+from .rendimiento import MedidorConsultas, _percentil
+
+TAMANOS_DEFECTO = (10_000, 100_000, 1_000_000)
+REPETICIONES_DEFECTO = 3
+SEMILLA_DEFECTO = 42
+# Un caso empeora si su p50 sube más que la tolerancia y además más que este margen
+TOLERANCIA_DEFECTO = 0.25
+MARGEN_MS = 5.0
+
+POR_PAGINA = 50
+PROFUNDIDAD = 0.9
+USUARIO_BENCHMARK = 'benchmark'
+CLAVE_BENCHMARK = 'Benchmark,2024'
+
+
+class ErrorBenchmark(Exception):
+    """Un caso respondió con error: la medición no sería comparable."""
+
+
+def _usuario_admin():
+    from roles.models import Rol
+    from usuarios.models import Usuario
+    rol, _ = Rol.objects.get_or_create(nombre='Administrador', defaults={'descripcion': 'Rol administrador'})
+    usuario = Usuario.objects.filter(username=USUARIO_BENCHMARK).first()
+    if usuario is None:
+        usuario = Usuario(
+            username=USUARIO_BENCHMARK, nombre='Benchmark', correo='benchmark@example.test',
+            contrasena='-', id_rol=rol,
+        )
+        usuario.set_password(CLAVE_BENCHMARK)
+        usuario.save()
+    return usuario
+
+
+def sembrar_hasta(tamano, semilla=SEMILLA_DEFECTO, procesos=None):
+    """Completa los datos de stress (ver generador_stress) hasta `tamano` productos."""
+    from inventarios.models import Inventario
+    from productos.models import Producto
+    from proveedores.models import Proveedor
+    from ventas.models import Venta
+    from .generador_stress import generar
+    from .models import Auditoria
+    _usuario_admin()
+    faltan = tamano - Producto.objects.count()
+    if faltan > 0:
+        generar(faltan, procesos=procesos, semilla=semilla + tamano)
+    return {
+        'productos': Producto.objects.count(),
+        'inventarios': Inventario.objects.count(),
+        'proveedores': Proveedor.objects.count(),
+        'ventas': Venta.objects.count(),
+        'auditorias': Auditoria.objects.count(),
+    }
+
+
+def _pagina_profunda(tipo, filtros):
+    total = EXPORTACIONES[tipo].construir_queryset(filtros).count()
+    return max(1, int(total / POR_PAGINA * PROFUNDIDAD))
+
+
+def _listado(nombre_url, tipo, clave_pagina, **filtros):
+    def preparar():
+        # Sin medir: la primera página entrega el paginador de la vista, que ubica el cursor
+        # de la página profunda (un OFFSET que la navegación real no paga)
+        cliente = Client()
+        cliente.force_login(_usuario_admin())
+        params = {**filtros, 'per_page': POR_PAGINA}
+        paginator = cliente.get(reverse(nombre_url), params).context[clave_pagina].paginator
+        pagina = _pagina_profunda(tipo, filtros)
+        params.update(page=pagina, cursor=paginator.cursor_de_pagina(pagina))
+        return lambda cliente: cliente.get(reverse(nombre_url), params)
+    return preparar
+
+
+def _exportacion(nombre_url):
+    def preparar():
+        return lambda cliente: cliente.get(reverse(nombre_url), {'all': 'true'})
+    return preparar
+
+
+def _login():
+    # Cliente nuevo: cada login crea su propia sesión
+    datos = {'username': USUARIO_BENCHMARK, 'password': CLAVE_BENCHMARK}
+    return lambda cliente: Client().post(reverse('dashboard:login'), datos)
+
+
+def _movimiento():
+    from inventarios.models import Inventario
+    datos = {
+        'tipo_movimiento': 'entrada', 'cantidad': 1, 'motivo': 'Benchmark',
+        'producto': Inventario.objects.order_by('pk').values_list('pk', flat=True).first(),
+    }
+    return lambda cliente: cliente.post(reverse('dashboard:registrar_movimiento_inventario'), datos)
+
+
+# nombre: preparar() -> petición(cliente) -> response. Lo que hace `preparar` no se mide.
+CASOS = {
+    # Con orden explícito: sin él la búsqueda de productos ordena por relevancia (sin cursor)
+    'listado_productos': _listado('dashboard:productos', 'productos', 'productos',
+                                  search='chocolate', order_by='id_producto'),
+    'listado_inventarios': _listado('dashboard:inventarios', 'inventarios', 'inventarios'),
+    'listado_proveedores': _listado('dashboard:proveedores', 'proveedores', 'proveedores', search='comercial'),
+    'listado_auditorias': _listado('dashboard:auditorias', 'auditorias', 'page_obj', entidad='Inventario'),
+    'exportar_productos': _exportacion('dashboard:exportar_productos_excel'),
+    'exportar_inventarios': _exportacion('dashboard:exportar_inventarios'),
+    'exportar_usuarios': _exportacion('dashboard:exportar_usuarios_excel'),
+    'exportar_auditorias': _exportacion('dashboard:exportar_auditorias_excel'),
+    'login': _login,
+    'registrar_movimiento': _movimiento,
+}
+
+
+def _ejecutar(peticion, cliente, medidor):
+    with connection.execute_wrapper(medidor):
+        respuesta = peticion(cliente)
+        if respuesta.streaming:
+            for _ in respuesta.streaming_content:
+                pass
+        respuesta.close()
+    return respuesta
+
+
+def medir_caso(nombre, cliente, repeticiones=REPETICIONES_DEFECTO, calentamiento=1):
+    """{ms_p50, ms_p90, ms_max, consultas} de `repeticiones` ejecuciones (tras `calentamiento`)."""
+    peticion = CASOS[nombre]()
+    tiempos, consultas = [], []
+    for vuelta in range(calentamiento + repeticiones):
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        respuesta = _ejecutar(peticion, cliente, medidor)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        if respuesta.status_code >= 400:
+            raise ErrorBenchmark(f'{nombre}: HTTP {respuesta.status_code}')
+        if vuelta >= calentamiento:
+            tiempos.append(milisegundos)
+            consultas.append(medidor.consultas)
+    tiempos.sort()
+    return {
+        'ms_p50': round(_percentil(tiempos, 50), 2),
+        'ms_p90': round(_percentil(tiempos, 90), 2),
+        'ms_max': round(tiempos[-1], 2),
+        'consultas': max(consultas),
+    }
+
+
+def medir(casos=None, repeticiones=REPETICIONES_DEFECTO, progreso=None):
+    """Mide los casos pedidos (todos por defecto) con un cliente autenticado como administrador."""
+    _usuario_admin()
+    cliente = Client()
+    cliente.login(username=USUARIO_BENCHMARK, password=CLAVE_BENCHMARK)
+    resultados = {}
+    for nombre in casos or CASOS:
+        resultados[nombre] = medir_caso(nombre, cliente, repeticiones)
+        if progreso:
+            progreso(nombre, resultados[nombre])
+    return resultados
+
+
+def ejecutar(tamanos=TAMANOS_DEFECTO, repeticiones=REPETICIONES_DEFECTO, semilla=SEMILLA_DEFECTO,
+             casos=None, procesos=None, progreso=None):
+    """Siembra y mide cada tamaño en orden creciente. Devuelve el documento JSON de resultados."""
+    documento = {
+        'fecha': timezone.now().isoformat(),
+        'motor': connections['default'].vendor,
+        'repeticiones': repeticiones,
+        'semilla': semilla,
+        'tamanos': {},
+    }
+    for tamano in sorted(tamanos):
+        inicio = time.perf_counter()
+        filas = sembrar_hasta(tamano, semilla, procesos)
+        sembrado = time.perf_counter() - inicio
+        documento['tamanos'][str(tamano)] = {
+            'filas': filas,
+            'siembra_segundos': round(sembrado, 2),
+            'casos': medir(casos, repeticiones, progreso=(lambda n, r: progreso(tamano, n, r)) if progreso else None),
+        }
+    return documento
+
+
+def comparar(anterior, actual, tolerancia=TOLERANCIA_DEFECTO, margen_ms=MARGEN_MS):
+    """Lista de regresiones (texto) de `actual` respecto de `anterior` en los tamaños y casos comunes."""
+    regresiones = []
+    for tamano, datos in actual.get('tamanos', {}).items():
+        previos = anterior.get('tamanos', {}).get(tamano, {}).get('casos', {})
+        for nombre, medicion in datos['casos'].items():
+            previo = previos.get(nombre)
+            if not previo:
+                continue
+            antes, ahora = previo['ms_p50'], medicion['ms_p50']
+            if ahora > antes * (1 + tolerancia) and ahora - antes > margen_ms:
+                regresiones.append(f'{tamano} {nombre}: p50 {antes:.1f} → {ahora:.1f} ms')
+            if medicion['consultas'] > previo['consultas']:
+                regresiones.append(f'{tamano} {nombre}: consultas {previo["consultas"]} → {medicion["consultas"]}')
+    return regresiones
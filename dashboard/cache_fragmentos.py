@@ -0,0 +1,58 @@
+"""
+Cache de fragmentos y conteos del dashboard, invalidado por versión.
+
+Cada grupo de datos ('productos', 'inventarios', 'auditoria') tiene un número
+de versión en el cache. Las claves de los fragmentos de plantilla
+(`{% cache %}`) y de los conteos incluyen las versiones de los grupos de los
+que dependen; las señales de dashboard/senales.py incrementan la versión al
+escribir Producto, Inventario o Auditoria, de modo que la próxima lectura
+recalcula. El TTL acota lo que no pasa por save()/delete() (update() masivos).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GRUPO_PRODUCTOS = 'productos'
+GRUPO_INVENTARIOS = 'inventarios'
+GRUPO_AUDITORIA = 'auditoria'
+
+
+def ttl_fragmentos():
+    return getattr(settings, 'CACHE_FRAGMENTOS_SEGUNDOS', 300)
+
+
+def _clave_version(grupo):
+    return f'fragmentos:version:{grupo}'
+
+
+def version_fragmentos(*grupos):
+    """Versión combinada de los grupos, p. ej. '1718044.1718051' (para usar en claves)."""
+    claves = [_clave_version(grupo) for grupo in grupos]
+    versiones = cache.get_many(claves)
+    for clave in claves:
+        if clave not in versiones:
+            # Si la clave se desalojó, la nueva versión no puede repetir una anterior
+            cache.add(clave, int(time.time() * 1000), timeout=None)
+            versiones[clave] = cache.get(clave)
+    return '.'.join(str(versiones[clave]) for clave in claves)
+
+
+def invalidar_fragmentos(*grupos):
+    for grupo in grupos:
+        clave = _clave_version(grupo)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            # Sin versión previa: la próxima lectura crea una nueva
+            pass
+
+
+def conteo_cacheado(nombre, queryset, *grupos):
+    """`queryset.count()` cacheado mientras no cambien los `grupos`."""
+    clave = f'fragmentos:conteo:{nombre}:{version_fragmentos(*grupos)}'
+    total = cache.get(clave)
+    if total is None:
+        total = queryset.count()
+        cache.set(clave, total, ttl_fragmentos())
+    return total
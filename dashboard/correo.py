@@ -0,0 +1,166 @@
+"""
+Cola de correos salientes.
+
+Las vistas no hablan con el servidor SMTP: `encolar_correo()` inserta un
+`EmailSaliente` y vuelve de inmediato. El comando `enviar_correos` reclama
+lotes de pendientes y los envía por una sola conexión SMTP reutilizada:
+
+- Reclamo: un UPDATE condicionado al estado marca el lote con un token
+  propio del worker, así dos workers nunca envían el mismo correo.
+- Reintentos: un envío fallido vuelve a 'pendiente' con espera exponencial
+  (CORREO_REINTENTO_SEGUNDOS · 2^(intentos-1)) hasta CORREO_MAX_INTENTOS;
+  después queda en 'error'. Tras un fallo la conexión se reabre.
+- Los correos con `caduca` vencida (p. ej. enlaces de recuperación de 5
+  minutos) se descartan en lugar de enviarse tarde.
+- Al llegar a un estado final (enviado, caducado o 'error' tras el último
+  intento) se vacía el cuerpo: la tabla no conserva enlaces ni claves.
+
+El backend es el de EMAIL_BACKEND, de modo que en local se puede probar con
+`locmem` o `filebased`. La entrega es "al menos una vez": si el worker muere
+a mitad de un lote, los correos reclamados se reencolan.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import EmailSaliente
+
+TAMANO_LOTE_DEFECTO = 50
+MAX_INTENTOS_DEFECTO = 5
+REINTENTO_SEGUNDOS_DEFECTO = 60
+REINTENTO_MAXIMO = timedelta(hours=6)
+
+
+def max_intentos():
+    return getattr(settings, 'CORREO_MAX_INTENTOS', MAX_INTENTOS_DEFECTO)
+
+
+def espera_reintento(intentos):
+    """Espera antes del siguiente intento (exponencial, con tope)."""
+    base = getattr(settings, 'CORREO_REINTENTO_SEGUNDOS', REINTENTO_SEGUNDOS_DEFECTO)
+    return min(timedelta(seconds=base * 2 ** max(intentos - 1, 0)), REINTENTO_MAXIMO)
+
+
+def encolar_correo(destinatarios, asunto, mensaje, html_message=None, from_email=None, caduca=None):
+    """Deja un correo en la cola (mismos argumentos que send_mail). Devuelve el EmailSaliente."""
+    if isinstance(destinatarios, str):
+        destinatarios = [destinatarios]
+    return EmailSaliente.objects.create(
+        destinatarios=[destinatario for destinatario in destinatarios if destinatario],
+        remitente=from_email or '',
+        asunto=asunto[:255],
+        cuerpo=mensaje or '',
+        cuerpo_html=html_message or '',
+        caduca=caduca,
+    )
+
+
+def reclamar_lote(tamano=TAMANO_LOTE_DEFECTO, ahora=None):
+    """Marca como 'enviando' hasta `tamano` correos listos y los devuelve."""
+    ahora = ahora or timezone.now()
+    ids = list(
+        EmailSaliente.objects.filter(estado=EmailSaliente.ESTADO_PENDIENTE, proximo_intento__lte=ahora)
+        .order_by('proximo_intento', 'pk').values_list('pk', flat=True)[:tamano]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    EmailSaliente.objects.filter(pk__in=ids, estado=EmailSaliente.ESTADO_PENDIENTE).update(
+        estado=EmailSaliente.ESTADO_ENVIANDO, reclamado_por=token, fecha_reclamo=ahora,
+    )
+    return list(EmailSaliente.objects.filter(reclamado_por=token, estado=EmailSaliente.ESTADO_ENVIANDO).order_by('pk'))
+
+
+def _mensaje(correo, conexion):
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto,
+        body=correo.cuerpo,
+        from_email=correo.remitente or settings.DEFAULT_FROM_EMAIL,
+        to=correo.destinatarios,
+        connection=conexion,
+    )
+    if correo.cuerpo_html:
+        mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+    return mensaje
+
+
+def enviar_lote(correos, conexion=None, ahora=None):
+    """Envía los correos reclamados por una sola conexión. Devuelve {'enviados', 'reintentos', 'fallidos'}."""
+    ahora = ahora or timezone.now()
+    resultado = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+    if not correos:
+        return resultado
+    conexion = conexion or get_connection(fail_silently=False)
+    try:
+        for correo in correos:
+            correo.reclamado_por = ''
+            if correo.caduca and correo.caduca <= ahora:
+                correo.estado = EmailSaliente.ESTADO_ERROR
+                correo.ultimo_error = 'Caducado antes de enviarse'
+                correo.cuerpo = correo.cuerpo_html = ''
+                resultado['fallidos'] += 1
+                continue
+            correo.intentos += 1
+            try:
+                conexion.send_messages([_mensaje(correo, conexion)])
+            except Exception as e:
+                import traceback
+                print(f"❌ Error enviando correo {correo.pk}: {traceback.format_exc()}")
+                correo.ultimo_error = f'{type(e).__name__}: {e}'[:2000]
+                if correo.intentos >= max_intentos():
+                    correo.estado = EmailSaliente.ESTADO_ERROR
+                    correo.cuerpo = correo.cuerpo_html = ''
+                    resultado['fallidos'] += 1
+                else:
+                    correo.estado = EmailSaliente.ESTADO_PENDIENTE
+                    correo.proximo_intento = timezone.now() + espera_reintento(correo.intentos)
+                    resultado['reintentos'] += 1
+                # La conexión puede haber quedado inutilizable: se reabre en el siguiente envío
+                conexion.close()
+                continue
+            correo.estado = EmailSaliente.ESTADO_ENVIADO
+            correo.fecha_envio = timezone.now()
+            correo.ultimo_error = ''
+            correo.cuerpo = correo.cuerpo_html = ''
+            resultado['enviados'] += 1
+    finally:
+        conexion.close()
+        EmailSaliente.objects.bulk_update(correos, [
+            'estado', 'intentos', 'proximo_intento', 'reclamado_por', 'ultimo_error', 'fecha_envio',
+            'cuerpo', 'cuerpo_html',
+        ])
+    return resultado
+
+
+def enviar_pendientes(tamano_lote=TAMANO_LOTE_DEFECTO, max_lotes=None):
+    """Envía la cola lista, lote a lote. Devuelve los totales."""
+    total = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        correos = reclamar_lote(tamano_lote)
+        if not correos:
+            break
+        for clave, valor in enviar_lote(correos).items():
+            total[clave] += valor
+        lotes += 1
+    return total
+
+
+def reencolar_atascados(minutos):
+    """Devuelve a 'pendiente' los correos reclamados por un worker que murió."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return EmailSaliente.objects.filter(estado=EmailSaliente.ESTADO_ENVIANDO, fecha_reclamo__lt=limite).update(
+        estado=EmailSaliente.ESTADO_PENDIENTE, reclamado_por='',
+    )
+
+
+def purgar_correos(dias):
+    """Elimina los correos enviados o descartados hace más de `dias`."""
+    limite = timezone.now() - timedelta(days=dias)
+    borrados, _ = EmailSaliente.objects.filter(
+        estado__in=[EmailSaliente.ESTADO_ENVIADO, EmailSaliente.ESTADO_ERROR], fecha_creacion__lt=limite,
+    ).delete()
+    return borrados
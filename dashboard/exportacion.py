@@ -0,0 +1,408 @@
+"""
+Motor de exportación compartido por todos los exportadores.
+
+Usa el modo write-only de openpyxl con estilos con nombre (un único estilo
+registrado por tipo de celda) y recorre los querysets con
+`.values_list().iterator(chunk_size=...)`, de modo que la memoria se mantiene
+constante sin importar la cantidad de filas. El archivo se genera en un
+temporal y se envía por partes mediante StreamingHttpResponse.
+
+Con `format=csv` o `format=ndjson` las filas se envían directamente desde un
+generador, sin archivo intermedio (pensado para cargas completas desde BI).
+"""
+import csv
+import json
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+from .metricas import observar
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CONTENT_TYPES = {
+    'xlsx': CONTENT_TYPE_XLSX,
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+FORMATOS = tuple(CONTENT_TYPES)
+CHUNK_SIZE_QUERYSET = 2000
+CHUNK_SIZE_RESPUESTA = 64 * 1024
+
+# campo: ruta para values_list; formato: callable opcional sobre el valor crudo
+Columna = namedtuple('Columna', ['titulo', 'campo', 'ancho', 'formato', 'estilo'], defaults=(None, 'celda'))
+
+
+class Exportacion:
+    """Describe una exportación: columnas, hoja y cómo construir el queryset."""
+
+    def __init__(self, nombre, titulo_hoja, columnas, construir_queryset,
+                 color_encabezado='DC2626', session_per_page=None, per_page_defecto=10,
+                 detectar_unico=True):
+        self.nombre = nombre
+        self.titulo_hoja = titulo_hoja
+        self.columnas = columnas
+        self.construir_queryset = construir_queryset
+        self.color_encabezado = color_encabezado
+        self.session_per_page = session_per_page
+        self.per_page_defecto = per_page_defecto
+        self.detectar_unico = detectar_unico
+
+    @property
+    def campos(self):
+        return [columna.campo for columna in self.columnas]
+
+    def filas(self, queryset, chunk_size=CHUNK_SIZE_QUERYSET):
+        """Itera las filas ya formateadas leyendo solo las columnas necesarias."""
+        formatos = [columna.formato for columna in self.columnas]
+        for fila in queryset.iterator(chunk_size=chunk_size):
+            yield [formato(valor) if formato else valor for formato, valor in zip(formatos, fila)]
+
+
+def _estilos(color_encabezado):
+    borde = Border(
+        left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin')
+    )
+    return [
+        NamedStyle(
+            name='encabezado',
+            font=Font(bold=True, color='FFFFFF', size=12),
+            fill=PatternFill(start_color=color_encabezado, end_color=color_encabezado, fill_type='solid'),
+            alignment=Alignment(horizontal='center', vertical='center'),
+            border=borde,
+        ),
+        NamedStyle(name='celda', alignment=Alignment(vertical='center'), border=borde),
+        NamedStyle(name='moneda', alignment=Alignment(vertical='center'), border=borde, number_format='$#,##0'),
+    ]
+
+
+def escribir_xlsx(exportacion, filas, destino):
+    """Escribe las filas en `destino` (ruta o archivo) usando un workbook write-only."""
+    wb = Workbook(write_only=True)
+    for estilo in _estilos(exportacion.color_encabezado):
+        wb.add_named_style(estilo)
+    ws = wb.create_sheet(exportacion.titulo_hoja)
+    for col_num, columna in enumerate(exportacion.columnas, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = columna.ancho
+
+    def celda(valor, estilo):
+        cell = WriteOnlyCell(ws, value=valor)
+        cell.style = estilo
+        return cell
+
+    ws.append([celda(columna.titulo, 'encabezado') for columna in exportacion.columnas])
+    estilos = [columna.estilo for columna in exportacion.columnas]
+    total = 0
+    for fila in filas:
+        ws.append([celda(valor, estilo) for valor, estilo in zip(fila, estilos)])
+        total += 1
+    wb.save(destino)
+    return total
+
+
+def filas_medidas(exportacion, filas, formato, modo):
+    """Deja pasar las filas y al terminar registra cuántas fueron y cuánto tardó."""
+    inicio = time.perf_counter()
+    total = 0
+    try:
+        for fila in filas:
+            total += 1
+            yield fila
+    finally:
+        etiquetas = {'tipo': exportacion.nombre, 'formato': formato, 'modo': modo}
+        observar('dulceria_exportacion_filas', total, **etiquetas)
+        observar('dulceria_exportacion_segundos', time.perf_counter() - inicio, **etiquetas)
+
+
+def respuesta_xlsx_streaming(exportacion, queryset, nombre_archivo):
+    """StreamingHttpResponse que genera el xlsx recién al empezar a enviarse."""
+    def contenido():
+        with tempfile.TemporaryFile() as temporal:
+            filas = filas_medidas(exportacion, exportacion.filas(queryset), 'xlsx', 'directa')
+            escribir_xlsx(exportacion, filas, temporal)
+            temporal.seek(0)
+            while True:
+                bloque = temporal.read(CHUNK_SIZE_RESPUESTA)
+                if not bloque:
+                    break
+                yield bloque
+
+    response = StreamingHttpResponse(contenido(), content_type=CONTENT_TYPE_XLSX)
+    response['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
+    return response
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(exportacion, filas):
+    """Genera el CSV línea por línea (encabezado con los títulos de columna)."""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([columna.titulo for columna in exportacion.columnas])
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def lineas_ndjson(exportacion, filas):
+    """Genera un objeto JSON por línea, con los campos del queryset como claves."""
+    campos = exportacion.campos
+    codificador = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for fila in filas:
+        yield codificador.encode(dict(zip(campos, fila))) + '\n'
+
+
+GENERADORES_TEXTO = {'csv': lineas_csv, 'ndjson': lineas_ndjson}
+
+
+def formato_solicitado(params):
+    """Formato pedido en ?format= (xlsx por defecto o si no es válido)."""
+    formato = (params.get('format') or 'xlsx').strip().lower()
+    return formato if formato in FORMATOS else 'xlsx'
+
+
+def escribir_exportacion(exportacion, filas, destino, formato='xlsx'):
+    """Escribe las filas en un archivo binario en el formato indicado y devuelve cuántas fueron."""
+    if formato == 'xlsx':
+        return escribir_xlsx(exportacion, filas, destino)
+    total = 0
+
+    def contar(filas):
+        nonlocal total
+        for fila in filas:
+            total += 1
+            yield fila
+
+    for linea in GENERADORES_TEXTO[formato](exportacion, contar(filas)):
+        destino.write(linea.encode('utf-8'))
+    return total
+
+
+def respuesta_exportacion(exportacion, queryset, nombre_base, formato='xlsx'):
+    """Respuesta streaming en el formato pedido; `nombre_base` va sin extensión."""
+    if formato == 'xlsx':
+        return respuesta_xlsx_streaming(exportacion, queryset, f'{nombre_base}.xlsx')
+    filas = filas_medidas(exportacion, exportacion.filas(queryset), formato, 'directa')
+    lineas = GENERADORES_TEXTO[formato](exportacion, filas)
+    response = StreamingHttpResponse(lineas, content_type=CONTENT_TYPES[formato])
+    response['Content-Disposition'] = f'attachment; filename={nombre_base}.{formato}'
+    return response
+
+
+def resolver_alcance(exportacion, params, session=None):
+    """Aplica el alcance pedido (todos, único o página) al queryset filtrado.
+
+    Devuelve (queryset de values_list, export_scope, export_all).
+    """
+    queryset = exportacion.construir_queryset(params).values_list(*exportacion.campos)
+
+    per_page_param = params.get('per_page')
+    try:
+        if per_page_param:
+            per_page = int(per_page_param)
+        elif session is not None and exportacion.session_per_page:
+            per_page = int(session.get(exportacion.session_per_page, exportacion.per_page_defecto))
+        else:
+            per_page = exportacion.per_page_defecto
+    except (TypeError, ValueError):
+        per_page = exportacion.per_page_defecto
+    per_page = max(per_page, 1)
+    try:
+        current_page = max(int(params.get('page') or 1), 1)
+    except (TypeError, ValueError):
+        current_page = 1
+
+    export_all = (params.get('all') or 'false').lower() in ['true', '1', 'yes']
+    if export_all:
+        return queryset, 'todos', True
+    # Basta con saber si hay exactamente un registro: nunca contar la tabla completa
+    if exportacion.detectar_unico and queryset.order_by()[:2].count() == 1:
+        return queryset, 'unico', False
+    offset = (current_page - 1) * per_page
+    return queryset[offset:offset + per_page], f'pagina_{current_page}', False
+
+
+def marca_tiempo():
+    return datetime.now().strftime('%Y%m%d_%H%M%S')
+
+
+def _orden(params, allowed_fields, defecto, direccion_defecto='desc'):
+    order_by = (params.get('order_by') or defecto).lstrip('-')
+    if order_by not in allowed_fields:
+        order_by = defecto
+    order_direction = params.get('order_direction') or direccion_defecto
+    return f'-{order_by}' if order_direction == 'desc' else order_by
+
+
+def _fecha(valor, vacio=''):
+    return valor.strftime('%Y-%m-%d %H:%M') if valor else vacio
+
+
+# --- Definición de cada exportación ---
+
+def queryset_productos(params):
+    from productos.models import Producto
+    from productos.busqueda import buscar_productos
+    productos = Producto.objects.all()
+    search = params.get('search') or ''
+    if search:
+        productos = buscar_productos(productos, search)
+    allowed_fields = {'id_producto', 'nombre', 'descripcion', 'precio_referencia', 'unidad_medida'}
+    return productos.order_by(_orden(params, allowed_fields, 'id_producto'))
+
+
+def queryset_usuarios(params):
+    from usuarios.models import Usuario
+    usuarios = Usuario.objects.all()
+    search = (params.get('search') or '').strip()
+    if search:
+        usuarios = usuarios.filter(
+            Q(username__icontains=search) | Q(nombre__icontains=search) | Q(email__icontains=search)
+        )
+    allowed_fields = {'id_usuario', 'username', 'nombre', 'email', 'last_login', 'date_joined'}
+    return usuarios.order_by(_orden(params, allowed_fields, 'id_usuario'))
+
+
+def queryset_auditorias(params):
+    from dashboard.models import Auditoria
+    auditorias = Auditoria.objects.all()
+    accion = params.get('accion') or ''
+    entidad = (params.get('entidad') or '').strip()
+    usuario_id = (params.get('usuario') or '').strip()
+    if accion:
+        auditorias = auditorias.filter(accion=accion)
+    if entidad:
+        auditorias = auditorias.filter(entidad__icontains=entidad)
+    if usuario_id:
+        auditorias = auditorias.filter(usuario_id=usuario_id)
+    search = (params.get('search') or '').strip()
+    if search:
+        auditorias = auditorias.filter(
+            Q(entidad__icontains=search) |
+            Q(detalle__icontains=search) |
+            Q(accion__icontains=search) |
+            Q(usuario__nombre__icontains=search) |
+            Q(usuario__username__icontains=search)
+        )
+    return auditorias.order_by(_orden(params, {'fecha_hora', 'accion', 'entidad'}, 'fecha_hora'))
+
+
+def queryset_inventarios(params):
+    from inventarios.models import Inventario
+    inventarios = Inventario.objects.all()
+    search = (params.get('search') or '').strip()
+    if search:
+        inventarios = inventarios.filter(Q(id_producto__nombre__icontains=search) | Q(ubicacion__icontains=search))
+    allowed_fields = {'id_inventario', 'cantidad_actual', 'stock_minimo', 'ubicacion', 'fecha_ultima_actualizacion'}
+    return inventarios.order_by(_orden(params, allowed_fields, 'fecha_ultima_actualizacion'), '-id_inventario')
+
+
+def queryset_proveedores(params):
+    from proveedores.models import Proveedor
+    proveedores = Proveedor.objects.all()
+    search = (params.get('search') or '').strip()
+    if search:
+        proveedores = proveedores.filter(Q(nombre__icontains=search) | Q(rut_nif__icontains=search))
+    return proveedores.order_by('-id_proveedor')
+
+
+EXPORTACION_PRODUCTOS = Exportacion(
+    nombre='productos',
+    titulo_hoja='Productos',
+    columnas=[
+        Columna('ID', 'id_producto', 8),
+        Columna('Nombre', 'nombre', 35),
+        Columna('Descripción', 'descripcion', 50),
+        Columna('Precio Referencia', 'precio_referencia', 18, estilo='moneda'),
+    ],
+    construir_queryset=queryset_productos,
+    session_per_page='productos_per_page',
+    detectar_unico=False,
+)
+
+EXPORTACION_USUARIOS = Exportacion(
+    nombre='usuarios',
+    titulo_hoja='Usuarios',
+    columnas=[
+        Columna('ID', 'id_usuario', 8),
+        Columna('Usuario', 'username', 20),
+        Columna('Email', 'email', 30),
+        Columna('Nombre', 'nombre', 25),
+        Columna('Teléfono', 'telefono', 15, lambda v: v or ''),
+        Columna('Rol', 'id_rol__nombre', 20, lambda v: v or 'Sin rol'),
+        Columna('Estado', 'is_active', 12, lambda v: 'Activo' if v else 'Inactivo'),
+        Columna('Último Acceso', 'last_login', 20, lambda v: _fecha(v, 'Nunca')),
+        Columna('Fecha Creación', 'date_joined', 20, _fecha),
+    ],
+    construir_queryset=queryset_usuarios,
+    session_per_page='usuarios_per_page',
+)
+
+EXPORTACION_AUDITORIAS = Exportacion(
+    nombre='auditorias',
+    titulo_hoja='Auditorias',
+    columnas=[
+        Columna('Fecha/Hora', 'fecha_hora', 20, _fecha),
+        Columna('Acción', 'accion', 12),
+        Columna('Entidad', 'entidad', 18),
+        Columna('Detalle', 'detalle', 50),
+        Columna('Usuario', 'usuario__nombre', 22, lambda v: 'Sistema' if v is None else v),
+    ],
+    construir_queryset=queryset_auditorias,
+    session_per_page='auditorias_per_page',
+    per_page_defecto=50,
+)
+
+EXPORTACION_INVENTARIOS = Exportacion(
+    nombre='inventarios',
+    titulo_hoja='Inventarios',
+    columnas=[
+        Columna('ID', 'id_inventario', 8),
+        Columna('Producto', 'id_producto__nombre', 35),
+        Columna('Ubicación', 'ubicacion', 25),
+        Columna('Cantidad Actual', 'cantidad_actual', 16),
+        Columna('Stock Mínimo', 'stock_minimo', 14),
+        Columna('Stock Máximo', 'stock_maximo', 14, lambda v: '' if v is None else v),
+        Columna('Última Actualización', 'fecha_ultima_actualizacion', 20, _fecha),
+    ],
+    construir_queryset=queryset_inventarios,
+    color_encabezado='16A34A',
+    session_per_page='inventarios_per_page',
+)
+
+EXPORTACION_PROVEEDORES = Exportacion(
+    nombre='proveedores',
+    titulo_hoja='Proveedores',
+    columnas=[
+        Columna('ID', 'id_proveedor', 8),
+        Columna('Nombre', 'nombre', 30),
+        Columna('Contacto', 'contacto', 25, lambda v: v or ''),
+        Columna('Dirección', 'direccion', 40, lambda v: v or ''),
+        Columna('País', 'pais', 15, lambda v: v or ''),
+        Columna('RUT', 'rut_nif', 15),
+        Columna('Email', 'email', 30, lambda v: v or ''),
+        Columna('Email Secundario', 'email_secundario', 30, lambda v: v or ''),
+    ],
+    construir_queryset=queryset_proveedores,
+    color_encabezado='4F81F7',
+    session_per_page='proveedores_per_page',
+)
+
+EXPORTACIONES = {
+    exportacion.nombre: exportacion
+    for exportacion in (
+        EXPORTACION_PRODUCTOS, EXPORTACION_USUARIOS, EXPORTACION_AUDITORIAS,
+        EXPORTACION_INVENTARIOS, EXPORTACION_PROVEEDORES,
+    )
+}
@@ -0,0 +1,452 @@
+"""
+Generador de datos de stress para todo el esquema.
+
+A partir de una cantidad de productos N se generan, en este orden:
+
+    usuarios (N/1000, mín. 5)   clientes (N/10)   proveedores (N/10)
+    productos (N) + índice de búsqueda
+    inventarios (2 por producto) + stock_resumen + movimiento de carga inicial
+    producto_proveedor (2 por producto)
+    ventas (N) + detalle_venta (1 a 5 líneas, ~3N)
+    auditoría (N)
+
+y al final se acumulan los totales diarios de ventas. Son ~14 filas por
+producto: 10M filas con --productos 700000.
+
+Cada etapa se divide en tramos de unidades consecutivas; cada tramo se
+genera con un `random.Random` sembrado con (semilla, etapa, inicio), de modo
+que el resultado no depende del número de procesos. Los ids se asignan de
+forma explícita a continuación del máximo existente y las claves foráneas se
+calculan (no se consultan), así que los tramos de una etapa se escriben en
+paralelo con un pool de procesos, cada uno con su conexión, usando INSERT
+de varias filas. En SQLite (un solo escritor) todo corre en el proceso actual.
+
+Los datos se agregan a lo existente; no se generan colas operativas
+(export_job, import_job, email_saliente, tokens de recuperación).
+"""
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.color import no_style
+from django.db import connection, connections, models, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+TAMANO_TRAMO_DEFECTO = 5000
+SEMILLA_DEFECTO = 42
+DIAS_DEFECTO = 365
+# Tope de filas por INSERT (además del límite de parámetros del motor)
+FILAS_POR_INSERT = 1000
+CLAVE_STRESS = 'Stress,2024'
+LOTE_AGREGADOS = 100_000
+
+ROLES = ('Administrador', 'Vendedor', 'Bodeguero', 'Cliente', 'Consulta')
+CATEGORIAS = (
+    'Alfajor', 'Trufa', 'Bombón', 'Caramelo', 'Gomita', 'Chocolate', 'Piruleta', 'Chicle',
+    'Mazapán', 'Turrón', 'Brownie', 'Cookie', 'Galletita', 'Wafer', 'Oblea',
+)
+SABORES = (
+    'Chocolate', 'Vainilla', 'Fresa', 'Limón', 'Naranja', 'Menta', 'Café', 'Caramelo', 'Coco', 'Frambuesa',
+    'Dulce de Leche', 'Maracuyá', 'Cereza', 'Pistacho', 'Avellana', 'Almendra', 'Nuez', 'Miel', 'Canela', 'Jengibre',
+)
+UBICACIONES = (
+    'Estante A1', 'Estante A2', 'Estante A3', 'Estante A4', 'Estante B1', 'Estante B2', 'Estante B3', 'Estante B4',
+    'Estante C1', 'Estante C2', 'Estante C3', 'Estante C4', 'Bodega Principal', 'Bodega Secundaria',
+    'Almacén Norte', 'Almacén Sur', 'Depósito 1', 'Depósito 2', 'Refrigerador A', 'Refrigerador B',
+)
+# Paso coprimo con len(UBICACIONES): las dos ubicaciones de un producto nunca coinciden
+PASO_UBICACION = 7
+UNIDADES = ('unidad', 'caja', 'paquete', 'kg')
+NOMBRES = ('Juan', 'María', 'Pedro', 'Lucía', 'Carlos', 'Ana', 'Sofía', 'Tomás', 'Daniela', 'Felipe')
+APELLIDOS = ('Pérez', 'González', 'Silva', 'Rojas', 'Torres', 'Castro', 'Vargas', 'Flores', 'Suárez', 'López')
+EMPRESAS = ('Comercial', 'Distribuidora', 'Importadora', 'Confites', 'Dulces', 'Alimentos')
+ZONAS = ('Andes', 'Pacífico', 'Austral', 'Central', 'Del Norte', 'Del Sur', 'Premium')
+CALLES = ('Av. Libertador', 'Calle Principal', 'Av. Los Héroes', 'Calle 21 de Mayo', 'Pasaje Central', 'Camino Real')
+COMUNAS = ('Santiago', 'Providencia', 'Ñuñoa', 'Maipú', 'Las Condes', 'La Florida')
+ENTIDADES = ('Producto', 'Inventario', 'Proveedor', 'Usuario', 'Venta')
+ACCIONES = ('CREAR', 'EDITAR', 'BORRAR')
+# Cuerpo de RUT de los proveedores generados: base + id (único sin consultar los existentes)
+BASE_RUT = 50_000_000
+
+
+def _modelo(etiqueta):
+    from django.apps import apps
+    return apps.get_model(etiqueta)
+
+
+def precio(producto_id):
+    """Precio de referencia de un producto generado, calculable desde su id en cualquier tramo."""
+    return 1500 + producto_id * 7919 % 6501
+
+
+def _fechas(rng, ahora, dias, n):
+    minutos = dias * 24 * 60
+    return [ahora - timedelta(minutes=m) for m in rng.choices(range(minutos), k=n)]
+
+
+def _personas(rng, n):
+    return [f'{nombre} {apellido}' for nombre, apellido in zip(rng.choices(NOMBRES, k=n), rng.choices(APELLIDOS, k=n))]
+
+
+def _direcciones(rng, n):
+    calles, numeros, comunas = rng.choices(CALLES, k=n), rng.choices(range(10, 9999), k=n), rng.choices(COMUNAS, k=n)
+    return [f'{calle} {numero}, {comuna}' for calle, numero, comuna in zip(calles, numeros, comunas)]
+
+
+def _rango(ctx, clave):
+    base = ctx['base'][clave]
+    return range(base + 1, base + ctx['cantidades'][clave] + 1)
+
+
+# --- Generadores por etapa: (rng, inicio, fin, ctx) -> [(etiqueta del modelo, {columna: lista o valor})] ---
+
+def _usuarios(rng, inicio, fin, ctx):
+    ids = [ctx['base']['usuarios'] + k + 1 for k in range(inicio, fin)]
+    n = len(ids)
+    return [('usuarios.Usuario', {
+        'id_usuario': ids,
+        'username': [f'stress{pk}' for pk in ids],
+        'correo': [f'stress{pk}@example.test' for pk in ids],
+        'email': [f'stress{pk}@example.test' for pk in ids],
+        'nombre': _personas(rng, n),
+        'password': ctx['clave'],
+        'contrasena': '-',
+        'id_rol_id': rng.choices(ctx['roles'], k=n),
+        'date_joined': _fechas(rng, ctx['ahora'], ctx['dias'], n),
+    })]
+
+
+def _clientes(rng, inicio, fin, ctx):
+    ids = [ctx['base']['clientes'] + k + 1 for k in range(inicio, fin)]
+    n = len(ids)
+    return [('dashboard.Cliente', {
+        'id_cliente': ids,
+        'nombre': _personas(rng, n),
+        'contacto': [f'+56 9 {numero:08d}' for numero in rng.choices(range(10 ** 8), k=n)],
+        'direccion': _direcciones(rng, n),
+    })]
+
+
+def _proveedores(rng, inicio, fin, ctx):
+    from proveedores.management.commands.generar_proveedores_stress import calcular_dv_rut
+    ids = [ctx['base']['proveedores'] + k + 1 for k in range(inicio, fin)]
+    n = len(ids)
+    return [('proveedores.Proveedor', {
+        'id_proveedor': ids,
+        'rut_nif': [f'{BASE_RUT + pk}-{calcular_dv_rut(BASE_RUT + pk)}' for pk in ids],
+        'nombre': [
+            f'{empresa} {zona} #{pk}' for empresa, zona, pk in zip(rng.choices(EMPRESAS, k=n), rng.choices(ZONAS, k=n), ids)
+        ],
+        'contacto': _personas(rng, n),
+        'direccion': _direcciones(rng, n),
+        'pais': 'Chile',
+        'email': [f'proveedor{pk}@example.test' for pk in ids],
+    })]
+
+
+def _productos(rng, inicio, fin, ctx):
+    from productos.busqueda import documento_busqueda
+    ids = [ctx['base']['productos'] + k + 1 for k in range(inicio, fin)]
+    n = len(ids)
+    categorias, sabores = rng.choices(CATEGORIAS, k=n), rng.choices(SABORES, k=n)
+    nombres = [f'{categoria} de {sabor} #{pk}' for categoria, sabor, pk in zip(categorias, sabores, ids)]
+    descripciones = [
+        f'{categoria} artesanal sabor {sabor} - Lote {pk}' for categoria, sabor, pk in zip(categorias, sabores, ids)
+    ]
+    precios = [precio(pk) for pk in ids]
+    documentos = [documento_busqueda(*datos) for datos in zip(nombres, descripciones, precios)]
+    return [
+        ('productos.Producto', {
+            'id_producto': ids, 'nombre': nombres, 'descripcion': descripciones, 'precio_referencia': precios,
+            'unidad_medida': rng.choices(UNIDADES, k=n),
+        }),
+        ('productos.ProductoBusqueda', {
+            'id_producto_id': ids,
+            'nombre': [nombre for nombre, _ in documentos],
+            'texto': [texto for _, texto in documentos],
+        }),
+    ]
+
+
+def _inventarios(rng, inicio, fin, ctx):
+    """Dos ubicaciones por producto, su resumen de stock y la entrada de carga inicial."""
+    productos = [ctx['base']['productos'] + k + 1 for k in range(inicio, fin)]
+    n = len(productos)
+    ids = [ctx['base']['inventarios'] + 2 * k + j + 1 for k in range(inicio, fin) for j in (0, 1)]
+    producto_de = [pk for pk in productos for _ in (0, 1)]
+    ubicacion_base = rng.choices(range(len(UBICACIONES)), k=n)
+    ubicaciones = [
+        UBICACIONES[(base + j * PASO_UBICACION) % len(UBICACIONES)] for base in ubicacion_base for j in (0, 1)
+    ]
+    cantidades = rng.choices(range(501), k=2 * n)
+    minimos = rng.choices(range(5, 51), k=2 * n)
+    fechas = _fechas(rng, ctx['ahora'], ctx['dias'], 2 * n)
+    usuarios = _rango(ctx, 'usuarios')
+    con_stock = [i for i, cantidad in enumerate(cantidades) if cantidad > 0]
+    return [
+        ('inventarios.Inventario', {
+            'id_inventario': ids, 'id_producto_id': producto_de, 'cantidad_actual': cantidades,
+            'stock_minimo': minimos, 'ubicacion': ubicaciones, 'fecha_ultima_actualizacion': fechas,
+        }),
+        ('inventarios.StockResumen', {
+            'id_producto_id': productos,
+            'total_unidades': [cantidades[2 * k] + cantidades[2 * k + 1] for k in range(n)],
+            'num_ubicaciones': 2,
+            'stock_minimo_total': [minimos[2 * k] + minimos[2 * k + 1] for k in range(n)],
+            'ubicaciones_bajo_minimo': [
+                (cantidades[2 * k] < minimos[2 * k]) + (cantidades[2 * k + 1] < minimos[2 * k + 1]) for k in range(n)
+            ],
+            'fecha_actualizacion': ctx['ahora'],
+        }),
+        ('inventarios.MovimientoInventario', {
+            'inventario_id': [ids[i] for i in con_stock],
+            'usuario_id': rng.choices(usuarios, k=len(con_stock)),
+            'tipo': 'entrada',
+            'cantidad': [cantidades[i] for i in con_stock],
+            'stock_resultante': [cantidades[i] for i in con_stock],
+            'motivo': 'Carga inicial',
+            'detalle': 'Carga inicial',
+            'fecha_hora': [fechas[i] for i in con_stock],
+        }),
+    ]
+
+
+def _producto_proveedor(rng, inicio, fin, ctx):
+    productos = [ctx['base']['productos'] + k + 1 for k in range(inicio, fin) for _ in (0, 1)]
+    n = len(productos)
+    return [('producto_proveedor.ProductoProveedor', {
+        'id_producto_id': productos,
+        'id_proveedor_id': rng.choices(_rango(ctx, 'proveedores'), k=n),
+        'precio_acordado': [precio(pk) * margen // 100 for pk, margen in zip(productos, rng.choices(range(50, 81), k=n))],
+        'fecha_registro': [fecha.date() for fecha in _fechas(rng, ctx['ahora'], ctx['dias'], n)],
+    })]
+
+
+def _ventas(rng, inicio, fin, ctx):
+    ids = [ctx['base']['ventas'] + k + 1 for k in range(inicio, fin)]
+    n = len(ids)
+    lineas = rng.choices(range(1, 6), k=n)
+    venta_de = [pk for pk, cantidad in zip(ids, lineas) for _ in range(cantidad)]
+    productos = rng.choices(_rango(ctx, 'productos'), k=len(venta_de))
+    return [
+        ('ventas.Venta', {
+            'id_venta': ids,
+            'fecha': _fechas(rng, ctx['ahora'], ctx['dias'], n),
+            'id_usuario_id': rng.choices(_rango(ctx, 'usuarios'), k=n),
+            'id_cliente_id': rng.choices(_rango(ctx, 'clientes'), k=n),
+        }),
+        ('detalle_ventas.DetalleVenta', {
+            'id_venta_id': venta_de,
+            'id_producto_id': productos,
+            'cantidad': rng.choices(range(1, 11), k=len(venta_de)),
+            'precio_unitario': [precio(pk) for pk in productos],
+        }),
+    ]
+
+
+def _auditorias(rng, inicio, fin, ctx):
+    n = fin - inicio
+    entidades = rng.choices(ENTIDADES, k=n)
+    return [('dashboard.Auditoria', {
+        'usuario_id': rng.choices(_rango(ctx, 'usuarios'), k=n),
+        'fecha_hora': _fechas(rng, ctx['ahora'], ctx['dias'], n),
+        'accion': rng.choices(ACCIONES, k=n),
+        'entidad': entidades,
+        'detalle': [f'{entidad} ID: {numero}' for entidad, numero in zip(entidades, rng.choices(range(1, 10 ** 6), k=n))],
+    })]
+
+
+# etapa: (generador, clave de `cantidades` que define las unidades, modelos con id explícito)
+ETAPAS = {
+    'usuarios': (_usuarios, 'usuarios', ('usuarios.Usuario',)),
+    'clientes': (_clientes, 'clientes', ('dashboard.Cliente',)),
+    'proveedores': (_proveedores, 'proveedores', ('proveedores.Proveedor',)),
+    'productos': (_productos, 'productos', ('productos.Producto',)),
+    'inventarios': (_inventarios, 'productos', ('inventarios.Inventario',)),
+    'producto_proveedor': (_producto_proveedor, 'productos', ()),
+    'ventas': (_ventas, 'ventas', ('ventas.Venta',)),
+    'auditorias': (_auditorias, 'auditorias', ()),
+}
+
+
+def cantidades_para(productos):
+    """Unidades de cada etapa para `productos` productos."""
+    return {
+        'usuarios': max(5, productos // 1000),
+        'clientes': max(1, productos // 10),
+        'proveedores': max(1, productos // 10),
+        'productos': productos,
+        'ventas': productos,
+        'auditorias': productos,
+    }
+
+
+# --- Escritura ---
+
+def _adaptador(campo, conexion):
+    if isinstance(campo, models.DateTimeField):
+        return conexion.ops.adapt_datetimefield_value
+    if isinstance(campo, models.DateField):
+        return conexion.ops.adapt_datefield_value
+    return None
+
+
+def _filas(modelo, columnas, conexion):
+    """Ordena las columnas según el modelo, completa las omitidas con su default y adapta fechas."""
+    largo = max((len(valor) for valor in columnas.values() if isinstance(valor, list)), default=0)
+    nombres, listas = [], []
+    for campo in modelo._meta.concrete_fields:
+        if campo.attname in columnas:
+            valor = columnas[campo.attname]
+        elif campo.primary_key:
+            continue
+        else:
+            valor = campo.get_default() if campo.has_default() or not campo.null else None
+        adaptar = _adaptador(campo, conexion)
+        if isinstance(valor, list):
+            lista = [adaptar(v) for v in valor] if adaptar else valor
+        else:
+            lista = [adaptar(valor) if adaptar else valor] * largo
+        nombres.append(campo.column)
+        listas.append(lista)
+    return nombres, list(zip(*listas))
+
+
+def insertar_filas(conexion, tabla, columnas, filas):
+    """INSERT de varias filas por sentencia, sin pasar por el registro de consultas de DEBUG."""
+    if not filas:
+        return 0
+    limite = conexion.features.max_query_params or FILAS_POR_INSERT * len(columnas)
+    por_sentencia = max(1, min(FILAS_POR_INSERT, limite // len(columnas)))
+    quote = conexion.ops.quote_name
+    cabecera = f'INSERT INTO {quote(tabla)} ({", ".join(quote(columna) for columna in columnas)}) VALUES '
+    marcador = '(' + ', '.join(['%s'] * len(columnas)) + ')'
+    conexion.ensure_connection()
+    cursor = conexion.create_cursor()
+    try:
+        for i in range(0, len(filas), por_sentencia):
+            tramo = filas[i:i + por_sentencia]
+            cursor.execute(cabecera + ', '.join([marcador] * len(tramo)), [valor for fila in tramo for valor in fila])
+    finally:
+        cursor.close()
+    return len(filas)
+
+
+def escribir_tramo(etapa, inicio, fin, ctx):
+    """Genera y escribe un tramo de una etapa. Devuelve {tabla: filas}."""
+    from productos.busqueda import escribir_fts
+    generador = ETAPAS[etapa][0]
+    rng = random.Random(f'{ctx["semilla"]}:{etapa}:{inicio}')
+    conexion = connections['default']
+    escritas = {}
+    with transaction.atomic():
+        if conexion.vendor == 'mysql':
+            # Las claves se calculan consistentes: se omiten las verificaciones por fila en la carga
+            with conexion.cursor() as cursor:
+                cursor.execute('SET SESSION foreign_key_checks = 0, unique_checks = 0')
+        for etiqueta, columnas in generador(rng, inicio, fin, ctx):
+            modelo = _modelo(etiqueta)
+            nombres, filas = _filas(modelo, columnas, conexion)
+            escritas[modelo._meta.db_table] = insertar_filas(conexion, modelo._meta.db_table, nombres, filas)
+            if etiqueta == 'productos.ProductoBusqueda':
+                escribir_fts(conexion, list(zip(columnas['id_producto_id'], columnas['nombre'], columnas['texto'])))
+        if conexion.vendor == 'mysql':
+            with conexion.cursor() as cursor:
+                cursor.execute('SET SESSION foreign_key_checks = 1, unique_checks = 1')
+    return escritas
+
+
+def _inicializar_proceso(base_datos):
+    import django
+    django.setup()
+    # Con 'spawn' el hijo relee settings: se fija la misma base que el padre (p. ej. la de prueba)
+    connections['default'].settings_dict['NAME'] = base_datos
+
+
+def _contexto(productos, semilla, dias):
+    from django.contrib.auth.hashers import make_password
+    Rol = _modelo('roles.Rol')
+    roles = [
+        Rol.objects.get_or_create(nombre=nombre, defaults={'descripcion': f'Rol {nombre.lower()}'})[0].pk
+        for nombre in ROLES
+    ]
+    maximos = {
+        'usuarios': 'usuarios.Usuario', 'clientes': 'dashboard.Cliente', 'proveedores': 'proveedores.Proveedor',
+        'productos': 'productos.Producto', 'inventarios': 'inventarios.Inventario', 'ventas': 'ventas.Venta',
+    }
+    base = {
+        clave: _modelo(etiqueta).objects.aggregate(maximo=Max('pk'))['maximo'] or 0
+        for clave, etiqueta in maximos.items()
+    }
+    return {
+        'semilla': semilla,
+        'dias': dias,
+        'ahora': timezone.now(),
+        'roles': roles,
+        # Un solo hash para todos: hashear por usuario dominaría el tiempo de carga
+        'clave': make_password(CLAVE_STRESS),
+        'base': base,
+        'cantidades': cantidades_para(productos),
+    }
+
+
+def generar(productos, procesos=None, tramo=TAMANO_TRAMO_DEFECTO, semilla=SEMILLA_DEFECTO, dias=DIAS_DEFECTO,
+            agregar_ventas=True, progreso=None):
+    """Agrega el conjunto completo para `productos` productos. Devuelve {tabla: filas insertadas}."""
+    from dashboard.cache_fragmentos import GRUPO_AUDITORIA, GRUPO_INVENTARIOS, GRUPO_PRODUCTOS, invalidar_fragmentos
+    from productos.autocompletar import invalidar_indice
+    if productos <= 0:
+        return {}
+    ctx = _contexto(productos, semilla, dias)
+    procesos = procesos or multiprocessing.cpu_count()
+    if connection.vendor == 'sqlite':
+        # SQLite admite un solo escritor (y la base de prueba puede estar en memoria)
+        procesos = 1
+
+    totales = {}
+    pool = None
+    if procesos > 1:
+        connections.close_all()
+        metodo = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        pool = ProcessPoolExecutor(
+            max_workers=procesos, mp_context=multiprocessing.get_context(metodo),
+            initializer=_inicializar_proceso, initargs=(connection.settings_dict['NAME'],),
+        )
+    try:
+        for etapa, (_, clave, con_id) in ETAPAS.items():
+            unidades = ctx['cantidades'][clave]
+            tramos = [(inicio, min(inicio + tramo, unidades)) for inicio in range(0, unidades, tramo)]
+            if pool is None:
+                resultados = (escribir_tramo(etapa, inicio, fin, ctx) for inicio, fin in tramos)
+            else:
+                futuros = [pool.submit(escribir_tramo, etapa, inicio, fin, ctx) for inicio, fin in tramos]
+                resultados = (futuro.result() for futuro in as_completed(futuros))
+            escritas = {}
+            for resultado in resultados:
+                for tabla, filas in resultado.items():
+                    escritas[tabla] = escritas.get(tabla, 0) + filas
+            # Motores con secuencias (PostgreSQL): continuar después de los ids explícitos
+            sentencias = connection.ops.sequence_reset_sql(no_style(), [_modelo(etiqueta) for etiqueta in con_id])
+            if sentencias:
+                with connection.cursor() as cursor:
+                    for sentencia in sentencias:
+                        cursor.execute(sentencia)
+            for tabla, filas in escritas.items():
+                totales[tabla] = totales.get(tabla, 0) + filas
+            if progreso:
+                progreso(etapa, escritas)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if agregar_ventas:
+        from ventas.agregados import agregar_ventas as acumular
+        # Lotes grandes: las ventas generadas están desordenadas por fecha y con lotes chicos
+        # cada uno volvería a actualizar casi todos los totales diarios
+        acumular(lote=LOTE_AGREGADOS)
+    # Nada de esto pasó por save(): invalidar conteos cacheados y el índice de autocompletado
+    invalidar_fragmentos(GRUPO_PRODUCTOS, GRUPO_INVENTARIOS, GRUPO_AUDITORIA)
+    invalidar_indice()
+    return totales
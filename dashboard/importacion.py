@@ -0,0 +1,525 @@
+"""
+Importación masiva de productos, inventario y proveedores desde xlsx o csv.
+
+El archivo se lee en streaming (openpyxl en modo read-only o el módulo csv)
+y se procesa en lotes de `lote` filas:
+
+1. Cada fila se valida con las mismas reglas de la interfaz: ProductoForm,
+   ProveedorForm (incluido `validar_rut_chileno`) e `Inventario.clean()`.
+   Las existencias de productos referenciados se consultan una vez por lote.
+2. Las filas válidas se guardan con `bulk_create(update_conflicts=True)`
+   sobre la clave natural de cada tabla (id_producto, rut_nif o
+   producto + ubicación), en una transacción por lote. Dentro de un mismo
+   lote, la última fila con una clave repetida es la que queda.
+3. Las filas con errores se escriben en un libro de reporte (write-only)
+   con la fila original, el campo y el mensaje.
+
+Un lote fallido no deshace los anteriores: el reporte y el resumen indican
+hasta dónde se llegó, y volver a importar el mismo archivo es idempotente
+salvo para productos sin id (que se crean de nuevo).
+"""
+import csv
+import io
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from openpyxl import Workbook, load_workbook
+
+from productos.busqueda import normalizar
+
+TAMANO_LOTE_DEFECTO = 1000
+EXTENSIONES = ('xlsx', 'csv')
+MOTIVO_IMPORTACION = 'Importación'
+# Errores que se devuelven en el resumen (el reporte los incluye todos)
+MAX_ERRORES_RESUMEN = 100
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (formato, encabezados o tipo desconocido)."""
+
+
+# --- Lectura ---
+
+def extension_de(nombre):
+    return (nombre or '').rsplit('.', 1)[-1].lower()
+
+
+def _leer_xlsx(archivo):
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        yield from enumerate(libro.active.iter_rows(values_only=True), start=1)
+    finally:
+        libro.close()
+
+
+def _leer_csv(archivo):
+    texto = io.TextIOWrapper(getattr(archivo, 'file', archivo), encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            delimitador = csv.Sniffer().sniff(muestra, delimiters=';,\t').delimiter
+        except csv.Error:
+            delimitador = ','
+        yield from enumerate(csv.reader(texto, delimiter=delimitador), start=1)
+    finally:
+        # No cerrar el archivo de quien llama
+        texto.detach()
+
+
+def leer_filas(archivo, nombre):
+    """Itera (número de fila, tupla de valores) del archivo `archivo` (ruta o binario)."""
+    extension = extension_de(nombre)
+    if extension not in EXTENSIONES:
+        raise ErrorImportacion(f'Formato no soportado: {extension or "sin extensión"} (usa xlsx o csv)')
+    if isinstance(archivo, str):
+        with open(archivo, 'rb') as binario:
+            yield from leer_filas(binario, nombre)
+        return
+    if extension == 'xlsx':
+        yield from _leer_xlsx(archivo)
+    else:
+        yield from _leer_csv(archivo)
+
+
+def contar_filas(archivo, nombre):
+    """Filas de datos aproximadas (para el progreso); None si no se pueden estimar."""
+    archivo.seek(0)
+    try:
+        if extension_de(nombre) == 'xlsx':
+            libro = load_workbook(archivo, read_only=True)
+            filas = libro.active.max_row
+            libro.close()
+        else:
+            filas = sum(bloque.count(b'\n') for bloque in iter(lambda: archivo.read(1 << 20), b''))
+    except Exception:
+        return None
+    finally:
+        archivo.seek(0)
+    return max(filas - 1, 0) if filas else None
+
+
+def clave_columna(encabezado):
+    """'Precio de Venta' -> 'precio_de_venta'."""
+    return re.sub(r'\s+', '_', normalizar(encabezado))
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _vacia(valores):
+    return all(_texto(valor) == '' for valor in valores)
+
+
+# --- Reporte de errores ---
+
+class ReporteErrores:
+    """Libro write-only con una fila por error; se crea con el primer error."""
+
+    def __init__(self, encabezados):
+        self.encabezados = [_texto(encabezado) for encabezado in encabezados]
+        self.libro = None
+        self.hoja = None
+        self.total = 0
+
+    def agregar(self, numero, campo, mensaje, valores):
+        if self.libro is None:
+            self.libro = Workbook(write_only=True)
+            self.hoja = self.libro.create_sheet('Errores')
+            self.hoja.append(['Fila', 'Campo', 'Error', *self.encabezados])
+        self.hoja.append([numero, campo, mensaje, *(valores or ())])
+        self.total += 1
+
+    def guardar(self, destino):
+        """Escribe el libro en `destino` (ruta o binario). Devuelve False si no hubo errores."""
+        if self.libro is None:
+            return False
+        self.libro.save(destino)
+        return True
+
+
+# --- Tipos de importación ---
+
+def _opciones_upsert(unique_fields, update_fields):
+    opciones = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = unique_fields
+    return opciones
+
+
+def _errores_formulario(form):
+    return [
+        (campo if campo != '__all__' else '', mensaje)
+        for campo, mensajes in form.errors.items() for mensaje in mensajes
+    ]
+
+
+def _entero(datos, campo, errores, obligatorio=True):
+    valor = _texto(datos.get(campo))
+    if valor == '':
+        if obligatorio:
+            errores.append((campo, 'Este campo es obligatorio.'))
+        return None
+    if not re.fullmatch(r'-?\d+(\.0+)?', valor):
+        errores.append((campo, 'Debe ser un número entero.'))
+        return None
+    return int(valor.split('.')[0])
+
+
+class Importacion:
+    """Un tipo de importación: columnas aceptadas, validación y guardado de un lote."""
+    nombre = ''
+    entidad = ''
+    permiso = ''
+    columnas = ()       # campos en el orden en que se documentan
+    obligatorias = ()   # columnas que el encabezado debe incluir
+    alias = {}          # clave_columna(encabezado) -> campo
+
+    def campo_de(self, encabezado):
+        clave = clave_columna(encabezado)
+        return self.alias.get(clave, clave if clave in self.columnas else None)
+
+    def validar(self, filas):
+        """filas: [(número, {campo: valor})]. Devuelve ([(número, instancia)], [(número, campo, mensaje)])."""
+        raise NotImplementedError
+
+    def guardar(self, instancias, usuario):
+        """Guarda las instancias válidas de un lote (dentro de una transacción). Devuelve cuántas."""
+        raise NotImplementedError
+
+    def finalizar(self):
+        """Se llama una vez al terminar una importación con filas guardadas."""
+
+
+def _formulario_producto():
+    from .forms import ProductoForm
+
+    class ProductoImportacionForm(ProductoForm):
+        # Unidades de compra/venta no se guardan en el modelo: no se exigen al importar
+        unidad_compra = None
+        unidad_venta = None
+
+    return ProductoImportacionForm
+
+
+def _formulario_proveedor():
+    from proveedores.views import ProveedorForm
+
+    class ProveedorImportacionForm(ProveedorForm):
+        def validate_unique(self):
+            # Un RUT existente actualiza al proveedor en lugar de ser un error
+            pass
+
+    return ProveedorImportacionForm
+
+
+class ImportacionProductos(Importacion):
+    nombre = 'productos'
+    entidad = 'Producto'
+    permiso = 'can_edit_products'
+    columnas = ('id_producto', 'nombre', 'descripcion', 'precio_referencia', 'unidad_medida')
+    obligatorias = ('nombre', 'precio_referencia', 'unidad_medida')
+    alias = {
+        'id': 'id_producto', 'codigo': 'id_producto', 'producto': 'nombre', 'nombre_del_producto': 'nombre',
+        'precio': 'precio_referencia', 'precio_de_venta': 'precio_referencia',
+        'unidad': 'unidad_medida', 'unidad_de_medida': 'unidad_medida',
+    }
+    campos_guardados = ['nombre', 'descripcion', 'precio_referencia', 'unidad_medida']
+
+    def __init__(self):
+        from productos.models import Producto
+        self.formulario = _formulario_producto()
+        # Acepta el valor ('kg') o la etiqueta ('Kilogramo')
+        self.unidades = {}
+        for valor, etiqueta in Producto.UNIDADES_MEDIDA:
+            self.unidades[normalizar(valor)] = valor
+            self.unidades[normalizar(etiqueta)] = valor
+
+    def validar(self, filas):
+        from productos.models import Producto
+        ids = {}
+        errores = []
+        for numero, datos in filas:
+            valor = _texto(datos.get('id_producto'))
+            if valor:
+                errores_id = []
+                ids[numero] = _entero(datos, 'id_producto', errores_id)
+                errores.extend((numero, campo, mensaje) for campo, mensaje in errores_id)
+        existentes = set(
+            Producto.objects.filter(pk__in={pk for pk in ids.values() if pk is not None})
+            .values_list('id_producto', flat=True)
+        )
+
+        validas = {}
+        nuevas = []
+        for numero, datos in filas:
+            pk = ids.get(numero)
+            if numero in ids and pk is None:
+                continue
+            if pk is not None and pk not in existentes:
+                errores.append((numero, 'id_producto', f'El producto {pk} no existe.'))
+                continue
+            unidad = _texto(datos.get('unidad_medida'))
+            form = self.formulario({
+                'nombre': _texto(datos.get('nombre')),
+                'descripcion': _texto(datos.get('descripcion')),
+                'precio_referencia': _texto(datos.get('precio_referencia')),
+                'unidad_medida': self.unidades.get(normalizar(unidad), unidad),
+            })
+            if not form.is_valid():
+                errores.extend((numero, campo, mensaje) for campo, mensaje in _errores_formulario(form))
+                continue
+            producto = Producto(id_producto=pk, **{campo: form.cleaned_data[campo] for campo in self.campos_guardados})
+            if pk is None:
+                nuevas.append((numero, producto))
+            else:
+                validas[pk] = (numero, producto)
+        return list(validas.values()) + nuevas, errores
+
+    def guardar(self, instancias, usuario):
+        from productos.busqueda import indexar_en_lote
+        from productos.models import Producto
+        existentes = [producto for producto in instancias if producto.pk is not None]
+        nuevos = [producto for producto in instancias if producto.pk is None]
+        if existentes:
+            Producto.objects.bulk_create(existentes, **_opciones_upsert(['id_producto'], self.campos_guardados))
+        if nuevos:
+            ultimo = Producto.objects.aggregate(ultimo=Max('id_producto'))['ultimo'] or 0
+            Producto.objects.bulk_create(nuevos)
+            if nuevos[0].pk is None:
+                # Sin RETURNING (MySQL): se reindexa todo lo insertado desde `ultimo`
+                nuevos = list(Producto.objects.filter(id_producto__gt=ultimo))
+        # bulk_create no pasa por Producto.save(): el índice de búsqueda se mantiene aquí
+        indexar_en_lote(existentes + nuevos)
+        return len(instancias)
+
+    def finalizar(self):
+        from productos.autocompletar import invalidar_indice
+        from .cache_fragmentos import GRUPO_PRODUCTOS, invalidar_fragmentos
+        invalidar_indice()
+        invalidar_fragmentos(GRUPO_PRODUCTOS)
+
+
+class ImportacionProveedores(Importacion):
+    nombre = 'proveedores'
+    entidad = 'Proveedor'
+    permiso = 'can_manage_suppliers'
+    columnas = ('rut_nif', 'nombre', 'contacto', 'direccion', 'pais', 'email', 'email_secundario')
+    obligatorias = ('rut_nif', 'nombre', 'email')
+    alias = {'rut': 'rut_nif', 'nif': 'rut_nif', 'correo': 'email', 'email_principal': 'email',
+             'correo_secundario': 'email_secundario', 'direccion_completa': 'direccion'}
+    campos_guardados = ['nombre', 'contacto', 'direccion', 'pais', 'email', 'email_secundario']
+
+    def __init__(self):
+        self.formulario = _formulario_proveedor()
+
+    def validar(self, filas):
+        from proveedores.models import Proveedor
+        validas, errores = {}, []
+        for numero, datos in filas:
+            valores = {campo: _texto(datos.get(campo)) for campo in self.columnas}
+            valores['rut_nif'] = valores['rut_nif'].upper()
+            valores['pais'] = valores['pais'] or 'Chile'
+            form = self.formulario(valores)
+            if not form.is_valid():
+                errores.extend((numero, campo, mensaje) for campo, mensaje in _errores_formulario(form))
+                continue
+            datos_limpios = form.cleaned_data
+            validas[datos_limpios['rut_nif']] = (numero, Proveedor(
+                rut_nif=datos_limpios['rut_nif'],
+                **{campo: datos_limpios.get(campo) or ('' if campo != 'email_secundario' else None)
+                   for campo in self.campos_guardados},
+            ))
+        return list(validas.values()), errores
+
+    def guardar(self, instancias, usuario):
+        from proveedores.models import Proveedor
+        Proveedor.objects.bulk_create(instancias, **_opciones_upsert(['rut_nif'], self.campos_guardados))
+        return len(instancias)
+
+
+class ImportacionInventario(Importacion):
+    nombre = 'inventario'
+    entidad = 'Inventario'
+    permiso = 'can_edit_inventory'
+    columnas = ('id_producto', 'ubicacion', 'cantidad_actual', 'stock_minimo', 'stock_maximo')
+    obligatorias = ('id_producto', 'ubicacion', 'cantidad_actual', 'stock_minimo')
+    alias = {'producto': 'id_producto', 'codigo_producto': 'id_producto', 'cantidad': 'cantidad_actual',
+             'stock': 'cantidad_actual', 'minimo': 'stock_minimo', 'maximo': 'stock_maximo'}
+    campos_guardados = ['cantidad_actual', 'stock_minimo', 'stock_maximo', 'fecha_ultima_actualizacion']
+
+    def validar(self, filas):
+        from inventarios.models import Inventario
+        from productos.models import Producto
+        leidas, errores = [], []
+        for numero, datos in filas:
+            errores_fila = []
+            valores = {
+                'id_producto_id': _entero(datos, 'id_producto', errores_fila),
+                'cantidad_actual': _entero(datos, 'cantidad_actual', errores_fila),
+                'stock_minimo': _entero(datos, 'stock_minimo', errores_fila),
+                'stock_maximo': _entero(datos, 'stock_maximo', errores_fila, obligatorio=False),
+                'ubicacion': _texto(datos.get('ubicacion')),
+            }
+            if not valores['ubicacion']:
+                errores_fila.append(('ubicacion', 'Este campo es obligatorio.'))
+            elif len(valores['ubicacion']) > 150:
+                errores_fila.append(('ubicacion', 'Máximo 150 caracteres.'))
+            if errores_fila:
+                errores.extend((numero, campo, mensaje) for campo, mensaje in errores_fila)
+            else:
+                leidas.append((numero, Inventario(**valores)))
+
+        productos = set(
+            Producto.objects.filter(pk__in={inventario.id_producto_id for _, inventario in leidas})
+            .values_list('id_producto', flat=True)
+        )
+        validas = {}
+        for numero, inventario in leidas:
+            if inventario.id_producto_id not in productos:
+                errores.append((numero, 'id_producto', f'El producto {inventario.id_producto_id} no existe.'))
+                continue
+            try:
+                inventario.clean()
+            except ValidationError as e:
+                errores.extend((numero, '', mensaje) for mensaje in e.messages)
+                continue
+            validas[(inventario.id_producto_id, inventario.ubicacion)] = (numero, inventario)
+        return list(validas.values()), errores
+
+    def guardar(self, instancias, usuario):
+        """Upsert por producto + ubicación; cada cambio de stock queda como movimiento 'Importación'."""
+        from inventarios.models import Inventario, MovimientoInventario, StockResumen
+        claves = {(inventario.id_producto_id, inventario.ubicacion) for inventario in instancias}
+        filtro = {
+            'id_producto_id__in': {producto for producto, _ in claves},
+            'ubicacion__in': {ubicacion for _, ubicacion in claves},
+        }
+
+        def leer(consulta):
+            return {
+                (inventario.id_producto_id, inventario.ubicacion): inventario
+                for inventario in consulta.filter(**filtro).order_by('id_inventario')
+                if (inventario.id_producto_id, inventario.ubicacion) in claves
+            }
+
+        # Mismo orden de bloqueo que el checkout y los movimientos en lote
+        anteriores = leer(Inventario.objects.select_for_update())
+        Inventario.objects.bulk_create(
+            instancias, **_opciones_upsert(['id_producto', 'ubicacion'], self.campos_guardados)
+        )
+        guardados = leer(Inventario.objects.all())
+
+        cambios, movimientos = [], []
+        for clave, inventario in guardados.items():
+            anterior = anteriores.get(clave)
+            cambios.append((anterior._estado_stock() if anterior else None, inventario._estado_stock()))
+            delta = inventario.cantidad_actual - (anterior.cantidad_actual if anterior else 0)
+            if delta:
+                movimientos.append(MovimientoInventario(
+                    inventario=inventario,
+                    usuario=usuario,
+                    tipo='entrada' if delta > 0 else 'salida',
+                    cantidad=abs(delta),
+                    motivo=MOTIVO_IMPORTACION,
+                    detalle=MOTIVO_IMPORTACION,
+                    stock_resultante=inventario.cantidad_actual,
+                ))
+        StockResumen.aplicar_cambios(cambios)
+        MovimientoInventario.objects.bulk_create(movimientos)
+        transaction.on_commit(_despues_de_inventario)
+        return len(instancias)
+
+
+def _despues_de_inventario():
+    from .cache_fragmentos import GRUPO_INVENTARIOS, invalidar_fragmentos
+    # bulk_create no emite post_save
+    invalidar_fragmentos(GRUPO_INVENTARIOS)
+
+
+IMPORTACIONES = {
+    clase.nombre: clase for clase in (ImportacionProductos, ImportacionInventario, ImportacionProveedores)
+}
+
+
+# --- Proceso ---
+
+def _resultado_vacio():
+    return {'filas': 0, 'validas': 0, 'guardadas': 0, 'con_error': 0, 'errores': [], 'reporte': False}
+
+
+def importar(tipo, archivo, nombre, usuario=None, lote=TAMANO_LOTE_DEFECTO, simular=False,
+             reporte=None, progreso=None):
+    """Importa `archivo` (ruta o binario) y devuelve el resumen.
+
+    `reporte` es la ruta o el binario donde escribir el libro de errores (si
+    los hay); con `simular=True` solo se valida. `progreso(resultado)` se
+    llama después de cada lote.
+    """
+    if tipo not in IMPORTACIONES:
+        raise ErrorImportacion(f'Tipo de importación desconocido: {tipo}')
+    importacion = IMPORTACIONES[tipo]()
+    resultado = _resultado_vacio()
+    filas = leer_filas(archivo, nombre)
+
+    encabezados = None
+    for _, valores in filas:
+        if not _vacia(valores):
+            encabezados = list(valores)
+            break
+    if encabezados is None:
+        raise ErrorImportacion('El archivo está vacío')
+    campos = [importacion.campo_de(_texto(encabezado)) for encabezado in encabezados]
+    faltantes = [campo for campo in importacion.obligatorias if campo not in campos]
+    if faltantes:
+        raise ErrorImportacion(f'Faltan columnas obligatorias: {", ".join(faltantes)}')
+
+    # Sin destino no se arma el libro (su archivo temporal quedaría abierto)
+    errores_reporte = ReporteErrores(encabezados) if reporte is not None else None
+    bloque = []
+
+    def procesar(bloque):
+        validas, errores = importacion.validar([(numero, datos) for numero, datos, _ in bloque])
+        originales = {numero: valores for numero, _, valores in bloque}
+        for numero, campo, mensaje in sorted(errores, key=lambda error: error[0]):
+            if errores_reporte is not None:
+                errores_reporte.agregar(numero, campo, mensaje, originales[numero])
+            if len(resultado['errores']) < MAX_ERRORES_RESUMEN:
+                resultado['errores'].append({'fila': numero, 'campo': campo, 'error': mensaje})
+        resultado['filas'] += len(bloque)
+        resultado['con_error'] += len({error[0] for error in errores})
+        resultado['validas'] += len(validas)
+        if validas and not simular:
+            with transaction.atomic():
+                resultado['guardadas'] += importacion.guardar([instancia for _, instancia in validas], usuario)
+        if progreso:
+            progreso(resultado)
+
+    for numero, valores in filas:
+        if _vacia(valores):
+            continue
+        datos = {campo: valor for campo, valor in zip(campos, valores) if campo}
+        bloque.append((numero, datos, valores))
+        if len(bloque) >= lote:
+            procesar(bloque)
+            bloque = []
+    if bloque:
+        procesar(bloque)
+
+    if resultado['guardadas']:
+        importacion.finalizar()
+        from .auditoria import registrar_auditoria
+        registrar_auditoria(
+            usuario, 'IMPORTAR', importacion.entidad,
+            f'{nombre}: {resultado["guardadas"]} filas guardadas, {resultado["con_error"]} con errores',
+        )
+    if reporte is not None:
+        resultado['reporte'] = errores_reporte.guardar(reporte)
+    return resultado
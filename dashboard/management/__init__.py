@@ -0,0 +1 @@
+# Este archivo indica que esta carpeta es un paquete Python
@@ -0,0 +1,42 @@
+"""
+Archiva los eventos de auditoría de meses antiguos
+Uso: python manage.py archivar_auditoria [--meses 12] [--destino tabla|ndjson] [--directorio RUTA]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard.archivo_auditoria import (
+    DESTINO_TABLA, DESTINOS, TAMANO_LOTE_DEFECTO, archivar_auditoria, directorio_archivo, fecha_corte,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mueve los eventos de auditoría con más de N meses a auditoria_archivo o a archivos NDJSON gzip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=settings.AUDITORIA_MESES_RETENCION,
+                            help='Meses completos que permanecen en la tabla auditoria')
+        parser.add_argument('--destino', choices=DESTINOS, default=DESTINO_TABLA,
+                            help='tabla: auditoria_archivo; ndjson: archivos auditoria_AAAA_MM.ndjson.gz')
+        parser.add_argument('--directorio', default=None,
+                            help='Carpeta de los archivos NDJSON (por defecto AUDITORIA_ARCHIVO_DIR)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO, help='Filas por transacción')
+        parser.add_argument('--simular', action='store_true', help='Solo informa qué se archivaría')
+
+    def handle(self, *args, **options):
+        corte = fecha_corte(options['meses'])
+        destino = options['destino']
+        ubicacion = 'auditoria_archivo' if destino == DESTINO_TABLA else (options['directorio'] or directorio_archivo())
+        self.stdout.write(f'Archivando eventos anteriores a {corte:%Y-%m-%d} → {ubicacion}')
+
+        resumen = archivar_auditoria(
+            meses=options['meses'], destino=destino, directorio=options['directorio'],
+            lote=options['lote'], simular=options['simular'],
+        )
+        for mes, cantidad in sorted(resumen.items()):
+            self.stdout.write(f'  {mes.replace("_", "-")}: {cantidad} eventos')
+
+        total = sum(resumen.values())
+        if options['simular']:
+            self.stdout.write(self.style.WARNING(f'⚠ Simulación: se archivarían {total} eventos'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} eventos archivados'))
@@ -0,0 +1,101 @@
+"""
+Benchmark de listados, exportaciones, login y movimientos sobre datos de stress
+Uso: python manage.py benchmark [--tamanos 10000,100000,1000000] [--repeticiones 3]
+                                [--salida benchmark.json] [--comparar anterior.json]
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from dashboard.benchmark import (
+    CASOS, REPETICIONES_DEFECTO, SEMILLA_DEFECTO, TAMANOS_DEFECTO, TOLERANCIA_DEFECTO,
+    ErrorBenchmark, comparar, ejecutar,
+)
+
+
+def _tamanos(valor):
+    try:
+        tamanos = [int(parte.replace('_', '')) for parte in valor.split(',') if parte.strip()]
+    except ValueError:
+        raise CommandError(f'Tamaños inválidos: {valor}')
+    if not tamanos or min(tamanos) <= 0:
+        raise CommandError(f'Tamaños inválidos: {valor}')
+    return tamanos
+
+
+class Command(BaseCommand):
+    help = 'Siembra datos de stress de varios tamaños y mide los caminos calientes; escribe los resultados en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default=','.join(str(tamano) for tamano in TAMANOS_DEFECTO),
+                            help='Cantidades de productos separadas por coma')
+        parser.add_argument('--repeticiones', type=int, default=REPETICIONES_DEFECTO,
+                            help='Mediciones por caso (tras una vuelta de calentamiento)')
+        parser.add_argument('--casos', default='', help=f'Subconjunto de casos: {", ".join(CASOS)}')
+        parser.add_argument('--semilla', type=int, default=SEMILLA_DEFECTO, help='Semilla de los datos generados')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para generar los datos (ver generar_stress_completo)')
+        parser.add_argument('--salida', default='benchmark.json', help='Archivo JSON de resultados')
+        parser.add_argument('--comparar', default=None, help='JSON de una corrida anterior para detectar regresiones')
+        parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_DEFECTO,
+                            help='Aumento relativo del p50 que se considera regresión (0.25 = 25%%)')
+        parser.add_argument('--conservar-base', action='store_true',
+                            help='Reutiliza y conserva la base de prueba (evita volver a sembrar)')
+        parser.add_argument('--base-actual', action='store_true',
+                            help='Usa la base configurada en lugar de una base de prueba (le agrega datos)')
+
+    def handle(self, *args, **options):
+        tamanos = _tamanos(options['tamanos'])
+        casos = [caso.strip() for caso in options['casos'].split(',') if caso.strip()] or None
+        desconocidos = set(casos or ()) - set(CASOS)
+        if desconocidos:
+            raise CommandError(f'Casos desconocidos: {", ".join(sorted(desconocidos))}')
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        verbosity = options['verbosity']
+        nombre_original = connection.settings_dict['NAME']
+        if not options['base_actual']:
+            # Una base aparte (test_<NAME>): los datos de stress no tocan la base real. Se crea
+            # desde los modelos, sin migraciones, igual que en los tests (--nomigrations)
+            connection.settings_dict['TEST']['MIGRATE'] = False
+            connection.creation.create_test_db(verbosity=verbosity, autoclobber=True,
+                                               keepdb=options['conservar_base'])
+        setup_test_environment()
+        try:
+            def progreso(tamano, nombre, resultado):
+                self.stdout.write(
+                    f'  {tamano:>9,} {nombre:<22} p50 {resultado["ms_p50"]:>9.1f} ms  '
+                    f'p90 {resultado["ms_p90"]:>9.1f} ms  {resultado["consultas"]:>4} consultas'
+                )
+
+            self.stdout.write(f'Midiendo {len(casos or CASOS)} casos en {len(tamanos)} tamaños...')
+            documento = ejecutar(
+                tamanos, options['repeticiones'], options['semilla'], casos,
+                procesos=options['procesos'], progreso=progreso,
+            )
+        except ErrorBenchmark as e:
+            raise CommandError(str(e))
+        finally:
+            teardown_test_environment()
+            if not options['base_actual']:
+                connection.creation.destroy_test_db(nombre_original, verbosity=verbosity,
+                                                    keepdb=options['conservar_base'])
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(documento, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'✅ Resultados en {options["salida"]}'))
+
+        if anterior is not None:
+            regresiones = comparar(anterior, documento, options['tolerancia'])
+            if regresiones:
+                for regresion in regresiones:
+                    self.stdout.write(self.style.ERROR(f'  ✗ {regresion}'))
+                raise CommandError(f'{len(regresiones)} regresiones respecto de {options["comparar"]}')
+            self.stdout.write(self.style.SUCCESS('✅ Sin regresiones'))
@@ -0,0 +1,46 @@
+"""
+Worker de la cola de correos salientes
+Uso: python manage.py enviar_correos [--una-vez] [--intervalo 2] [--lote 50]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from dashboard.correo import TAMANO_LOTE_DEFECTO, enviar_pendientes, purgar_correos, reencolar_atascados
+
+
+class Command(BaseCommand):
+    help = 'Envía los EmailSaliente pendientes en lotes por una conexión SMTP, con reintentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Envía la cola actual y termina')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando no hay correos')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO, help='Correos por conexión SMTP')
+        parser.add_argument('--purgar-dias', type=int, default=30,
+                            help='Elimina correos enviados o fallidos con más de estos días')
+        parser.add_argument('--atascado-minutos', type=int, default=10,
+                            help='Reencola correos reclamados hace más de estos minutos')
+
+    def handle(self, *args, **options):
+        totales = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+        while True:
+            reencolados = reencolar_atascados(options['atascado_minutos'])
+            if reencolados:
+                self.stdout.write(self.style.WARNING(f'⚠ {reencolados} correos atascados reencolados'))
+            purgar_correos(options['purgar_dias'])
+
+            resultado = enviar_pendientes(options['lote'])
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if any(resultado.values()):
+                self.stdout.write(
+                    f'✉ {resultado["enviados"]} enviados, {resultado["reintentos"]} para reintentar, '
+                    f'{resultado["fallidos"]} fallidos'
+                )
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {totales["enviados"]} correos enviados ({totales["fallidos"]} fallidos)'
+        ))
@@ -0,0 +1,52 @@
+"""
+Genera datos de stress para todas las tablas (ver dashboard/generador_stress.py)
+Uso: python manage.py generar_stress_completo --productos 700000 [--procesos 8] [--tramo 5000] [--semilla 42]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.generador_stress import (
+    DIAS_DEFECTO, SEMILLA_DEFECTO, TAMANO_TRAMO_DEFECTO, cantidades_para, generar,
+)
+
+
+class Command(BaseCommand):
+    help = 'Agrega datos de stress en todas las tablas (productos, inventarios, ventas, movimientos, auditoría...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=10000,
+                            help='Productos a generar; el resto de las tablas se escala a partir de este número')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos de escritura (por defecto uno por CPU; siempre 1 en SQLite)')
+        parser.add_argument('--tramo', type=int, default=TAMANO_TRAMO_DEFECTO, help='Unidades por tarea')
+        parser.add_argument('--semilla', type=int, default=SEMILLA_DEFECTO,
+                            help='Semilla (mismos datos con la misma semilla)')
+        parser.add_argument('--dias', type=int, default=DIAS_DEFECTO,
+                            help='Días hacia atrás para fechas de ventas y eventos')
+        parser.add_argument('--sin-agregados', action='store_true',
+                            help='No acumula los totales diarios de ventas al terminar')
+
+    def handle(self, *args, **options):
+        if options['productos'] <= 0 or options['tramo'] <= 0:
+            raise CommandError('--productos y --tramo deben ser mayores que 0')
+        cantidades = cantidades_para(options['productos'])
+        self.stdout.write(
+            f'Generando {cantidades["productos"]:,} productos, {cantidades["ventas"]:,} ventas, '
+            f'{cantidades["proveedores"]:,} proveedores, {cantidades["clientes"]:,} clientes '
+            f'y {cantidades["usuarios"]:,} usuarios...'
+        )
+        inicio = time.perf_counter()
+
+        def progreso(etapa, escritas):
+            detalle = ', '.join(f'{tabla} {filas:,}' for tabla, filas in escritas.items())
+            self.stdout.write(f'  ✓ {etapa:<20} {detalle}  ({time.perf_counter() - inicio:,.1f} s)')
+
+        totales = generar(
+            options['productos'], procesos=options['procesos'], tramo=options['tramo'], semilla=options['semilla'],
+            dias=options['dias'], agregar_ventas=not options['sin_agregados'], progreso=progreso,
+        )
+        segundos = time.perf_counter() - inicio
+        filas = sum(totales.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {filas:,} filas en {segundos:,.1f} s ({filas / max(segundos, 0.001):,.0f} filas/s)'
+        ))
@@ -0,0 +1,51 @@
+"""
+Comando de gestión para importar productos, inventario o proveedores desde xlsx/csv
+Uso: python manage.py importar_datos {productos,inventario,proveedores} ARCHIVO [--lote 1000] [--reporte errores.xlsx] [--simular]
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.importacion import IMPORTACIONES, TAMANO_LOTE_DEFECTO, ErrorImportacion, importar
+
+
+class Command(BaseCommand):
+    help = 'Importa un archivo xlsx o csv por lotes y escribe un libro con las filas rechazadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTACIONES))
+        parser.add_argument('archivo', help='Ruta del archivo .xlsx o .csv')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO, help='Filas por transacción')
+        parser.add_argument('--reporte', default=None,
+                            help='Ruta del libro de errores (por defecto ARCHIVO_errores.xlsx)')
+        parser.add_argument('--simular', action='store_true', help='Solo valida, no guarda nada')
+        parser.add_argument('--usuario', default=None, help='Username al que se atribuyen movimientos y auditoría')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = get_user_model().objects.get(username=options['usuario'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No existe el usuario {options["usuario"]}')
+        reporte = options['reporte'] or f'{options["archivo"].rsplit(".", 1)[0]}_errores.xlsx'
+
+        def progreso(resultado):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  … {resultado["filas"]} filas, {resultado["con_error"]} con errores')
+
+        try:
+            resultado = importar(
+                options['tipo'], options['archivo'], options['archivo'], usuario=usuario,
+                lote=options['lote'], simular=options['simular'], reporte=reporte, progreso=progreso,
+            )
+        except (ErrorImportacion, OSError) as e:
+            raise CommandError(str(e))
+
+        accion = 'válidas' if options['simular'] else 'guardadas'
+        cantidad = resultado['validas'] if options['simular'] else resultado['guardadas']
+        self.stdout.write(f'{resultado["filas"]} filas leídas, {cantidad} {accion}')
+        if resultado['con_error']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ {resultado["con_error"]} filas con errores (detalle en {reporte})'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Importación sin errores'))
@@ -0,0 +1,55 @@
+"""
+Worker de exportaciones en segundo plano
+Uso: python manage.py procesar_exportaciones [--una-vez] [--intervalo 2]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from dashboard.auditoria import vaciar_auditoria
+from dashboard.metricas import volcar_metricas
+from dashboard.trabajos_exportacion import (
+    procesar_trabajo, purgar_exportaciones, reclamar_siguiente, reencolar_atascados,
+)
+
+
+class Command(BaseCommand):
+    help = 'Procesa los ExportJob pendientes y guarda los archivos generados en MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa la cola actual y termina')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--purgar-horas', type=int, default=24,
+                            help='Elimina exportaciones terminadas con más de estas horas')
+        parser.add_argument('--atascado-minutos', type=int, default=30,
+                            help='Reencola trabajos en proceso desde hace más de estos minutos')
+
+    def handle(self, *args, **options):
+        procesados = 0
+        while True:
+            reencolados = reencolar_atascados(options['atascado_minutos'])
+            if reencolados:
+                self.stdout.write(self.style.WARNING(f'⚠ {reencolados} exportaciones atascadas reencoladas'))
+            purgadas = purgar_exportaciones(options['purgar_horas'])
+            if purgadas:
+                self.stdout.write(f'🗑 {purgadas} exportaciones antiguas eliminadas')
+
+            job = reclamar_siguiente()
+            while job is not None:
+                procesar_trabajo(job)
+                procesados += 1
+                if job.estado == job.ESTADO_COMPLETADO:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Exportación #{job.pk} ({job.tipo}): {job.filas_procesadas} filas → {job.archivo.name}'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'✗ Exportación #{job.pk} ({job.tipo}): {job.mensaje_error}'))
+                # El worker no emite request_finished: escribir ya los eventos y métricas del trabajo
+                vaciar_auditoria()
+                volcar_metricas()
+                job = reclamar_siguiente()
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesados} exportaciones procesadas'))
@@ -0,0 +1,58 @@
+"""
+Worker de importaciones en segundo plano
+Uso: python manage.py procesar_importaciones [--una-vez] [--intervalo 2] [--lote 1000]
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from dashboard.auditoria import vaciar_auditoria
+from dashboard.metricas import volcar_metricas
+from dashboard.importacion import TAMANO_LOTE_DEFECTO
+from dashboard.trabajos_importacion import (
+    procesar_trabajo, purgar_importaciones, reclamar_siguiente, reencolar_atascados,
+)
+
+
+class Command(BaseCommand):
+    help = 'Procesa los ImportJob pendientes y guarda el reporte de errores de cada uno en MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa la cola actual y termina')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera cuando no hay trabajos')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO, help='Filas por transacción')
+        parser.add_argument('--purgar-horas', type=int, default=24 * 7,
+                            help='Elimina importaciones terminadas con más de estas horas')
+        parser.add_argument('--atascado-minutos', type=int, default=60,
+                            help='Reencola trabajos en proceso desde hace más de estos minutos')
+
+    def handle(self, *args, **options):
+        procesados = 0
+        while True:
+            reencolados = reencolar_atascados(options['atascado_minutos'])
+            if reencolados:
+                self.stdout.write(self.style.WARNING(f'⚠ {reencolados} importaciones atascadas reencoladas'))
+            purgadas = purgar_importaciones(options['purgar_horas'])
+            if purgadas:
+                self.stdout.write(f'🗑 {purgadas} importaciones antiguas eliminadas')
+
+            job = reclamar_siguiente()
+            while job is not None:
+                procesar_trabajo(job, lote=options['lote'])
+                procesados += 1
+                if job.estado == job.ESTADO_COMPLETADO:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Importación #{job.pk} ({job.tipo}): {job.filas_guardadas} filas guardadas, '
+                        f'{job.filas_con_error} con errores'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'✗ Importación #{job.pk} ({job.tipo}): {job.mensaje_error}'))
+                # El worker no emite request_finished: escribir ya los eventos y métricas del trabajo
+                vaciar_auditoria()
+                volcar_metricas()
+                job = reclamar_siguiente()
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesados} importaciones procesadas'))
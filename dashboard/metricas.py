@@ -0,0 +1,204 @@
+"""
+Métricas de operación en formato de exposición de Prometheus (`/metrics`).
+
+Cada proceso acumula sus contadores e histogramas en memoria y los suma a un
+archivo SQLite compartido (METRICAS_ARCHIVO) al terminar un request si pasó
+METRICAS_INTERVALO_SEGUNDOS desde la última escritura, y al salir del
+proceso. Todas las series son sumables (contadores, buckets acumulados,
+_sum y _count), así que la tabla guarda una fila por serie con
+`valor = valor + delta` y `/metrics` devuelve el total de todos los workers
+de gunicorn sin depender de qué worker atiende el scrape.
+
+Las series se reinician si se borra el archivo (Prometheus lo trata como
+un reinicio del contador).
+
+El endpoint exige `Authorization: Bearer METRICAS_TOKEN`; sin token
+configurado responde 403 a todos (detrás de nginx cualquier petición llega
+desde localhost, así que la dirección de origen no sirve para autorizar).
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+INTERVALO_DEFECTO = 5.0
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_EXPORTACION_SEGUNDOS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+BUCKETS_FILAS = (10, 100, 1000, 10000, 100000, 1000000)
+
+# nombre: (tipo, ayuda, buckets)
+METRICAS = {
+    'dulceria_login_intentos_total': ('counter', 'Intentos de login por resultado', None),
+    'dulceria_login_bloqueos_total': ('counter', 'Cuentas bloqueadas por exceso de intentos fallidos', None),
+    'dulceria_movimientos_inventario_total': ('counter', 'Movimientos de inventario por tipo y origen', None),
+    'dulceria_movimientos_inventario_unidades_total': ('counter', 'Unidades movidas por tipo y origen', None),
+    'dulceria_exportacion_filas': ('histogram', 'Filas por exportación', BUCKETS_FILAS),
+    'dulceria_exportacion_segundos': ('histogram', 'Duración de las exportaciones', BUCKETS_EXPORTACION_SEGUNDOS),
+    'dulceria_http_requests_total': ('counter', 'Requests por ruta, método y código de estado', None),
+    'dulceria_http_request_segundos': ('histogram', 'Latencia de los requests por ruta', BUCKETS_SEGUNDOS),
+}
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(etiquetas):
+    return ','.join(f'{clave}="{_escapar(valor)}"' for clave, valor in sorted(etiquetas.items()))
+
+
+def _formato_numero(valor):
+    return repr(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class AlmacenMetricas:
+    """Deltas pendientes del proceso y su volcado al archivo compartido."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = defaultdict(float)
+        self._ultimo_volcado = time.monotonic()
+        self._conexion = None
+        self._pid = None
+        self._ruta = None
+
+    def sumar(self, serie, etiquetas, valor):
+        with self._lock:
+            self._pendientes[(serie, etiquetas)] += valor
+
+    def _conectar(self):
+        # Una conexión por proceso: los workers hijos no heredan la del padre
+        ruta = str(getattr(settings, 'METRICAS_ARCHIVO'))
+        if self._conexion is not None and self._pid == os.getpid() and self._ruta == ruta:
+            return self._conexion
+        if self._conexion is not None and self._pid == os.getpid():
+            self._conexion.close()
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        conexion = sqlite3.connect(ruta, timeout=5, isolation_level=None, check_same_thread=False)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS serie ('
+            ' nombre TEXT NOT NULL, etiquetas TEXT NOT NULL, valor REAL NOT NULL DEFAULT 0,'
+            ' PRIMARY KEY (nombre, etiquetas))'
+        )
+        self._conexion, self._pid, self._ruta = conexion, os.getpid(), ruta
+        return conexion
+
+    def volcar(self, forzar=True):
+        """Suma los deltas pendientes al archivo. Sin `forzar`, solo si venció el intervalo."""
+        intervalo = getattr(settings, 'METRICAS_INTERVALO_SEGUNDOS', INTERVALO_DEFECTO)
+        with self._lock:
+            if not self._pendientes or (not forzar and time.monotonic() - self._ultimo_volcado < intervalo):
+                return 0
+            pendientes, self._pendientes = self._pendientes, defaultdict(float)
+            self._ultimo_volcado = time.monotonic()
+            try:
+                conexion = self._conectar()
+                with conexion:
+                    conexion.execute('BEGIN IMMEDIATE')
+                    conexion.executemany(
+                        'INSERT INTO serie (nombre, etiquetas, valor) VALUES (?, ?, ?) '
+                        'ON CONFLICT (nombre, etiquetas) DO UPDATE SET valor = valor + excluded.valor',
+                        [(serie, etiquetas, valor) for (serie, etiquetas), valor in pendientes.items()],
+                    )
+            except sqlite3.Error:
+                import traceback
+                print(f"Error guardando métricas: {traceback.format_exc()}")
+                # Se reintenta en el próximo volcado
+                for clave, valor in pendientes.items():
+                    self._pendientes[clave] += valor
+                return 0
+        return len(pendientes)
+
+    def leer(self):
+        """[(serie, etiquetas, valor)] del archivo compartido."""
+        with self._lock:
+            conexion = self._conectar()
+            return conexion.execute('SELECT nombre, etiquetas, valor FROM serie').fetchall()
+
+    def reiniciar(self):
+        with self._lock:
+            self._pendientes.clear()
+            if os.path.exists(str(getattr(settings, 'METRICAS_ARCHIVO'))):
+                self._conectar().execute('DELETE FROM serie')
+
+
+almacen_metricas = AlmacenMetricas()
+
+
+def _activas():
+    return getattr(settings, 'METRICAS_ACTIVAS', True)
+
+
+def contar(nombre, valor=1, **etiquetas):
+    """Incrementa el contador `nombre` (debe estar en METRICAS)."""
+    if _activas():
+        almacen_metricas.sumar(nombre, _etiquetas(etiquetas), valor)
+
+
+def observar(nombre, valor, **etiquetas):
+    """Registra `valor` en el histograma `nombre` (buckets acumulados, _sum y _count)."""
+    if not _activas():
+        return
+    buckets = METRICAS[nombre][2]
+    for limite in buckets:
+        if valor <= limite:
+            almacen_metricas.sumar(f'{nombre}_bucket', _etiquetas({**etiquetas, 'le': limite}), 1)
+    almacen_metricas.sumar(f'{nombre}_bucket', _etiquetas({**etiquetas, 'le': '+Inf'}), 1)
+    almacen_metricas.sumar(f'{nombre}_sum', _etiquetas(etiquetas), valor)
+    almacen_metricas.sumar(f'{nombre}_count', _etiquetas(etiquetas), 1)
+
+
+def volcar_metricas(sender=None, **kwargs):
+    """Receptor de `request_finished` (respetando el intervalo) y de atexit; los workers lo llaman tras cada trabajo."""
+    return almacen_metricas.volcar(forzar=sender is None)
+
+
+atexit.register(volcar_metricas)
+
+
+def _clave_orden(fila):
+    serie, etiquetas, _ = fila
+    # Los buckets en orden numérico de `le`, +Inf al final
+    if 'le="' in etiquetas:
+        le = etiquetas.split('le="', 1)[1].split('"', 1)[0]
+        resto = etiquetas.replace(f'le="{le}"', '')
+        return serie, resto, float('inf') if le == '+Inf' else float(le)
+    return serie, etiquetas, 0.0
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus con el total de todos los procesos."""
+    almacen_metricas.volcar()
+    por_metrica = defaultdict(list)
+    for fila in sorted(almacen_metricas.leer(), key=_clave_orden):
+        serie = fila[0]
+        for sufijo in ('_bucket', '_sum', '_count', ''):
+            base = serie[:-len(sufijo)] if sufijo else serie
+            if serie.endswith(sufijo) and base in METRICAS:
+                por_metrica[base].append(fila)
+                break
+    lineas = []
+    for nombre, (tipo, ayuda, _) in METRICAS.items():
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for serie, etiquetas, valor in por_metrica.get(nombre, ()):
+            lineas.append(f'{serie}{{{etiquetas}}} {_formato_numero(valor)}' if etiquetas
+                          else f'{serie} {_formato_numero(valor)}')
+    return '\n'.join(lineas) + '\n'
+
+
+def autorizado(request):
+    """Solo con `Authorization: Bearer METRICAS_TOKEN`; sin token configurado nadie accede."""
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token:
+        return False
+    import hmac
+    recibido = request.headers.get('Authorization', '')
+    return hmac.compare_digest(recibido.encode(), f'Bearer {token}'.encode())
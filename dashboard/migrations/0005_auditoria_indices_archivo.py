@@ -0,0 +1,56 @@
+# Generated manually: índices de auditoría y tabla de archivo (auditoria_archivo)
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def comprimir_archivo(apps, schema_editor):
+    """En MySQL/InnoDB la tabla de archivo usa filas comprimidas."""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE auditoria_archivo ROW_FORMAT=COMPRESSED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_alter_auditoria_fecha_hora'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=models.Index(fields=['fecha_hora'], name='auditoria_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=models.Index(fields=['usuario', 'fecha_hora'], name='auditoria_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoria',
+            index=models.Index(fields=['entidad', 'fecha_hora'], name='auditoria_entidad_fecha_idx'),
+        ),
+        migrations.CreateModel(
+            name='AuditoriaArchivo',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auditorias_archivadas', to=settings.AUTH_USER_MODEL)),
+                ('fecha_hora', models.DateTimeField()),
+                ('accion', models.CharField(choices=[('CREAR', 'Crear'), ('EDITAR', 'Editar'), ('BORRAR', 'Borrar')], max_length=10)),
+                ('entidad', models.CharField(max_length=50)),
+                ('detalle', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Auditoría archivado',
+                'verbose_name_plural': 'Eventos de Auditoría archivados',
+                'db_table': 'auditoria_archivo',
+                'ordering': ['-fecha_hora'],
+                'indexes': [
+                    models.Index(fields=['fecha_hora'], name='aud_arch_fecha_idx'),
+                    models.Index(fields=['usuario', 'fecha_hora'], name='aud_arch_usuario_fecha_idx'),
+                    models.Index(fields=['entidad', 'fecha_hora'], name='aud_arch_entidad_fecha_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(comprimir_archivo, migrations.RunPython.noop),
+    ]
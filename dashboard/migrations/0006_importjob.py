@@ -0,0 +1,41 @@
+# Generated manually to add ImportJob (importaciones en segundo plano)
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_auditoria_indices_archivo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30)),
+                ('archivo', models.FileField(upload_to='importaciones/')),
+                ('nombre_archivo', models.CharField(max_length=150)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], db_index=True, default='pendiente', max_length=12)),
+                ('total_filas', models.IntegerField(blank=True, null=True)),
+                ('filas_procesadas', models.IntegerField(default=0)),
+                ('filas_guardadas', models.IntegerField(default=0)),
+                ('filas_con_error', models.IntegerField(default=0)),
+                ('reporte', models.FileField(blank=True, upload_to='importaciones/reportes/')),
+                ('mensaje_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importación en segundo plano',
+                'verbose_name_plural': 'Importaciones en segundo plano',
+                'db_table': 'import_job',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Cliente(models.Model):
     id_cliente = models.AutoField(primary_key=True)
@@ -20,7 +21,8 @@ class Auditoria(models.Model):
         ('BORRAR', 'Borrar'),
     ]
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
-    fecha_hora = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add) para conservar la hora del evento al escribir en lote
+    fecha_hora = models.DateTimeField(default=timezone.now)
     accion = models.CharField(max_length=10, choices=ACCION_CHOICES)
     entidad = models.CharField(max_length=50)  # Ej: Usuario, Producto, Inventario
     detalle = models.TextField(blank=True)     # Ej: ID afectado, cambios, etc.
@@ -33,3 +35,158 @@ class Auditoria(models.Model):
         verbose_name_plural = "Eventos de Auditoría"
         db_table = "auditoria"
         ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='auditoria_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_hora'], name='auditoria_usuario_fecha_idx'),
+            models.Index(fields=['entidad', 'fecha_hora'], name='auditoria_entidad_fecha_idx'),
+        ]
+
+
+class AuditoriaArchivo(models.Model):
+    """Eventos de auditoría archivados por `archivar_auditoria` (meses cerrados).
+
+    Mismas columnas y en el mismo orden que Auditoria, de modo que ambas tablas
+    se pueden unir (UNION) al consultar rangos de fechas que cruzan el límite.
+    """
+    id = models.BigIntegerField(primary_key=True)  # Se conserva el id original
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='auditorias_archivadas'
+    )
+    fecha_hora = models.DateTimeField()
+    accion = models.CharField(max_length=10, choices=Auditoria.ACCION_CHOICES)
+    entidad = models.CharField(max_length=50)
+    detalle = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.fecha_hora} - {self.usuario} - {self.accion} {self.entidad} (archivado)"
+
+    class Meta:
+        verbose_name = "Evento de Auditoría archivado"
+        verbose_name_plural = "Eventos de Auditoría archivados"
+        db_table = "auditoria_archivo"
+        ordering = ['-fecha_hora']
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='aud_arch_fecha_idx'),
+            models.Index(fields=['usuario', 'fecha_hora'], name='aud_arch_usuario_fecha_idx'),
+            models.Index(fields=['entidad', 'fecha_hora'], name='aud_arch_entidad_fecha_idx'),
+        ]
+
+
+class ExportJob(models.Model):
+    """Exportación generada en segundo plano por `procesar_exportaciones`."""
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_PROCESANDO = 'procesando'
+    ESTADO_COMPLETADO = 'completado'
+    ESTADO_ERROR = 'error'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_PROCESANDO, 'Procesando'),
+        (ESTADO_COMPLETADO, 'Completado'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    tipo = models.CharField(max_length=30)            # Clave en dashboard.exportacion.EXPORTACIONES
+    formato = models.CharField(max_length=10, default='xlsx')
+    parametros = models.JSONField(default=dict, blank=True)
+    huella = models.CharField(max_length=64, db_index=True)  # sha256 de tipo + formato + parámetros
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE, db_index=True)
+    total_filas = models.IntegerField(null=True, blank=True)
+    filas_procesadas = models.IntegerField(default=0)
+    archivo = models.FileField(upload_to='exportaciones/', blank=True)
+    nombre_archivo = models.CharField(max_length=150, blank=True)
+    mensaje_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Exportación en segundo plano"
+        verbose_name_plural = "Exportaciones en segundo plano"
+        db_table = "export_job"
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+    @property
+    def progreso(self):
+        """Porcentaje de avance (0-100)."""
+        if self.estado == self.ESTADO_COMPLETADO:
+            return 100
+        if not self.total_filas:
+            return 0
+        return min(int(self.filas_procesadas * 100 / self.total_filas), 99)
+
+
+class ImportJob(models.Model):
+    """Importación de un archivo xlsx/csv procesada en segundo plano por `procesar_importaciones`."""
+    ESTADO_PENDIENTE = ExportJob.ESTADO_PENDIENTE
+    ESTADO_PROCESANDO = ExportJob.ESTADO_PROCESANDO
+    ESTADO_COMPLETADO = ExportJob.ESTADO_COMPLETADO
+    ESTADO_ERROR = ExportJob.ESTADO_ERROR
+    ESTADO_CHOICES = ExportJob.ESTADO_CHOICES
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    tipo = models.CharField(max_length=30)            # Clave en dashboard.importacion.IMPORTACIONES
+    archivo = models.FileField(upload_to='importaciones/')
+    nombre_archivo = models.CharField(max_length=150)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE, db_index=True)
+    total_filas = models.IntegerField(null=True, blank=True)
+    filas_procesadas = models.IntegerField(default=0)
+    filas_guardadas = models.IntegerField(default=0)
+    filas_con_error = models.IntegerField(default=0)
+    reporte = models.FileField(upload_to='importaciones/reportes/', blank=True)
+    mensaje_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Importación en segundo plano"
+        verbose_name_plural = "Importaciones en segundo plano"
+        db_table = "import_job"
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
+
+    progreso = ExportJob.progreso
+
+
+class EmailSaliente(models.Model):
+    """Correo en cola de salida; lo envía el comando `enviar_correos` (ver dashboard/correo.py)."""
+    ESTADO_PENDIENTE = 'pendiente'
+    ESTADO_ENVIANDO = 'enviando'
+    ESTADO_ENVIADO = 'enviado'
+    ESTADO_ERROR = 'error'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDIENTE, 'Pendiente'),
+        (ESTADO_ENVIANDO, 'Enviando'),
+        (ESTADO_ENVIADO, 'Enviado'),
+        (ESTADO_ERROR, 'Error'),
+    ]
+    destinatarios = models.JSONField(default=list)
+    remitente = models.CharField(max_length=254, blank=True)
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField(blank=True)
+    cuerpo_html = models.TextField(blank=True)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default=ESTADO_PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    caduca = models.DateTimeField(null=True, blank=True)   # No enviar después de esta fecha
+    reclamado_por = models.CharField(max_length=32, blank=True)
+    fecha_reclamo = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Correo saliente"
+        verbose_name_plural = "Correos salientes"
+        db_table = "email_saliente"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='email_saliente_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asunto} → {', '.join(self.destinatarios)} ({self.estado})"
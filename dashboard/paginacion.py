@@ -0,0 +1,314 @@
+"""
+Paginación por cursor (keyset) para los listados del dashboard.
+
+En lugar de OFFSET, cada página se obtiene buscando a partir del último
+registro visto sobre (campo de orden, pk), de modo que la página N cuesta lo
+mismo que la página 1. El total es opcional y puede ser una estimación.
+
+Solo las primeras PAGINAS_NUMERADAS páginas se piden por número (un OFFSET
+pequeño); más allá se llega con anterior/siguiente, que llevan cursor.
+"""
+import base64
+import binascii
+import json
+import math
+from collections.abc import Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import F, Q
+
+# Con el modo 'estimado' nunca se cuentan más filas que esto en consultas filtradas
+LIMITE_CONTEO_ESTIMADO = 10000
+# Páginas con enlace numérico (OFFSET); un ?page= mayor sin cursor muestra la última de ellas
+PAGINAS_NUMERADAS = 5
+
+
+def _codificar_valor(valor):
+    if hasattr(valor, 'isoformat'):
+        # isoformat conserva los microsegundos, necesarios para la igualdad del seek
+        return valor.isoformat()
+    if valor is None or isinstance(valor, (int, float, str, bool)):
+        return valor
+    return str(valor)
+
+
+class CursorPage(Sequence):
+    """Página compatible con la interfaz de django.core.paginator.Page."""
+
+    def __init__(self, object_list, number, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return max(self.number - 1, 1)
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return ''
+        return self.paginator.codificar_cursor(self.object_list[-1], 'n')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return ''
+        return self.paginator.codificar_cursor(self.object_list[0], 'p')
+
+
+class CursorPaginator:
+    """Paginador keyset que busca sobre (order_by, pk).
+
+    Parámetros:
+    - order_by / order_direction: mismos valores que reciben las vistas; si el
+      campo no es un campo concreto del modelo se usa la pk.
+    - count: total ya conocido (p. ej. calculado por otra agregación).
+    - contar: 'exacto', 'estimado' o None (sin total).
+    - paginas_numeradas: páginas que se pueden pedir por número sin cursor.
+    """
+
+    def __init__(self, queryset, per_page, order_by=None, order_direction='asc',
+                 count=None, contar='estimado', limite_conteo=LIMITE_CONTEO_ESTIMADO,
+                 paginas_numeradas=PAGINAS_NUMERADAS):
+        self.queryset = queryset
+        self.per_page = max(int(per_page), 1)
+        self.model = queryset.model
+        self.pk_name = self.model._meta.pk.attname
+        self.field = self._resolver_campo(order_by)
+        self.descendente = order_direction == 'desc'
+        self.contar = contar
+        self.limite_conteo = limite_conteo
+        self.max_pagina_numerada = max(int(paginas_numeradas), 1)
+        self.count_es_estimado = False
+        # El total es la cota del COUNT acotado: hay al menos esa cantidad de filas
+        self.count_es_cota = False
+        self._count = count
+        self._numero_actual = 1
+        self._tiene_siguiente = False
+
+    def _resolver_campo(self, order_by):
+        nombre = (order_by or '').lstrip('-')
+        if nombre and nombre != 'pk':
+            try:
+                campo = self.model._meta.get_field(nombre)
+            except FieldDoesNotExist:
+                campo = None
+            if campo is not None and getattr(campo, 'concrete', False) and not campo.many_to_many:
+                return campo
+        return self.model._meta.pk
+
+    # --- Total (opcional) ---
+
+    @property
+    def count(self):
+        if self._count is None and self.contar:
+            self._count = self._calcular_total()
+        return self._count
+
+    def _calcular_total(self):
+        if self.contar == 'exacto':
+            return self.queryset.count()
+        connection = connections[self.queryset.db]
+        if connection.vendor == 'mysql' and not self.queryset.query.where:
+            # Tabla sin filtros: usar la estadística del motor en vez de un COUNT(*)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                    [self.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+            if fila and fila[0] is not None:
+                self.count_es_estimado = True
+                return int(fila[0])
+        # COUNT acotado: nunca recorre más de `limite_conteo` filas
+        total = self.queryset.order_by()[:self.limite_conteo + 1].count()
+        if total > self.limite_conteo:
+            self.count_es_estimado = True
+            self.count_es_cota = True
+            return self.limite_conteo
+        return total
+
+    @property
+    def total_mostrado(self):
+        """Total para las plantillas: '10000+' si es la cota, '~N' si es la estadística del motor."""
+        total = self.count
+        if total is None:
+            return ''
+        if self.count_es_cota:
+            return f'{total}+'
+        return f'~{total}' if self.count_es_estimado else str(total)
+
+    @property
+    def num_pages(self):
+        paginas_conocidas = self._numero_actual + (1 if self._tiene_siguiente else 0)
+        if self.count is None:
+            return paginas_conocidas
+        return max(math.ceil(self.count / self.per_page), paginas_conocidas, 1)
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    @property
+    def paginas_numeradas(self):
+        """Números a enlazar en las plantillas: las primeras páginas y la actual."""
+        paginas = list(range(1, min(self.num_pages, self.max_pagina_numerada) + 1))
+        if self._numero_actual > self.max_pagina_numerada:
+            paginas.append(self._numero_actual)
+        return paginas
+
+    # --- Cursores ---
+
+    def codificar_cursor(self, obj, direccion):
+        datos = {
+            'v': _codificar_valor(getattr(obj, self.field.attname)),
+            'pk': _codificar_valor(getattr(obj, self.pk_name)),
+            'd': direccion,
+        }
+        crudo = json.dumps(datos, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+    def cursor_de_pagina(self, number):
+        """Cursor con el que se pide la página `number` ('' para la primera).
+
+        Cuesta un OFFSET hasta esa página: sirve para preparar pruebas y el
+        benchmark, no para las vistas.
+        """
+        if number <= 1:
+            return ''
+        offset = (number - 1) * self.per_page
+        anterior = list(self._ordenar()[offset - 1:offset])
+        return self.codificar_cursor(anterior[0], 'n') if anterior else ''
+
+    def decodificar_cursor(self, cursor):
+        """Devuelve (valor, pk, dirección) o None si el cursor no es válido."""
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            valor = datos['v']
+            if valor is not None:
+                valor = self.field.to_python(valor)
+            pk = self.model._meta.pk.to_python(datos['pk'])
+            direccion = datos['d'] if datos.get('d') in ('n', 'p') else 'n'
+        except (ValueError, KeyError, TypeError, binascii.Error, ValidationError):
+            return None
+        return valor, pk, direccion
+
+    # --- Consultas ---
+
+    def _ordenar(self, invertir=False):
+        descendente = self.descendente != invertir
+        campo = self.field.attname
+        if self.field.null:
+            # Los NULL se tratan como el menor valor en ambos sentidos
+            orden_campo = F(campo).desc(nulls_last=True) if descendente else F(campo).asc(nulls_first=True)
+        else:
+            orden_campo = f'-{campo}' if descendente else campo
+        orden_pk = f'-{self.pk_name}' if descendente else self.pk_name
+        if self.field.attname == self.pk_name:
+            return self.queryset.order_by(orden_pk)
+        return self.queryset.order_by(orden_campo, orden_pk)
+
+    def _filtro_seek(self, valor, pk, hacia_mayores):
+        campo = self.field.attname
+        pk_name = self.pk_name
+        if campo == pk_name:
+            return Q(**{f'{pk_name}__gt' if hacia_mayores else f'{pk_name}__lt': pk})
+        op = 'gt' if hacia_mayores else 'lt'
+        desempate = Q(**{f'{pk_name}__{op}': pk})
+        if valor is None:
+            if hacia_mayores:
+                return Q(**{f'{campo}__isnull': False}) | (Q(**{f'{campo}__isnull': True}) & desempate)
+            return Q(**{f'{campo}__isnull': True}) & desempate
+        filtro = Q(**{f'{campo}__{op}': valor}) | (Q(**{campo: valor}) & desempate)
+        if self.field.null and not hacia_mayores:
+            filtro |= Q(**{f'{campo}__isnull': True})
+        return filtro
+
+    def get_page(self, cursor=None, number=1):
+        """Obtiene una página a partir de un cursor o, sin cursor, por número."""
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        datos_cursor = self.decodificar_cursor(cursor) if cursor else None
+
+        if datos_cursor is not None:
+            valor, pk, direccion = datos_cursor
+            if direccion == 'p':
+                # Hacia atrás: recorrer en orden inverso y dar vuelta el resultado
+                hacia_mayores = self.descendente
+                qs = self._ordenar(invertir=True).filter(self._filtro_seek(valor, pk, hacia_mayores))
+                filas = list(qs[:self.per_page + 1])
+                if len(filas) < self.per_page:
+                    # Se alcanzó el inicio: mostrar la primera página completa
+                    return self._pagina_desde_inicio(1)
+                has_previous = len(filas) > self.per_page
+                filas = list(reversed(filas[:self.per_page]))
+                number = number if has_previous else 1
+                return self._construir(filas, max(number, 1), has_next=True, has_previous=has_previous)
+            hacia_mayores = not self.descendente
+            qs = self._ordenar().filter(self._filtro_seek(valor, pk, hacia_mayores))
+            filas = list(qs[:self.per_page + 1])
+            return self._construir(
+                filas[:self.per_page], max(number, 2),
+                has_next=len(filas) > self.per_page, has_previous=True,
+            )
+        return self._pagina_desde_inicio(number)
+
+    def _pagina_desde_inicio(self, number):
+        # Sin cursor (enlace numérico directo) se recurre a OFFSET, acotado a las primeras
+        # páginas; la navegación anterior/siguiente usa cursores y no paga ese costo.
+        number = min(number, self.max_pagina_numerada)
+        offset = (number - 1) * self.per_page
+        filas = list(self._ordenar()[offset:offset + self.per_page + 1])
+        if not filas and number > 1:
+            return self._pagina_desde_inicio(1)
+        return self._construir(
+            filas[:self.per_page], number,
+            has_next=len(filas) > self.per_page, has_previous=number > 1,
+        )
+
+    def _construir(self, filas, number, has_next, has_previous):
+        self._numero_actual = number
+        self._tiene_siguiente = has_next
+        return CursorPage(filas, number, self, has_next=has_next, has_previous=has_previous)
+
+
+def paginar_por_cursor(request, queryset, per_page, order_by=None, order_direction='asc', **kwargs):
+    """Atajo para vistas: lee `cursor` y `page` del querystring."""
+    paginator = CursorPaginator(queryset, per_page, order_by=order_by, order_direction=order_direction, **kwargs)
+    return paginator.get_page(request.GET.get('cursor') or None, request.GET.get('page', 1))
@@ -0,0 +1,189 @@
+"""
+Instrumentación de costo por request.
+
+`RendimientoMiddleware` mide cada request: tiempo total, número de consultas
+y tiempo en base de datos (con `connection.execute_wrapper`, sin depender de
+DEBUG) y lo asocia al nombre de la vista resuelta (p. ej.
+`dashboard:productos`). Por cada vista se guardan en memoria las últimas
+RENDIMIENTO_VENTANA muestras, de las que se calculan percentiles; cada
+proceso lleva las suyas.
+
+Si un request supera RENDIMIENTO_PRESUPUESTO_CONSULTAS se registra un
+warning en el logger `dashboard.rendimiento` con las huellas de SQL que se
+repiten al menos RENDIMIENTO_MIN_REPETICIONES veces: la misma consulta con
+distintos parámetros, típico de un N+1.
+
+Además alimenta los contadores e histogramas HTTP de `/metrics`
+(ver dashboard.metricas), etiquetados por nombre de vista y no por URL.
+
+Las respuestas en streaming se miden hasta que la vista devuelve la
+respuesta, no hasta que termina de enviarse.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metricas import contar, observar
+
+logger = logging.getLogger('dashboard.rendimiento')
+
+PRESUPUESTO_CONSULTAS_DEFECTO = 50
+MIN_REPETICIONES_DEFECTO = 5
+VENTANA_DEFECTO = 500
+PERCENTILES = (50, 90, 99)
+# Otros métodos se agrupan para no abrir series por valores arbitrarios
+METODOS_HTTP = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'}
+
+_LISTA_PARAMETROS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r'\b\d+\b')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def huella_sql(sql):
+    """SQL sin literales ni largo de listas IN: consultas iguales salvo parámetros comparten huella."""
+    sql = _LISTA_PARAMETROS.sub('(...)', sql)
+    sql = _LITERAL_TEXTO.sub('?', sql)
+    sql = _LITERAL_NUMERO.sub('?', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+class MedidorConsultas:
+    """Wrapper para `execute_wrapper`: cuenta consultas, tiempo y huellas."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        # SQL tal cual (ya parametrizado): la huella se calcula solo si hace falta
+        self.sentencias = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sentencias[sql] += 1
+
+    def repetidas(self, minimo):
+        """[(huella, veces)] de las huellas repetidas al menos `minimo` veces, de mayor a menor."""
+        huellas = Counter()
+        for sql, veces in self.sentencias.items():
+            huellas[huella_sql(sql)] += veces
+        return [(huella, veces) for huella, veces in huellas.most_common() if veces >= minimo]
+
+
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class RegistroRendimiento:
+    """Muestras recientes por vista (en memoria, por proceso)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._muestras = {}
+        self._totales = {}
+
+    def registrar(self, vista, milisegundos, consultas, milisegundos_db, excedido):
+        ventana = _ajuste('RENDIMIENTO_VENTANA', VENTANA_DEFECTO)
+        with self._lock:
+            muestras = self._muestras.get(vista)
+            if muestras is None or muestras.maxlen != ventana:
+                muestras = self._muestras[vista] = deque(muestras or (), maxlen=ventana)
+            muestras.append((milisegundos, consultas, milisegundos_db))
+            total = self._totales.setdefault(vista, {'requests': 0, 'excedidos': 0})
+            total['requests'] += 1
+            total['excedidos'] += int(excedido)
+
+    def resumen(self):
+        """{vista: {requests, excedidos, muestras, ms: {p50..}, consultas: {p50..}, ms_db: {p50..}}}."""
+        with self._lock:
+            copia = {vista: list(muestras) for vista, muestras in self._muestras.items()}
+            totales = {vista: dict(total) for vista, total in self._totales.items()}
+        resumen = {}
+        for vista, muestras in copia.items():
+            columnas = [sorted(columna) for columna in zip(*muestras)]
+            resumen[vista] = {
+                **totales[vista],
+                'muestras': len(muestras),
+                **{
+                    nombre: {f'p{p}': round(_percentil(columna, p), 2) for p in PERCENTILES}
+                    for nombre, columna in zip(('ms', 'consultas', 'ms_db'), columnas)
+                },
+            }
+        return resumen
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+
+
+registro_rendimiento = RegistroRendimiento()
+
+
+def nombre_vista(request):
+    """Nombre de la ruta resuelta ('dashboard:productos'); la ruta o 'sin_ruta' si no resolvió."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin_ruta'
+    return match.view_name or match.route or 'sin_ruta'
+
+
+class RendimientoMiddleware:
+    """Mide tiempo, consultas y tiempo de BD de cada request (ver módulo)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _ajuste('RENDIMIENTO_ACTIVO', True):
+            return self.get_response(request)
+
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medidor))
+            response = self.get_response(request)
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        milisegundos_db = medidor.segundos * 1000
+
+        vista = nombre_vista(request)
+        presupuesto = _ajuste('RENDIMIENTO_PRESUPUESTO_CONSULTAS', PRESUPUESTO_CONSULTAS_DEFECTO)
+        excedido = medidor.consultas > presupuesto
+        registro_rendimiento.registrar(vista, milisegundos, medidor.consultas, milisegundos_db, excedido)
+        request.rendimiento = {
+            'vista': vista, 'ms': milisegundos, 'consultas': medidor.consultas, 'ms_db': milisegundos_db,
+        }
+        metodo = request.method if request.method in METODOS_HTTP else 'otro'
+        observar('dulceria_http_request_segundos', milisegundos / 1000, ruta=vista, metodo=metodo)
+        contar('dulceria_http_requests_total', ruta=vista, metodo=metodo, estado=str(response.status_code))
+
+        if excedido:
+            repetidas = medidor.repetidas(_ajuste('RENDIMIENTO_MIN_REPETICIONES', MIN_REPETICIONES_DEFECTO))
+            logger.warning(
+                '%s %s (%s): %d consultas (presupuesto %d), %.1f ms, %.1f ms en BD%s',
+                request.method, request.path, vista, medidor.consultas, presupuesto, milisegundos, milisegundos_db,
+                ''.join(f'\n  {veces}× {huella}' for huella, veces in repetidas[:5]),
+            )
+        if _ajuste('RENDIMIENTO_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = (
+                f'app;dur={milisegundos:.1f}, db;dur={milisegundos_db:.1f};desc="{medidor.consultas} consultas"'
+            )
+        return response
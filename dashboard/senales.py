@@ -0,0 +1,28 @@
+"""
+Señales que invalidan el cache de fragmentos del dashboard.
+
+Se conectan en DashboardConfig.ready(). La invalidación se hace al confirmar
+la transacción, para que ningún request recachee datos que luego se revierten.
+Los eventos de auditoría escritos en lote (bulk_create no emite post_save)
+invalidan desde BufferAuditoria.vaciar().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache_fragmentos import GRUPO_AUDITORIA, GRUPO_INVENTARIOS, GRUPO_PRODUCTOS, invalidar_fragmentos
+
+
+def _receptor(grupo):
+    def invalidar(sender, **kwargs):
+        transaction.on_commit(lambda: invalidar_fragmentos(grupo))
+    return invalidar
+
+
+def conectar_senales():
+    from inventarios.models import Inventario
+    from productos.models import Producto
+    from .models import Auditoria
+    for modelo, grupo in ((Producto, GRUPO_PRODUCTOS), (Inventario, GRUPO_INVENTARIOS), (Auditoria, GRUPO_AUDITORIA)):
+        receptor = _receptor(grupo)
+        post_save.connect(receptor, sender=modelo, weak=False, dispatch_uid=f'fragmentos_guardar_{grupo}')
+        post_delete.connect(receptor, sender=modelo, weak=False, dispatch_uid=f'fragmentos_borrar_{grupo}')
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from usuarios.models import Usuario
 from roles.models import Rol
@@ -101,3 +101,908 @@ class ExportarUsuariosExcelTests(TestCase):
         resp = self.client.get(url, {'search': unico_username})
         self.assertEqual(resp.status_code, 200)
         self.assertIn('unico', resp['Content-Disposition'])
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self):
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        # Nombres repetidos para ejercitar el desempate por pk
+        for i in range(6):
+            Usuario.objects.create(
+                username=f'user{i}', nombre=f'Usuario {i % 3}', correo=f'user{i}@example.com', contrasena='dummy', id_rol=self.rol_admin
+            )
+        self.client.login(username='admin', password='Test1234!')
+
+    def _recorrer(self, params):
+        url = reverse('dashboard:usuarios')
+        vistos = []
+        resp = self.client.get(url, params)
+        while True:
+            page_obj = resp.context['usuarios']
+            vistos.extend(u.id_usuario for u in page_obj)
+            if not page_obj.has_next():
+                return vistos, page_obj
+            resp = self.client.get(url, dict(params, page=page_obj.next_page_number(), cursor=page_obj.next_cursor))
+
+    def test_cursor_recorre_todo_sin_repetir(self):
+        params = {'order_by': 'nombre', 'order_direction': 'asc', 'per_page': 3}
+        vistos, ultima = self._recorrer(params)
+        esperados = list(Usuario.objects.order_by('nombre', 'id_usuario').values_list('id_usuario', flat=True))
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(ultima.number, 3)
+
+    def test_cursor_con_campo_nulo(self):
+        # last_login es NULL salvo para el admin: los NULL se tratan como el menor valor
+        params = {'order_by': 'last_login', 'order_direction': 'desc', 'per_page': 2}
+        vistos, _ = self._recorrer(params)
+        self.assertEqual(len(vistos), Usuario.objects.count())
+        self.assertEqual(len(set(vistos)), len(vistos))
+        self.assertEqual(vistos[0], self.admin.id_usuario)
+
+    def test_cursor_anterior_vuelve_a_la_pagina_previa(self):
+        params = {'order_by': 'nombre', 'order_direction': 'desc', 'per_page': 3}
+        url = reverse('dashboard:usuarios')
+        primera = self.client.get(url, params).context['usuarios']
+        segunda = self.client.get(url, dict(params, page=2, cursor=primera.next_cursor)).context['usuarios']
+        volver = self.client.get(url, dict(params, page=1, cursor=segunda.previous_cursor)).context['usuarios']
+        self.assertEqual([u.pk for u in volver], [u.pk for u in primera])
+        self.assertFalse(volver.has_previous())
+
+    def test_auditorias_con_cursor(self):
+        from dashboard.models import Auditoria
+        for i in range(60):
+            Auditoria.objects.create(usuario=self.admin, accion='CREAR', entidad='Producto', detalle=f'ID: {i}')
+        url = reverse('dashboard:auditorias')
+        primera = self.client.get(url).context['page_obj']
+        self.assertEqual(len(primera), 50)
+        self.assertEqual(primera.paginator.count, 60)
+        segunda = self.client.get(url, {'page': 2, 'cursor': primera.next_cursor}).context['page_obj']
+        self.assertEqual(len(segunda), 10)
+        self.assertFalse(segunda.has_next())
+
+    def test_total_acotado_se_muestra_como_cota(self):
+        from dashboard.models import Auditoria
+        from dashboard.paginacion import LIMITE_CONTEO_ESTIMADO
+        Auditoria.objects.bulk_create(
+            Auditoria(usuario=self.admin, accion='CREAR', entidad='Producto', detalle=f'ID: {i}')
+            for i in range(LIMITE_CONTEO_ESTIMADO + 1)
+        )
+        resp = self.client.get(reverse('dashboard:auditorias'), {'entidad': 'Producto'})
+        page_obj = resp.context['page_obj']
+        self.assertTrue(page_obj.paginator.count_es_cota)
+        self.assertContains(resp, f'{LIMITE_CONTEO_ESTIMADO}+ registros')
+        # Sin enlace a una "última página" que no se conoce
+        self.assertNotContains(resp, f'page={page_obj.paginator.num_pages}&')
+        self.assertNotContains(resp, f' de {page_obj.paginator.num_pages}<')
+
+    def test_paginas_profundas_solo_por_cursor(self):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        url = reverse('dashboard:usuarios')
+        params = {'order_by': 'id_usuario', 'order_direction': 'asc', 'per_page': 1}
+        # Un número fuera de la ventana no se traduce en un OFFSET profundo
+        with CaptureQueriesContext(connection) as consultas:
+            resp = self.client.get(url, dict(params, page=7))
+        self.assertEqual(resp.context['usuarios'].number, 5)
+        self.assertFalse([q for q in consultas if 'OFFSET 6' in q['sql']])
+        # Con cursor se llega a cualquier página; los números enlazados son los primeros y el actual
+        paginator = resp.context['usuarios'].paginator
+        resp = self.client.get(url, dict(params, page=7, cursor=paginator.cursor_de_pagina(7)))
+        septima = resp.context['usuarios']
+        self.assertEqual([u.pk for u in septima],
+                         list(Usuario.objects.order_by('id_usuario').values_list('pk', flat=True)[6:7]))
+        self.assertEqual(septima.paginator.paginas_numeradas, [1, 2, 3, 4, 5, 7])
+        self.assertNotContains(resp, 'href="?page=6&per_page')
+        self.assertContains(resp, 'href="?page=1&per_page')
+
+class ExportacionStreamingTests(TestCase):
+    def setUp(self):
+        from dashboard.models import Auditoria
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        for i in range(3):
+            Auditoria.objects.create(usuario=self.admin, accion='CREAR', entidad='Producto', detalle=f'ID: {i}')
+        Auditoria.objects.create(usuario=None, accion='BORRAR', entidad='Inventario', detalle='ID: 99')
+        self.client.login(username='admin', password='Test1234!')
+
+    def _leer(self, resp):
+        import io
+        import openpyxl
+        return openpyxl.load_workbook(io.BytesIO(b''.join(resp.streaming_content))).active
+
+    def test_exportar_auditorias_todos_es_streaming(self):
+        resp = self.client.get(reverse('dashboard:exportar_auditorias_excel'), {'all': 'true'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('todos', resp['Content-Disposition'])
+        ws = self._leer(resp)
+        self.assertEqual(ws.max_row, 5)
+        self.assertEqual(ws['A1'].value, 'Fecha/Hora')
+        self.assertEqual(ws['A1'].style, 'encabezado')
+        usuarios = {ws.cell(row=r, column=5).value for r in range(2, 6)}
+        self.assertEqual(usuarios, {'Admin', 'Sistema'})
+
+    def test_exportar_usuarios_excel_columnas(self):
+        resp = self.client.get(reverse('dashboard:exportar_usuarios_excel'), {'search': 'admin'})
+        ws = self._leer(resp)
+        self.assertEqual(ws.max_row, 2)
+        self.assertEqual(ws.cell(row=2, column=6).value, 'Administrador')
+        self.assertEqual(ws.cell(row=2, column=7).value, 'Activo')
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        for i in range(4):
+            Usuario.objects.create(
+                username=f'user{i}', nombre=f'Usuario {i}', correo=f'user{i}@example.com', contrasena='dummy', id_rol=self.rol_admin
+            )
+        self.client.login(username='admin', password='Test1234!')
+
+    def test_encolar_procesar_y_descargar(self):
+        import io
+        import openpyxl
+        from django.core.management import call_command
+        resp = self.client.get(reverse('dashboard:exportar_usuarios_excel'), {'all': 'true', 'async': 'true'})
+        self.assertEqual(resp.status_code, 202)
+        data = resp.json()
+        self.assertFalse(data['reutilizado'])
+        self.assertEqual(data['trabajo']['estado'], 'pendiente')
+
+        call_command('procesar_exportaciones', '--una-vez', stdout=io.StringIO())
+
+        estado = self.client.get(reverse('dashboard:estado_exportacion', args=[data['job_id']])).json()['trabajo']
+        self.assertEqual(estado['estado'], 'completado')
+        self.assertEqual(estado['progreso'], 100)
+        self.assertEqual(estado['filas_procesadas'], 5)
+        descarga = self.client.get(estado['download_url'])
+        self.assertEqual(descarga.status_code, 200)
+        self.assertIn('todos', descarga['Content-Disposition'])
+        ws = openpyxl.load_workbook(io.BytesIO(b''.join(descarga.streaming_content))).active
+        self.assertEqual(ws.max_row, 6)
+
+    def test_mismos_filtros_reutilizan_el_trabajo(self):
+        import io
+        from django.core.management import call_command
+        from dashboard.models import ExportJob
+        url = reverse('dashboard:exportar_usuarios_excel')
+        primero = self.client.get(url, {'all': 'true', 'search': 'user', 'async': 'true'}).json()
+        # Pendiente: se devuelve el mismo trabajo en lugar de encolar otro
+        segundo = self.client.get(url, {'search': 'user', 'all': 'true', 'async': 'true', 'page': 3}).json()
+        self.assertEqual(primero['job_id'], segundo['job_id'])
+        self.assertTrue(segundo['reutilizado'])
+        call_command('procesar_exportaciones', '--una-vez', stdout=io.StringIO())
+        tercero = self.client.get(url, {'all': 'true', 'search': 'user', 'async': 'true'}).json()
+        self.assertEqual(tercero['job_id'], primero['job_id'])
+        self.assertEqual(tercero['trabajo']['estado'], 'completado')
+        otro = self.client.get(url, {'all': 'true', 'search': 'Usuario 1', 'async': 'true'}).json()
+        self.assertNotEqual(otro['job_id'], primero['job_id'])
+        self.assertEqual(ExportJob.objects.count(), 2)
+        # Con el archivo vencido se encola uno nuevo
+        with self.settings(EXPORTACION_TTL_SEGUNDOS=0):
+            vencido = self.client.get(url, {'all': 'true', 'search': 'user', 'async': 'true'}).json()
+        self.assertFalse(vencido['reutilizado'])
+        self.assertEqual(ExportJob.objects.count(), 3)
+
+    def test_no_reutiliza_trabajos_de_otro_usuario(self):
+        from django.test import Client
+        rol = Rol.objects.create(nombre='Bodeguero', descripcion='Rol bodeguero')
+        bodeguero = Usuario.objects.create(
+            username='bodega', nombre='Bodega', correo='bodega@example.com', contrasena='dummy', id_rol=rol
+        )
+        bodeguero.set_password('Test1234!')
+        bodeguero.save()
+        url = reverse('dashboard:exportar_inventarios')
+        del_admin = self.client.get(url, {'all': 'true', 'async': 'true'}).json()
+        otro = Client()
+        otro.login(username='bodega', password='Test1234!')
+        propio = otro.get(url, {'all': 'true', 'async': 'true'}).json()
+        self.assertFalse(propio['reutilizado'])
+        self.assertNotEqual(propio['job_id'], del_admin['job_id'])
+        estado = otro.get(reverse('dashboard:estado_exportacion', args=[propio['job_id']]))
+        self.assertEqual(estado.status_code, 200)
+
+class ExportacionFormatosTests(TestCase):
+    def setUp(self):
+        from productos.models import Producto
+        from inventarios.models import Inventario
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        chocolate = Producto.objects.create(nombre='Chocolate, amargo', precio_referencia=1500, unidad_medida='unidad')
+        caramelo = Producto.objects.create(nombre='Caramelo', precio_referencia=200, unidad_medida='unidad')
+        Inventario.objects.create(id_producto=chocolate, cantidad_actual=10, stock_minimo=5, ubicacion='Bodega Ñuñoa')
+        Inventario.objects.create(id_producto=caramelo, cantidad_actual=3, stock_minimo=5, ubicacion='Local')
+        self.client.login(username='admin', password='Test1234!')
+
+    def test_productos_csv(self):
+        import csv
+        import io
+        resp = self.client.get(reverse('dashboard:exportar_productos_excel'), {
+            'format': 'csv', 'all': 'true', 'order_by': 'nombre', 'order_direction': 'asc',
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('text/csv', resp['Content-Type'])
+        self.assertIn('.csv', resp['Content-Disposition'])
+        filas = list(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode('utf-8'))))
+        self.assertEqual(filas[0], ['ID', 'Nombre', 'Descripción', 'Precio Referencia'])
+        self.assertEqual([fila[1] for fila in filas[1:]], ['Caramelo', 'Chocolate, amargo'])
+
+    def test_inventarios_ndjson_con_busqueda(self):
+        import json
+        resp = self.client.get(reverse('dashboard:exportar_inventarios'), {
+            'format': 'ndjson', 'all': 'true', 'search': 'Ñuñoa',
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('application/x-ndjson', resp['Content-Type'])
+        lineas = b''.join(resp.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lineas), 1)
+        fila = json.loads(lineas[0])
+        self.assertEqual(fila['id_producto__nombre'], 'Chocolate, amargo')
+        self.assertEqual(fila['ubicacion'], 'Bodega Ñuñoa')
+        self.assertEqual(fila['cantidad_actual'], 10)
+
+    def test_formato_invalido_usa_xlsx(self):
+        resp = self.client.get(reverse('dashboard:exportar_inventarios'), {'format': 'pdf'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('spreadsheetml', resp['Content-Type'])
+
+class AuditoriaEnLoteTests(TestCase):
+    def setUp(self):
+        from productos.models import Producto
+        from inventarios.models import Inventario
+        from dashboard.auditoria import buffer_auditoria
+        self.buffer = buffer_auditoria
+        self.buffer.vaciar()
+        self.addCleanup(self.buffer.vaciar)
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        producto = Producto.objects.create(nombre='Trufa', precio_referencia=1000, unidad_medida='unidad')
+        self.inventario = Inventario.objects.create(
+            id_producto=producto, cantidad_actual=10, stock_minimo=2, ubicacion='A1'
+        )
+        self.client.login(username='admin', password='Test1234!')
+
+    def _mover(self):
+        return self.client.post(reverse('dashboard:registrar_movimiento_inventario'), {
+            'tipo_movimiento': 'entrada', 'producto': self.inventario.pk, 'cantidad': 1,
+        })
+
+    def test_movimiento_encola_tras_commit_y_vacia_en_lote(self):
+        from django.test import override_settings
+        from dashboard.models import Auditoria
+        with override_settings(AUDITORIA_TAMANO_LOTE=100, AUDITORIA_INTERVALO_SEGUNDOS=60):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(self._mover().json()['success'])
+            # El evento se encoló al confirmar la transacción; aún no está en la tabla
+            self.assertEqual(len(self.buffer), 1)
+            self.assertFalse(Auditoria.objects.filter(accion='MOVIMIENTO').exists())
+            with self.captureOnCommitCallbacks(execute=True):
+                self._mover()
+        # Al terminar el segundo request se escribió el primero
+        self.assertEqual(Auditoria.objects.filter(accion='MOVIMIENTO').count(), 1)
+        self.assertEqual(len(self.buffer), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.vaciar(), 1)
+        eventos = list(Auditoria.objects.filter(accion='MOVIMIENTO').order_by('fecha_hora'))
+        self.assertEqual(len(eventos), 2)
+        self.assertLess(eventos[0].fecha_hora, eventos[1].fecha_hora)
+
+    def test_umbral_de_tamano(self):
+        from django.test import override_settings
+        from dashboard.auditoria import registrar_auditoria
+        from dashboard.models import Auditoria
+        with override_settings(AUDITORIA_TAMANO_LOTE=3, AUDITORIA_INTERVALO_SEGUNDOS=60):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    registrar_auditoria(self.admin, 'CREAR', 'Producto', f'ID: {i}')
+        self.assertEqual(len(self.buffer), 0)
+        self.assertEqual(Auditoria.objects.filter(entidad='Producto').count(), 3)
+
+    def test_rollback_descarta_y_modo_sincrono(self):
+        from django.db import transaction
+        from django.test import override_settings
+        from dashboard.auditoria import registrar_auditoria
+        from dashboard.models import Auditoria
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    registrar_auditoria(self.admin, 'BORRAR', 'Producto', 'ID: 1')
+                    raise ValueError('rollback')
+            except ValueError:
+                pass
+        self.assertEqual(len(self.buffer), 0)
+        with override_settings(AUDITORIA_SINCRONA=True):
+            self._mover()
+        self.assertTrue(Auditoria.objects.filter(accion='MOVIMIENTO').exists())
+
+    def test_vacia_antes_de_cerrar_las_conexiones(self):
+        from unittest import mock
+        from django.core.signals import request_finished
+        from django.db import connection
+        orden = []
+        with mock.patch.object(self.buffer, 'vaciar', side_effect=lambda: orden.append('vaciar')), \
+                mock.patch.object(connection, 'close_if_unusable_or_obsolete',
+                                  side_effect=lambda: orden.append('cerrar')):
+            request_finished.send(sender=None)
+        self.assertEqual(orden, ['vaciar', 'cerrar'])
+
+
+class AuditoriaLoteFallidoTests(TransactionTestCase):
+    def test_fila_invalida_no_pierde_el_lote(self):
+        from django.test import override_settings
+        from django.utils import timezone
+        from dashboard.auditoria import buffer_auditoria
+        from dashboard.models import Auditoria
+        buffer_auditoria.vaciar()
+        self.addCleanup(buffer_auditoria.vaciar)
+        eventos = [
+            Auditoria(accion='CREAR', entidad='Producto', detalle='ID: 1', fecha_hora=timezone.now()),
+            Auditoria(accion=None, entidad='Producto', detalle='ID: 2', fecha_hora=timezone.now()),
+            Auditoria(accion='CREAR', entidad='Producto', detalle='ID: 3', fecha_hora=timezone.now()),
+        ]
+        with override_settings(AUDITORIA_TAMANO_LOTE=100, AUDITORIA_INTERVALO_SEGUNDOS=60):
+            buffer_auditoria.agregar_varios(eventos)
+        # El bulk_create del lote falla: se reintenta de a uno y solo se descarta la fila inválida
+        self.assertEqual(buffer_auditoria.vaciar(), 2)
+        self.assertEqual(
+            sorted(Auditoria.objects.values_list('detalle', flat=True)), ['ID: 1', 'ID: 3']
+        )
+
+
+class ArchivoAuditoriaTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from dashboard.models import Auditoria
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        ahora = timezone.now()
+        self.viejas = [
+            Auditoria.objects.create(usuario=self.admin, accion='CREAR', entidad='Producto',
+                                     detalle=f'viejo {i}', fecha_hora=ahora - timedelta(days=400 + i))
+            for i in range(3)
+        ]
+        self.reciente = Auditoria.objects.create(
+            usuario=self.admin, accion='EDITAR', entidad='Producto', detalle='reciente', fecha_hora=ahora
+        )
+        self.client.login(username='admin', password='Test1234!')
+
+    def test_archiva_a_tabla_y_la_vista_consulta_ambas(self):
+        import io
+        from django.core.management import call_command
+        from dashboard.models import Auditoria, AuditoriaArchivo
+        call_command('archivar_auditoria', meses=6, lote=2, stdout=io.StringIO())
+        self.assertEqual(list(Auditoria.objects.values_list('pk', flat=True)), [self.reciente.pk])
+        self.assertEqual(
+            set(AuditoriaArchivo.objects.values_list('pk', flat=True)), {a.pk for a in self.viejas}
+        )
+
+        url = reverse('dashboard:auditorias')
+        # Sin rango: solo la tabla viva
+        self.assertEqual(self.client.get(url).context['total'], 1)
+        # Rango que cruza el límite del archivo: UNION de ambas tablas
+        desde = self.viejas[-1].fecha_hora.date().isoformat()
+        response = self.client.get(url, {'desde': desde, 'entidad': 'Producto'})
+        self.assertEqual(response.context['total'], 4)
+        self.assertEqual([a.pk for a in response.context['page_obj']][0], self.reciente.pk)
+        self.assertContains(response, 'viejo 2')
+        # Rango completamente archivado: solo la tabla de archivo
+        hasta = self.viejas[0].fecha_hora.date().isoformat()
+        response = self.client.get(url, {'desde': desde, 'hasta': hasta})
+        self.assertEqual(response.context['total'], 3)
+        self.assertNotContains(response, 'reciente')
+
+    def test_archiva_a_ndjson_gzip(self):
+        import gzip
+        import json
+        import tempfile
+        from pathlib import Path
+        from dashboard.archivo_auditoria import archivar_auditoria
+        from dashboard.models import Auditoria, AuditoriaArchivo
+        with tempfile.TemporaryDirectory() as directorio:
+            self.assertEqual(sum(archivar_auditoria(meses=6, simular=True).values()), 3)
+            self.assertEqual(Auditoria.objects.count(), 4)
+            resumen = archivar_auditoria(meses=6, destino='ndjson', directorio=directorio)
+            self.assertEqual(sum(resumen.values()), 3)
+            filas = []
+            for archivo in Path(directorio).glob('auditoria_*.ndjson.gz'):
+                with gzip.open(archivo, 'rt', encoding='utf-8') as f:
+                    filas.extend(json.loads(linea) for linea in f)
+        self.assertEqual({f['id'] for f in filas}, {a.pk for a in self.viejas})
+        self.assertEqual(Auditoria.objects.count(), 1)
+        self.assertFalse(AuditoriaArchivo.objects.exists())
+
+    def test_ndjson_descarta_pendientes_de_un_lote_revertido(self):
+        import gzip
+        import json
+        import tempfile
+        from pathlib import Path
+        from dashboard.archivo_auditoria import _preparar_ndjson, archivar_auditoria
+        from dashboard.models import Auditoria
+        with tempfile.TemporaryDirectory() as directorio:
+            # Lote escrito y luego revertido (las filas siguen en la tabla)
+            _preparar_ndjson(list(Auditoria.objects.filter(pk=self.viejas[0].pk).values(
+                'id', 'usuario_id', 'fecha_hora', 'accion', 'entidad', 'detalle'
+            )), Path(directorio))
+            archivar_auditoria(meses=6, destino='ndjson', directorio=directorio, lote=2)
+            self.assertFalse(list(Path(directorio).glob('*.pendiente')))
+            ids = []
+            for archivo in Path(directorio).glob('auditoria_*.ndjson.gz'):
+                with gzip.open(archivo, 'rt', encoding='utf-8') as f:
+                    ids.extend(json.loads(linea)['id'] for linea in f)
+        self.assertEqual(sorted(ids), sorted(a.pk for a in self.viejas))
+
+
+class CacheFragmentosHomeTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        self.client.login(username='admin', password='Test1234!')
+
+    def _consultas_home(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('dashboard:home'))
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in consultas]
+
+    def test_fragmentos_se_reutilizan_e_invalidan(self):
+        from productos.models import Producto
+        from dashboard.auditoria import registrar_auditoria
+        response, consultas = self._consultas_home()
+        self.assertTrue(any('COUNT(' in sql for sql in consultas))
+        self.assertEqual(response['Cache-Control'].count('no-cache'), 1)
+
+        response, consultas = self._consultas_home()
+        self.assertFalse(any('COUNT(' in sql or '"auditoria"' in sql for sql in consultas))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(nombre='Gomitas', precio_referencia=500, unidad_medida='unidad')
+        with self.settings(AUDITORIA_SINCRONA=True), self.captureOnCommitCallbacks(execute=True):
+            registrar_auditoria(self.admin, 'CREAR', 'Producto', 'Gomitas agregadas')
+        response, consultas = self._consultas_home()
+        self.assertTrue(any('COUNT(' in sql for sql in consultas))
+        self.assertContains(response, 'Gomitas agregadas')
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.media.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+
+    def _archivo(self, nombre, contenido):
+        import os
+        ruta = os.path.join(self.media.name, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def test_comando_importa_productos_y_reporta_errores(self):
+        import io
+        import openpyxl
+        from django.core.management import call_command
+        from productos.busqueda import buscar_productos
+        from productos.models import Producto
+        existente = Producto.objects.create(nombre='Chicle', precio_referencia=100, unidad_medida='unidad')
+        ruta = self._archivo('catalogo.csv', (
+            'ID;Nombre;Descripción;Precio de Venta;Unidad de Medida\n'
+            f'{existente.pk};Chicle Menta;Sabor menta;150;Unidad\n'
+            ';Gomitas Ácidas;;500;kg\n'
+            ';Sin precio;;;caja\n'
+            ';Caramelo;;-5;paquete\n'
+            '999999;Fantasma;;100;caja\n'
+        ))
+        reporte = self._archivo('errores.xlsx', '')
+        salida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('importar_datos', 'productos', ruta, '--lote', '2', '--reporte', reporte, stdout=salida)
+        self.assertIn('5 filas leídas, 2 guardadas', salida.getvalue())
+
+        existente.refresh_from_db()
+        self.assertEqual((existente.nombre, existente.precio_referencia), ('Chicle Menta', 150))
+        gomitas = Producto.objects.get(nombre='Gomitas Ácidas')
+        self.assertEqual(gomitas.unidad_medida, 'kg')
+        self.assertEqual(Producto.objects.count(), 2)
+        # El índice de búsqueda se mantiene aunque bulk_create no pase por save()
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), 'acidas')), [gomitas])
+        self.assertEqual(list(buscar_productos(Producto.objects.all(), 'menta')), [existente])
+
+        filas = list(openpyxl.load_workbook(reporte).active.iter_rows(values_only=True))
+        self.assertEqual(filas[0][:4], ('Fila', 'Campo', 'Error', 'ID'))
+        self.assertEqual([(fila[0], fila[1]) for fila in filas[1:]],
+                         [(4, 'precio_referencia'), (5, 'precio_referencia'), (6, 'id_producto')])
+        self.assertEqual(filas[2][4], 'Caramelo')
+
+    def test_proveedores_actualizan_por_rut(self):
+        from dashboard.importacion import importar
+        from proveedores.models import Proveedor
+        Proveedor.objects.create(
+            nombre='Dulces SA', contacto='Ana', direccion='Calle 1', rut_nif='12345678-5', email='ana@dulces.cl'
+        )
+        ruta = self._archivo('proveedores.csv', (
+            'rut,nombre,contacto,direccion,email\n'
+            '12345678-5,Dulces Chile SA,Ana,Calle 2,ventas@dulces.cl\n'
+            '11111111-1,Golosinas Ltda,Luis,Av. 3,luis@golosinas.cl\n'
+            '11111111-2,RUT Malo,Eva,Av. 4,eva@malo.cl\n'
+        ))
+        resultado = importar('proveedores', ruta, ruta, usuario=self.admin)
+        self.assertEqual((resultado['guardadas'], resultado['con_error']), (2, 1))
+        self.assertEqual(resultado['errores'][0]['campo'], 'rut_nif')
+        self.assertEqual(Proveedor.objects.count(), 2)
+        actualizado = Proveedor.objects.get(rut_nif='12345678-5')
+        self.assertEqual((actualizado.nombre, actualizado.email, actualizado.pais), ('Dulces Chile SA', 'ventas@dulces.cl', 'Chile'))
+
+    def test_importacion_de_inventario_en_segundo_plano(self):
+        import io
+        import openpyxl
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.core.management import call_command
+        from inventarios.models import Inventario, MovimientoInventario, StockResumen
+        from productos.models import Producto
+        producto = Producto.objects.create(nombre='Chocolate', precio_referencia=900, unidad_medida='unidad')
+        Inventario.objects.create(id_producto=producto, cantidad_actual=10, stock_minimo=2, ubicacion='Bodega')
+
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['Producto', 'Ubicación', 'Cantidad', 'Stock mínimo', 'Stock máximo'])
+        hoja.append([producto.pk, 'Bodega', 4, 5, None])
+        hoja.append([producto.pk, 'Vitrina', 7, 1, 20])
+        hoja.append([producto.pk, 'Pasillo', 3, 5, 1])
+        binario = io.BytesIO()
+        libro.save(binario)
+
+        self.client.login(username='admin', password='Test1234!')
+        archivo = SimpleUploadedFile('stock.xlsx', binario.getvalue())
+        resp = self.client.post(reverse('dashboard:importar_datos'), {'tipo': 'inventario', 'archivo': archivo})
+        self.assertEqual(resp.status_code, 202)
+        trabajo = resp.json()['trabajo']
+        self.assertEqual((trabajo['estado'], trabajo['total_filas']), ('pendiente', 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('procesar_importaciones', '--una-vez', stdout=io.StringIO())
+        estado = self.client.get(trabajo['estado_url']).json()['trabajo']
+        self.assertEqual(estado['estado'], 'completado')
+        self.assertEqual((estado['filas_guardadas'], estado['filas_con_error']), (2, 1))
+
+        stock = dict(Inventario.objects.values_list('ubicacion', 'cantidad_actual'))
+        self.assertEqual(stock, {'Bodega': 4, 'Vitrina': 7})
+        movimientos = MovimientoInventario.objects.filter(motivo='Importación').order_by('inventario__ubicacion')
+        self.assertEqual(
+            [(m.inventario.ubicacion, m.tipo, m.cantidad, m.stock_resultante, m.usuario_id) for m in movimientos],
+            [('Bodega', 'salida', 6, 4, self.admin.pk), ('Vitrina', 'entrada', 7, 7, self.admin.pk)],
+        )
+        resumen = StockResumen.objects.get(id_producto=producto)
+        self.assertEqual((resumen.total_unidades, resumen.num_ubicaciones, resumen.ubicaciones_bajo_minimo), (11, 2, 1))
+
+        reporte = self.client.get(estado['reporte_url'])
+        self.assertEqual(reporte.status_code, 200)
+        filas = list(openpyxl.load_workbook(io.BytesIO(b''.join(reporte.streaming_content))).active.iter_rows(values_only=True))
+        self.assertEqual(filas[1][:3], (4, None, 'El stock máximo no puede ser menor que el stock mínimo.'))
+
+class CorreoSalienteTests(TestCase):
+    def setUp(self):
+        self.rol = Rol.objects.create(nombre='Vendedor', descripcion='Rol vendedor')
+        self.usuario = Usuario.objects.create(
+            username='ana', nombre='Ana', correo='ana@example.com', email='ana@example.com', contrasena='dummy', id_rol=self.rol
+        )
+
+    def test_recuperacion_encola_y_el_worker_envia(self):
+        import io
+        from django.core import mail
+        from django.core.management import call_command
+        from dashboard.models import EmailSaliente
+        from usuarios.models import PasswordResetToken
+        resp = self.client.post(reverse('dashboard:forgot_password'), {'email': 'ana@example.com'})
+        self.assertRedirects(resp, reverse('dashboard:login'), fetch_redirect_response=False)
+        self.assertEqual(len(mail.outbox), 0)
+        correo = EmailSaliente.objects.get()
+        self.assertEqual((correo.estado, correo.destinatarios), ('pendiente', ['ana@example.com']))
+        token = PasswordResetToken.objects.get(usuario=self.usuario)
+        self.assertEqual(correo.caduca, token.expires_at)
+
+        call_command('enviar_correos', '--una-vez', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(str(token.token), mail.outbox[0].alternatives[0][0])
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos, correo.cuerpo, correo.cuerpo_html), ('enviado', 1, '', ''))
+
+    def test_reintentos_con_espera_y_caducados(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from dashboard.correo import enviar_lote, encolar_correo, reclamar_lote
+        from dashboard.models import EmailSaliente
+
+        class ConexionCaida:
+            cerrada = 0
+
+            def send_messages(self, mensajes):
+                raise ConnectionError('SMTP no disponible')
+
+            def close(self):
+                self.cerrada += 1
+
+        correo = encolar_correo('ana@example.com', 'Aviso', 'Hola')
+        vencido = encolar_correo('ana@example.com', 'Enlace', 'Hola', caduca=timezone.now() - timedelta(seconds=1))
+        with self.settings(CORREO_MAX_INTENTOS=2, CORREO_REINTENTO_SEGUNDOS=30):
+            self.assertEqual(enviar_lote(reclamar_lote(), ConexionCaida()), {'enviados': 0, 'reintentos': 1, 'fallidos': 1})
+            correo.refresh_from_db()
+            vencido.refresh_from_db()
+            self.assertEqual((correo.estado, correo.intentos), ('pendiente', 1))
+            self.assertGreater(correo.proximo_intento, timezone.now() + timedelta(seconds=25))
+            self.assertEqual((vencido.estado, vencido.intentos), ('error', 0))
+            # Estado final: sin cuerpo; pendiente de reintento: lo conserva
+            self.assertEqual((vencido.cuerpo, vencido.cuerpo_html), ('', ''))
+            self.assertEqual(correo.cuerpo, 'Hola')
+            # Todavía en espera: no se reclama
+            self.assertEqual(reclamar_lote(), [])
+
+            lote = reclamar_lote(ahora=correo.proximo_intento)
+            self.assertEqual(enviar_lote(lote, ConexionCaida()), {'enviados': 0, 'reintentos': 0, 'fallidos': 1})
+        correo.refresh_from_db()
+        self.assertEqual((correo.estado, correo.intentos, correo.cuerpo), ('error', 2, ''))
+        self.assertIn('SMTP no disponible', correo.ultimo_error)
+        self.assertFalse(EmailSaliente.objects.filter(estado='enviando').exists())
+
+class RendimientoMiddlewareTests(TestCase):
+    def setUp(self):
+        from dashboard.rendimiento import registro_rendimiento
+        registro_rendimiento.limpiar()
+        self.addCleanup(registro_rendimiento.limpiar)
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        self.client.login(username='admin', password='Test1234!')
+
+    def test_huella_agrupa_consultas_que_solo_cambian_parametros(self):
+        from dashboard.rendimiento import huella_sql
+        self.assertEqual(
+            huella_sql('SELECT * FROM producto WHERE id IN (%s, %s,%s) LIMIT 21'),
+            huella_sql("SELECT  * FROM producto WHERE id IN (%s) LIMIT 5"),
+        )
+        self.assertEqual(huella_sql("SELECT 1 FROM t WHERE nombre = 'a''b'"), 'SELECT ? FROM t WHERE nombre = ?')
+
+    def test_registra_percentiles_y_marca_requests_sobre_presupuesto(self):
+        from productos.models import Producto
+        from dashboard.rendimiento import MedidorConsultas, registro_rendimiento
+        for i in range(6):
+            Producto.objects.create(nombre=f'Producto {i}', precio_referencia=100, unidad_medida='unidad')
+
+        with self.settings(RENDIMIENTO_PRESUPUESTO_CONSULTAS=1000):
+            respuesta = self.client.get(reverse('dashboard:productos'))
+        self.assertEqual(respuesta.status_code, 200)
+        medido = respuesta.wsgi_request.rendimiento
+        self.assertEqual(medido['vista'], 'dashboard:productos')
+        self.assertGreater(medido['consultas'], 0)
+
+        with self.settings(RENDIMIENTO_PRESUPUESTO_CONSULTAS=0, RENDIMIENTO_SERVER_TIMING=True), \
+                self.assertLogs('dashboard.rendimiento', 'WARNING') as logs:
+            respuesta = self.client.get(reverse('dashboard:productos'))
+        self.assertIn('dashboard:productos', logs.output[0])
+        self.assertIn('db;dur=', respuesta['Server-Timing'])
+
+        resumen = self.client.get(reverse('dashboard:rendimiento')).json()['vistas']['dashboard:productos']
+        self.assertEqual((resumen['requests'], resumen['excedidos'], resumen['muestras']), (2, 1, 2))
+        consultas = sorted([medido['consultas'], respuesta.wsgi_request.rendimiento['consultas']])
+        self.assertEqual((resumen['consultas']['p50'], resumen['consultas']['p99']), tuple(consultas))
+        self.assertGreaterEqual(resumen['ms']['p99'], resumen['ms']['p50'])
+
+        # Consultas repetidas (N+1) se agrupan por huella
+        medidor = MedidorConsultas()
+        from django.db import connection
+        with connection.execute_wrapper(medidor):
+            for producto in Producto.objects.all():
+                list(Producto.objects.filter(pk=producto.pk))
+        huella, veces = medidor.repetidas(5)[0]
+        self.assertEqual(veces, 6)
+        self.assertIn('WHERE "producto"."id_producto" = %s', huella)
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        from dashboard.metricas import almacen_metricas
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(METRICAS_ARCHIVO=f'{directorio.name}/metricas.sqlite3', METRICAS_TOKEN='secreto')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        almacen_metricas.reiniciar()
+        self.addCleanup(almacen_metricas.reiniciar)
+        from productos.models import Producto
+        from inventarios.models import Inventario
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        producto = Producto.objects.create(nombre='Trufa', precio_referencia=1000, unidad_medida='unidad')
+        self.inventario = Inventario.objects.create(
+            id_producto=producto, cantidad_actual=10, stock_minimo=2, ubicacion='A1'
+        )
+
+    def test_expone_contadores_e_histogramas_sumados(self):
+        self.client.post(reverse('dashboard:login'), {'username': 'admin', 'password': 'incorrecta'})
+        self.client.login(username='admin', password='Test1234!')
+        self.client.post(reverse('dashboard:registrar_movimiento_inventario'), {
+            'tipo_movimiento': 'entrada', 'producto': self.inventario.pk, 'cantidad': 4,
+        })
+
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain'))
+        texto = respuesta.content.decode()
+        self.assertIn('# TYPE dulceria_login_intentos_total counter', texto)
+        self.assertIn('dulceria_login_intentos_total{resultado="fallido"} 1', texto)
+        self.assertIn('dulceria_movimientos_inventario_total{origen="individual",tipo="entrada"} 1', texto)
+        self.assertIn('dulceria_movimientos_inventario_unidades_total{origen="individual",tipo="entrada"} 4', texto)
+        self.assertIn(
+            'dulceria_http_requests_total{estado="200",metodo="POST",ruta="dashboard:registrar_movimiento_inventario"} 1',
+            texto,
+        )
+        self.assertIn(
+            'dulceria_http_request_segundos_bucket{le="+Inf",metodo="POST",'
+            'ruta="dashboard:registrar_movimiento_inventario"} 1',
+            texto,
+        )
+
+    def test_exige_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto').status_code, 200
+        )
+        # Sin token configurado queda cerrado, también desde localhost (nginx en el mismo host)
+        with self.settings(METRICAS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metricas'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    def test_worker_de_exportaciones_vuelca_tras_cada_trabajo(self):
+        import io
+        import tempfile
+        from django.core.management import call_command
+        from dashboard.metricas import almacen_metricas
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.client.login(username='admin', password='Test1234!')
+        with self.settings(MEDIA_ROOT=media.name):
+            self.client.get(reverse('dashboard:exportar_inventarios'), {'all': 'true', 'async': 'true'})
+            call_command('procesar_exportaciones', '--una-vez', stdout=io.StringIO())
+        # Ya en el archivo compartido, sin esperar a un request ni al fin del proceso
+        series = {(serie, etiquetas) for serie, etiquetas, _ in almacen_metricas.leer()}
+        self.assertIn(
+            ('dulceria_exportacion_filas_count', 'formato="xlsx",modo="segundo_plano",tipo="inventarios"'), series
+        )
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_siembra_y_mide_todos_los_casos(self):
+        from productos.models import Producto
+        from proveedores.models import Proveedor
+        from dashboard.benchmark import CASOS, medir, sembrar_hasta
+        filas = sembrar_hasta(40)
+        self.assertEqual((filas['productos'], filas['proveedores'], filas['ventas']), (40, 4, 40))
+        # Volver a sembrar el mismo tamaño no agrega filas
+        sembrar_hasta(40)
+        self.assertEqual((Producto.objects.count(), Proveedor.objects.count()), (40, 4))
+
+        resultados = medir(repeticiones=1)
+        self.assertEqual(set(resultados), set(CASOS))
+        for nombre, medicion in resultados.items():
+            self.assertGreater(medicion['consultas'], 0, nombre)
+            self.assertGreaterEqual(medicion['ms_max'], medicion['ms_p50'])
+
+    def test_comparar_marca_tiempo_y_consultas_peores(self):
+        from dashboard.benchmark import comparar
+        def documento(ms, consultas):
+            return {'tamanos': {'10000': {'casos': {'login': {'ms_p50': ms, 'consultas': consultas}}}}}
+        self.assertEqual(comparar(documento(100, 5), documento(110, 5)), [])
+        regresiones = comparar(documento(100, 5), documento(200, 6))
+        self.assertEqual(len(regresiones), 2)
+        self.assertIn('login', regresiones[0])
+
+
+class GeneradorStressTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_genera_todas_las_tablas_con_claves_consistentes(self):
+        from django.db.models import F, Sum
+        from detalle_ventas.models import DetalleVenta
+        from inventarios.models import Inventario, MovimientoInventario, StockResumen
+        from producto_proveedor.models import ProductoProveedor
+        from productos.models import Producto, ProductoBusqueda
+        from ventas.models import Venta, VentaDiariaProducto
+        from dashboard.generador_stress import generar, precio
+        totales = generar(40, tramo=15)
+
+        self.assertEqual(Producto.objects.count(), 40)
+        self.assertEqual(ProductoBusqueda.objects.count(), 40)
+        self.assertEqual(Inventario.objects.count(), 80)
+        self.assertEqual(ProductoProveedor.objects.count(), 80)
+        self.assertEqual(Venta.objects.count(), 40)
+        self.assertEqual(totales['detalle_venta'], DetalleVenta.objects.count())
+        self.assertTrue(VentaDiariaProducto.objects.exists())
+        # Precios y stock calculados en tramos distintos coinciden con lo escrito
+        for detalle in DetalleVenta.objects.select_related('id_producto')[:20]:
+            self.assertEqual(detalle.precio_unitario, detalle.id_producto.precio_referencia)
+            self.assertEqual(detalle.precio_unitario, precio(detalle.id_producto_id))
+        resumen = StockResumen.objects.get(id_producto=Producto.objects.order_by('pk').first())
+        self.assertEqual(
+            resumen.total_unidades,
+            Inventario.objects.filter(id_producto=resumen.id_producto_id).aggregate(total=Sum('cantidad_actual'))['total'],
+        )
+        self.assertFalse(MovimientoInventario.objects.exclude(stock_resultante=F('inventario__cantidad_actual')).exists())
+
+        # Se agrega a lo existente con ids nuevos
+        generar(10, agregar_ventas=False)
+        self.assertEqual(Producto.objects.count(), 50)
+
+    def test_misma_semilla_mismos_datos(self):
+        from productos.models import Producto
+        from dashboard.generador_stress import generar
+        generar(12, tramo=5, semilla=7, agregar_ventas=False)
+        primera = list(Producto.objects.order_by('pk').values_list('pk', 'nombre', 'unidad_medida'))
+        Producto.objects.all().delete()
+        generar(12, tramo=5, semilla=7, agregar_ventas=False)
+        self.assertEqual(list(Producto.objects.order_by('pk').values_list('pk', 'nombre', 'unidad_medida')), primera)
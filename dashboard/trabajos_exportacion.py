@@ -0,0 +1,205 @@
+"""
+Exportaciones en segundo plano.
+
+Las vistas de exportación encolan un `ExportJob` (con `?async=true`) y
+devuelven su id; el comando `procesar_exportaciones` toma los trabajos
+pendientes desde la base de datos, genera el archivo bajo MEDIA_ROOT y va
+informando el avance. Un mismo conjunto de filtros pedido por el mismo
+usuario dentro del TTL reutiliza el archivo ya generado (o el trabajo que aún
+está en curso).
+"""
+import hashlib
+import json
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .exportacion import (
+    EXPORTACIONES, escribir_exportacion, filas_medidas, formato_solicitado, marca_tiempo, resolver_alcance,
+)
+from .models import ExportJob
+
+# Segundos durante los cuales un archivo terminado se reutiliza para los mismos filtros
+TTL_EXPORTACION_DEFECTO = 600
+# Cada cuántas filas se persiste el avance
+PASO_PROGRESO = 1000
+
+# Parámetros del querystring que afectan el contenido de una exportación
+CLAVES_PARAMETROS = ('search', 'order_by', 'order_direction', 'accion', 'entidad', 'usuario', 'page', 'per_page')
+
+
+def ttl_exportacion():
+    return getattr(settings, 'EXPORTACION_TTL_SEGUNDOS', TTL_EXPORTACION_DEFECTO)
+
+
+def pide_segundo_plano(params):
+    return (params.get('async') or 'false').lower() in ['true', '1', 'yes']
+
+
+def parametros_exportacion(exportacion, params, session=None):
+    """Normaliza los parámetros para que el worker no dependa de la sesión.
+
+    Con all=true se descartan page/per_page; en otro caso per_page se resuelve
+    igual que en `resolver_alcance` (querystring, sesión o valor por defecto).
+    """
+    parametros = {clave: str(params.get(clave)).strip() for clave in CLAVES_PARAMETROS if params.get(clave)}
+    if (params.get('all') or 'false').lower() in ['true', '1', 'yes']:
+        parametros['all'] = 'true'
+        parametros.pop('page', None)
+        parametros.pop('per_page', None)
+    elif 'per_page' not in parametros:
+        per_page = exportacion.per_page_defecto
+        if session is not None and exportacion.session_per_page:
+            per_page = session.get(exportacion.session_per_page, per_page)
+        parametros['per_page'] = str(per_page)
+    return parametros
+
+
+def calcular_huella(tipo, formato, parametros):
+    crudo = json.dumps([tipo, formato, parametros], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+def _archivo_disponible(job):
+    return bool(job.archivo) and job.archivo.storage.exists(job.archivo.name)
+
+
+def encolar_exportacion(exportacion, params, usuario=None, session=None, formato='xlsx'):
+    """Crea un trabajo o reutiliza uno equivalente del mismo usuario. Devuelve (job, reutilizado)."""
+    parametros = parametros_exportacion(exportacion, params, session)
+    huella = calcular_huella(exportacion.nombre, formato, parametros)
+    limite = timezone.now() - timedelta(seconds=ttl_exportacion())
+    dueno = usuario if getattr(usuario, 'is_authenticated', False) else None
+    # Solo trabajos del mismo dueño: estado y descarga están restringidos a él (o a un administrador)
+    candidatos = ExportJob.objects.filter(huella=huella, usuario=dueno).filter(
+        Q(estado__in=[ExportJob.ESTADO_PENDIENTE, ExportJob.ESTADO_PROCESANDO]) |
+        Q(estado=ExportJob.ESTADO_COMPLETADO, fecha_fin__gte=limite)
+    ).order_by('-fecha_creacion')
+    for job in candidatos[:3]:
+        if job.estado != ExportJob.ESTADO_COMPLETADO or _archivo_disponible(job):
+            return job, True
+    job = ExportJob.objects.create(
+        usuario=dueno,
+        tipo=exportacion.nombre,
+        formato=formato,
+        parametros=parametros,
+        huella=huella,
+    )
+    return job, False
+
+
+def reclamar_siguiente():
+    """Marca como 'procesando' el trabajo pendiente más antiguo y lo devuelve.
+
+    El UPDATE condicionado al estado hace que dos workers nunca tomen el
+    mismo trabajo, sin depender de SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    pendientes = ExportJob.objects.filter(estado=ExportJob.ESTADO_PENDIENTE).order_by('fecha_creacion', 'pk')
+    for job_id in pendientes.values_list('pk', flat=True)[:10]:
+        tomado = ExportJob.objects.filter(pk=job_id, estado=ExportJob.ESTADO_PENDIENTE).update(
+            estado=ExportJob.ESTADO_PROCESANDO, fecha_inicio=timezone.now(), filas_procesadas=0,
+        )
+        if tomado:
+            return ExportJob.objects.get(pk=job_id)
+    return None
+
+
+def _filas_con_progreso(job, filas):
+    procesadas = 0
+    for fila in filas:
+        yield fila
+        procesadas += 1
+        if procesadas % PASO_PROGRESO == 0:
+            ExportJob.objects.filter(pk=job.pk).update(filas_procesadas=procesadas)
+
+
+def procesar_trabajo(job):
+    """Genera el archivo del trabajo y lo guarda en el storage por defecto."""
+    try:
+        exportacion = EXPORTACIONES[job.tipo]
+        queryset, export_scope, _ = resolver_alcance(exportacion, job.parametros)
+        job.total_filas = queryset.count()
+        ExportJob.objects.filter(pk=job.pk).update(total_filas=job.total_filas)
+
+        nombre_archivo = f'{job.tipo}_{export_scope}_{marca_tiempo()}.{job.formato}'
+        with tempfile.TemporaryFile() as temporal:
+            filas = filas_medidas(
+                exportacion, _filas_con_progreso(job, exportacion.filas(queryset)), job.formato, 'segundo_plano',
+            )
+            job.filas_procesadas = escribir_exportacion(exportacion, filas, temporal, job.formato)
+            temporal.seek(0)
+            job.archivo.save(f'{job.pk}_{nombre_archivo}', File(temporal), save=False)
+        job.nombre_archivo = nombre_archivo
+        job.estado = ExportJob.ESTADO_COMPLETADO
+        job.fecha_fin = timezone.now()
+        job.save(update_fields=['archivo', 'nombre_archivo', 'estado', 'filas_procesadas', 'total_filas', 'fecha_fin'])
+    except Exception as e:
+        import traceback
+        print(f"Error procesando exportación {job.pk}: {traceback.format_exc()}")
+        job.estado = ExportJob.ESTADO_ERROR
+        job.mensaje_error = str(e)
+        job.fecha_fin = timezone.now()
+        job.save(update_fields=['estado', 'mensaje_error', 'fecha_fin'])
+    return job
+
+
+def reencolar_atascados(minutos):
+    """Devuelve a 'pendiente' los trabajos cuyo worker murió a mitad de camino."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ExportJob.objects.filter(estado=ExportJob.ESTADO_PROCESANDO, fecha_inicio__lt=limite).update(
+        estado=ExportJob.ESTADO_PENDIENTE, fecha_inicio=None, filas_procesadas=0,
+    )
+
+
+def purgar_exportaciones(horas):
+    """Elimina los trabajos terminados (y sus archivos) con más de `horas` de antigüedad."""
+    limite = timezone.now() - timedelta(hours=horas)
+    viejos = ExportJob.objects.filter(
+        estado__in=[ExportJob.ESTADO_COMPLETADO, ExportJob.ESTADO_ERROR], fecha_fin__lt=limite
+    )
+    eliminados = 0
+    for job in viejos.iterator():
+        if job.archivo:
+            job.archivo.delete(save=False)
+        job.delete()
+        eliminados += 1
+    return eliminados
+
+
+def serializar_trabajo(job):
+    datos = {
+        'id': job.pk,
+        'tipo': job.tipo,
+        'estado': job.estado,
+        'progreso': job.progreso,
+        'filas_procesadas': job.filas_procesadas,
+        'total_filas': job.total_filas,
+        'estado_url': reverse('dashboard:estado_exportacion', args=[job.pk]),
+        'download_url': None,
+    }
+    if job.estado == ExportJob.ESTADO_COMPLETADO:
+        datos['download_url'] = reverse('dashboard:descargar_exportacion', args=[job.pk])
+        datos['nombre_archivo'] = job.nombre_archivo
+    elif job.estado == ExportJob.ESTADO_ERROR:
+        datos['mensaje'] = job.mensaje_error
+    return datos
+
+
+def respuesta_trabajo_exportacion(request, exportacion):
+    """Encola la exportación pedida y responde 202 con el id del trabajo."""
+    job, reutilizado = encolar_exportacion(
+        exportacion, request.GET, request.user, request.session, formato=formato_solicitado(request.GET),
+    )
+    return JsonResponse({
+        'success': True,
+        'message': 'Exportación reutilizada' if reutilizado else 'Exportación encolada',
+        'job_id': job.pk,
+        'reutilizado': reutilizado,
+        'trabajo': serializar_trabajo(job),
+    }, status=202)
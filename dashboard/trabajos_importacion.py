@@ -0,0 +1,128 @@
+"""
+Importaciones en segundo plano.
+
+La vista `importar_datos` guarda el archivo subido en MEDIA_ROOT y encola un
+`ImportJob`; el comando `procesar_importaciones` toma los pendientes (igual
+que `procesar_exportaciones`), importa el archivo por lotes informando el
+avance y deja el libro de errores como `reporte`.
+"""
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.urls import reverse
+from django.utils import timezone
+
+from .importacion import contar_filas, importar
+from .models import ImportJob
+
+
+def encolar_importacion(tipo, archivo, usuario=None):
+    """Guarda el archivo subido y crea el trabajo pendiente."""
+    job = ImportJob(
+        usuario=usuario if getattr(usuario, 'is_authenticated', False) else None,
+        tipo=tipo,
+        nombre_archivo=archivo.name[:150],
+        total_filas=contar_filas(archivo, archivo.name),
+    )
+    job.archivo.save(archivo.name, archivo, save=False)
+    job.save()
+    return job
+
+
+def reclamar_siguiente():
+    """Marca como 'procesando' la importación pendiente más antigua (ver trabajos_exportacion)."""
+    pendientes = ImportJob.objects.filter(estado=ImportJob.ESTADO_PENDIENTE).order_by('fecha_creacion', 'pk')
+    for job_id in pendientes.values_list('pk', flat=True)[:10]:
+        tomado = ImportJob.objects.filter(pk=job_id, estado=ImportJob.ESTADO_PENDIENTE).update(
+            estado=ImportJob.ESTADO_PROCESANDO, fecha_inicio=timezone.now(),
+            filas_procesadas=0, filas_guardadas=0, filas_con_error=0,
+        )
+        if tomado:
+            return ImportJob.objects.get(pk=job_id)
+    return None
+
+
+def procesar_trabajo(job, lote=None):
+    """Importa el archivo del trabajo; el libro de errores queda en `job.reporte`."""
+    from .importacion import TAMANO_LOTE_DEFECTO
+
+    def progreso(resultado):
+        ImportJob.objects.filter(pk=job.pk).update(
+            filas_procesadas=resultado['filas'], filas_guardadas=resultado['guardadas'],
+            filas_con_error=resultado['con_error'],
+        )
+
+    try:
+        with job.archivo.open('rb') as archivo, tempfile.TemporaryFile() as temporal:
+            resultado = importar(
+                job.tipo, archivo, job.nombre_archivo, usuario=job.usuario,
+                lote=lote or TAMANO_LOTE_DEFECTO, reporte=temporal, progreso=progreso,
+            )
+            if resultado['reporte']:
+                temporal.seek(0)
+                job.reporte.save(f'{job.pk}_errores.xlsx', File(temporal), save=False)
+        job.filas_procesadas = resultado['filas']
+        job.filas_guardadas = resultado['guardadas']
+        job.filas_con_error = resultado['con_error']
+        job.estado = ImportJob.ESTADO_COMPLETADO
+        job.fecha_fin = timezone.now()
+        job.save(update_fields=[
+            'reporte', 'filas_procesadas', 'filas_guardadas', 'filas_con_error', 'estado', 'fecha_fin',
+        ])
+    except Exception as e:
+        import traceback
+        print(f"Error procesando importación {job.pk}: {traceback.format_exc()}")
+        job.estado = ImportJob.ESTADO_ERROR
+        job.mensaje_error = str(e)
+        job.fecha_fin = timezone.now()
+        job.save(update_fields=['estado', 'mensaje_error', 'fecha_fin'])
+    return job
+
+
+def reencolar_atascados(minutos):
+    """Devuelve a 'pendiente' las importaciones cuyo worker murió a mitad de camino.
+
+    Reimportar es seguro: las filas ya guardadas se actualizan con los mismos valores.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ImportJob.objects.filter(estado=ImportJob.ESTADO_PROCESANDO, fecha_inicio__lt=limite).update(
+        estado=ImportJob.ESTADO_PENDIENTE, fecha_inicio=None, filas_procesadas=0,
+    )
+
+
+def purgar_importaciones(horas):
+    """Elimina las importaciones terminadas (archivo y reporte) con más de `horas` de antigüedad."""
+    limite = timezone.now() - timedelta(hours=horas)
+    viejos = ImportJob.objects.filter(
+        estado__in=[ImportJob.ESTADO_COMPLETADO, ImportJob.ESTADO_ERROR], fecha_fin__lt=limite
+    )
+    eliminados = 0
+    for job in viejos.iterator():
+        for archivo in (job.archivo, job.reporte):
+            if archivo:
+                archivo.delete(save=False)
+        job.delete()
+        eliminados += 1
+    return eliminados
+
+
+def serializar_trabajo(job):
+    datos = {
+        'id': job.pk,
+        'tipo': job.tipo,
+        'nombre_archivo': job.nombre_archivo,
+        'estado': job.estado,
+        'progreso': job.progreso,
+        'filas_procesadas': job.filas_procesadas,
+        'filas_guardadas': job.filas_guardadas,
+        'filas_con_error': job.filas_con_error,
+        'total_filas': job.total_filas,
+        'estado_url': reverse('dashboard:estado_importacion', args=[job.pk]),
+        'reporte_url': None,
+    }
+    if job.reporte:
+        datos['reporte_url'] = reverse('dashboard:reporte_importacion', args=[job.pk])
+    if job.estado == ImportJob.ESTADO_ERROR:
+        datos['mensaje'] = job.mensaje_error
+    return datos
@@ -15,21 +15,32 @@ urlpatterns = [
     path('usuarios/guardar/', login_required(views.guardar_usuario), name='guardar_usuario'),
     path('usuarios/reset-password/<int:usuario_id>/', login_required(views.reset_usuario_password), name='reset_usuario_password'),
     path('auditorias/', login_required(views.auditorias_view), name='auditorias'),
+    path('auditorias/exportar-excel/', login_required(views.exportar_auditorias_excel), name='exportar_auditorias_excel'),
     path('usuarios/eliminar/<int:usuario_id>/', login_required(views.eliminar_usuario), name='eliminar_usuario'),
     path('usuarios/cambiar-estado/<int:usuario_id>/', login_required(views.cambiar_estado_usuario), name='cambiar_estado_usuario'),
     path('usuarios/exportar-excel/', login_required(views.exportar_usuarios_excel), name='exportar_usuarios_excel'),
     path('productos/', login_required(views.productos_view), name='productos'),
     path('productos/obtener/<int:producto_id>/', login_required(views.obtener_producto), name='obtener_producto'),
+    path('productos/autocompletar/', login_required(views.autocompletar_productos), name='autocompletar_productos'),
     path('productos/actualizar/', login_required(views.actualizar_producto), name='actualizar_producto'),
     path('productos/agregar/', login_required(views.agregar_producto), name='agregar_producto'),
     path('productos/editar/<int:producto_id>/', login_required(views.editar_producto), name='editar_producto'),
     path('productos/exportar-excel/', login_required(views.exportar_productos_excel), name='exportar_productos_excel'),
+    path('exportaciones/<int:job_id>/', login_required(views.estado_exportacion), name='estado_exportacion'),
+    path('exportaciones/<int:job_id>/descargar/', login_required(views.descargar_exportacion), name='descargar_exportacion'),
+    path('importaciones/', login_required(views.importar_datos), name='importar_datos'),
+    path('importaciones/<int:job_id>/', login_required(views.estado_importacion), name='estado_importacion'),
+    path('importaciones/<int:job_id>/reporte/', login_required(views.reporte_importacion), name='reporte_importacion'),
     path('productos/eliminar/<int:producto_id>/', login_required(views.eliminar_producto), name='eliminar_producto'),
     path('inventarios/', login_required(views.inventarios_view), name='inventarios'),
     path('inventarios/agregar/', login_required(views.agregar_inventario), name='agregar_inventario'),
     path('inventarios/editar/<int:inventario_id>/', login_required(views.editar_inventario), name='editar_inventario'),
     path('inventarios/eliminar/<int:inventario_id>/', login_required(views.eliminar_inventario), name='eliminar_inventario'),
     path('inventarios/movimiento/', login_required(views.registrar_movimiento_inventario), name='registrar_movimiento_inventario'),
+    path('inventarios/movimientos-lote/', login_required(views.registrar_movimientos_lote), name='registrar_movimientos_lote'),
+    path('inventarios/exportar/', login_required(views.exportar_inventarios), name='exportar_inventarios'),
+    path('inventarios/historico/', login_required(views.stock_historico), name='stock_historico'),
     path('proveedores/', login_required(views.proveedores_view), name='proveedores'),
     path('ventas/', login_required(views.ventas_view), name='ventas'),
+    path('rendimiento/', login_required(views.rendimiento_view), name='rendimiento'),
 ]
@@ -12,12 +12,19 @@ from django.db import transaction
 from django.db.models import F
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from dashboard.models import Auditoria
+from .auditoria import registrar_auditoria
+from .correo import encolar_correo
+from .metricas import contar
+from roles.permisos import permisos_de
+from productos.busqueda import buscar_productos
+from .exportacion import (
+    EXPORTACION_AUDITORIAS, EXPORTACION_PRODUCTOS, EXPORTACION_USUARIOS,
+    EXPORTACION_INVENTARIOS, formato_solicitado, marca_tiempo, resolver_alcance, respuesta_exportacion,
+)
+from .trabajos_exportacion import pide_segundo_plano, respuesta_trabajo_exportacion, serializar_trabajo
 
 # --- API para eliminar producto ---
 @login_required
@@ -25,14 +32,14 @@ from dashboard.models import Auditoria
 def eliminar_producto(request, producto_id):
     user = request.user
     # Solo administradores pueden eliminar
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     try:
         producto = get_object_or_404(Producto, id_producto=producto_id)
         nombre = producto.nombre
         producto.delete()
         # Auditoría
-        Auditoria.objects.create(
+        registrar_auditoria(
             usuario=user,
             accion='BORRAR',
             entidad='Producto',
@@ -47,9 +54,8 @@ def eliminar_producto(request, producto_id):
 @require_POST
 def eliminar_inventario(request, inventario_id):
     user = request.user
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
     # Solo administradores y bodegueros pueden eliminar
-    if not (user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']):
+    if not permisos_de(user).can_edit_inventory:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     try:
         inventario = get_object_or_404(Inventario, id_inventario=inventario_id)
@@ -57,7 +63,7 @@ def eliminar_inventario(request, inventario_id):
         ubicacion = inventario.ubicacion
         inventario.delete()
         # Auditoría
-        Auditoria.objects.create(
+        registrar_auditoria(
             usuario=user,
             accion='BORRAR',
             entidad='Inventario',
@@ -71,7 +77,13 @@ from django.contrib.auth.hashers import make_password
 from django.conf import settings
 from productos.models import Producto
 from inventarios.models import Inventario, MovimientoInventario
+from inventarios.services import obtener_estadisticas_stock
+from .paginacion import paginar_por_cursor
+from .cache_fragmentos import (
+    GRUPO_AUDITORIA, GRUPO_INVENTARIOS, GRUPO_PRODUCTOS, conteo_cacheado, ttl_fragmentos, version_fragmentos,
+)
 from usuarios.models import Usuario, PasswordResetToken
+from usuarios.limitador import LimitadorLogin, ip_cliente
 from .forms import ProductoForm, InventarioForm
 
 @never_cache
@@ -93,16 +105,30 @@ def login_view(request):
                 'username': identificador
             }
             return render(request, 'dashboard/new_login.html', context)
+        # Límite de intentos en cache (por identificador y por IP): sin escrituras en `usuario`
+        limitador = LimitadorLogin(identificador, ip_cliente(request))
+        minutos_bloqueo = limitador.minutos_bloqueo()
+        if minutos_bloqueo:
+            contar('dulceria_login_intentos_total', resultado='bloqueado')
+            context = {
+                'error_type': 'locked',
+                'locked_minutes': minutos_bloqueo,
+                'username': identificador
+            }
+            return render(request, 'dashboard/new_login.html', context)
         # Permitir login por username o correo
         try:
+            if limitador.usuario_inexistente():
+                raise Usuario.DoesNotExist
             if '@' in identificador:
                 user_obj = Usuario.objects.get(correo=identificador)
             else:
                 user_obj = Usuario.objects.get(username=identificador)
             username_real = user_obj.username
             
-            # Verificar si la cuenta está bloqueada
+            # Verificar si la cuenta está bloqueada (bloqueo persistido)
             if user_obj.is_account_locked():
+                contar('dulceria_login_intentos_total', resultado='bloqueado')
                 tiempo_restante = int((user_obj.locked_until - timezone.now()).total_seconds() / 60)
                 context = {
                     'error_type': 'locked',
@@ -115,30 +141,35 @@ def login_view(request):
             user = authenticate(request, username=username_real, password=password)
             
             if user is not None:
-                # Login exitoso - resetear intentos fallidos
-                user_obj.reset_failed_attempts()
+                # Login exitoso - olvidar fallos (y el bloqueo antiguo solo si lo hay)
+                limitador.limpiar()
+                contar('dulceria_login_intentos_total', resultado='exito')
+                if user_obj.failed_login_attempts or user_obj.locked_until:
+                    user_obj.reset_failed_attempts()
                 login(request, user)
                 # Si el usuario debe cambiar la clave, redirigir al flujo de cambio
                 if hasattr(user_obj, 'debe_cambiar_clave') and user_obj.debe_cambiar_clave:
                     return redirect('dashboard:reset_password')
                 return redirect('dashboard:home')
             else:
-                # Contraseña incorrecta - incrementar intentos fallidos
-                user_obj.increment_failed_attempts()
-                intentos_restantes = 5 - user_obj.failed_login_attempts
+                # Contraseña incorrecta - contar el fallo; se persiste solo al cruzar el umbral
+                fallos, bloqueado = limitador.registrar_fallo()
+                contar('dulceria_login_intentos_total', resultado='fallido')
                 
-                if user_obj.is_account_locked():
+                if bloqueado:
+                    user_obj.bloquear(fallos, limitador.bloqueo_segundos // 60)
+                    contar('dulceria_login_bloqueos_total')
                     # Cuenta bloqueada
                     context = {
                         'error_type': 'locked',
-                        'locked_minutes': 30,
+                        'locked_minutes': limitador.bloqueo_segundos // 60,
                         'username': identificador
                     }
                 else:
                     # Advertencia de intentos restantes
                     context = {
                         'error_type': 'invalid',
-                        'attempts_remaining': intentos_restantes,
+                        'attempts_remaining': limitador.intentos_restantes(fallos),
                         'username': identificador
                     }
                 
@@ -146,6 +177,9 @@ def login_view(request):
         
         except Usuario.DoesNotExist:
             # Usuario/Correo no existe - no dar pistas de seguridad
+            limitador.marcar_inexistente()
+            limitador.registrar_fallo()
+            contar('dulceria_login_intentos_total', resultado='fallido')
             context = {
                 'error_type': 'invalid',
                 'username': identificador
@@ -181,17 +215,21 @@ def home(request):
     user = request.user
     now = timezone.now()
     
-    # Datos para el contexto
+    # Datos para el contexto. Los conteos y la actividad se pasan sin evaluar: la
+    # plantilla los cachea por fragmento ({% cache %}) y solo se consultan al regenerarlo
     context = {
         'user': user,
-        'productos_count': Producto.objects.count(),
-        'inventarios_count': Inventario.objects.count(),
+        'productos_count': Producto.objects.count,
+        'inventarios_count': Inventario.objects.count,
         'today': now.date(),
         'now': now,
+        'ttl_fragmentos': ttl_fragmentos(),
+        'version_estadisticas': version_fragmentos(GRUPO_PRODUCTOS, GRUPO_INVENTARIOS),
+        'version_actividad': version_fragmentos(GRUPO_AUDITORIA),
     }
     
     # Datos ficticios para proveedores y ventas (solo para administradores)
-    if user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador'):
+    if permisos_de(user).es_admin:
         context.update({
             'proveedores_count': 12,  # Ficticio
             'ventas_count': 156,      # Ficticio
@@ -206,35 +244,48 @@ def home(request):
 
 @login_required
 def auditorias_view(request):
-    """Vista de lista completa de auditorías"""
-    auditorias = Auditoria.objects.select_related('usuario').order_by('-fecha_hora')
-    
+    """Vista de lista completa de auditorías.
+
+    Con `desde`/`hasta` (AAAA-MM-DD) el rango puede llegar a meses archivados
+    por `archivar_auditoria`; en ese caso se consulta también `auditoria_archivo`.
+    """
+    from urllib.parse import urlencode
+    from django.db.models import prefetch_related_objects
+    from .archivo_auditoria import consulta_auditorias, rango_fechas
+
     # Filtros opcionales
     accion = request.GET.get('accion')
     entidad = request.GET.get('entidad')
     usuario_id = request.GET.get('usuario')
-    
-    if accion:
-        auditorias = auditorias.filter(accion=accion)
-    if entidad:
-        auditorias = auditorias.filter(entidad__icontains=entidad)
-    if usuario_id:
-        auditorias = auditorias.filter(usuario_id=usuario_id)
-    
-    # Paginación
-    from django.core.paginator import Paginator
-    paginator = Paginator(auditorias, 50)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
+    desde = request.GET.get('desde', '')
+    hasta = request.GET.get('hasta', '')
+    inicio, fin = rango_fechas(desde, hasta)
+
+    auditorias, combinado = consulta_auditorias(accion, entidad, usuario_id, inicio, fin)
+
+    if combinado:
+        # UNION de tabla viva y archivo: paginación por OFFSET sobre (fecha_hora, id)
+        page_obj = Paginator(auditorias, 50).get_page(request.GET.get('page', 1))
+        page_obj.object_list = list(page_obj.object_list)
+        prefetch_related_objects(page_obj.object_list, 'usuario')
+    else:
+        # Paginación por cursor sobre (fecha_hora, id): el total es una estimación acotada
+        page_obj = paginar_por_cursor(request, auditorias, 50, order_by='fecha_hora', order_direction='desc')
+
+    filtros = {clave: request.GET.get(clave) for clave in ('accion', 'entidad', 'usuario', 'desde', 'hasta')}
     context = {
         'page_obj': page_obj,
-        'total': auditorias.count(),
+        'total': page_obj.paginator.count,
+        'desde': desde,
+        'hasta': hasta,
+        'filtros_qs': urlencode({clave: valor for clave, valor in filtros.items() if valor}),
     }
-    
+
     return render(request, 'dashboard/auditorias.html', context)
 
 
+@login_required
+def exportar_auditorias_excel(request):
     """Exportar auditorías respetando filtros, búsqueda, orden y paginación.
 
     Parámetros:
@@ -243,93 +294,24 @@ def auditorias_view(request):
     - order_by, order_direction
     - per_page, page
     - all=true para todos los registros filtrados
+    - async=true: encola un ExportJob y responde con su id (ver estado_exportacion)
+    - format=xlsx|csv|ndjson (xlsx por defecto)
     - Si solo hay 1 registro y no se pide all, se exporta 'unico'
     """
+    user = request.user
+
+    # Solo administradores pueden acceder
+    if not permisos_de(user).es_admin:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+
     try:
-        auditorias_qs = Auditoria.objects.select_related('usuario').all()
-        accion = request.GET.get('accion', '')
-        entidad = (request.GET.get('entidad') or '').strip()
-        usuario_id = (request.GET.get('usuario') or '').strip()
-        if accion:
-            auditorias_qs = auditorias_qs.filter(accion=accion)
-        if entidad:
-            auditorias_qs = auditorias_qs.filter(entidad__icontains=entidad)
-        if usuario_id:
-            auditorias_qs = auditorias_qs.filter(usuario_id=usuario_id)
-        search = (request.GET.get('search') or '').strip()
-        if search:
-            from django.db.models import Q
-            auditorias_qs = auditorias_qs.filter(
-                Q(entidad__icontains=search) |
-                Q(detalle__icontains=search) |
-                Q(accion__icontains=search) |
-                Q(usuario__nombre__icontains=search) |
-                Q(usuario__username__icontains=search)
-            )
-        order_by = request.GET.get('order_by', 'fecha_hora')
-        order_direction = request.GET.get('order_direction', 'desc')
-        allowed_fields = {'fecha_hora', 'accion', 'entidad'}
-        if order_by not in allowed_fields:
-            order_by = 'fecha_hora'
-        order_field = f'-{order_by}' if order_direction == 'desc' else order_by
-        auditorias_qs = auditorias_qs.order_by(order_field)
-        total_filtrados = auditorias_qs.count()
-        per_page_param = request.GET.get('per_page')
-        try:
-            per_page = int(per_page_param) if per_page_param else request.session.get('auditorias_per_page', 50)
-        except ValueError:
-            per_page = 50
-        page_param = request.GET.get('page', '1')
-        try:
-            current_page = int(page_param)
-        except ValueError:
-            current_page = 1
-        export_all = request.GET.get('all', 'false').lower() in ['true','1','yes']
-        if export_all:
-            auditorias_export = auditorias_qs
-            export_scope = 'todos'
-        elif total_filtrados == 1:
-            auditorias_export = auditorias_qs
-            export_scope = 'unico'
-        else:
-            paginator = Paginator(auditorias_qs, per_page)
-            page_obj = paginator.get_page(current_page)
-            auditorias_export = page_obj.object_list
-            export_scope = f'pagina_{current_page}'
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = 'Auditorias'
-        header_fill = PatternFill(start_color='DC2626', end_color='DC2626', fill_type='solid')
-        header_font = Font(bold=True, color='FFFFFF', size=12)
-        border = Border(
-            left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin')
+        if pide_segundo_plano(request.GET):
+            return respuesta_trabajo_exportacion(request, EXPORTACION_AUDITORIAS)
+        auditorias_export, export_scope, _ = resolver_alcance(EXPORTACION_AUDITORIAS, request.GET, request.session)
+        return respuesta_exportacion(
+            EXPORTACION_AUDITORIAS, auditorias_export, f'auditorias_{export_scope}_{marca_tiempo()}',
+            formato_solicitado(request.GET),
         )
-        headers = ['Fecha/Hora', 'Acción', 'Entidad', 'Detalle', 'Usuario']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = border
-        for row_num, audit in enumerate(auditorias_export, 2):
-            ws.cell(row=row_num, column=1).value = audit.fecha_hora.strftime('%Y-%m-%d %H:%M')
-            ws.cell(row=row_num, column=2).value = audit.accion
-            ws.cell(row=row_num, column=3).value = audit.entidad
-            ws.cell(row=row_num, column=4).value = audit.detalle
-            ws.cell(row=row_num, column=5).value = audit.usuario.nombre if audit.usuario else 'Sistema'
-            for col_num in range(1, len(headers) + 1):
-                ws.cell(row=row_num, column=col_num).border = border
-                ws.cell(row=row_num, column=col_num).alignment = Alignment(vertical='center')
-        column_widths = [20, 12, 18, 50, 22]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        from datetime import datetime
-        fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-        response['Content-Disposition'] = f'attachment; filename=auditorias_{export_scope}_{fecha_actual}.xlsx'
-        wb.save(response)
-        return response
     except Exception as e:
         import traceback
         print(f"Error exportando auditorias: {traceback.format_exc()}")
@@ -342,39 +324,26 @@ def productos_view(request):
     user = request.user
     
     # Verificar permisos según rol
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
+    permisos = permisos_de(user)
+    rol_nombre = permisos.rol
     es_vendedor = rol_nombre == 'Vendedor'
     es_bodeguero = rol_nombre == 'Bodeguero'
     es_cliente = rol_nombre == 'Cliente'
     es_consulta = rol_nombre == 'Consulta'
-    puede_crear_editar = user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']
-    puede_eliminar = user.is_superuser or rol_nombre == 'Administrador'
+    puede_crear_editar = permisos.can_edit_products
+    puede_eliminar = permisos.can_delete_products
     
     productos = Producto.objects.all()
     
-    # Búsqueda por múltiples campos
+    # Búsqueda sobre el índice normalizado (nombre, descripción y precio)
     search = request.GET.get('search', '')
     if search:
-        productos = productos.filter(
-            nombre__icontains=search
-        ) | productos.filter(
-            descripcion__icontains=search
-        ) | productos.filter(
-            precio_referencia__icontains=search
-        )
+        productos = buscar_productos(productos, search)
     
     # Ordenamiento
     order_by = request.GET.get('order_by', 'id_producto')
     order_direction = request.GET.get('order_direction', 'asc')
     
-    # Construir el campo de ordenamiento
-    if order_direction == 'desc':
-        order_field = f'-{order_by}' if not order_by.startswith('-') else order_by
-    else:
-        order_field = order_by.replace('-', '')
-    
-    productos = productos.order_by(order_field)
-    
     # Paginación - obtener de sesión o de parámetro GET
     per_page_param = request.GET.get('per_page')
     if per_page_param:
@@ -386,9 +355,17 @@ def productos_view(request):
         if isinstance(per_page, str):
             per_page = int(per_page)
     
-    paginator = Paginator(productos, per_page)
-    page = request.GET.get('page', 1)
-    productos_paginados = paginator.get_page(page)
+    if search and not request.GET.get('order_by'):
+        # Sin orden explícito, los resultados de búsqueda se ordenan por relevancia
+        productos_paginados = Paginator(
+            productos.order_by('-relevancia', 'id_producto'), per_page
+        ).get_page(request.GET.get('page', 1))
+    else:
+        # Paginación por cursor: ordena por (order_by, id_producto) y busca desde el último visto
+        productos_paginados = paginar_por_cursor(
+            request, productos, per_page, order_by=order_by.replace('-', ''), order_direction=order_direction
+        )
+    total_productos = conteo_cacheado('productos', Producto.objects.all(), GRUPO_PRODUCTOS)
     
     context = {
         'productos': productos_paginados,
@@ -396,8 +373,8 @@ def productos_view(request):
         'order_by': order_by.replace('-', ''),
         'order_direction': order_direction,
         'per_page': per_page,
-        'total_productos': Producto.objects.count(),
-        'productos_activos': Producto.objects.count(),
+        'total_productos': total_productos,
+        'productos_activos': total_productos,
         'es_vendedor': es_vendedor,
         'es_bodeguero': es_bodeguero,
         'es_cliente': es_cliente,
@@ -413,13 +390,14 @@ def inventarios_view(request):
     """Vista de inventarios con paginación y selector de registros por página"""
     user = request.user
     # Verificar permisos según rol
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
+    permisos = permisos_de(user)
+    rol_nombre = permisos.rol
     # Bloquear acceso al rol CONSULTA
-    if rol_nombre == 'Consulta':
+    if not permisos.can_view_inventory:
         raise PermissionDenied("El rol Consulta no tiene permisos para acceder al inventario")
     es_vendedor = rol_nombre == 'Vendedor'
     es_bodeguero = rol_nombre == 'Bodeguero'
-    puede_editar = user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']
+    puede_editar = permisos.can_edit_inventory
     inventarios_qs = Inventario.objects.select_related('id_producto').all()
     now = timezone.now()
     # Mock data para proveedores
@@ -441,24 +419,25 @@ def inventarios_view(request):
         per_page = request.session.get('inventarios_per_page', 10)
         if isinstance(per_page, str):
             per_page = int(per_page)
-    paginator = Paginator(inventarios_qs, per_page)
-    page = request.GET.get('page', 1)
-    inventarios = paginator.get_page(page)
+    # Estadísticas de stock en una sola consulta (cacheadas en el request)
+    estadisticas = obtener_estadisticas_stock(request)
 
-    # Estadísticas de stock
-    stock_bajo = inventarios_qs.filter(cantidad_actual__lt=F('stock_minimo')).count()
-    stock_medio = inventarios_qs.filter(cantidad_actual__gte=F('stock_minimo'), cantidad_actual__lt=F('stock_minimo') * 2).count()
-    stock_alto = max(inventarios_qs.count() - stock_bajo - stock_medio, 0)
+    # Paginación por cursor; el total ya calculado evita un COUNT adicional
+    inventarios = paginar_por_cursor(
+        request, inventarios_qs, per_page,
+        order_by='fecha_ultima_actualizacion', order_direction='desc', count=estadisticas['total'],
+    )
 
     # Movimientos recientes
     movimientos_recientes = MovimientoInventario.objects.select_related('inventario', 'inventario__id_producto', 'usuario').order_by('-fecha_hora')[:20]
     context = {
         'inventarios': inventarios,
         'proveedores': proveedores,
-        'total_productos': inventarios_qs.count(),
-        'stock_alto': stock_alto,
-        'stock_medio': stock_medio,
-        'stock_bajo': stock_bajo,
+        'total_productos': estadisticas['total'],
+        'stock_alto': estadisticas['stock_alto'],
+        'stock_medio': estadisticas['stock_medio'],
+        'stock_bajo': estadisticas['stock_bajo'],
+        'total_unidades': estadisticas['total_unidades'],
         'today': now.date(),
         'user': request.user,
         'es_vendedor': es_vendedor,
@@ -469,13 +448,38 @@ def inventarios_view(request):
     }
     return render(request, 'dashboard/inventarios.html', context)
 
+@login_required
+def exportar_inventarios(request):
+    """Exportar inventarios respetando búsqueda, orden y paginación.
+
+    Parámetros: search (producto o ubicación), order_by, order_direction,
+    per_page, page, all=true, async=true y format=xlsx|csv|ndjson.
+    """
+    user = request.user
+    # Mismo criterio que el listado: el rol Consulta no accede al inventario
+    if not permisos_de(user).can_view_inventory:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+
+    try:
+        if pide_segundo_plano(request.GET):
+            return respuesta_trabajo_exportacion(request, EXPORTACION_INVENTARIOS)
+        inventarios_export, export_scope, _ = resolver_alcance(EXPORTACION_INVENTARIOS, request.GET, request.session)
+        return respuesta_exportacion(
+            EXPORTACION_INVENTARIOS, inventarios_export, f'inventarios_{export_scope}_{marca_tiempo()}',
+            formato_solicitado(request.GET),
+        )
+    except Exception as e:
+        import traceback
+        print(f"Error exportando inventarios: {traceback.format_exc()}")
+        return JsonResponse({'success': False, 'message': f'Error al exportar: {str(e)}'}, status=500)
+
 @login_required
 @never_cache
 def proveedores_view(request):
     """Vista de proveedores con datos reales y paginación"""
     user = request.user
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         raise PermissionDenied("No tienes permisos para acceder a esta sección")
 
     # Datos reales de proveedores
@@ -497,16 +501,15 @@ def proveedores_view(request):
         if isinstance(per_page, str):
             per_page = int(per_page)
 
-    paginator = Paginator(proveedores_qs, per_page)
-    page = request.GET.get('page', 1)
-    proveedores = paginator.get_page(page)
+    proveedores = paginar_por_cursor(request, proveedores_qs, per_page, order_by='id_proveedor', order_direction='desc')
+    proveedores_count = Proveedor.objects.count()
 
     context = {
         'proveedores': proveedores,
         'search': search,
         'per_page': per_page,
-        'proveedores_count': Proveedor.objects.count(),
-        'proveedores_activos': Proveedor.objects.count(),  # sin campo de estado, usamos total
+        'proveedores_count': proveedores_count,
+        'proveedores_activos': proveedores_count,  # sin campo de estado, usamos total
         'productos_proveedor': 0,
         'ordenes_pendientes': 0,
         'user': request.user,
@@ -516,22 +519,55 @@ def proveedores_view(request):
 @login_required
 @never_cache
 def ventas_view(request):
-    """Vista ficticia de ventas"""
+    """Vista de ventas: totales desde las tablas diarias y listado paginado por cursor"""
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         raise PermissionDenied("No tienes permisos para acceder a esta sección")
     
-    # Datos ficticios
-    ventas = [
-        {'id': 1, 'fecha': '2025-01-15', 'cliente': 'Cliente A', 'total': 50000, 'estado': 'Completada'},
-        {'id': 2, 'fecha': '2025-01-14', 'cliente': 'Cliente B', 'total': 75000, 'estado': 'Pendiente'},
-        {'id': 3, 'fecha': '2025-01-13', 'cliente': 'Cliente C', 'total': 30000, 'estado': 'Completada'},
-    ]
+    from datetime import timedelta
+    from django.db.models import Sum
+    from detalle_ventas.models import DetalleVenta
+    from ventas.agregados import productos_mas_vendidos, resumen_por_dia, vendedores_destacados
+    from ventas.models import Venta
+
+    per_page_param = request.GET.get('per_page')
+    if per_page_param:
+        per_page = int(per_page_param)
+        request.session['ventas_per_page'] = per_page
+    else:
+        per_page = request.session.get('ventas_per_page', 10)
+        if isinstance(per_page, str):
+            per_page = int(per_page)
+
+    ventas = paginar_por_cursor(
+        request, Venta.objects.select_related('id_cliente'), per_page, order_by='id_venta', order_direction='desc'
+    )
+    # Totales solo de las ventas de la página
+    totales = dict(
+        DetalleVenta.objects.filter(id_venta_id__in=[venta.id_venta for venta in ventas])
+        .values('id_venta_id').annotate(total=Sum(F('cantidad') * F('precio_unitario')))
+        .values_list('id_venta_id', 'total')
+    )
+    for venta in ventas:
+        venta.total = totales.get(venta.id_venta, 0)
+
+    hoy = timezone.localdate()
+    desde = hoy - timedelta(days=29)
+    resumen_dias = resumen_por_dia(desde)
+    ventas_hoy = next((dia for dia in resumen_dias if dia['fecha'] == hoy), None)
     
     context = {
         'ventas': ventas,
+        'per_page': per_page,
+        'resumen_dias': resumen_dias,
+        'ventas_dia': ventas_hoy['total'] if ventas_hoy else 0,
+        'ventas_hoy': ventas_hoy['num_ventas'] if ventas_hoy else 0,
+        'total_ventas': sum(dia['num_ventas'] for dia in resumen_dias),
+        'monto_periodo': sum(dia['total'] for dia in resumen_dias),
+        'top_productos': productos_mas_vendidos(desde),
+        'top_vendedores': vendedores_destacados(desde),
         'user': request.user,
     }
     return render(request, 'dashboard/ventas.html', context)
@@ -542,7 +578,7 @@ def agregar_producto(request):
     user = request.user
     
     # Verificar permisos
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre in ['Administrador', 'Bodeguero'])):
+    if not permisos_de(user).can_edit_products:
         messages.error(request, 'No tienes permisos para agregar productos')
         return redirect('dashboard:productos')
     
@@ -551,7 +587,7 @@ def agregar_producto(request):
         if form.is_valid():
             producto = form.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='CREAR',
                 entidad='Producto',
@@ -578,7 +614,7 @@ def editar_producto(request, producto_id):
     producto = get_object_or_404(Producto, id_producto=producto_id)
     
     # Solo administradores pueden editar
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         messages.error(request, 'No tienes permisos para editar productos')
         return redirect('dashboard:productos')
     
@@ -587,7 +623,7 @@ def editar_producto(request, producto_id):
         if form.is_valid():
             producto = form.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='EDITAR',
                 entidad='Producto',
@@ -610,14 +646,15 @@ def editar_producto(request, producto_id):
 def agregar_inventario(request):
     """Vista para agregar un nuevo inventario"""
     user = request.user
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
+    permisos = permisos_de(user)
+    rol_nombre = permisos.rol
     
     # Bloquear acceso a roles sin permisos de escritura (CONSULTA, VENDEDOR)
     if rol_nombre in ['Consulta', 'Vendedor']:
         raise PermissionDenied(f"El rol {rol_nombre} no tiene permisos para crear inventarios")
     
     # Solo administradores y bodegueros pueden agregar inventarios
-    if not (user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']):
+    if not permisos.can_edit_inventory:
         raise PermissionDenied('No tienes permisos para agregar inventarios')
     
     if request.method == 'POST':
@@ -625,7 +662,7 @@ def agregar_inventario(request):
         if form.is_valid():
             inventario = form.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='CREAR',
                 entidad='Inventario',
@@ -648,14 +685,15 @@ def editar_inventario(request, inventario_id):
     """Vista para editar un inventario existente"""
     user = request.user
     inventario = get_object_or_404(Inventario, id_inventario=inventario_id)
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
+    permisos = permisos_de(user)
+    rol_nombre = permisos.rol
     
     # Bloquear acceso a roles sin permisos de escritura (CONSULTA, VENDEDOR)
     if rol_nombre in ['Consulta', 'Vendedor']:
         raise PermissionDenied(f"El rol {rol_nombre} no tiene permisos para editar inventarios")
     
     # Solo administradores y bodegueros pueden editar
-    if not (user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']):
+    if not permisos.can_edit_inventory:
         raise PermissionDenied('No tienes permisos para editar inventarios')
     
     if request.method == 'POST':
@@ -663,7 +701,7 @@ def editar_inventario(request, inventario_id):
         if form.is_valid():
             inventario = form.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='EDITAR',
                 entidad='Inventario',
@@ -689,9 +727,8 @@ def editar_inventario(request, inventario_id):
 def registrar_movimiento_inventario(request):
     """Registrar entrada o salida de inventario y dejar traza de movimiento"""
     user = request.user
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
 
-    if not (user.is_superuser or rol_nombre in ['Administrador', 'Bodeguero']):
+    if not permisos_de(user).can_edit_inventory:
         return JsonResponse({'success': False, 'message': 'No tienes permisos para registrar movimientos'}, status=403)
 
     tipo = (request.POST.get('tipo_movimiento') or request.POST.get('tipo') or '').lower()
@@ -736,13 +773,15 @@ def registrar_movimiento_inventario(request):
                 stock_resultante=inventario.cantidad_actual,
             )
 
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='MOVIMIENTO',
                 entidad='Inventario',
                 detalle=f"{tipo.upper()} {cantidad} - InvID:{inventario.id_inventario} ({inventario.id_producto.nombre}) - Stock:{inventario.cantidad_actual}"
             )
 
+        contar('dulceria_movimientos_inventario_total', tipo=tipo, origen='individual')
+        contar('dulceria_movimientos_inventario_unidades_total', cantidad, tipo=tipo, origen='individual')
         return JsonResponse({
             'success': True,
             'message': 'Movimiento registrado',
@@ -755,6 +794,48 @@ def registrar_movimiento_inventario(request):
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
+@login_required
+@never_cache
+@require_POST
+def registrar_movimientos_lote(request):
+    """Registrar varios movimientos de inventario (p. ej. un envío completo) en una transacción.
+
+    Cuerpo JSON: {"proveedor": "...", "motivo": "...", "movimientos": [
+    {"inventario": id, "tipo": "entrada"|"salida", "cantidad": n, "proveedor"?, "motivo"?}, ...]}
+    """
+    import json
+    from inventarios.movimientos import ErrorMovimientos, registrar_movimientos
+    user = request.user
+
+    if not permisos_de(user).can_edit_inventory:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos para registrar movimientos'}, status=403)
+
+    try:
+        datos = json.loads(request.body or b'{}')
+        movimientos = datos['movimientos']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'message': 'Se espera un JSON con la lista "movimientos"'}, status=400)
+
+    try:
+        creados = registrar_movimientos(
+            user, movimientos, proveedor=datos.get('proveedor') or '', motivo=datos.get('motivo') or ''
+        )
+    except ErrorMovimientos as e:
+        return JsonResponse({'success': False, 'message': str(e), 'errores': e.errores}, status=e.status)
+    except Exception as e:
+        import traceback
+        print(f"Error registrando movimientos en lote: {traceback.format_exc()}")
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+    return JsonResponse({
+        'success': True,
+        'message': f'{len(creados)} movimientos registrados',
+        'movimientos': [
+            {'inventario': m.inventario_id, 'tipo': m.tipo, 'cantidad': m.cantidad, 'stock_actual': m.stock_resultante}
+            for m in creados
+        ],
+    })
+
 def forgot_password_view(request):
     """Vista para recuperación de contraseña"""
     if request.method == 'POST':
@@ -783,47 +864,26 @@ def forgot_password_view(request):
             })
             plain_message = strip_tags(html_message)
             
-            # Enviar email
-            try:
-                send_mail(
-                    subject='Recuperación de Contraseña - Dulcería Lilis',
-                    message=plain_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[email],
-                    html_message=html_message,
-                    fail_silently=False,
-                )
-                
-                # Log exitoso (opcional)
-                print(f"✅ Email de recuperación enviado a: {email}")
-                
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': True,
-                        'message': 'Se ha enviado un email con las instrucciones para recuperar tu contraseña'
-                    })
-                
-                messages.success(request, 'Se ha enviado un email con las instrucciones para recuperar tu contraseña')
-                return redirect('dashboard:login')
-                
-            except Exception as email_error:
-                # Log del error
-                import traceback
-                print(f"❌ Error enviando email a {email}:")
-                print(traceback.format_exc())
-                
-                # Marcar el token como inválido si el email falló
-                token.delete()
-                
-                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                    return JsonResponse({
-                        'success': False,
-                        'message': 'Error al enviar el email. Verifica la configuración del servidor de correo.'
-                    })
-                
-                messages.error(request, 'Error al enviar el email. Por favor contacta al administrador del sistema.')
-                return render(request, 'dashboard/forgot_password.html')
-            
+            # Encolar email (lo envía el comando enviar_correos); el token expira con el enlace
+            encolar_correo(
+                [email],
+                'Recuperación de Contraseña - Dulcería Lilis',
+                plain_message,
+                html_message=html_message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                caduca=token.expires_at,
+            )
+            print(f"✅ Email de recuperación encolado para: {email}")
+
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': True,
+                    'message': 'Se ha enviado un email con las instrucciones para recuperar tu contraseña'
+                })
+
+            messages.success(request, 'Se ha enviado un email con las instrucciones para recuperar tu contraseña')
+            return redirect('dashboard:login')
+
         except Usuario.DoesNotExist:
             # F-REC-02: Mostrar mensaje genérico sin indicar si el correo existe o no
             print(f"⚠️ Intento de recuperación para email no registrado: {email}")
@@ -1006,7 +1066,7 @@ def usuarios_view(request):
     """Vista de gestión de usuarios con paginación y selector de registros por página"""
     user = request.user
     # Solo administradores pueden gestionar usuarios
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         raise PermissionDenied("No tienes permisos para gestionar usuarios")
     # Usar el modelo de Usuario personalizado
     from usuarios.models import Usuario
@@ -1028,11 +1088,6 @@ def usuarios_view(request):
     allowed_fields = {'id_usuario', 'username', 'nombre', 'email', 'last_login', 'date_joined'}
     if order_by not in allowed_fields:
         order_by = 'id_usuario'
-    if order_direction == 'desc':
-        order_field = f'-{order_by}' if not order_by.startswith('-') else order_by
-    else:
-        order_field = order_by.replace('-', '')
-    usuarios_qs = usuarios_qs.order_by(order_field)
     roles = Rol.objects.all()
     
     # Paginación - obtener de sesión o de parámetro GET
@@ -1044,9 +1099,7 @@ def usuarios_view(request):
         per_page = request.session.get('usuarios_per_page', 10)
         if isinstance(per_page, str):
             per_page = int(per_page)
-    paginator = Paginator(usuarios_qs, per_page)
-    page = request.GET.get('page', 1)
-    usuarios = paginator.get_page(page)
+    usuarios = paginar_por_cursor(request, usuarios_qs, per_page, order_by=order_by, order_direction=order_direction)
 
     context = {
         'usuarios': usuarios,
@@ -1076,7 +1129,7 @@ def obtener_usuario(request, usuario_id):
     
     # Solo administradores pueden acceder
     try:
-        if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+        if not permisos_de(user).es_admin:
             return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     except Exception as e:
         return JsonResponse({'success': False, 'message': f'Error verificando permisos: {str(e)}'}, status=500)
@@ -1112,7 +1165,7 @@ def guardar_usuario(request):
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method != 'POST':
@@ -1203,9 +1256,10 @@ def guardar_usuario(request):
                         </div>
                         """
                     )
-                    send_mail(
-                        subject='Dulcería Lilis - Clave temporal de acceso',
-                        message=(
+                    encolar_correo(
+                        [usuario.email],
+                        'Dulcería Lilis - Clave temporal de acceso',
+                        (
                             f'Hola {usuario.nombre},\n'
                             f'Se ha generado una clave temporal para tu cuenta.\n'
                             f'Usuario: {usuario.username}\n'
@@ -1213,17 +1267,15 @@ def guardar_usuario(request):
                             f'URL de acceso: {login_url}\n'
                             'Al ingresar se te pedirá cambiar la contraseña.'
                         ),
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[usuario.email],
-                        fail_silently=True,
                         html_message=html_message,
+                        from_email=settings.DEFAULT_FROM_EMAIL,
                     )
                 except Exception:
                     pass
             
             usuario.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='EDITAR',
                 entidad='Usuario',
@@ -1266,7 +1318,7 @@ def guardar_usuario(request):
             usuario.debe_cambiar_clave = True
             usuario.save()
             # Auditoría
-            Auditoria.objects.create(
+            registrar_auditoria(
                 usuario=user,
                 accion='CREAR',
                 entidad='Usuario',
@@ -1292,19 +1344,18 @@ def guardar_usuario(request):
                     </div>
                     """
                 )
-                send_mail(
-                    subject='Dulcería Lilis - Tu acceso y clave temporal',
-                    message=(
+                encolar_correo(
+                    [usuario.email],
+                    'Dulcería Lilis - Tu acceso y clave temporal',
+                    (
                         f'Hola {usuario.nombre},\n'
                         f'Tu usuario es: {usuario.username}\n'
                         f'Tu clave temporal es: {temp_password}\n\n'
                         f'URL de acceso: {login_url}\n'
                         'Deberás cambiarla en tu primer ingreso.'
                     ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[usuario.email],
-                    fail_silently=True,
                     html_message=html_message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
                 )
             except Exception:
                 pass
@@ -1332,7 +1383,7 @@ def eliminar_usuario(request, usuario_id):
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method != 'POST':
@@ -1352,7 +1403,7 @@ def eliminar_usuario(request, usuario_id):
         nombre = usuario.nombre
         usuario.delete()
         # Auditoría
-        Auditoria.objects.create(
+        registrar_auditoria(
             usuario=user,
             accion='BORRAR',
             entidad='Usuario',
@@ -1375,7 +1426,7 @@ def reset_usuario_password(request, usuario_id):
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method != 'POST':
@@ -1415,7 +1466,7 @@ def reset_usuario_password(request, usuario_id):
         usuario.save(update_fields=['password', 'debe_cambiar_clave'])
         
         # Auditoría
-        Auditoria.objects.create(
+        registrar_auditoria(
             usuario=user,
             accion='EDITAR',
             entidad='Usuario',
@@ -1441,9 +1492,10 @@ def reset_usuario_password(request, usuario_id):
                 </div>
                 """
             )
-            send_mail(
-                subject='Dulcería Lilis - Tu contraseña ha sido reseteada',
-                message=(
+            encolar_correo(
+                [usuario.email],
+                'Dulcería Lilis - Tu contraseña ha sido reseteada',
+                (
                     f'Hola {usuario.nombre},\n'
                     f'El administrador ha reseteado tu contraseña.\n\n'
                     f'Usuario: {usuario.username}\n'
@@ -1451,10 +1503,8 @@ def reset_usuario_password(request, usuario_id):
                     f'URL de acceso: {login_url}\n\n'
                     'Al ingresar se te pedirá cambiar la contraseña por una nueva.'
                 ),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[usuario.email],
-                fail_silently=False,
                 html_message=html_message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
             )
             
             return JsonResponse({
@@ -1463,10 +1513,9 @@ def reset_usuario_password(request, usuario_id):
             })
             
         except Exception as email_error:
-            # Si falla el correo, revertir el cambio
             return JsonResponse({
                 'success': False,
-                'message': f'Error al enviar correo: {str(email_error)}'
+                'message': f'Error al encolar el correo: {str(email_error)}'
             }, status=500)
         
     except Exception as e:
@@ -1481,7 +1530,7 @@ def cambiar_estado_usuario(request, usuario_id):
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method != 'POST':
@@ -1528,127 +1577,25 @@ def exportar_usuarios_excel(request):
     - per_page: tamaño de página
     - page: número de página
     - all=true: exporta todos los registros filtrados ignorando paginación
+    - async=true: encola un ExportJob y responde con su id (ver estado_exportacion)
+    - format=xlsx|csv|ndjson (xlsx por defecto)
     - Si el filtro da exactamente 1 resultado y all!=true, se exporta solo ese registro
     """
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     try:
-        from usuarios.models import Usuario
-
-        # Query base
-        usuarios_qs = Usuario.objects.select_related('id_rol').all()
-
-        # Filtro búsqueda
-        search = (request.GET.get('search') or '').strip()
-        if search:
-            from django.db.models import Q
-            usuarios_qs = usuarios_qs.filter(
-                Q(username__icontains=search) | Q(nombre__icontains=search) | Q(email__icontains=search)
-            )
-
-        # Ordenamiento
-        order_by = request.GET.get('order_by', 'id_usuario')
-        order_direction = request.GET.get('order_direction', 'desc')
-        allowed_fields = {'id_usuario', 'username', 'nombre', 'email', 'last_login', 'date_joined'}
-        if order_by not in allowed_fields:
-            order_by = 'id_usuario'
-        order_field = f'-{order_by}' if order_direction == 'desc' else order_by.replace('-', '')
-        usuarios_qs = usuarios_qs.order_by(order_field)
-
-        total_filtrados = usuarios_qs.count()
-
-        # Paginación
-        per_page_param = request.GET.get('per_page')
-        try:
-            per_page = int(per_page_param) if per_page_param else request.session.get('usuarios_per_page', 10)
-        except ValueError:
-            per_page = 10
-        if isinstance(per_page, str):
-            try:
-                per_page = int(per_page)
-            except ValueError:
-                per_page = 10
-        page_param = request.GET.get('page', '1')
-        try:
-            current_page = int(page_param)
-        except ValueError:
-            current_page = 1
-
-        export_all = request.GET.get('all', 'false').lower() in ['true','1','yes']
-        if export_all:
-            usuarios_export = usuarios_qs
-            export_scope = 'todos'
-        elif total_filtrados == 1:
-            usuarios_export = usuarios_qs
-            export_scope = 'unico'
-        else:
-            paginator = Paginator(usuarios_qs, per_page)
-            page_obj = paginator.get_page(current_page)
-            usuarios_export = page_obj.object_list
-            export_scope = f'pagina_{current_page}'
-
-        # Crear libro de Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Usuarios"
-        
-        # Estilos
-        header_fill = PatternFill(start_color="DC2626", end_color="DC2626", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
+        if pide_segundo_plano(request.GET):
+            return respuesta_trabajo_exportacion(request, EXPORTACION_USUARIOS)
+        usuarios_export, export_scope, _ = resolver_alcance(EXPORTACION_USUARIOS, request.GET, request.session)
+        return respuesta_exportacion(
+            EXPORTACION_USUARIOS, usuarios_export, f'usuarios_{export_scope}_{marca_tiempo()}',
+            formato_solicitado(request.GET),
         )
         
-        # Encabezados
-        headers = ['ID', 'Usuario', 'Email', 'Nombre', 'Teléfono', 'Rol', 'Estado', 'Último Acceso', 'Fecha Creación']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = border
-        
-        # Llenar datos
-        for row_num, usuario in enumerate(usuarios_export, 2):
-            ws.cell(row=row_num, column=1).value = usuario.id_usuario
-            ws.cell(row=row_num, column=2).value = usuario.username
-            ws.cell(row=row_num, column=3).value = usuario.email
-            ws.cell(row=row_num, column=4).value = usuario.nombre
-            ws.cell(row=row_num, column=5).value = usuario.telefono or ''
-            ws.cell(row=row_num, column=6).value = usuario.id_rol.nombre if usuario.id_rol else 'Sin rol'
-            ws.cell(row=row_num, column=7).value = 'Activo' if usuario.is_active else 'Inactivo'
-            ws.cell(row=row_num, column=8).value = usuario.last_login.strftime('%Y-%m-%d %H:%M') if usuario.last_login else 'Nunca'
-            ws.cell(row=row_num, column=9).value = usuario.date_joined.strftime('%Y-%m-%d %H:%M') if usuario.date_joined else ''
-            
-            # Aplicar bordes
-            for col_num in range(1, len(headers) + 1):
-                ws.cell(row=row_num, column=col_num).border = border
-                ws.cell(row=row_num, column=col_num).alignment = Alignment(vertical='center')
-        
-        # Ajustar ancho de columnas
-        column_widths = [8, 20, 30, 25, 15, 20, 12, 20, 20]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
-        
-        # Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-        response['Content-Disposition'] = f'attachment; filename=usuarios_{export_scope}_{fecha_actual}.xlsx'
-        
-        # Guardar y devolver
-        wb.save(response)
-        return response
-        
     except Exception as e:
         import traceback
         print(f"Error exportando usuarios: {traceback.format_exc()}")
@@ -1659,115 +1606,23 @@ def exportar_usuarios_excel(request):
 
 @login_required
 def exportar_productos_excel(request):
-    """Exportar lista de productos a Excel"""
+    """Exportar lista de productos (format=xlsx|csv|ndjson; con async=true se encola un ExportJob)"""
     user = request.user
     
     # Solo administradores pueden acceder
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     try:
-        from productos.models import Producto
-
-        # 1) Construir queryset respetando filtros y orden del listado
-        productos = Producto.objects.all()
-
-        # Filtro de búsqueda (igual que en productos.views.lista_productos)
-        search = request.GET.get('search', '')
-        if search:
-            productos = (productos.filter(nombre__icontains=search)
-                         | productos.filter(descripcion__icontains=search)
-                         | productos.filter(precio_referencia__icontains=search))
-
-        # Ordenamiento
-        order_by = request.GET.get('order_by', 'id_producto')
-        order_direction = request.GET.get('order_direction', 'desc')
-        if order_direction == 'desc':
-            order_field = f'-{order_by}' if not order_by.startswith('-') else order_by
-        else:
-            order_field = order_by.replace('-', '')
-        productos = productos.order_by(order_field)
-
-        # Paginación: por defecto usar el valor en sesión; si viene por GET, priorizarlo
-        per_page_param = request.GET.get('per_page')
-        if per_page_param:
-            try:
-                per_page = int(per_page_param)
-            except ValueError:
-                per_page = 10
-        else:
-            per_page = request.session.get('productos_per_page', 10)
-
-        page_param = request.GET.get('page', '1')
-        try:
-            current_page = int(page_param)
-        except ValueError:
-            current_page = 1
-
-        # Si se recibe all=true exportar todo ignorando paginación
-        export_all = request.GET.get('all', 'false').lower() in ['true', '1', 'yes']
-
-        if not export_all:
-            paginator = Paginator(productos, per_page)
-            page_obj = paginator.get_page(current_page)
-            productos = page_obj.object_list
-
-        # 2) Crear libro de Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Productos"
-        
-        # Estilos
-        header_fill = PatternFill(start_color="DC2626", end_color="DC2626", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=12)
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        # Encabezados
-        headers = ['ID', 'Nombre', 'Descripción', 'Precio Referencia']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = border
-        
-        # 3) Llenar datos
-        for row_num, producto in enumerate(productos, 2):
-            ws.cell(row=row_num, column=1).value = producto.id_producto
-            ws.cell(row=row_num, column=2).value = producto.nombre
-            ws.cell(row=row_num, column=3).value = producto.descripcion
-            ws.cell(row=row_num, column=4).value = producto.precio_referencia
-            
-            # Formatear precio como moneda
-            ws.cell(row=row_num, column=4).number_format = '$#,##0'
-            
-            # Aplicar bordes
-            for col_num in range(1, len(headers) + 1):
-                ws.cell(row=row_num, column=col_num).border = border
-                ws.cell(row=row_num, column=col_num).alignment = Alignment(vertical='center')
-        
-        # Ajustar ancho de columnas
-        column_widths = [8, 35, 50, 18]
-        for col_num, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
-        
-        # 4) Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        if pide_segundo_plano(request.GET):
+            return respuesta_trabajo_exportacion(request, EXPORTACION_PRODUCTOS)
+        # Mismos filtros y orden que el listado (search, order_by, order_direction);
+        # sin all=true se exporta solo la página actual
+        productos_export, _, export_all = resolver_alcance(EXPORTACION_PRODUCTOS, request.GET, request.session)
+        return respuesta_exportacion(
+            EXPORTACION_PRODUCTOS, productos_export, f"productos_{'todos_' if export_all else ''}{marca_tiempo()}",
+            formato_solicitado(request.GET),
         )
-        fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-        nombre_archivo = f"productos_{'todos_' if export_all else ''}{fecha_actual}.xlsx"
-        response['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
-        
-        # Guardar y devolver
-        wb.save(response)
-        return response
         
     except Exception as e:
         import traceback
@@ -1777,6 +1632,204 @@ def exportar_productos_excel(request):
             'message': f'Error al exportar: {str(e)}'
         }, status=500)
 
+def _obtener_trabajo_exportacion(request, job_id):
+    """Devuelve el ExportJob si el usuario es su dueño o administrador; si no, None."""
+    from dashboard.models import ExportJob
+    user = request.user
+    job = get_object_or_404(ExportJob, pk=job_id)
+    es_admin = permisos_de(user).es_admin
+    if not es_admin and job.usuario_id != user.pk:
+        return None
+    return job
+
+@login_required
+@never_cache
+def estado_exportacion(request, job_id):
+    """Estado y avance de una exportación en segundo plano (para polling)."""
+    job = _obtener_trabajo_exportacion(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+    return JsonResponse({'success': True, 'trabajo': serializar_trabajo(job)})
+
+@login_required
+def descargar_exportacion(request, job_id):
+    """Descarga el archivo generado por una exportación terminada."""
+    from django.http import FileResponse, Http404
+    from dashboard.models import ExportJob
+    job = _obtener_trabajo_exportacion(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+    if job.estado != ExportJob.ESTADO_COMPLETADO or not job.archivo:
+        return JsonResponse({'success': False, 'message': 'La exportación aún no está lista'}, status=409)
+    try:
+        archivo = job.archivo.open('rb')
+    except FileNotFoundError:
+        raise Http404('El archivo de la exportación ya no existe')
+    return FileResponse(archivo, as_attachment=True, filename=job.nombre_archivo)
+
+@login_required
+@never_cache
+@require_POST
+def importar_datos(request):
+    """Encola la importación de un xlsx/csv (campos `tipo` y `archivo`) y responde 202 con el trabajo."""
+    from .importacion import EXTENSIONES, IMPORTACIONES, extension_de
+    from .trabajos_importacion import encolar_importacion, serializar_trabajo as serializar_importacion
+    user = request.user
+    tipo = request.POST.get('tipo', '')
+    archivo = request.FILES.get('archivo')
+
+    if tipo not in IMPORTACIONES:
+        return JsonResponse({'success': False, 'message': 'Tipo de importación inválido'}, status=400)
+    if not getattr(permisos_de(user), IMPORTACIONES[tipo].permiso):
+        return JsonResponse({'success': False, 'message': 'No tienes permisos para importar estos datos'}, status=403)
+    if archivo is None:
+        return JsonResponse({'success': False, 'message': 'Debes adjuntar un archivo'}, status=400)
+    if extension_de(archivo.name) not in EXTENSIONES:
+        return JsonResponse({'success': False, 'message': 'El archivo debe ser .xlsx o .csv'}, status=400)
+
+    try:
+        job = encolar_importacion(tipo, archivo, user)
+    except Exception as e:
+        import traceback
+        print(f"Error encolando importación: {traceback.format_exc()}")
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+    return JsonResponse({
+        'success': True,
+        'message': 'Importación encolada',
+        'job_id': job.pk,
+        'trabajo': serializar_importacion(job),
+    }, status=202)
+
+def _obtener_trabajo_importacion(request, job_id):
+    """Devuelve el ImportJob si el usuario es su dueño o administrador; si no, None."""
+    from dashboard.models import ImportJob
+    user = request.user
+    job = get_object_or_404(ImportJob, pk=job_id)
+    if not permisos_de(user).es_admin and job.usuario_id != user.pk:
+        return None
+    return job
+
+@login_required
+@never_cache
+def estado_importacion(request, job_id):
+    """Estado y avance de una importación en segundo plano (para polling)."""
+    from .trabajos_importacion import serializar_trabajo as serializar_importacion
+    job = _obtener_trabajo_importacion(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+    return JsonResponse({'success': True, 'trabajo': serializar_importacion(job)})
+
+@login_required
+def reporte_importacion(request, job_id):
+    """Descarga el libro con las filas rechazadas de una importación."""
+    from django.http import FileResponse, Http404
+    job = _obtener_trabajo_importacion(request, job_id)
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+    if not job.reporte:
+        return JsonResponse({'success': False, 'message': 'La importación no tiene reporte de errores'}, status=404)
+    try:
+        archivo = job.reporte.open('rb')
+    except FileNotFoundError:
+        raise Http404('El reporte de la importación ya no existe')
+    nombre = f'{job.nombre_archivo.rsplit(".", 1)[0]}_errores.xlsx'
+    return FileResponse(archivo, as_attachment=True, filename=nombre)
+
+@login_required
+@never_cache
+def rendimiento_view(request):
+    """Percentiles de tiempo y consultas por vista en este proceso (solo administradores)."""
+    from .rendimiento import registro_rendimiento
+    if not permisos_de(request.user).es_admin:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+    vistas = registro_rendimiento.resumen()
+    orden = sorted(vistas.items(), key=lambda item: item[1]['ms']['p90'], reverse=True)
+    return JsonResponse({'success': True, 'vistas': dict(orden)})
+
+@never_cache
+def metricas_view(request):
+    """Métricas en formato de Prometheus (exige Bearer METRICAS_TOKEN)."""
+    from .metricas import autorizado, exposicion
+    if not autorizado(request):
+        return JsonResponse({'success': False, 'message': 'No autorizado'}, status=403)
+    return HttpResponse(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@login_required
+@never_cache
+def autocompletar_productos(request):
+    """Sugerencias de productos por prefijo del nombre (JSON).
+
+    Parámetros: q (texto escrito), limit (máximo de resultados, por defecto 10).
+    Devuelve id, nombre, unidad y stock total de cada producto.
+    """
+    from productos.autocompletar import LIMITE_POR_DEFECTO, autocompletar_productos as sugerir
+    termino = (request.GET.get('q') or '').strip()
+    try:
+        limite = int(request.GET.get('limit') or LIMITE_POR_DEFECTO)
+    except (TypeError, ValueError):
+        limite = LIMITE_POR_DEFECTO
+    if not termino:
+        return JsonResponse({'success': True, 'resultados': []})
+    try:
+        return JsonResponse({'success': True, 'resultados': sugerir(termino, limite)})
+    except Exception as e:
+        import traceback
+        print(f"Error en autocompletar productos: {traceback.format_exc()}")
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+@login_required
+def stock_historico(request):
+    """Stock de cada inventario en una fecha pasada (JSON).
+
+    Parámetros: fecha (AAAA-MM-DD, stock al cierre de ese día) o momento
+    (fecha y hora ISO), producto (opcional), per_page (máx. 500) y cursor.
+    """
+    from datetime import datetime, time
+    from inventarios.snapshots import stock_en
+
+    if not permisos_de(request.user).can_view_inventory:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
+
+    try:
+        if request.GET.get('momento'):
+            momento = datetime.fromisoformat(request.GET['momento'])
+        else:
+            momento = datetime.combine(datetime.strptime(request.GET.get('fecha', ''), '%Y-%m-%d').date(), time.max)
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        per_page = min(max(int(request.GET.get('per_page') or 100), 1), 500)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Indica fecha (AAAA-MM-DD) o momento válido'}, status=400)
+    try:
+        producto_id = int(request.GET['producto']) if request.GET.get('producto') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'El producto debe ser un id numérico'}, status=400)
+
+    try:
+        inventarios = Inventario.objects.select_related('id_producto')
+        if producto_id is not None:
+            inventarios = inventarios.filter(id_producto_id=producto_id)
+        pagina = paginar_por_cursor(request, inventarios, per_page, order_by='id_inventario', contar=None)
+        stock = stock_en(momento, [inventario.id_inventario for inventario in pagina])
+        return JsonResponse({
+            'success': True,
+            'momento': momento.isoformat(),
+            'inventarios': [
+                {
+                    'id': inventario.id_inventario,
+                    'producto': inventario.id_producto.nombre,
+                    'ubicacion': inventario.ubicacion,
+                    'cantidad': stock.get(inventario.id_inventario),
+                }
+                for inventario in pagina
+            ],
+            'siguiente': pagina.next_cursor if pagina.has_next() else None,
+        })
+    except Exception as e:
+        import traceback
+        print(f"Error en stock histórico: {traceback.format_exc()}")
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
 @login_required
 def obtener_producto(request, producto_id):
     """API para obtener detalles de un producto en formato JSON"""
@@ -1833,9 +1886,8 @@ def actualizar_producto(request):
     
     # Verificar permisos: Administrador y Bodeguero pueden editar
     user = request.user
-    rol_nombre = user.id_rol.nombre if hasattr(user, 'id_rol') and user.id_rol else None
     
-    if rol_nombre not in ['Administrador', 'Bodeguero'] and not user.is_superuser:
+    if not permisos_de(user).can_edit_products:
         return JsonResponse({
             'success': False, 
             'message': 'No tienes permisos para editar productos.'
@@ -25,14 +25,38 @@ pip install -r requirements.txt --quiet
 echo "🗄️  Aplicando migraciones..."
 python manage.py migrate --noinput
 
+echo "📈 Agregando ventas pendientes a los totales diarios..."
+python manage.py agregar_ventas
+
 echo "📁 Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput
 
+echo "⚙️  Instalando workers en segundo plano..."
+# Correos, exportaciones e importaciones se procesan fuera de gunicorn (ver deploy/dulceria-worker@.service)
+WORKERS="enviar_correos procesar_exportaciones procesar_importaciones"
+for unidad in dulceria-worker@.service dulceria-tarea@.service dulceria-agregar-ventas.timer; do
+    sed -e "s|__DIR__|$SCRIPT_DIR|g" -e "s|__USER__|$(whoami)|g" "deploy/$unidad" \
+        | sudo tee "/etc/systemd/system/$unidad" > /dev/null
+done
+
 echo "🔄 Reiniciando servidor..."
 sudo systemctl daemon-reload
 sudo systemctl restart dulceria
+for worker in $WORKERS; do
+    sudo systemctl enable --quiet "dulceria-worker@$worker"
+    sudo systemctl restart "dulceria-worker@$worker"
+done
+sudo systemctl enable --now --quiet dulceria-agregar-ventas.timer
 
 echo "✅ ¡Despliegue completado exitosamente!"
 echo ""
 echo "📊 Estado del servicio:"
 sudo systemctl status dulceria --no-pager -l
+for worker in $WORKERS; do
+    sudo systemctl is-active --quiet "dulceria-worker@$worker" \
+        && echo "   ✓ dulceria-worker@$worker activo" \
+        || echo "   ✗ dulceria-worker@$worker no está activo (journalctl -u dulceria-worker@$worker)"
+done
+sudo systemctl is-active --quiet dulceria-agregar-ventas.timer \
+    && echo "   ✓ dulceria-agregar-ventas.timer activo" \
+    || echo "   ✗ dulceria-agregar-ventas.timer no está activo (journalctl -u dulceria-tarea@agregar_ventas)"
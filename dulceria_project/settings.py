@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'dashboard.rendimiento.RendimientoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +76,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'roles.context_processors.permisos',
                 'django.template.context_processors.debug',
             ],
         },
@@ -110,6 +112,19 @@ else:
         }
     }
 
+# Cache (versiones de permisos, sesión, límite de login y fragmentos del dashboard).
+# Con varios procesos (gunicorn) usar un cache compartido para que las invalidaciones
+# lleguen a todos, p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# y CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='dulceria'),
+    }
+}
+# Segundos que viven los fragmentos/conteos cacheados aunque no cambie nada
+CACHE_FRAGMENTOS_SEGUNDOS = config('CACHE_FRAGMENTOS_SEGUNDOS', default=300, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -168,8 +183,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configuración del modelo de usuario personalizado
 AUTH_USER_MODEL = 'usuarios.Usuario'
 
+# Carga del usuario de la sesión en una consulta (con su rol). El perfil se memoriza
+# solo si el cache es compartido (no LocMemCache); clave y estado se leen siempre de la base
+AUTHENTICATION_BACKENDS = ['usuarios.backends.UsuarioBackend']
+USUARIO_SESION_CACHE_SEGUNDOS = config('USUARIO_SESION_CACHE_SEGUNDOS', default=300, cast=int)
+
+# Límite de intentos de login (usuarios/limitador.py): ventana deslizante en cache por
+# identificador y por IP; el bloqueo se guarda en Usuario.locked_until al cruzar el umbral
+LOGIN_MAX_INTENTOS = config('LOGIN_MAX_INTENTOS', default=5, cast=int)
+LOGIN_MAX_INTENTOS_IP = config('LOGIN_MAX_INTENTOS_IP', default=30, cast=int)
+LOGIN_VENTANA_SEGUNDOS = config('LOGIN_VENTANA_SEGUNDOS', default=900, cast=int)
+LOGIN_BLOQUEO_MINUTOS = config('LOGIN_BLOQUEO_MINUTOS', default=30, cast=int)
+# Proxies inversos cuyo X-Forwarded-For indica la IP del cliente (límite de login por IP).
+# Si la petición llega de uno de ellos sin ese encabezado, el límite por IP no se aplica
+PROXIES_CONFIABLES = [
+    proxy.strip() for proxy in config('PROXIES_CONFIABLES', default='127.0.0.1,::1').split(',') if proxy.strip()
+]
+
+# Instrumentación por request (dashboard/rendimiento.py): requests con más consultas
+# que el presupuesto se registran en el logger dashboard.rendimiento con las
+# consultas repetidas (posibles N+1); percentiles por vista sobre las últimas
+# RENDIMIENTO_VENTANA muestras. Server-Timing se agrega por defecto solo con DEBUG.
+RENDIMIENTO_ACTIVO = config('RENDIMIENTO_ACTIVO', default=True, cast=bool)
+RENDIMIENTO_PRESUPUESTO_CONSULTAS = config('RENDIMIENTO_PRESUPUESTO_CONSULTAS', default=50, cast=int)
+RENDIMIENTO_MIN_REPETICIONES = config('RENDIMIENTO_MIN_REPETICIONES', default=5, cast=int)
+RENDIMIENTO_VENTANA = config('RENDIMIENTO_VENTANA', default=500, cast=int)
+RENDIMIENTO_SERVER_TIMING = config('RENDIMIENTO_SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Métricas Prometheus en /metrics (dashboard/metricas.py): cada worker suma sus
+# contadores al archivo SQLite compartido METRICAS_ARCHIVO. El scrape usa
+# "Authorization: Bearer <METRICAS_TOKEN>"; sin token el endpoint queda cerrado.
+METRICAS_ACTIVAS = config('METRICAS_ACTIVAS', default=True, cast=bool)
+METRICAS_ARCHIVO = config('METRICAS_ARCHIVO', default=str(BASE_DIR / 'metricas' / 'metricas.sqlite3'))
+METRICAS_INTERVALO_SEGUNDOS = config('METRICAS_INTERVALO_SEGUNDOS', default=5.0, cast=float)
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+
 # Configuración de Email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Los correos se encolan en email_saliente y los envía `manage.py enviar_correos`
+# (dashboard/correo.py). En local: EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend
+# deja cada correo en EMAIL_FILE_PATH.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'correos_enviados'))
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=20, cast=int)
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 465
 EMAIL_USE_TLS = False
@@ -177,6 +232,32 @@ EMAIL_USE_SSL = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='tu-email@gmail.com')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='tu-app-password')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+CORREO_MAX_INTENTOS = config('CORREO_MAX_INTENTOS', default=5, cast=int)
+CORREO_REINTENTO_SEGUNDOS = config('CORREO_REINTENTO_SEGUNDOS', default=60, cast=int)
+
+# Exportaciones en segundo plano (comando procesar_exportaciones): durante estos
+# segundos un archivo terminado se reutiliza si el mismo usuario pide los mismos filtros
+EXPORTACION_TTL_SEGUNDOS = config('EXPORTACION_TTL_SEGUNDOS', default=600, cast=int)
+
+# Auditoría en lote (dashboard/auditoria.py): los eventos se escriben con bulk_create
+# al terminar cada request o al llegar al tamaño/intervalo. AUDITORIA_SINCRONA=True
+# los escribe de inmediato (útil en pruebas y scripts).
+AUDITORIA_SINCRONA = config('AUDITORIA_SINCRONA', default=False, cast=bool)
+AUDITORIA_TAMANO_LOTE = config('AUDITORIA_TAMANO_LOTE', default=100, cast=int)
+AUDITORIA_INTERVALO_SEGUNDOS = config('AUDITORIA_INTERVALO_SEGUNDOS', default=2.0, cast=float)
+
+# Archivo de auditoría (comando archivar_auditoria): meses que quedan en la tabla
+# viva y carpeta de los archivos NDJSON comprimidos (--destino ndjson)
+AUDITORIA_MESES_RETENCION = config('AUDITORIA_MESES_RETENCION', default=12, cast=int)
+AUDITORIA_ARCHIVO_DIR = config('AUDITORIA_ARCHIVO_DIR', default=str(BASE_DIR / 'archivo_auditoria'))
+
+# Totales diarios de ventas (comando agregar_ventas): solo se agregan ventas con
+# más de estos segundos, para no saltar checkouts que aún no confirmaron
+VENTAS_AGREGACION_MARGEN_SEGUNDOS = config('VENTAS_AGREGACION_MARGEN_SEGUNDOS', default=60, cast=int)
+
+# Snapshots diarios de stock (comando capturar_stock): días que se conservan
+# completos; de los más antiguos queda solo el del día 1 de cada mes
+STOCK_SNAPSHOT_RETENCION_DIAS = config('STOCK_SNAPSHOT_RETENCION_DIAS', default=90, cast=int)
 
 # Seguridad de cookies de sesión
 SESSION_COOKIE_HTTPONLY = True  # Protege contra XSS (JavaScript no puede acceder)
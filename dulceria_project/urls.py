@@ -31,6 +31,8 @@ urlpatterns = [
     path('productos/', include('productos.urls')),
     path('proveedores/', include('proveedores.urls')),
     path('roles/', include('roles.urls')),
+    path('ventas/', include('ventas.urls')),
+    path('metrics', dashboard_views.metricas_view, name='metricas'),
 ]
 
 # Servir archivos media en desarrollo
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Inventario
+from .models import Inventario, StockResumen
+from roles.permisos import permisos_de
 
 class InventarioInline(admin.TabularInline):
     model = Inventario
@@ -16,8 +17,8 @@ class InventarioAdmin(admin.ModelAdmin):
     
     def has_module_permission(self, request):
         """Controlar acceso al módulo de inventarios"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             # Solo administradores pueden ver inventarios
             return user_role == 'Administrador'
         return request.user.is_superuser
@@ -36,8 +37,8 @@ class InventarioAdmin(admin.ModelAdmin):
         """Filtrar datos según el rol del usuario"""
         qs = super().get_queryset(request)
         
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             
             if user_role == 'Vendedor':
                 # Los vendedores solo pueden ver inventarios con stock > 0
@@ -53,29 +54,46 @@ class InventarioAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         """Controlar permisos de agregar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             return user_role in ['Administrador', 'Bodeguero']
         return request.user.is_superuser
     
     def has_change_permission(self, request, obj=None):
         """Controlar permisos de editar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             return user_role in ['Administrador', 'Bodeguero']
         return request.user.is_superuser
     
     def has_delete_permission(self, request, obj=None):
         """Controlar permisos de eliminar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             return user_role == 'Administrador'
         return request.user.is_superuser
     
     def actualizar_stock(self, request, queryset):
         """Acción personalizada para actualizar stock"""
+        producto_ids = list(queryset.values_list('id_producto_id', flat=True).distinct())
         updated = queryset.update(cantidad_actual=100)  # Ejemplo: resetear a 100
+        # update() no pasa por save(): recalcular el resumen de los productos afectados
+        StockResumen.recalcular(producto_ids)
+        from dashboard.cache_fragmentos import GRUPO_INVENTARIOS, invalidar_fragmentos
+        invalidar_fragmentos(GRUPO_INVENTARIOS)
         self.message_user(request, f'{updated} registros de inventario actualizados.')
     actualizar_stock.short_description = "Actualizar stock a 100 unidades"
     
     actions = ['actualizar_stock']
+
+
+@admin.register(StockResumen)
+class StockResumenAdmin(admin.ModelAdmin):
+    list_display = ('id_producto', 'total_unidades', 'num_ubicaciones', 'stock_minimo_total', 'ubicaciones_bajo_minimo', 'fecha_actualizacion')
+    search_fields = ('id_producto__nombre',)
+    list_select_related = ('id_producto',)
+    readonly_fields = ('id_producto', 'total_unidades', 'num_ubicaciones', 'stock_minimo_total', 'ubicaciones_bajo_minimo', 'fecha_actualizacion')
+
+    def has_add_permission(self, request):
+        """El resumen se mantiene automáticamente desde Inventario"""
+        return False
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class InventariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventarios'
+
+    def ready(self):
+        # StockResumen: los borrados (también los masivos) restan su stock
+        from .senales import conectar_senales
+        conectar_senales()
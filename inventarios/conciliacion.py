@@ -0,0 +1,208 @@
+"""
+Conciliación del libro de movimientos contra el stock de cada inventario.
+
+Para cada fila de `inventario` se recorren sus movimientos en orden de
+id_movimiento y se verifica la cadena del libro:
+
+- salto: `stock_resultante` de un movimiento no es el anterior más/menos su
+  cantidad (hubo un cambio de stock sin movimiento entre ambos, p. ej. una
+  edición desde el formulario o el admin);
+- descuadre: `cantidad_actual` no coincide con el `stock_resultante` del
+  último movimiento.
+
+Los movimientos se leen en streaming (`iterator(chunk_size)`) por rangos de
+id_inventario, y los rangos pueden repartirse en un pool de procesos que
+solo leen. Con `corregir=True` el proceso principal salda cada descuadre
+agregando un movimiento de ajuste (el libro es solo de inserción y
+`cantidad_actual` es el stock vigente); los saltos históricos solo se
+informan. Con `desde_snapshot=True` cada inventario parte de su último
+snapshot diario y solo se reproducen los movimientos posteriores.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Inventario, MovimientoInventario
+
+TAMANO_RANGO_DEFECTO = 2000
+TAMANO_CHUNK_DEFECTO = 5000
+MOTIVO_AJUSTE = 'Ajuste por conciliación'
+# Inventarios corregidos por transacción
+LOTE_AJUSTES = 1000
+
+
+def _delta(tipo, cantidad):
+    return cantidad if tipo == 'entrada' else -cantidad
+
+
+def _resultado_vacio():
+    return {'inventarios': 0, 'movimientos': 0, 'saltos': 0, 'sin_movimientos': 0, 'descuadres': [], 'corregidos': 0}
+
+
+def _sumar(total, parcial):
+    for clave in ('inventarios', 'movimientos', 'saltos', 'sin_movimientos'):
+        total[clave] += parcial[clave]
+    total['descuadres'].extend(parcial['descuadres'])
+
+
+def rangos_inventario(tamano=TAMANO_RANGO_DEFECTO):
+    """Rangos [(desde, hasta)] de id_inventario que cubren la tabla."""
+    limites = Inventario.objects.aggregate(minimo=Min('id_inventario'), maximo=Max('id_inventario'))
+    if limites['minimo'] is None:
+        return []
+    return [
+        (inicio, min(inicio + tamano - 1, limites['maximo']))
+        for inicio in range(limites['minimo'], limites['maximo'] + 1, tamano)
+    ]
+
+
+def conciliar_rango(desde, hasta, chunk=TAMANO_CHUNK_DEFECTO, desde_snapshot=False):
+    """Reproduce el libro de los inventarios con id entre `desde` y `hasta` (inclusive).
+
+    Con `desde_snapshot` cada inventario con snapshot parte de él y solo se
+    reproducen los movimientos posteriores (ver inventarios/snapshots.py).
+    """
+    resultado = _resultado_vacio()
+    stock = dict(
+        Inventario.objects.filter(id_inventario__range=(desde, hasta))
+        .order_by().values_list('id_inventario', 'cantidad_actual')
+    )
+    resultado['inventarios'] = len(stock)
+    if not stock:
+        return resultado
+
+    base = {}
+    if desde_snapshot:
+        from .snapshots import movimientos_posteriores, snapshots_base
+        base = snapshots_base(timezone.now(), desde=desde, hasta=hasta)
+    # inventario -> [stock_resultante del último movimiento, saltos]
+    finales = {inventario_id: [cantidad, 0] for inventario_id, (cantidad, _, _) in base.items()}
+
+    campos = ('inventario_id', 'id_movimiento', 'tipo', 'cantidad', 'stock_resultante')
+    completos = MovimientoInventario.objects.filter(inventario_id__gte=desde, inventario_id__lte=hasta)
+    if base:
+        completos = completos.exclude(inventario_id__in=list(base))
+    lecturas = [completos.order_by('inventario_id', 'id_movimiento')]
+    if base:
+        lecturas.append(movimientos_posteriores(base))
+
+    for movimientos in lecturas:
+        actual = previo = None
+        for inventario_id, id_movimiento, tipo, cantidad, stock_resultante in (
+            movimientos.values_list(*campos).iterator(chunk_size=chunk)
+        ):
+            if inventario_id in base and id_movimiento <= base[inventario_id][1]:
+                continue
+            resultado['movimientos'] += 1
+            if inventario_id != actual:
+                actual = inventario_id
+                estado = finales.get(inventario_id)
+                if estado is None:
+                    # Primer movimiento del libro: no hay saldo anterior con qué comparar
+                    estado = finales[inventario_id] = [stock_resultante, 0]
+                    previo = stock_resultante
+                    continue
+                previo = estado[0]
+            if previo + _delta(tipo, cantidad) != stock_resultante:
+                estado[1] += 1
+            estado[0] = previo = stock_resultante
+
+    for inventario_id, cantidad_actual in sorted(stock.items()):
+        if inventario_id not in finales:
+            resultado['sin_movimientos'] += 1
+            continue
+        stock_libro, saltos = finales[inventario_id]
+        resultado['saltos'] += saltos
+        if cantidad_actual != stock_libro:
+            resultado['descuadres'].append({
+                'inventario': inventario_id,
+                'cantidad_actual': cantidad_actual,
+                'stock_libro': stock_libro,
+                'diferencia': cantidad_actual - stock_libro,
+                'saltos': saltos,
+            })
+    return resultado
+
+
+def corregir_descuadres(inventario_ids, usuario_id=None):
+    """Agrega un movimiento de ajuste por cada inventario cuyo stock no coincide con su libro.
+
+    Las filas se bloquean (en orden de id, como el checkout) y se vuelve a
+    leer el último movimiento, así un movimiento registrado mientras corría la
+    conciliación no genera un ajuste de más.
+    """
+    with transaction.atomic():
+        stock = dict(
+            Inventario.objects.select_for_update().filter(pk__in=inventario_ids)
+            .order_by('id_inventario').values_list('id_inventario', 'cantidad_actual')
+        )
+        ultimos = (
+            MovimientoInventario.objects.filter(inventario_id__in=stock).order_by()
+            .values('inventario_id').annotate(ultimo=Max('id_movimiento')).values_list('ultimo', flat=True)
+        )
+        stock_libro = dict(
+            MovimientoInventario.objects.filter(id_movimiento__in=list(ultimos))
+            .values_list('inventario_id', 'stock_resultante')
+        )
+        ajustes = []
+        for inventario_id, cantidad_actual in stock.items():
+            libro = stock_libro.get(inventario_id, cantidad_actual)
+            diferencia = cantidad_actual - libro
+            if not diferencia:
+                continue
+            ajustes.append(MovimientoInventario(
+                inventario_id=inventario_id,
+                usuario_id=usuario_id,
+                tipo='entrada' if diferencia > 0 else 'salida',
+                cantidad=abs(diferencia),
+                motivo=MOTIVO_AJUSTE,
+                detalle=f'Libro: {libro}, stock: {cantidad_actual}',
+                stock_resultante=cantidad_actual,
+            ))
+        MovimientoInventario.objects.bulk_create(ajustes)
+    return len(ajustes)
+
+
+def _iniciar_proceso():
+    import django
+    django.setup()
+    # Cada proceso abre sus propias conexiones
+    connections.close_all()
+
+
+def _conciliar_tarea(argumentos):
+    return conciliar_rango(*argumentos)
+
+
+def conciliar(procesos=None, tamano_rango=TAMANO_RANGO_DEFECTO, corregir=False, chunk=TAMANO_CHUNK_DEFECTO,
+              usuario_id=None, rangos=None, progreso=None, desde_snapshot=False):
+    """Concilia todos los rangos, en paralelo si `procesos` > 1. Devuelve el resultado sumado."""
+    if rangos is None:
+        rangos = rangos_inventario(tamano_rango)
+    procesos = procesos or os.cpu_count() or 1
+    tareas = [(desde, hasta, chunk, desde_snapshot) for desde, hasta in rangos]
+    total = _resultado_vacio()
+
+    def acumular(parciales):
+        for parcial in parciales:
+            _sumar(total, parcial)
+            if progreso:
+                progreso(total)
+
+    if procesos <= 1 or len(tareas) <= 1:
+        acumular(map(_conciliar_tarea, tareas))
+    else:
+        # No heredar conexiones abiertas en los procesos hijos
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas)), initializer=_iniciar_proceso) as pool:
+            acumular(pool.map(_conciliar_tarea, tareas))
+    total['descuadres'].sort(key=lambda descuadre: descuadre['inventario'])
+
+    if corregir:
+        ids = [descuadre['inventario'] for descuadre in total['descuadres']]
+        for inicio in range(0, len(ids), LOTE_AJUSTES):
+            total['corregidos'] += corregir_descuadres(ids[inicio:inicio + LOTE_AJUSTES], usuario_id)
+    return total
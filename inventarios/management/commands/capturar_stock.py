@@ -0,0 +1,35 @@
+"""
+Comando de gestión para guardar el snapshot diario de stock por inventario
+Uso: python manage.py capturar_stock [--fecha AAAA-MM-DD] [--rango 2000] [--retener-dias 90]
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from inventarios.snapshots import TAMANO_RANGO_DEFECTO, capturar_snapshots, depurar_snapshots, retencion_dias
+
+
+class Command(BaseCommand):
+    help = 'Guarda cantidad_actual y el último movimiento de cada inventario como snapshot del día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', default=None, help='Día del snapshot (por defecto hoy)')
+        parser.add_argument('--rango', type=int, default=TAMANO_RANGO_DEFECTO,
+                            help='Inventarios (por id) bloqueados y leídos por transacción')
+        parser.add_argument('--retener-dias', type=int, default=None,
+                            help='Días de snapshots diarios a conservar (por defecto STOCK_SNAPSHOT_RETENCION_DIAS)')
+        parser.add_argument('--sin-depurar', action='store_true', help='No borra snapshots antiguos')
+
+    def handle(self, *args, **options):
+        try:
+            fecha = date.fromisoformat(options['fecha']) if options['fecha'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('La fecha debe tener el formato AAAA-MM-DD')
+
+        escritos = capturar_snapshots(fecha, tamano_rango=options['rango'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {escritos} snapshots de stock guardados para {fecha:%Y-%m-%d}'))
+
+        if not options['sin_depurar']:
+            dias = options['retener_dias'] if options['retener_dias'] is not None else retencion_dias()
+            borrados = depurar_snapshots(dias)
+            self.stdout.write(f'{borrados} snapshots con más de {dias} días depurados (se conserva el día 1 de cada mes)')
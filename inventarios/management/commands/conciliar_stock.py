@@ -0,0 +1,59 @@
+"""
+Comando de gestión para conciliar el stock de inventario con el libro de movimientos
+Uso: python manage.py conciliar_stock [--procesos N] [--rango 2000] [--corregir] [--desde-snapshot] [--inventario ID ...]
+"""
+from django.core.management.base import BaseCommand
+from inventarios.conciliacion import TAMANO_CHUNK_DEFECTO, TAMANO_RANGO_DEFECTO, conciliar
+
+
+class Command(BaseCommand):
+    help = 'Reproduce los movimientos de cada inventario e informa (o corrige) las diferencias con cantidad_actual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos en paralelo (por defecto, uno por CPU)')
+        parser.add_argument('--rango', type=int, default=TAMANO_RANGO_DEFECTO,
+                            help='Inventarios (por id) que procesa cada tarea')
+        parser.add_argument('--chunk', type=int, default=TAMANO_CHUNK_DEFECTO,
+                            help='Movimientos leídos por viaje a la base de datos')
+        parser.add_argument('--inventario', type=int, action='append', dest='inventarios',
+                            help='ID de inventario a conciliar (se puede repetir). Por defecto todos.')
+        parser.add_argument('--corregir', action='store_true',
+                            help='Agrega un movimiento de ajuste por cada inventario descuadrado')
+        parser.add_argument('--desde-snapshot', action='store_true',
+                            help='Parte del último snapshot diario (capturar_stock) y solo reproduce lo posterior')
+        parser.add_argument('--mostrar', type=int, default=50, help='Descuadres a listar en la salida')
+
+    def handle(self, *args, **options):
+        rangos = [(i, i) for i in sorted(set(options['inventarios']))] if options['inventarios'] else None
+
+        def progreso(total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  … {total["inventarios"]} inventarios, {total["movimientos"]} movimientos')
+
+        resultado = conciliar(
+            procesos=options['procesos'], tamano_rango=options['rango'], corregir=options['corregir'],
+            chunk=options['chunk'], rangos=rangos, progreso=progreso, desde_snapshot=options['desde_snapshot'],
+        )
+
+        self.stdout.write(
+            f'{resultado["inventarios"]} inventarios, {resultado["movimientos"]} movimientos '
+            f'({resultado["sin_movimientos"]} inventarios sin movimientos, {resultado["saltos"]} saltos en el historial)'
+        )
+        descuadres = resultado['descuadres']
+        for descuadre in descuadres[:options['mostrar']]:
+            self.stdout.write(
+                f'  Inventario {descuadre["inventario"]}: stock {descuadre["cantidad_actual"]}, '
+                f'libro {descuadre["stock_libro"]} ({descuadre["diferencia"]:+d}, {descuadre["saltos"]} saltos)'
+            )
+        if len(descuadres) > options['mostrar']:
+            self.stdout.write(f'  … y {len(descuadres) - options["mostrar"]} más')
+
+        if not descuadres:
+            self.stdout.write(self.style.SUCCESS('✅ Stock y libro de movimientos conciliados'))
+        elif options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f'✅ {resultado["corregidos"]} ajustes registrados'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'⚠ {len(descuadres)} inventarios descuadrados (usa --corregir para registrar ajustes)'
+            ))
@@ -0,0 +1,26 @@
+"""
+Comando de gestión para reconstruir el resumen materializado de stock por producto
+Uso: python manage.py reconstruir_stock_resumen [--producto ID ...]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventarios.models import StockResumen
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla stock_resumen a partir de los registros de inventario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--producto',
+            type=int,
+            action='append',
+            dest='productos',
+            help='ID de producto a recalcular (se puede repetir). Por defecto todos.'
+        )
+        parser.add_argument('--batch', type=int, default=1000, help='Tamaño de lote para el upsert')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = StockResumen.recalcular(options['productos'], batch_size=options['batch'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} resúmenes de stock recalculados'))
@@ -0,0 +1,60 @@
+# Generated manually to add StockResumen (resumen materializado de stock por producto)
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_stock_resumen(apps, schema_editor):
+    """Construye el resumen inicial a partir de los inventarios existentes."""
+    Producto = apps.get_model('productos', 'Producto')
+    Inventario = apps.get_model('inventarios', 'Inventario')
+    StockResumen = apps.get_model('inventarios', 'StockResumen')
+    from django.db.models import Count, F, Q, Sum
+
+    agregados = {
+        fila['id_producto_id']: fila
+        for fila in Inventario.objects.order_by().values('id_producto_id').annotate(
+            total=Sum('cantidad_actual'),
+            ubicaciones=Count('pk'),
+            minimo=Sum('stock_minimo'),
+            bajo=Count('pk', filter=Q(cantidad_actual__lt=F('stock_minimo'))),
+        )
+    }
+    resumenes = []
+    for producto_id in Producto.objects.values_list('id_producto', flat=True).iterator():
+        fila = agregados.get(producto_id, {})
+        resumenes.append(StockResumen(
+            id_producto_id=producto_id,
+            total_unidades=fila.get('total') or 0,
+            num_ubicaciones=fila.get('ubicaciones') or 0,
+            stock_minimo_total=fila.get('minimo') or 0,
+            ubicaciones_bajo_minimo=fila.get('bajo') or 0,
+        ))
+    StockResumen.objects.bulk_create(resumenes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0001_initial'),
+        ('inventarios', '0003_inventario_stock_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockResumen',
+            fields=[
+                ('id_producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stock_resumen', serialize=False, to='productos.producto', verbose_name='Producto')),
+                ('total_unidades', models.IntegerField(default=0, verbose_name='Total de Unidades')),
+                ('num_ubicaciones', models.IntegerField(default=0, verbose_name='Número de Ubicaciones')),
+                ('stock_minimo_total', models.IntegerField(default=0, verbose_name='Stock Mínimo Total')),
+                ('ubicaciones_bajo_minimo', models.IntegerField(default=0, verbose_name='Ubicaciones bajo el mínimo')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Última Actualización')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Stock',
+                'verbose_name_plural': 'Resúmenes de Stock',
+                'db_table': 'stock_resumen',
+            },
+        ),
+        migrations.RunPython(poblar_stock_resumen, migrations.RunPython.noop),
+    ]
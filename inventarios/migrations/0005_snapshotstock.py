@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventarios', '0004_stockresumen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('cantidad', models.IntegerField(verbose_name='Cantidad')),
+                ('ultimo_movimiento', models.IntegerField(default=0, verbose_name='Último movimiento incluido')),
+                ('capturado', models.DateTimeField(verbose_name='Capturado')),
+                ('inventario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventarios.inventario')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Stock',
+                'verbose_name_plural': 'Snapshots de Stock',
+                'db_table': 'stock_snapshot',
+                'unique_together': {('fecha', 'inventario')},
+            },
+        ),
+    ]
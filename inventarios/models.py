@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, connection
+from django.db.models import Count, F, Q, Sum
 from productos.models import Producto
 from django.conf import settings
 from django.utils import timezone
@@ -39,9 +40,32 @@ class Inventario(models.Model):
         if self.stock_maximo is not None and self.stock_maximo < self.stock_minimo:
             raise ValidationError("El stock máximo no puede ser menor que el stock mínimo.")
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardar el estado leído para aplicar deltas sobre StockResumen
+        instance._estado_original = instance._estado_stock()
+        return instance
+
+    def _estado_stock(self):
+        """Tupla (producto, cantidad, mínimo) o None si hay campos diferidos."""
+        valores = self.__dict__
+        if not all(campo in valores for campo in ('id_producto_id', 'cantidad_actual', 'stock_minimo')):
+            return None
+        return (valores['id_producto_id'], valores['cantidad_actual'], valores['stock_minimo'])
+
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
+        es_nuevo = self._state.adding
+        anterior = getattr(self, '_estado_original', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if anterior is None and not es_nuevo:
+                # Estado previo desconocido: recalcular el producto completo
+                StockResumen.recalcular([self.id_producto_id])
+            else:
+                StockResumen.aplicar_cambio(anterior, self._estado_stock())
+        self._estado_original = self._estado_stock()
 
 
 class MovimientoInventario(models.Model):
@@ -70,3 +94,150 @@ class MovimientoInventario(models.Model):
     def __str__(self):
         signo = '+' if self.tipo == 'entrada' else '-'
         return f"{self.get_tipo_display()} {signo}{self.cantidad} de {self.inventario.id_producto.nombre}"
+
+
+class StockResumen(models.Model):
+    """Resumen materializado de stock por producto (modelo de lectura).
+
+    Se mantiene desde Inventario.save() y la señal post_delete de Inventario
+    (inventarios/senales.py, que también cubre los borrados de queryset)
+    dentro de la misma transacción aplicando deltas atómicos, de modo que
+    listados, exportaciones y el home pueden leer el stock por producto sin
+    agrupar sobre `inventario`.
+    """
+    id_producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stock_resumen',
+        verbose_name="Producto"
+    )
+    total_unidades = models.IntegerField(default=0, verbose_name="Total de Unidades")
+    num_ubicaciones = models.IntegerField(default=0, verbose_name="Número de Ubicaciones")
+    stock_minimo_total = models.IntegerField(default=0, verbose_name="Stock Mínimo Total")
+    ubicaciones_bajo_minimo = models.IntegerField(default=0, verbose_name="Ubicaciones bajo el mínimo")
+    fecha_actualizacion = models.DateTimeField(auto_now=True, verbose_name="Última Actualización")
+
+    class Meta:
+        verbose_name = "Resumen de Stock"
+        verbose_name_plural = "Resúmenes de Stock"
+        db_table = "stock_resumen"
+
+    def __str__(self):
+        return f"{self.id_producto_id}: {self.total_unidades} unidades en {self.num_ubicaciones} ubicaciones"
+
+    @property
+    def bajo_minimo(self):
+        """Alguna ubicación del producto está bajo su stock mínimo"""
+        return self.ubicaciones_bajo_minimo > 0
+
+    @property
+    def total_bajo_minimo(self):
+        """El stock total del producto no alcanza la suma de mínimos"""
+        return self.total_unidades < self.stock_minimo_total
+
+    @classmethod
+    def aplicar_cambio(cls, anterior, nuevo):
+        """Aplica la diferencia entre dos estados (producto, cantidad, mínimo) de un Inventario."""
+        cls.aplicar_cambios([(anterior, nuevo)])
+
+    @classmethod
+    def aplicar_cambios(cls, cambios):
+        """Como aplicar_cambio para varios (anterior, nuevo): un UPDATE por producto afectado."""
+        deltas = {}
+
+        def acumular(estado, signo):
+            producto_id, cantidad, minimo = estado
+            delta = deltas.setdefault(producto_id, [0, 0, 0, 0])
+            delta[0] += signo * cantidad
+            delta[1] += signo
+            delta[2] += signo * minimo
+            delta[3] += signo * (1 if cantidad < minimo else 0)
+
+        for anterior, nuevo in cambios:
+            if anterior is not None:
+                acumular(anterior, -1)
+            if nuevo is not None:
+                acumular(nuevo, 1)
+
+        faltantes = []
+        for producto_id, (unidades, ubicaciones, minimo, bajo) in deltas.items():
+            if not any((unidades, ubicaciones, minimo, bajo)):
+                continue
+            actualizados = cls.objects.filter(id_producto_id=producto_id).update(
+                total_unidades=F('total_unidades') + unidades,
+                num_ubicaciones=F('num_ubicaciones') + ubicaciones,
+                stock_minimo_total=F('stock_minimo_total') + minimo,
+                ubicaciones_bajo_minimo=F('ubicaciones_bajo_minimo') + bajo,
+                fecha_actualizacion=timezone.now(),
+            )
+            if not actualizados:
+                faltantes.append(producto_id)
+        if faltantes:
+            cls.recalcular(faltantes)
+
+    @classmethod
+    def recalcular(cls, producto_ids=None, batch_size=1000):
+        """Recalcula los resúmenes desde `inventario` (todos si producto_ids es None)."""
+        inventarios = Inventario.objects.order_by()
+        if producto_ids is not None:
+            producto_ids = set(producto_ids)
+            inventarios = inventarios.filter(id_producto_id__in=producto_ids)
+        else:
+            producto_ids = set(Producto.objects.values_list('id_producto', flat=True))
+        agregados = inventarios.values('id_producto_id').annotate(
+            total=Sum('cantidad_actual'),
+            ubicaciones=Count('pk'),
+            minimo=Sum('stock_minimo'),
+            bajo=Count('pk', filter=Q(cantidad_actual__lt=F('stock_minimo'))),
+        )
+        ahora = timezone.now()
+        resumenes = {
+            producto_id: cls(id_producto_id=producto_id, fecha_actualizacion=ahora)
+            for producto_id in producto_ids
+        }
+        for fila in agregados:
+            resumen = resumenes.setdefault(
+                fila['id_producto_id'],
+                cls(id_producto_id=fila['id_producto_id'], fecha_actualizacion=ahora),
+            )
+            resumen.total_unidades = fila['total'] or 0
+            resumen.num_ubicaciones = fila['ubicaciones']
+            resumen.stock_minimo_total = fila['minimo'] or 0
+            resumen.ubicaciones_bajo_minimo = fila['bajo']
+        opciones = {
+            'update_conflicts': True,
+            'update_fields': [
+                'total_unidades', 'num_ubicaciones', 'stock_minimo_total',
+                'ubicaciones_bajo_minimo', 'fecha_actualizacion',
+            ],
+        }
+        # MySQL (ON DUPLICATE KEY UPDATE) no admite indicar los campos únicos
+        if connection.features.supports_update_conflicts_with_target:
+            opciones['unique_fields'] = ['id_producto']
+        cls.objects.bulk_create(list(resumenes.values()), batch_size=batch_size, **opciones)
+        return len(resumenes)
+
+
+class SnapshotStock(models.Model):
+    """Stock de un inventario capturado al cierre de un día (ver inventarios/snapshots.py).
+
+    `ultimo_movimiento` es el id del último movimiento ya reflejado en
+    `cantidad`; el stock en un momento posterior es `cantidad` más los
+    movimientos con id mayor.
+    """
+    fecha = models.DateField(verbose_name="Fecha")
+    inventario = models.ForeignKey(Inventario, on_delete=models.CASCADE, related_name='snapshots')
+    cantidad = models.IntegerField(verbose_name="Cantidad")
+    ultimo_movimiento = models.IntegerField(default=0, verbose_name="Último movimiento incluido")
+    capturado = models.DateTimeField(verbose_name="Capturado")
+
+    class Meta:
+        verbose_name = "Snapshot de Stock"
+        verbose_name_plural = "Snapshots de Stock"
+        db_table = "stock_snapshot"
+        # fecha primero: se consulta un día completo (o un rango de inventarios de ese día)
+        unique_together = ['fecha', 'inventario']
+
+    def __str__(self):
+        return f"{self.fecha} inv {self.inventario_id}: {self.cantidad}"
@@ -0,0 +1,142 @@
+"""
+Registro de movimientos de inventario en lote (p. ej. la recepción de un envío).
+
+`registrar_movimientos()` aplica N movimientos en una sola transacción:
+
+1. Se validan todas las líneas antes de tocar la base de datos.
+2. Se bloquean con un único SELECT ... FOR UPDATE todas las filas de
+   Inventario afectadas, en orden de id_inventario (el mismo orden que usa
+   el checkout, así no hay deadlocks entre ambos).
+3. Las líneas se aplican en el orden recibido sobre el stock bloqueado; si
+   alguna salida deja un inventario en negativo se rechaza el lote completo.
+4. Inventarios con bulk_update, StockResumen con un UPDATE por producto y
+   movimientos y auditorías con bulk_create.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+MAX_MOVIMIENTOS = 1000
+TIPOS = ('entrada', 'salida')
+
+
+class ErrorMovimientos(Exception):
+    """Lote rechazado; `status` es el código HTTP sugerido y `errores` el detalle por línea."""
+    status = 400
+
+    def __init__(self, mensaje, errores=None, status=None):
+        super().__init__(mensaje)
+        self.errores = errores or []
+        if status is not None:
+            self.status = status
+
+
+def normalizar_movimientos(movimientos, proveedor='', motivo=''):
+    """Valida las líneas; `proveedor` y `motivo` son los valores por defecto del lote."""
+    if not movimientos:
+        raise ErrorMovimientos('El lote no tiene movimientos')
+    if not isinstance(movimientos, list):
+        raise ErrorMovimientos('Los movimientos deben ser una lista')
+    if len(movimientos) > MAX_MOVIMIENTOS:
+        raise ErrorMovimientos(f'El lote supera el máximo de {MAX_MOVIMIENTOS} movimientos')
+    lineas, errores = [], []
+    for numero, movimiento in enumerate(movimientos, start=1):
+        try:
+            tipo = str(movimiento.get('tipo') or '').lower()
+            inventario_id = int(movimiento.get('inventario') or movimiento.get('inventario_id'))
+            cantidad = int(movimiento.get('cantidad'))
+        except (AttributeError, TypeError, ValueError):
+            errores.append({'linea': numero, 'error': 'Inventario y cantidad deben ser enteros'})
+            continue
+        if tipo not in TIPOS:
+            errores.append({'linea': numero, 'error': 'Tipo de movimiento inválido'})
+        elif cantidad <= 0:
+            errores.append({'linea': numero, 'error': 'La cantidad debe ser mayor a cero'})
+        else:
+            lineas.append({
+                'linea': numero,
+                'inventario': inventario_id,
+                'tipo': tipo,
+                'cantidad': cantidad,
+                'proveedor': str(movimiento.get('proveedor') or proveedor).strip()[:255],
+                'motivo': str(movimiento.get('motivo') or motivo).strip()[:255],
+            })
+    if errores:
+        raise ErrorMovimientos('Hay líneas inválidas en el lote', errores)
+    return lineas
+
+
+def registrar_movimientos(usuario, movimientos, proveedor='', motivo=''):
+    """Aplica el lote y devuelve la lista de MovimientoInventario creados."""
+    from dashboard.auditoria import registrar_auditorias
+    from .models import Inventario, MovimientoInventario, StockResumen
+
+    lineas = normalizar_movimientos(movimientos, proveedor, motivo)
+    ids = sorted({linea['inventario'] for linea in lineas})
+
+    with transaction.atomic():
+        inventarios = {
+            inventario.id_inventario: inventario
+            for inventario in Inventario.objects.select_for_update()
+            .select_related('id_producto').filter(id_inventario__in=ids).order_by('id_inventario')
+        }
+        faltantes = [inventario_id for inventario_id in ids if inventario_id not in inventarios]
+        if faltantes:
+            raise ErrorMovimientos(
+                f'Inventarios no encontrados: {", ".join(map(str, faltantes))}',
+                [{'linea': l['linea'], 'error': 'Inventario no encontrado'} for l in lineas if l['inventario'] in faltantes],
+                status=404,
+            )
+
+        anteriores = {inventario_id: inventario._estado_stock() for inventario_id, inventario in inventarios.items()}
+        errores = []
+        for linea in lineas:
+            inventario = inventarios[linea['inventario']]
+            if linea['tipo'] == 'entrada':
+                inventario.cantidad_actual += linea['cantidad']
+            elif linea['cantidad'] > inventario.cantidad_actual:
+                errores.append({'linea': linea['linea'], 'error': 'La salida supera el stock disponible'})
+                continue
+            else:
+                inventario.cantidad_actual -= linea['cantidad']
+            linea['stock_resultante'] = inventario.cantidad_actual
+        if errores:
+            raise ErrorMovimientos('El lote deja stock negativo', errores)
+
+        ahora = timezone.now()
+        for inventario in inventarios.values():
+            inventario.fecha_ultima_actualizacion = ahora
+        Inventario.objects.bulk_update(list(inventarios.values()), ['cantidad_actual', 'fecha_ultima_actualizacion'])
+        StockResumen.aplicar_cambios(
+            (anteriores[inventario_id], inventario._estado_stock()) for inventario_id, inventario in inventarios.items()
+        )
+        creados = MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                inventario=inventarios[linea['inventario']],
+                usuario=usuario,
+                tipo=linea['tipo'],
+                cantidad=linea['cantidad'],
+                proveedor=linea['proveedor'],
+                motivo=linea['motivo'],
+                detalle=linea['motivo'],
+                stock_resultante=linea['stock_resultante'],
+                fecha_hora=ahora,
+            )
+            for linea in lineas
+        ])
+        registrar_auditorias(usuario, 'MOVIMIENTO', 'Inventario', [
+            f"{linea['tipo'].upper()} {linea['cantidad']} - InvID:{linea['inventario']} "
+            f"({inventarios[linea['inventario']].id_producto.nombre}) - Stock:{linea['stock_resultante']}"
+            for linea in lineas
+        ])
+        transaction.on_commit(lambda: _despues_de_movimientos(lineas))
+    return creados
+
+
+def _despues_de_movimientos(lineas):
+    from dashboard.cache_fragmentos import GRUPO_INVENTARIOS, invalidar_fragmentos
+    from dashboard.metricas import contar
+    # bulk_update no emite post_save
+    invalidar_fragmentos(GRUPO_INVENTARIOS)
+    for linea in lineas:
+        contar('dulceria_movimientos_inventario_total', tipo=linea['tipo'], origen='lote')
+        contar('dulceria_movimientos_inventario_unidades_total', linea['cantidad'], tipo=linea['tipo'], origen='lote')
@@ -0,0 +1,24 @@
+"""
+Señales que mantienen StockResumen al borrar inventarios.
+
+Se conectan en InventariosConfig.ready(). post_delete se emite tanto para
+instance.delete() como para los borrados de queryset (p. ej. la acción
+"eliminar seleccionados" del admin), a diferencia de sobrescribir delete().
+"""
+from django.db.models.signals import post_delete
+
+
+def _restar_stock(sender, instance, origin=None, **kwargs):
+    from productos.models import Producto
+    from .models import StockResumen
+    # Borrado en cascada desde el producto: su resumen se borra con él
+    if isinstance(origin, Producto) or getattr(origin, 'model', None) is Producto:
+        return
+    estado = getattr(instance, '_estado_original', None) or instance._estado_stock()
+    StockResumen.aplicar_cambio(estado, None)
+    instance._estado_original = None
+
+
+def conectar_senales():
+    from .models import Inventario
+    post_delete.connect(_restar_stock, sender=Inventario, dispatch_uid='inventarios_stock_resumen_borrar')
@@ -0,0 +1,62 @@
+from django.db.models import Count, F, Q, Sum
+
+from .models import Inventario
+
+
+def calcular_estadisticas_stock(queryset=None):
+    """Calcula los buckets de stock, total de filas y unidades en una sola consulta.
+
+    - stock_bajo: cantidad_actual < stock_minimo
+    - stock_medio: stock_minimo <= cantidad_actual < 2 * stock_minimo
+    - stock_alto: el resto
+    """
+    if queryset is None:
+        queryset = Inventario.objects.all()
+    datos = queryset.order_by().aggregate(
+        total=Count('pk'),
+        stock_bajo=Count('pk', filter=Q(cantidad_actual__lt=F('stock_minimo'))),
+        stock_medio=Count('pk', filter=Q(
+            cantidad_actual__gte=F('stock_minimo'),
+            cantidad_actual__lt=F('stock_minimo') * 2,
+        )),
+        total_unidades=Sum('cantidad_actual'),
+    )
+    total = datos['total'] or 0
+    stock_bajo = datos['stock_bajo'] or 0
+    stock_medio = datos['stock_medio'] or 0
+    return {
+        'total': total,
+        'stock_bajo': stock_bajo,
+        'stock_medio': stock_medio,
+        'stock_alto': max(total - stock_bajo - stock_medio, 0),
+        'total_unidades': datos['total_unidades'] or 0,
+    }
+
+
+def obtener_estadisticas_stock(request, queryset=None):
+    """Devuelve las estadísticas de stock cacheadas en el request actual.
+
+    Sin `queryset` (todo el inventario) la primera llamada ejecuta la
+    agregación y las siguientes (vista, template, context processors)
+    reutilizan el resultado sin volver a contar; además se cachea entre
+    requests hasta que cambie algún Inventario (ver dashboard/cache_fragmentos.py).
+    Con `queryset` se calcula siempre: un filtro no debe recibir las cifras globales.
+    """
+    if queryset is not None:
+        return calcular_estadisticas_stock(queryset)
+    cache = getattr(request, '_estadisticas_stock', None)
+    if cache is None:
+        cache = _estadisticas_globales()
+        request._estadisticas_stock = cache
+    return cache
+
+
+def _estadisticas_globales():
+    from django.core.cache import cache
+    from dashboard.cache_fragmentos import GRUPO_INVENTARIOS, ttl_fragmentos, version_fragmentos
+    clave = f'inventarios:estadisticas:{version_fragmentos(GRUPO_INVENTARIOS)}'
+    estadisticas = cache.get(clave)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas_stock()
+        cache.set(clave, estadisticas, ttl_fragmentos())
+    return estadisticas
@@ -0,0 +1,145 @@
+"""
+Snapshots diarios de stock y consultas de stock a una fecha.
+
+`capturar_snapshots()` (comando `capturar_stock`, una vez al día) guarda por
+cada inventario su `cantidad_actual` y el id del último movimiento ya
+reflejado en ella. Se procesa por rangos de id_inventario; cada rango
+bloquea sus filas mientras lee, así ningún movimiento queda a medias entre
+la cantidad y la marca (los movimientos se escriben con el inventario
+bloqueado).
+
+`stock_en(momento)` parte del último snapshot capturado antes de `momento`
+y suma solo los movimientos posteriores a él, de modo que cada consulta
+recorre a lo sumo un día de movimientos. Los inventarios sin snapshot
+anterior se calculan hacia atrás desde el stock actual.
+
+Los snapshots con más de STOCK_SNAPSHOT_RETENCION_DIAS se depuran, salvo el
+del primer día de cada mes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Sum, When
+from django.utils import timezone
+
+from .models import Inventario, MovimientoInventario, SnapshotStock
+
+TAMANO_RANGO_DEFECTO = 2000
+RETENCION_DIAS_DEFECTO = 90
+# Un movimiento con id mayor que la marca del snapshot no puede ser mucho más
+# antiguo que la captura (las transacciones que lo escriben son cortas)
+MARGEN_CAPTURA = timedelta(minutes=10)
+
+_DELTA = Case(
+    When(tipo='entrada', then=F('cantidad')),
+    default=-F('cantidad'),
+    output_field=IntegerField(),
+)
+
+
+def retencion_dias():
+    return getattr(settings, 'STOCK_SNAPSHOT_RETENCION_DIAS', RETENCION_DIAS_DEFECTO)
+
+
+def _rangos(tamano):
+    from .conciliacion import rangos_inventario
+    return rangos_inventario(tamano)
+
+
+def capturar_snapshots(fecha=None, tamano_rango=TAMANO_RANGO_DEFECTO):
+    """Guarda (o reemplaza) los snapshots del día `fecha`. Devuelve cuántos se escribieron."""
+    fecha = fecha or timezone.localdate()
+    escritos = 0
+    for desde, hasta in _rangos(tamano_rango):
+        with transaction.atomic():
+            stock = dict(
+                Inventario.objects.select_for_update()
+                .filter(id_inventario__range=(desde, hasta))
+                .order_by('id_inventario').values_list('id_inventario', 'cantidad_actual')
+            )
+            if not stock:
+                continue
+            ultimos = dict(
+                MovimientoInventario.objects.filter(inventario_id__gte=desde, inventario_id__lte=hasta)
+                .order_by().values('inventario_id').annotate(ultimo=Max('id_movimiento'))
+                .values_list('inventario_id', 'ultimo')
+            )
+            ahora = timezone.now()
+            SnapshotStock.objects.filter(fecha=fecha, inventario_id__gte=desde, inventario_id__lte=hasta).delete()
+            SnapshotStock.objects.bulk_create([
+                SnapshotStock(
+                    fecha=fecha, inventario_id=inventario_id, cantidad=cantidad,
+                    ultimo_movimiento=ultimos.get(inventario_id, 0), capturado=ahora,
+                )
+                for inventario_id, cantidad in stock.items()
+            ])
+            escritos += len(stock)
+    return escritos
+
+
+def depurar_snapshots(retener_dias=None, hoy=None):
+    """Borra los snapshots antiguos, conservando el del primer día de cada mes."""
+    retener_dias = retencion_dias() if retener_dias is None else retener_dias
+    limite = (hoy or timezone.localdate()) - timedelta(days=retener_dias)
+    borrados, _ = SnapshotStock.objects.filter(fecha__lt=limite).exclude(fecha__day=1).delete()
+    return borrados
+
+
+def fecha_snapshot_base(momento):
+    """Último día con snapshots capturados hasta `momento` (o None)."""
+    return SnapshotStock.objects.filter(capturado__lte=momento).aggregate(fecha=Max('fecha'))['fecha']
+
+
+def snapshots_base(momento, inventario_ids=None, desde=None, hasta=None):
+    """{inventario_id: (cantidad, ultimo_movimiento, capturado)} del último snapshot antes de `momento`."""
+    fecha = fecha_snapshot_base(momento)
+    if fecha is None:
+        return {}
+    snapshots = SnapshotStock.objects.filter(fecha=fecha, capturado__lte=momento)
+    if inventario_ids is not None:
+        snapshots = snapshots.filter(inventario_id__in=inventario_ids)
+    if desde is not None:
+        snapshots = snapshots.filter(inventario_id__gte=desde, inventario_id__lte=hasta)
+    return {
+        inventario_id: (cantidad, ultimo, capturado)
+        for inventario_id, cantidad, ultimo, capturado in snapshots.values_list(
+            'inventario_id', 'cantidad', 'ultimo_movimiento', 'capturado'
+        )
+    }
+
+
+def movimientos_posteriores(base, hasta_momento=None):
+    """Movimientos (en orden) posteriores a cada snapshot de `base`, hasta `hasta_momento` si se indica."""
+    if not base:
+        return MovimientoInventario.objects.none()
+    desde_captura = min(capturado for _, _, capturado in base.values()) - MARGEN_CAPTURA
+    movimientos = MovimientoInventario.objects.filter(inventario_id__in=list(base), fecha_hora__gt=desde_captura)
+    if hasta_momento is not None:
+        movimientos = movimientos.filter(fecha_hora__lte=hasta_momento)
+    return movimientos.order_by('inventario_id', 'id_movimiento')
+
+
+def stock_en(momento, inventario_ids):
+    """{inventario_id: stock} de los inventarios indicados en `momento`."""
+    inventario_ids = list(inventario_ids)
+    base = snapshots_base(momento, inventario_ids)
+    stock = {inventario_id: cantidad for inventario_id, (cantidad, _, _) in base.items()}
+    for inventario_id, id_movimiento, delta in movimientos_posteriores(base, momento).annotate(
+        delta=_DELTA
+    ).values_list('inventario_id', 'id_movimiento', 'delta'):
+        if id_movimiento > base[inventario_id][1]:
+            stock[inventario_id] += delta
+
+    # Sin snapshot previo: hacia atrás desde el stock actual
+    faltantes = [inventario_id for inventario_id in inventario_ids if inventario_id not in base]
+    if faltantes:
+        posteriores = dict(
+            MovimientoInventario.objects.filter(inventario_id__in=faltantes, fecha_hora__gt=momento)
+            .order_by().values('inventario_id').annotate(total=Sum(_DELTA)).values_list('inventario_id', 'total')
+        )
+        for inventario_id, cantidad in Inventario.objects.filter(pk__in=faltantes).values_list(
+            'id_inventario', 'cantidad_actual'
+        ):
+            stock[inventario_id] = cantidad - (posteriores.get(inventario_id) or 0)
+    return stock
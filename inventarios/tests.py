@@ -1,3 +1,267 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from productos.models import Producto
+from inventarios.conciliacion import MOTIVO_AJUSTE, conciliar
+from inventarios.models import Inventario, MovimientoInventario, SnapshotStock, StockResumen
+from inventarios.services import calcular_estadisticas_stock, obtener_estadisticas_stock
+from usuarios.models import Usuario
+from roles.models import Rol
 
-# Create your tests here.
+
+class EstadisticasStockTests(TestCase):
+    def setUp(self):
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        producto = Producto.objects.create(nombre='Trufa', precio_referencia=1000, unidad_medida='unidad')
+        # bajo (5 < 10), medio (10 <= 15 < 20), alto (50 >= 20)
+        for ubicacion, cantidad in [('A1', 5), ('A2', 15), ('A3', 50)]:
+            Inventario.objects.create(
+                id_producto=producto, cantidad_actual=cantidad, stock_minimo=10, ubicacion=ubicacion
+            )
+
+    def test_calcular_estadisticas_una_consulta(self):
+        with self.assertNumQueries(1):
+            stats = calcular_estadisticas_stock()
+        self.assertEqual(stats['total'], 3)
+        self.assertEqual(stats['stock_bajo'], 1)
+        self.assertEqual(stats['stock_medio'], 1)
+        self.assertEqual(stats['stock_alto'], 1)
+        self.assertEqual(stats['total_unidades'], 70)
+
+    def test_estadisticas_cacheadas_por_request(self):
+        request = RequestFactory().get('/')
+        primera = obtener_estadisticas_stock(request)
+        with self.assertNumQueries(0):
+            segunda = obtener_estadisticas_stock(request)
+        self.assertIs(primera, segunda)
+
+    def test_queryset_filtrado_no_usa_el_cache_del_request(self):
+        request = RequestFactory().get('/')
+        self.assertEqual(obtener_estadisticas_stock(request)['total'], 3)
+        filtrado = obtener_estadisticas_stock(request, Inventario.objects.filter(ubicacion='A1'))
+        self.assertEqual((filtrado['total'], filtrado['stock_bajo']), (1, 1))
+        self.assertEqual(obtener_estadisticas_stock(request)['total'], 3)
+
+    def test_inventarios_view_usa_estadisticas(self):
+        self.client.login(username='admin', password='Test1234!')
+        response = self.client.get(reverse('dashboard:inventarios'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_productos'], 3)
+        self.assertEqual(response.context['stock_bajo'], 1)
+        self.assertEqual(response.context['inventarios'].paginator.count, 3)
+
+
+class StockResumenTests(TestCase):
+    def setUp(self):
+        self.rol_admin = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=self.rol_admin
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        self.producto = Producto.objects.create(nombre='Bombón', precio_referencia=500, unidad_medida='unidad')
+        self.inv_a = Inventario.objects.create(
+            id_producto=self.producto, cantidad_actual=5, stock_minimo=10, ubicacion='A1'
+        )
+        self.inv_b = Inventario.objects.create(
+            id_producto=self.producto, cantidad_actual=30, stock_minimo=10, ubicacion='B1'
+        )
+
+    def test_resumen_se_mantiene_en_save_y_delete(self):
+        resumen = StockResumen.objects.get(id_producto=self.producto)
+        self.assertEqual(resumen.total_unidades, 35)
+        self.assertEqual(resumen.num_ubicaciones, 2)
+        self.assertEqual(resumen.ubicaciones_bajo_minimo, 1)
+        self.assertTrue(resumen.bajo_minimo)
+
+        inv = Inventario.objects.get(pk=self.inv_a.pk)
+        inv.cantidad_actual = 20
+        inv.save()
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.total_unidades, 50)
+        self.assertFalse(resumen.bajo_minimo)
+
+        Inventario.objects.get(pk=self.inv_b.pk).delete()
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.total_unidades, 20)
+        self.assertEqual(resumen.num_ubicaciones, 1)
+
+    def test_borrado_masivo_actualiza_resumen(self):
+        # Como la acción "eliminar seleccionados" del admin: queryset.delete()
+        Inventario.objects.filter(pk=self.inv_a.pk).delete()
+        resumen = StockResumen.objects.get(id_producto=self.producto)
+        self.assertEqual(resumen.total_unidades, 30)
+        self.assertEqual(resumen.num_ubicaciones, 1)
+        self.assertEqual(resumen.ubicaciones_bajo_minimo, 0)
+
+    def test_movimiento_actualiza_resumen(self):
+        self.client.login(username='admin', password='Test1234!')
+        response = self.client.post(reverse('dashboard:registrar_movimiento_inventario'), {
+            'tipo_movimiento': 'salida', 'producto': self.inv_b.pk, 'cantidad': 10,
+        })
+        self.assertTrue(response.json()['success'])
+        resumen = StockResumen.objects.get(id_producto=self.producto)
+        self.assertEqual(resumen.total_unidades, 25)
+
+    def test_recalcular_corrige_cambios_masivos(self):
+        Inventario.objects.filter(pk=self.inv_a.pk).update(cantidad_actual=100)
+        StockResumen.recalcular([self.producto.pk])
+        resumen = StockResumen.objects.get(id_producto=self.producto)
+        self.assertEqual(resumen.total_unidades, 130)
+        self.assertEqual(resumen.ubicaciones_bajo_minimo, 0)
+
+
+class ConciliacionStockTests(TestCase):
+    def setUp(self):
+        producto = Producto.objects.create(nombre='Alfajor', precio_referencia=800, unidad_medida='unidad')
+        self.cuadrado = Inventario.objects.create(id_producto=producto, cantidad_actual=7, stock_minimo=1, ubicacion='A1')
+        self.editado = Inventario.objects.create(id_producto=producto, cantidad_actual=20, stock_minimo=1, ubicacion='B1')
+        self.sin_libro = Inventario.objects.create(id_producto=producto, cantidad_actual=3, stock_minimo=1, ubicacion='C1')
+        for inventario, movimientos in (
+            (self.cuadrado, [('entrada', 10, 10), ('salida', 3, 7)]),
+            # 12 -> 15 sin movimiento entre medio, y luego editado a 20 desde el formulario
+            (self.editado, [('entrada', 12, 12), ('salida', 2, 15)]),
+        ):
+            for tipo, cantidad, resultante in movimientos:
+                MovimientoInventario.objects.create(
+                    inventario=inventario, tipo=tipo, cantidad=cantidad, stock_resultante=resultante
+                )
+
+    def test_detecta_saltos_y_descuadres(self):
+        resultado = conciliar(procesos=1, tamano_rango=2)
+        self.assertEqual(resultado['inventarios'], 3)
+        self.assertEqual(resultado['movimientos'], 4)
+        self.assertEqual(resultado['sin_movimientos'], 1)
+        self.assertEqual(resultado['saltos'], 1)
+        self.assertEqual(resultado['descuadres'], [{
+            'inventario': self.editado.pk, 'cantidad_actual': 20, 'stock_libro': 15, 'diferencia': 5, 'saltos': 1,
+        }])
+
+    def test_corregir_registra_ajuste(self):
+        resultado = conciliar(procesos=1, corregir=True)
+        self.assertEqual(resultado['corregidos'], 1)
+        ajuste = MovimientoInventario.objects.get(motivo=MOTIVO_AJUSTE)
+        self.assertEqual((ajuste.inventario_id, ajuste.tipo, ajuste.cantidad, ajuste.stock_resultante),
+                         (self.editado.pk, 'entrada', 5, 20))
+        self.assertEqual(conciliar(procesos=1)['descuadres'], [])
+
+
+class SnapshotStockTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from inventarios.snapshots import capturar_snapshots
+
+        self.ahora = timezone.now()
+        producto = Producto.objects.create(nombre='Turrón', precio_referencia=900, unidad_medida='unidad')
+        self.inventario = Inventario.objects.create(id_producto=producto, cantidad_actual=10, stock_minimo=1, ubicacion='A1')
+        MovimientoInventario.objects.create(
+            inventario=self.inventario, tipo='entrada', cantidad=10, stock_resultante=10,
+            fecha_hora=self.ahora - timedelta(days=3),
+        )
+        self.captura = self.ahora - timedelta(days=2)
+        capturar_snapshots(self.captura.date())
+        SnapshotStock.objects.update(capturado=self.captura)
+        MovimientoInventario.objects.create(
+            inventario=self.inventario, tipo='salida', cantidad=4, stock_resultante=6,
+            fecha_hora=self.ahora - timedelta(days=1),
+        )
+        Inventario.objects.filter(pk=self.inventario.pk).update(cantidad_actual=6)
+
+    def test_stock_en_parte_del_snapshot(self):
+        from datetime import timedelta
+        from inventarios.snapshots import stock_en
+
+        pk = self.inventario.pk
+        self.assertEqual(SnapshotStock.objects.get().cantidad, 10)
+        self.assertEqual(stock_en(self.captura + timedelta(hours=1), [pk]), {pk: 10})
+        self.assertEqual(stock_en(self.ahora, [pk]), {pk: 6})
+        # Antes del primer snapshot: hacia atrás desde el stock actual
+        self.assertEqual(stock_en(self.ahora - timedelta(days=4), [pk]), {pk: 0})
+
+    def test_conciliar_desde_snapshot(self):
+        Inventario.objects.filter(pk=self.inventario.pk).update(cantidad_actual=9)
+        resultado = conciliar(procesos=1, desde_snapshot=True)
+        self.assertEqual(resultado['movimientos'], 1)
+        self.assertEqual([d['diferencia'] for d in resultado['descuadres']], [3])
+
+    def test_stock_historico_view(self):
+        rol = Rol.objects.create(nombre='Bodeguero', descripcion='Rol bodeguero')
+        usuario = Usuario.objects.create(
+            username='bodega', nombre='Bodega', correo='bodega@example.com', contrasena='dummy', id_rol=rol
+        )
+        usuario.set_password('Test1234!')
+        usuario.save()
+        self.client.login(username='bodega', password='Test1234!')
+        response = self.client.get(reverse('dashboard:stock_historico'), {'momento': self.captura.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['inventarios'][0]['cantidad'], 10)
+        self.assertEqual(self.client.get(reverse('dashboard:stock_historico')).status_code, 400)
+        response = self.client.get(
+            reverse('dashboard:stock_historico'), {'momento': self.captura.isoformat(), 'producto': 'abc'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class MovimientosLoteTests(TestCase):
+    def setUp(self):
+        rol = Rol.objects.create(nombre='Bodeguero', descripcion='Rol bodeguero')
+        usuario = Usuario.objects.create(
+            username='bodega', nombre='Bodega', correo='bodega@example.com', contrasena='dummy', id_rol=rol
+        )
+        usuario.set_password('Test1234!')
+        usuario.save()
+        producto = Producto.objects.create(nombre='Caramelo', precio_referencia=100, unidad_medida='unidad')
+        self.inv_a = Inventario.objects.create(id_producto=producto, cantidad_actual=5, stock_minimo=1, ubicacion='A1')
+        self.inv_b = Inventario.objects.create(id_producto=producto, cantidad_actual=0, stock_minimo=1, ubicacion='B1')
+        self.client.login(username='bodega', password='Test1234!')
+
+    def _enviar(self, movimientos):
+        import json
+        return self.client.post(
+            reverse('dashboard:registrar_movimientos_lote'),
+            data=json.dumps({'proveedor': 'Dulces SA', 'motivo': 'Recepción', 'movimientos': movimientos}),
+            content_type='application/json',
+        )
+
+    def test_lote_aplica_todo_en_orden(self):
+        from django.test import override_settings
+        from dashboard.models import Auditoria
+        with override_settings(AUDITORIA_SINCRONA=True):
+            response = self._enviar([
+                {'inventario': self.inv_b.pk, 'tipo': 'entrada', 'cantidad': 30},
+                {'inventario': self.inv_a.pk, 'tipo': 'salida', 'cantidad': 5},
+                {'inventario': self.inv_b.pk, 'tipo': 'salida', 'cantidad': 10, 'motivo': 'Merma'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['stock_actual'] for m in response.json()['movimientos']], [30, 0, 20])
+        self.inv_a.refresh_from_db()
+        self.inv_b.refresh_from_db()
+        self.assertEqual((self.inv_a.cantidad_actual, self.inv_b.cantidad_actual), (0, 20))
+        self.assertEqual(StockResumen.objects.get(id_producto=self.inv_a.id_producto).total_unidades, 20)
+        self.assertEqual(MovimientoInventario.objects.filter(proveedor='Dulces SA').count(), 3)
+        self.assertEqual(MovimientoInventario.objects.filter(motivo='Merma').count(), 1)
+        self.assertEqual(Auditoria.objects.filter(accion='MOVIMIENTO').count(), 3)
+
+    def test_lote_con_error_no_escribe_nada(self):
+        response = self._enviar([
+            {'inventario': self.inv_a.pk, 'tipo': 'entrada', 'cantidad': 1},
+            {'inventario': self.inv_b.pk, 'tipo': 'salida', 'cantidad': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errores'], [{'linea': 2, 'error': 'La salida supera el stock disponible'}])
+        self.assertFalse(MovimientoInventario.objects.exists())
+        self.inv_a.refresh_from_db()
+        self.assertEqual(self.inv_a.cantidad_actual, 5)
+        self.assertEqual(self._enviar([{'inventario': 999, 'tipo': 'entrada', 'cantidad': 1}]).status_code, 404)
+
+    def test_movimientos_que_no_son_lista(self):
+        for movimientos in (5, 'x', {'inventario': self.inv_a.pk, 'tipo': 'entrada', 'cantidad': 1}):
+            response = self._enviar(movimientos)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], 'Los movimientos deben ser una lista')
+        self.assertFalse(MovimientoInventario.objects.exists())
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.db.models import Q
 from .models import Producto
 from inventarios.admin import InventarioInline
+from roles.permisos import permisos_de
 
 class PrecioFilter(admin.SimpleListFilter):
     title = 'Rango de Precio'
@@ -51,8 +52,8 @@ class ProductoAdmin(admin.ModelAdmin):
     
     def has_module_permission(self, request):
         """Controlar acceso al módulo de productos"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             # Administradores y Bodegueros pueden ver productos
             return user_role in ['Administrador', 'Bodeguero']
         return request.user.is_superuser
@@ -67,22 +68,22 @@ class ProductoAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         """Controlar permisos de agregar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             return user_role in ['Administrador', 'Bodeguero']
         return request.user.is_superuser
     
     def has_change_permission(self, request, obj=None):
         """Controlar permisos de editar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             # Solo administradores pueden modificar productos existentes
             return user_role == 'Administrador'
         return request.user.is_superuser
     
     def has_delete_permission(self, request, obj=None):
         """Controlar permisos de eliminar según rol"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             return user_role == 'Administrador'
         return request.user.is_superuser
@@ -0,0 +1,253 @@
+"""
+Índice en memoria para autocompletar productos por nombre.
+
+Cada proceso mantiene un arreglo ordenado de claves normalizadas (el nombre
+completo y cada sufijo que empieza en una palabra, así "mani" encuentra
+"Bombón de Maní") y responde con búsqueda binaria sobre el rango del prefijo.
+
+- Producto.save()/delete() actualizan el índice del proceso actual en forma
+  incremental (inserción/borrado en el arreglo, sin reconstruir).
+- Cada cambio se publica en el cache de Django bajo un número de versión; los
+  demás procesos, al detectar otra versión, aplican los cambios que les faltan
+  de la misma forma incremental.
+- Si falta alguno (desalojado del cache, o una carga masiva que no publica el
+  detalle) el índice se reconstruye en un hilo aparte y se reemplaza al
+  terminar; mientras tanto se responde con el índice anterior.
+- El stock se lee de StockResumen solo para los resultados devueltos.
+"""
+import bisect
+import threading
+import traceback
+
+from django.core.cache import cache
+
+from .busqueda import normalizar
+
+CLAVE_VERSION = 'productos:autocompletar:version'
+CLAVE_CAMBIO = 'productos:autocompletar:cambio:{}'
+# Segundos que se conserva cada cambio publicado para los demás procesos
+TTL_CAMBIOS = 3600
+# Con más cambios pendientes que estos conviene reconstruir
+MAX_CAMBIOS_INCREMENTALES = 500
+LIMITE_POR_DEFECTO = 10
+LIMITE_MAXIMO = 50
+
+
+def _claves(nombre):
+    """Nombre normalizado completo y cada sufijo que comienza en una palabra."""
+    palabras = normalizar(nombre).split()
+    return [' '.join(palabras[i:]) for i in range(len(palabras))]
+
+
+class IndicePrefijos:
+    """Arreglo ordenado de (clave, id_producto) con datos mínimos por producto."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = []   # [(clave, id_producto)] ordenado
+        self._productos = {}  # id_producto -> (nombre, unidad_medida)
+        self._construido = False
+        self._version = None
+        self._sincronizando = threading.Lock()
+        self._reconstruyendo = False
+
+    def __len__(self):
+        return len(self._productos)
+
+    # --- Construcción ---
+
+    def reconstruir(self):
+        from .models import Producto
+        # La versión se lee antes que las filas: un cambio concurrente se vuelve a aplicar después
+        # (aplicar un cambio dos veces no altera el resultado) en lugar de perderse
+        version = cache.get(CLAVE_VERSION, 0)
+        productos = {}
+        entradas = []
+        filas = Producto.objects.order_by().values_list('id_producto', 'nombre', 'unidad_medida')
+        for producto_id, nombre, unidad in filas.iterator(chunk_size=5000):
+            productos[producto_id] = (nombre, unidad)
+            entradas.extend((clave, producto_id) for clave in _claves(nombre))
+        entradas.sort()
+        with self._lock:
+            self._entradas = entradas
+            self._productos = productos
+            self._construido = True
+            self._version = version
+
+    def invalidar(self):
+        """Fuerza la reconstrucción en la próxima consulta."""
+        with self._lock:
+            self._construido = False
+
+    def _asegurar_vigente(self):
+        if not self._construido:
+            self.reconstruir()
+            return
+        version = cache.get(CLAVE_VERSION, 0)
+        if version != self._version:
+            self._sincronizar(version)
+
+    def _sincronizar(self, version):
+        """Aplica los cambios publicados por otros procesos hasta `version`."""
+        if not self._sincronizando.acquire(blocking=False):
+            return  # otro hilo ya está sincronizando: se responde con el índice actual
+        try:
+            desde = self._version
+            if desde is None or not desde < version <= desde + MAX_CAMBIOS_INCREMENTALES:
+                self._reconstruir_en_segundo_plano()
+                return
+            claves = [CLAVE_CAMBIO.format(numero) for numero in range(desde + 1, version + 1)]
+            cambios = cache.get_many(claves)
+            if len(cambios) != len(claves):
+                self._reconstruir_en_segundo_plano()
+                return
+            for clave in claves:
+                producto_id, nombre, unidad = cambios[clave]
+                if nombre is None:
+                    self.quitar(producto_id)
+                else:
+                    self.actualizar(producto_id, nombre, unidad)
+            with self._lock:
+                if self._version == desde:
+                    self._version = version
+        finally:
+            self._sincronizando.release()
+
+    def _reconstruir_en_segundo_plano(self):
+        with self._lock:
+            if self._reconstruyendo:
+                return
+            self._reconstruyendo = True
+        threading.Thread(target=self._reconstruir_y_cerrar, name='indice-productos', daemon=True).start()
+
+    def _reconstruir_y_cerrar(self):
+        from django.db import connection
+        try:
+            self.reconstruir()
+        except Exception:
+            print(f"Error reconstruyendo el índice de productos: {traceback.format_exc()}")
+        finally:
+            self._reconstruyendo = False
+            # La conexión de este hilo no la cierra ningún request
+            connection.close()
+
+    # --- Cambios incrementales ---
+
+    def _quitar_sin_lock(self, producto_id):
+        anterior = self._productos.pop(producto_id, None)
+        if anterior is None:
+            return
+        for clave in _claves(anterior[0]):
+            posicion = bisect.bisect_left(self._entradas, (clave, producto_id))
+            if posicion < len(self._entradas) and self._entradas[posicion] == (clave, producto_id):
+                del self._entradas[posicion]
+
+    def actualizar(self, producto_id, nombre, unidad):
+        if not self._construido:
+            return
+        with self._lock:
+            self._quitar_sin_lock(producto_id)
+            self._productos[producto_id] = (nombre, unidad)
+            for clave in _claves(nombre):
+                bisect.insort(self._entradas, (clave, producto_id))
+
+    def quitar(self, producto_id):
+        if not self._construido:
+            return
+        with self._lock:
+            self._quitar_sin_lock(producto_id)
+
+    def marcar_version(self, version):
+        """Registra que este proceso ya aplicó el cambio `version`.
+
+        Solo avanza si no hubo cambios intermedios de otros procesos.
+        """
+        with self._lock:
+            if self._construido and self._version == version - 1:
+                self._version = version
+
+    # --- Consulta ---
+
+    def buscar(self, termino, limite=LIMITE_POR_DEFECTO):
+        """Ids de productos cuyo nombre (o alguna palabra) empieza con `termino`."""
+        prefijo = normalizar(termino)
+        if not prefijo:
+            return []
+        self._asegurar_vigente()
+        ids = []
+        # Con el lock: actualizar()/quitar() modifican el arreglo en su lugar desde otros hilos.
+        # Recorre solo el rango del prefijo (sin copiar el arreglo), a lo sumo `limite` ids.
+        with self._lock:
+            entradas = self._entradas
+            posicion = bisect.bisect_left(entradas, (prefijo,))
+            while posicion < len(entradas) and len(ids) < limite:
+                clave, producto_id = entradas[posicion]
+                if not clave.startswith(prefijo):
+                    break
+                if producto_id not in ids:
+                    ids.append(producto_id)
+                posicion += 1
+        return ids
+
+    def datos(self, producto_id):
+        return self._productos.get(producto_id)
+
+
+indice_productos = IndicePrefijos()
+
+
+def _anunciar_cambio(cambio=None):
+    """Publica `cambio` (id, nombre, unidad; nombre None si se borró) con la versión siguiente."""
+    cache.add(CLAVE_VERSION, 0, timeout=None)
+    try:
+        version = cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave fue desalojada entre add() e incr(): los demás procesos reconstruirán
+        return
+    if cambio is not None:
+        cache.set(CLAVE_CAMBIO.format(version), cambio, TTL_CAMBIOS)
+    indice_productos.marcar_version(version)
+
+
+def invalidar_indice():
+    """Para cargas masivas: reconstruir aquí y avisar a los demás procesos (sin detalle: reconstruyen)."""
+    indice_productos.invalidar()
+    _anunciar_cambio()
+
+
+def producto_guardado(producto):
+    indice_productos.actualizar(producto.pk, producto.nombre, producto.unidad_medida)
+    _anunciar_cambio((producto.pk, producto.nombre, producto.unidad_medida))
+
+
+def producto_eliminado(producto_id):
+    indice_productos.quitar(producto_id)
+    _anunciar_cambio((producto_id, None, None))
+
+
+def autocompletar_productos(termino, limite=LIMITE_POR_DEFECTO):
+    """Lista de dicts {id, nombre, unidad, unidad_display, stock} para `termino`."""
+    from inventarios.models import StockResumen
+    from .models import Producto
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    ids = indice_productos.buscar(termino, limite)
+    if not ids:
+        return []
+    stock = dict(
+        StockResumen.objects.filter(id_producto_id__in=ids).values_list('id_producto_id', 'total_unidades')
+    )
+    unidades = dict(Producto.UNIDADES_MEDIDA)
+    resultados = []
+    for producto_id in ids:
+        datos = indice_productos.datos(producto_id)
+        if datos is None:
+            continue
+        nombre, unidad = datos
+        resultados.append({
+            'id': producto_id,
+            'nombre': nombre,
+            'unidad': unidad,
+            'unidad_display': unidades.get(unidad, unidad),
+            'stock': stock.get(producto_id, 0),
+        })
+    return resultados
@@ -0,0 +1,257 @@
+"""
+Búsqueda de productos sobre un índice de texto normalizado.
+
+Cada producto tiene una fila en `producto_busqueda` con su nombre y un
+documento (nombre + descripción + precio) en minúsculas y sin tildes. Sobre
+esa tabla:
+
+- MySQL: índices FULLTEXT (nombre) y (texto), consultados con MATCH ... AGAINST
+  en modo booleano; la relevancia pondera más las coincidencias en el nombre.
+- SQLite: tabla virtual FTS5 `producto_fts` con los mismos dos campos, ordenada
+  por bm25().
+- Otros motores: búsqueda por tokens sobre el texto normalizado.
+
+Si el índice aún no está construido se usa la búsqueda original con icontains.
+"""
+import re
+import unicodedata
+
+from django.db import DatabaseError, connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TABLA_FTS = 'producto_fts'
+# Peso del nombre frente al resto del documento al calcular la relevancia
+PESO_NOMBRE = 3.0
+# innodb_ft_min_token_size por defecto: prefijos más cortos no usan FULLTEXT
+MIN_TOKEN_FULLTEXT = 3
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y solo alfanuméricos separados por un espacio."""
+    if texto is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return _NO_ALFANUMERICO.sub(' ', texto).strip()
+
+
+def tokenizar(texto):
+    """Tokens normalizados sin repetir, en el orden en que aparecen."""
+    return list(dict.fromkeys(normalizar(texto).split()))
+
+
+def documento_busqueda(nombre, descripcion, precio_referencia):
+    """Devuelve (nombre normalizado, texto indexado) de un producto."""
+    nombre_normalizado = normalizar(nombre)
+    texto = ' '.join(tokenizar(f'{nombre} {descripcion or ""} {precio_referencia if precio_referencia is not None else ""}'))
+    return nombre_normalizado[:150], texto[:400]
+
+
+# --- Estructuras por motor ---
+
+def crear_estructuras_texto(connection):
+    """Crea los índices de texto completo propios del motor (idempotente)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(nombre, texto)'
+                )
+            except DatabaseError:
+                # SQLite compilado sin FTS5: se usa la búsqueda por tokens
+                return False
+            return True
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+                "AND TABLE_NAME = 'producto_busqueda' AND INDEX_TYPE = 'FULLTEXT'"
+            )
+            existentes = {fila[0] for fila in cursor.fetchall()}
+            if 'ft_producto_busqueda_nombre' not in existentes:
+                cursor.execute('ALTER TABLE producto_busqueda ADD FULLTEXT INDEX ft_producto_busqueda_nombre (nombre)')
+            if 'ft_producto_busqueda_texto' not in existentes:
+                cursor.execute('ALTER TABLE producto_busqueda ADD FULLTEXT INDEX ft_producto_busqueda_texto (texto)')
+            return True
+    return False
+
+
+def _tiene_fts(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLA_FTS])
+        return cursor.fetchone() is not None
+
+
+def escribir_fts(connection, filas, ids_eliminados=()):
+    """Reemplaza en FTS5 las filas (id, nombre, texto) y borra `ids_eliminados` (solo SQLite)."""
+    if connection.vendor != 'sqlite' or not crear_estructuras_texto(connection):
+        return
+    ids = [fila[0] for fila in filas] + list(ids_eliminados)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), 500):
+            lote = ids[inicio:inicio + 500]
+            cursor.execute(
+                f'DELETE FROM {TABLA_FTS} WHERE rowid IN ({", ".join(["%s"] * len(lote))})', lote
+            )
+        if filas:
+            cursor.executemany(f'INSERT INTO {TABLA_FTS} (rowid, nombre, texto) VALUES (%s, %s, %s)', filas)
+
+
+# --- Mantenimiento ---
+
+def indexar_productos(productos, using='default'):
+    """Actualiza el índice de los productos dados (instancias de Producto)."""
+    from .models import ProductoBusqueda
+    filas = []
+    for producto in productos:
+        nombre, texto = documento_busqueda(producto.nombre, producto.descripcion, producto.precio_referencia)
+        ProductoBusqueda.objects.using(using).update_or_create(
+            id_producto_id=producto.pk, defaults={'nombre': nombre, 'texto': texto}
+        )
+        filas.append((producto.pk, nombre, texto))
+    escribir_fts(connections[using], filas)
+
+
+def indexar_en_lote(productos, using='default'):
+    """Como indexar_productos, con un solo bulk upsert (importaciones y cargas masivas)."""
+    from .models import ProductoBusqueda
+    connection = connections[using]
+    filas = [(p.pk, *documento_busqueda(p.nombre, p.descripcion, p.precio_referencia)) for p in productos]
+    ProductoBusqueda.objects.using(using).bulk_create(
+        [ProductoBusqueda(id_producto_id=pk, nombre=nombre, texto=texto) for pk, nombre, texto in filas],
+        **_opciones_upsert(connection),
+    )
+    escribir_fts(connection, filas)
+    return len(filas)
+
+
+def _opciones_upsert(connection):
+    opciones = {'update_conflicts': True, 'update_fields': ['nombre', 'texto']}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['id_producto']
+    return opciones
+
+
+def quitar_del_indice(producto_ids, using='default'):
+    """Quita productos del índice FTS5 (la fila de producto_busqueda cae en cascada)."""
+    escribir_fts(connections[using], [], ids_eliminados=list(producto_ids))
+
+
+def reconstruir_indice(batch_size=1000, using='default'):
+    """Reconstruye el índice completo a partir de la tabla `producto`. Devuelve cuántos indexó."""
+    from .models import Producto, ProductoBusqueda
+    connection = connections[using]
+    crear_estructuras_texto(connection)
+    kwargs = _opciones_upsert(connection)
+    if connection.vendor == 'sqlite' and _tiene_fts(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLA_FTS}')
+    ProductoBusqueda.objects.using(using).exclude(
+        id_producto__in=Producto.objects.using(using).values('id_producto')
+    ).delete()
+
+    total = 0
+    filas = Producto.objects.using(using).order_by('id_producto').values_list(
+        'id_producto', 'nombre', 'descripcion', 'precio_referencia'
+    )
+    lote = []
+    for producto_id, nombre, descripcion, precio in filas.iterator(chunk_size=batch_size):
+        lote.append((producto_id, *documento_busqueda(nombre, descripcion, precio)))
+        if len(lote) >= batch_size:
+            total += _guardar_lote(lote, kwargs, using)
+            lote = []
+    if lote:
+        total += _guardar_lote(lote, kwargs, using)
+
+    from .autocompletar import invalidar_indice
+    invalidar_indice()
+    return total
+
+
+def _guardar_lote(lote, kwargs, using):
+    from .models import ProductoBusqueda
+    ProductoBusqueda.objects.using(using).bulk_create(
+        [ProductoBusqueda(id_producto_id=pk, nombre=nombre, texto=texto) for pk, nombre, texto in lote], **kwargs
+    )
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and _tiene_fts(connection):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {TABLA_FTS} (rowid, nombre, texto) VALUES (%s, %s, %s)', lote)
+    return len(lote)
+
+
+# --- Consulta ---
+
+def indice_construido(using='default'):
+    from .models import ProductoBusqueda
+    return ProductoBusqueda.objects.using(using).exists()
+
+
+def busqueda_icontains(queryset, termino):
+    """Búsqueda original: OR de icontains sobre nombre, descripción y precio."""
+    return queryset.filter(
+        Q(nombre__icontains=termino) | Q(descripcion__icontains=termino) | Q(precio_referencia__icontains=termino)
+    ).annotate(relevancia=Case(
+        When(nombre__icontains=termino, then=Value(2)), default=Value(1), output_field=IntegerField()
+    ))
+
+
+def buscar_productos(queryset, termino):
+    """Filtra `queryset` por `termino` y anota `relevancia` (mayor es mejor).
+
+    Todos los tokens deben aparecer (como prefijo de alguna palabra). El orden
+    queda a cargo de quien llama: `.order_by('-relevancia', ...)`.
+    """
+    termino = (termino or '').strip()
+    tokens = tokenizar(termino)
+    if not tokens:
+        return busqueda_icontains(queryset, termino) if termino else queryset
+    connection = connections[queryset.db]
+    try:
+        if not indice_construido(queryset.db):
+            return busqueda_icontains(queryset, termino)
+        if connection.vendor == 'sqlite' and _tiene_fts(connection):
+            return _buscar_fts5(queryset, tokens)
+        if connection.vendor == 'mysql' and min(len(t) for t in tokens) >= MIN_TOKEN_FULLTEXT:
+            return _buscar_fulltext(queryset, tokens)
+    except DatabaseError:
+        return busqueda_icontains(queryset, termino)
+    return _buscar_tokens(queryset, tokens)
+
+
+def _buscar_fts5(queryset, tokens):
+    consulta = ' '.join(f'"{token}"*' for token in tokens)
+    return queryset.filter(
+        id_producto__in=RawSQL(f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', [consulta])
+    ).annotate(relevancia=RawSQL(
+        f'SELECT -bm25({TABLA_FTS}, %s, 1.0) FROM {TABLA_FTS} '
+        f'WHERE {TABLA_FTS} MATCH %s AND rowid = producto.id_producto',
+        [PESO_NOMBRE, consulta],
+    ))
+
+
+def _buscar_fulltext(queryset, tokens):
+    consulta = ' '.join(f'+{token}*' for token in tokens)
+    return queryset.filter(
+        id_producto__in=RawSQL(
+            'SELECT id_producto FROM producto_busqueda WHERE MATCH(texto) AGAINST (%s IN BOOLEAN MODE)', [consulta]
+        )
+    ).annotate(relevancia=RawSQL(
+        'SELECT %s * MATCH(b.nombre) AGAINST (%s IN BOOLEAN MODE) + MATCH(b.texto) AGAINST (%s IN BOOLEAN MODE) '
+        'FROM producto_busqueda b WHERE b.id_producto = producto.id_producto',
+        [PESO_NOMBRE, consulta, consulta],
+    ))
+
+
+def _buscar_tokens(queryset, tokens):
+    filtro = Q()
+    for token in tokens:
+        filtro &= Q(busqueda__texto__startswith=token) | Q(busqueda__texto__contains=f' {token}')
+    return queryset.filter(filtro).annotate(relevancia=Case(
+        When(busqueda__nombre__startswith=tokens[0], then=Value(3)),
+        When(busqueda__nombre__contains=f' {tokens[0]}', then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    ))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from productos.models import Producto
-from inventarios.models import Inventario
+from productos.busqueda import reconstruir_indice
+from inventarios.models import Inventario, StockResumen
 from django.utils import timezone
 import random
 
@@ -89,6 +90,7 @@ class Command(BaseCommand):
                 inventario = Inventario(
                     id_producto=producto,
                     cantidad_actual=random.randint(0, 500),
+                    stock_minimo=random.randint(5, 50),
                     ubicacion=random.choice(ubicaciones),
                     fecha_ultima_actualizacion=timezone.now()
                 )
@@ -106,6 +108,14 @@ class Command(BaseCommand):
             Inventario.objects.bulk_create(inventarios_creados, ignore_conflicts=True)
         
         self.stdout.write(self.style.SUCCESS(f'✓ {total_inventarios} inventarios creados'))
+
+        # bulk_create no pasa por Inventario.save(): reconstruir el resumen de stock
+        StockResumen.recalcular(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS('✓ Resumen de stock recalculado'))
+
+        # Tampoco pasa por Producto.save(): reconstruir el índice de búsqueda
+        reconstruir_indice(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS('✓ Índice de búsqueda de productos reconstruido'))
         
         # Resumen
         self.stdout.write('')
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from productos.models import Producto
+from productos.busqueda import reconstruir_indice
 import random
 
 
@@ -54,6 +55,9 @@ class Command(BaseCommand):
         # Insertar los productos restantes
         if productos:
             Producto.objects.bulk_create(productos, ignore_conflicts=True)
+
+        # bulk_create no pasa por Producto.save(): reconstruir el índice de búsqueda
+        reconstruir_indice(batch_size=batch_size)
         
         total = Producto.objects.count()
         self.stdout.write(self.style.SUCCESS(f'✅ Proceso completado. Total de productos en BD: {total}'))
@@ -0,0 +1,19 @@
+"""
+Comando de gestión para reconstruir el índice de búsqueda de productos
+Uso: python manage.py reconstruir_indice_productos [--batch 1000]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from productos.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye producto_busqueda (y FULLTEXT/FTS5 según el motor) desde la tabla producto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=1000, help='Tamaño de lote para el upsert')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = reconstruir_indice(batch_size=options['batch'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} productos indexados para búsqueda'))
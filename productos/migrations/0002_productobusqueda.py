@@ -0,0 +1,53 @@
+# Generated manually to add ProductoBusqueda (índice de búsqueda de productos)
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def construir_indice(apps, schema_editor):
+    """Crea FULLTEXT/FTS5 según el motor y pobla el índice con los productos existentes."""
+    from productos.busqueda import crear_estructuras_texto, documento_busqueda, escribir_fts
+    Producto = apps.get_model('productos', 'Producto')
+    ProductoBusqueda = apps.get_model('productos', 'ProductoBusqueda')
+    connection = schema_editor.connection
+    crear_estructuras_texto(connection)
+
+    lote = []
+    filas = Producto.objects.order_by('id_producto').values_list('id_producto', 'nombre', 'descripcion', 'precio_referencia')
+    for producto_id, nombre, descripcion, precio in filas.iterator(chunk_size=1000):
+        lote.append((producto_id, *documento_busqueda(nombre, descripcion, precio)))
+        if len(lote) >= 1000:
+            ProductoBusqueda.objects.bulk_create([ProductoBusqueda(id_producto_id=p, nombre=n, texto=t) for p, n, t in lote])
+            escribir_fts(connection, lote)
+            lote = []
+    if lote:
+        ProductoBusqueda.objects.bulk_create([ProductoBusqueda(id_producto_id=p, nombre=n, texto=t) for p, n, t in lote])
+        escribir_fts(connection, lote)
+
+
+def eliminar_estructuras(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS producto_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('id_producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='productos.producto', verbose_name='Producto')),
+                ('nombre', models.CharField(max_length=150, verbose_name='Nombre normalizado')),
+                ('texto', models.CharField(max_length=400, verbose_name='Texto indexado')),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda de producto',
+                'verbose_name_plural': 'Índice de búsqueda de productos',
+                'db_table': 'producto_busqueda',
+            },
+        ),
+        migrations.RunPython(construir_indice, eliminar_estructuras),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class Producto(models.Model):
     UNIDADES_MEDIDA = [
@@ -28,3 +28,50 @@ class Producto(models.Model):
     
     def __str__(self):
         return f"{self.nombre} ({self.get_unidad_medida_display()}) - ${self.precio_referencia:,}"
+
+    def save(self, *args, **kwargs):
+        from .autocompletar import producto_guardado
+        from .busqueda import indexar_productos
+        using = kwargs.get('using') or self._state.db or 'default'
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            indexar_productos([self], using=using)
+            # El índice en memoria solo se toca si la transacción se confirma
+            transaction.on_commit(lambda: producto_guardado(self), using=using)
+
+    def delete(self, *args, **kwargs):
+        from .autocompletar import producto_eliminado
+        from .busqueda import quitar_del_indice
+        producto_id = self.pk
+        using = kwargs.get('using') or self._state.db or 'default'
+        with transaction.atomic(using=using):
+            resultado = super().delete(*args, **kwargs)
+            quitar_del_indice([producto_id], using=using)
+            transaction.on_commit(lambda: producto_eliminado(producto_id), using=using)
+        return resultado
+
+
+class ProductoBusqueda(models.Model):
+    """Índice de búsqueda de productos: texto en minúsculas y sin tildes.
+
+    Se mantiene desde Producto.save()/delete(); las cargas masivas
+    (bulk_create, update) deben correr `reconstruir_indice_productos`.
+    Ver productos/busqueda.py.
+    """
+    id_producto = models.OneToOneField(
+        Producto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='busqueda',
+        verbose_name="Producto"
+    )
+    nombre = models.CharField(max_length=150, verbose_name="Nombre normalizado")
+    texto = models.CharField(max_length=400, verbose_name="Texto indexado")
+
+    class Meta:
+        verbose_name = "Índice de búsqueda de producto"
+        verbose_name_plural = "Índice de búsqueda de productos"
+        db_table = "producto_busqueda"
+
+    def __str__(self):
+        return f"{self.id_producto_id}: {self.texto}"
@@ -1,3 +1,140 @@
 from django.test import TestCase
+from django.urls import reverse
+from productos.models import Producto, ProductoBusqueda
+from productos.busqueda import buscar_productos, normalizar, reconstruir_indice
+from usuarios.models import Usuario
+from roles.models import Rol
 
-# Create your tests here.
+
+class BusquedaProductosTests(TestCase):
+    def setUp(self):
+        self.cafe = Producto.objects.create(
+            nombre='Café Bombón', descripcion='Bombón relleno', precio_referencia=1500, unidad_medida='unidad'
+        )
+        self.bombon = Producto.objects.create(
+            nombre='Bombón de Maní', descripcion='Con café molido', precio_referencia=800, unidad_medida='caja'
+        )
+        self.gomita = Producto.objects.create(
+            nombre='Gomitas', descripcion='Sabor frutilla', precio_referencia=300, unidad_medida='paquete'
+        )
+
+    def _buscar(self, termino):
+        return list(buscar_productos(Producto.objects.all(), termino).order_by('-relevancia', 'id_producto'))
+
+    def test_normalizar_quita_tildes_y_simbolos(self):
+        self.assertEqual(normalizar('  Café-Bombón, MANÍ! '), 'cafe bombon mani')
+
+    def test_busqueda_sin_tildes_y_por_prefijo(self):
+        self.assertEqual(self._buscar('mani'), [self.bombon])
+        self.assertEqual(set(self._buscar('BOMB')), {self.bombon, self.cafe})
+        self.assertEqual(self._buscar('150'), [self.cafe])
+        self.assertEqual(self._buscar('gomitas frut'), [self.gomita])
+        self.assertEqual(self._buscar('gomitas chocolate'), [])
+
+    def test_relevancia_prioriza_el_nombre(self):
+        # "café" está en el nombre de uno y solo en la descripción del otro
+        self.assertEqual(self._buscar('cafe'), [self.cafe, self.bombon])
+
+    def test_indice_se_mantiene_en_save_y_delete(self):
+        self.gomita.nombre = 'Chicle Ácido'
+        self.gomita.save()
+        self.assertEqual(self._buscar('acido'), [self.gomita])
+        self.assertEqual(self._buscar('gomitas'), [])
+        self.gomita.delete()
+        self.assertEqual(self._buscar('acido'), [])
+        self.assertFalse(ProductoBusqueda.objects.filter(id_producto=self.gomita.pk).exists())
+
+    def test_sin_indice_usa_icontains(self):
+        ProductoBusqueda.objects.all().delete()
+        self.assertEqual(self._buscar('Maní'), [self.bombon])
+        self.assertEqual(reconstruir_indice(), 3)
+        self.assertEqual(self._buscar('mani'), [self.bombon])
+
+    def test_productos_view_ordena_por_relevancia(self):
+        rol = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=rol
+        )
+        admin.set_password('Test1234!')
+        admin.save()
+        self.client.login(username='admin', password='Test1234!')
+        response = self.client.get(reverse('dashboard:productos'), {'search': 'cafe'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p.pk for p in response.context['productos']], [self.cafe.pk, self.bombon.pk])
+
+
+class AutocompletarProductosTests(TestCase):
+    def setUp(self):
+        from inventarios.models import Inventario
+        from productos.autocompletar import indice_productos
+        indice_productos.invalidar()
+        self.bombon = Producto.objects.create(nombre='Bombón de Maní', precio_referencia=800, unidad_medida='caja')
+        self.mani = Producto.objects.create(nombre='Maní Confitado', precio_referencia=500, unidad_medida='kg')
+        Producto.objects.create(nombre='Gomitas', precio_referencia=300, unidad_medida='paquete')
+        Inventario.objects.create(id_producto=self.mani, cantidad_actual=7, stock_minimo=1, ubicacion='A1')
+        Inventario.objects.create(id_producto=self.mani, cantidad_actual=5, stock_minimo=1, ubicacion='A2')
+        rol = Rol.objects.create(nombre='Vendedor', descripcion='Rol vendedor')
+        usuario = Usuario.objects.create(
+            username='vendedor', nombre='Vendedor', correo='v@example.com', contrasena='dummy', id_rol=rol
+        )
+        usuario.set_password('Test1234!')
+        usuario.save()
+        self.client.login(username='vendedor', password='Test1234!')
+
+    def _sugerir(self, q, **extra):
+        response = self.client.get(reverse('dashboard:autocompletar_productos'), dict(q=q, **extra))
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resultados']
+
+    def test_prefijo_del_nombre_y_de_cada_palabra(self):
+        resultados = self._sugerir('MANI')
+        self.assertEqual({r['id'] for r in resultados}, {self.bombon.pk, self.mani.pk})
+        mani = next(r for r in resultados if r['id'] == self.mani.pk)
+        self.assertEqual(mani['nombre'], 'Maní Confitado')
+        self.assertEqual(mani['unidad'], 'kg')
+        self.assertEqual(mani['stock'], 12)
+        self.assertEqual([r['id'] for r in self._sugerir('bombon d')], [self.bombon.pk])
+        self.assertEqual(len(self._sugerir('m', limit=1)), 1)
+        self.assertEqual(self._sugerir(''), [])
+
+    def test_cambios_incrementales(self):
+        self._sugerir('go')  # construye el índice
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Producto.objects.create(nombre='Gomas Ácidas', precio_referencia=100, unidad_medida='unidad')
+        self.assertIn(nuevo.pk, [r['id'] for r in self._sugerir('go')])
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.nombre = 'Caramelos Ácidos'
+            nuevo.save()
+        self.assertNotIn(nuevo.pk, [r['id'] for r in self._sugerir('go')])
+        self.assertEqual([r['id'] for r in self._sugerir('acid')], [nuevo.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertEqual(self._sugerir('acid'), [])
+
+    def test_otro_proceso_aplica_los_cambios_sin_reconstruir(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from productos.autocompletar import CLAVE_CAMBIO, CLAVE_VERSION, IndicePrefijos
+        otro = IndicePrefijos()  # el índice de otro worker
+        otro.reconstruir()
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = Producto.objects.create(nombre='Gomas Ácidas', precio_referencia=100, unidad_medida='unidad')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mani.delete()
+        with mock.patch.object(otro, 'reconstruir') as reconstruir, self.assertNumQueries(0):
+            self.assertIn(nuevo.pk, otro.buscar('go'))
+            self.assertEqual(otro.buscar('mani'), [self.bombon.pk])
+        reconstruir.assert_not_called()
+
+        # Un cambio que ya no está en el cache: se sigue respondiendo y se reconstruye aparte
+        version = cache.get(CLAVE_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.nombre = 'Caramelos Ácidos'
+            nuevo.save()
+        cache.delete(CLAVE_CAMBIO.format(version + 1))
+        with mock.patch.object(otro, '_reconstruir_en_segundo_plano') as en_segundo_plano:
+            self.assertEqual(otro.buscar('gomas'), [nuevo.pk])
+        en_segundo_plano.assert_called_once()
+        otro.reconstruir()
+        self.assertEqual(otro.buscar('gomas'), [])
+        self.assertEqual(otro.buscar('caramelos'), [nuevo.pk])
@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from .models import Producto
+from .busqueda import buscar_productos
 from django import forms
 
 class ProductoForm(forms.ModelForm):
@@ -42,16 +43,10 @@ def lista_productos(request):
     """Vista para listar todos los productos con búsqueda, paginación y ordenamiento"""
     productos = Producto.objects.all()
     
-    # Búsqueda por múltiples campos
+    # Búsqueda sobre el índice normalizado (nombre, descripción y precio)
     search = request.GET.get('search', '')
     if search:
-        productos = productos.filter(
-            nombre__icontains=search
-        ) | productos.filter(
-            descripcion__icontains=search
-        ) | productos.filter(
-            precio_referencia__icontains=search
-        )
+        productos = buscar_productos(productos, search)
     
     # Ordenamiento
     order_by = request.GET.get('order_by', '-id_producto')
@@ -63,7 +58,11 @@ def lista_productos(request):
     else:
         order_field = order_by.replace('-', '')
     
-    productos = productos.order_by(order_field)
+    if search and not request.GET.get('order_by'):
+        # Sin orden explícito, los resultados de búsqueda se ordenan por relevancia
+        productos = productos.order_by('-relevancia', 'id_producto')
+    else:
+        productos = productos.order_by(order_field)
     
     # Paginación - obtener de sesión o de parámetro GET
     per_page_param = request.GET.get('per_page')
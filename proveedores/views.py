@@ -5,9 +5,9 @@ from django.core.paginator import Paginator
 from django.http import JsonResponse
 from .models import Proveedor
 from django import forms
-from django.http import HttpResponse
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from dashboard.exportacion import EXPORTACION_PROVEEDORES, formato_solicitado, marca_tiempo, resolver_alcance, respuesta_exportacion
+from dashboard.trabajos_exportacion import pide_segundo_plano, respuesta_trabajo_exportacion
+from roles.permisos import permisos_de
 
 class ProveedorForm(forms.ModelForm):
     rut_nif = forms.CharField(
@@ -178,107 +178,23 @@ def exportar_proveedores_excel(request):
     - Si ?all=true se exportan TODOS los proveedores filtrados.
     - Si la búsqueda (search) devuelve exactamente 1 proveedor, se exporta solo ese registro.
     - En caso contrario se exporta SOLO la página actual (según ?page y ?per_page).
+    - Con ?async=true se encola un ExportJob y se responde con su id.
+    - ?format=csv o ?format=ndjson envían las filas en streaming (xlsx por defecto).
     """
     # Solo administradores pueden acceder
     user = request.user
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
 
-    # Filtros (search por nombre/RUT)
-    search = request.GET.get('search', '').strip()
-    proveedores_base = Proveedor.objects.all().order_by('-id_proveedor')
-    if search:
-        proveedores_base = proveedores_base.filter(nombre__icontains=search) | proveedores_base.filter(rut_nif__icontains=search)
-
-    total_filtrados = proveedores_base.count()
-
-    # Parámetros de paginación
-    per_page_param = request.GET.get('per_page')
-    try:
-        per_page = int(per_page_param) if per_page_param else request.session.get('proveedores_per_page', 10)
-    except ValueError:
-        per_page = 10
-    if isinstance(per_page, str):
-        try:
-            per_page = int(per_page)
-        except ValueError:
-            per_page = 10
-
-    page_param = request.GET.get('page', '1')
-    try:
-        current_page = int(page_param)
-    except ValueError:
-        current_page = 1
-
-    export_all = request.GET.get('all', 'false').lower() in ['true', '1', 'yes']
-
-    # Decidir subconjunto a exportar
-    if export_all:
-        proveedores_export = proveedores_base
-        export_scope = 'todos'
-    elif total_filtrados == 1:
-        proveedores_export = proveedores_base
-        export_scope = 'unico'
-    else:
-        paginator = Paginator(proveedores_base, per_page)
-        page_obj = paginator.get_page(current_page)
-        proveedores_export = page_obj.object_list
-        export_scope = f'pagina_{current_page}'
-
-    # Crear libro de Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Proveedores"
-
-    # Estilos
-    header_fill = PatternFill(start_color="4F81F7", end_color="4F81F7", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Encabezados (alineados con la grilla visible)
-    headers = ['ID', 'Nombre', 'Contacto', 'Dirección', 'País', 'RUT', 'Email', 'Email Secundario']
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-
-    # Llenar datos
-    for row_num, prov in enumerate(proveedores_export, 2):
-        ws.cell(row=row_num, column=1).value = prov.id_proveedor
-        ws.cell(row=row_num, column=2).value = prov.nombre
-        ws.cell(row=row_num, column=3).value = prov.contacto or ''
-        ws.cell(row=row_num, column=4).value = prov.direccion or ''
-        ws.cell(row=row_num, column=5).value = prov.pais or ''
-        ws.cell(row=row_num, column=6).value = prov.rut_nif
-        ws.cell(row=row_num, column=7).value = prov.email or ''
-        ws.cell(row=row_num, column=8).value = prov.email_secundario or ''
-        for col_num in range(1, len(headers) + 1):
-            ws.cell(row=row_num, column=col_num).border = border
-            ws.cell(row=row_num, column=col_num).alignment = Alignment(vertical='center')
-
-    # Ajuste de columnas
-    column_widths = [8, 30, 25, 40, 15, 15, 30, 30]
-    for col_num, width in enumerate(column_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = width
+    if pide_segundo_plano(request.GET):
+        return respuesta_trabajo_exportacion(request, EXPORTACION_PROVEEDORES)
 
-    # Respuesta HTTP
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # Filtros (search por nombre/RUT) y alcance (todos, único o página actual)
+    proveedores_export, export_scope, _ = resolver_alcance(EXPORTACION_PROVEEDORES, request.GET, request.session)
+    return respuesta_exportacion(
+        EXPORTACION_PROVEEDORES, proveedores_export, f'proveedores_{export_scope}_{marca_tiempo()}',
+        formato_solicitado(request.GET),
     )
-    from datetime import datetime
-    fecha_actual = datetime.now().strftime('%Y%m%d_%H%M%S')
-    nombre_archivo = f'proveedores_{export_scope}_{fecha_actual}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
-    wb.save(response)
-    return response
 
 @login_required
 def obtener_proveedor(request, proveedor_id):
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Rol
+from .permisos import permisos_de
 
 @admin.register(Rol)
 class RolAdmin(admin.ModelAdmin):
@@ -11,8 +12,8 @@ class RolAdmin(admin.ModelAdmin):
     
     def has_module_permission(self, request):
         """Controlar acceso al módulo de roles"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             # Solo administradores pueden ver roles
             return user_role == 'Administrador'
         return request.user.is_superuser
@@ -0,0 +1,8 @@
+from django.utils.functional import SimpleLazyObject
+
+from .permisos import permisos_de
+
+
+def permisos(request):
+    """Expone `permisos` (rol y capacidades del usuario) a las plantillas."""
+    return {'permisos': SimpleLazyObject(lambda: permisos_de(getattr(request, 'user', None)))}
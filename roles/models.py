@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+
+from .permisos import invalidar_permisos
 
 class Rol(models.Model):
     id_rol = models.AutoField(primary_key=True)
@@ -13,3 +15,16 @@ class Rol(models.Model):
     
     def __str__(self):
         return self.nombre
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # El nombre del rol define los permisos cacheados de sus usuarios: se invalida
+        # ya (este proceso) y otra vez al confirmar, por si otro request lo recacheó antes
+        invalidar_permisos()
+        transaction.on_commit(invalidar_permisos)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_permisos()
+        transaction.on_commit(invalidar_permisos)
+        return resultado
@@ -0,0 +1,120 @@
+"""
+Permisos por rol resueltos una vez por request y cacheados entre requests.
+
+`permisos_de(user)` devuelve un `PermisosUsuario` con el nombre del rol y sus
+capacidades (`can_edit_inventory`, `can_edit_products`, ...):
+
+- Dentro del request se memoriza en el propio objeto `request.user`.
+- Entre requests se cachea el nombre de cada rol por su id bajo un número de
+  versión; Rol.save()/delete() incrementan la versión. Como la clave usa
+  `id_rol_id` (columna ya cargada con el usuario), reasignar el rol de un
+  usuario se refleja en su siguiente request sin invalidar nada.
+
+Así las vistas comprueban permisos sin cargar la fila de `rol` cada vez.
+"""
+from django.core.cache import cache
+
+CLAVE_VERSION = 'roles:permisos:version'
+TTL_ROL = 60 * 60
+
+ROL_ADMINISTRADOR = 'Administrador'
+ROL_BODEGUERO = 'Bodeguero'
+ROL_VENDEDOR = 'Vendedor'
+ROL_CONSULTA = 'Consulta'
+ROL_CLIENTE = 'Cliente'
+
+# Capacidades que otorga cada rol (el superusuario las tiene todas)
+CAPACIDADES_POR_ROL = {
+    ROL_ADMINISTRADOR: {
+        'can_view_inventory', 'can_edit_inventory', 'can_edit_products', 'can_delete_products',
+        'can_manage_users', 'can_manage_roles', 'can_manage_suppliers', 'can_sell',
+    },
+    ROL_BODEGUERO: {'can_view_inventory', 'can_edit_inventory', 'can_edit_products'},
+    ROL_VENDEDOR: {'can_view_inventory', 'can_sell'},
+    ROL_CLIENTE: {'can_view_inventory'},
+    ROL_CONSULTA: set(),
+}
+CAPACIDADES = frozenset().union(*CAPACIDADES_POR_ROL.values())
+# Roles creados desde la interfaz: mismo acceso de lectura que antes (solo Consulta se bloqueaba)
+CAPACIDADES_OTRO_ROL = frozenset({'can_view_inventory'})
+
+
+class PermisosUsuario:
+    """Rol y capacidades de un usuario. `permisos.can_edit_inventory` -> bool."""
+    __slots__ = ('rol', 'es_superusuario', 'capacidades')
+
+    def __init__(self, rol=None, es_superusuario=False):
+        self.rol = rol
+        self.es_superusuario = es_superusuario
+        if es_superusuario:
+            self.capacidades = CAPACIDADES
+        elif rol is None:
+            self.capacidades = frozenset()
+        else:
+            self.capacidades = frozenset(CAPACIDADES_POR_ROL.get(rol, CAPACIDADES_OTRO_ROL))
+
+    def __repr__(self):
+        return f'<PermisosUsuario {self.rol or "-"}{" (superusuario)" if self.es_superusuario else ""}>'
+
+    def __getattr__(self, nombre):
+        if nombre in CAPACIDADES:
+            return nombre in self.capacidades
+        raise AttributeError(nombre)
+
+    @property
+    def es_admin(self):
+        return self.es_superusuario or self.rol == ROL_ADMINISTRADOR
+
+    def puede(self, capacidad):
+        return capacidad in self.capacidades
+
+
+ANONIMO = PermisosUsuario()
+
+
+def version_permisos():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def invalidar_permisos():
+    """Descarta los roles cacheados en todos los procesos."""
+    cache.add(CLAVE_VERSION, 1, timeout=None)
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        # La clave fue desalojada: la próxima lectura empieza una versión nueva
+        cache.delete(CLAVE_VERSION)
+
+
+def nombre_rol(rol_id):
+    """Nombre del rol `rol_id` desde el cache (una consulta solo si no está)."""
+    from .models import Rol
+    clave = f'roles:rol:{rol_id}:v{version_permisos()}'
+    nombre = cache.get(clave)
+    if nombre is None:
+        nombre = Rol.objects.filter(pk=rol_id).values_list('nombre', flat=True).first() or ''
+        cache.set(clave, nombre, TTL_ROL)
+    return nombre or None
+
+
+def permisos_de(user):
+    """Permisos del usuario, memorizados en el objeto durante el request."""
+    if user is None or not user.is_authenticated:
+        return ANONIMO
+    rol_id = getattr(user, 'id_rol_id', None)
+    firma = (rol_id, user.is_superuser)
+    memo = getattr(user, '_permisos_memo', None)
+    if memo is not None and memo[0] == firma:
+        return memo[1]
+    rol = user._state.fields_cache.get('id_rol') if hasattr(user, '_state') else None
+    if rol is not None and rol.pk == rol_id:
+        nombre = rol.nombre
+    else:
+        nombre = nombre_rol(rol_id) if rol_id else None
+    permisos = PermisosUsuario(nombre, user.is_superuser)
+    user._permisos_memo = (firma, permisos)
+    return permisos
@@ -1,3 +1,55 @@
 from django.test import TestCase
+from django.urls import reverse
+from roles.models import Rol
+from roles.permisos import permisos_de
+from usuarios.models import Usuario
 
-# Create your tests here.
+
+class PermisosCacheadosTests(TestCase):
+    def setUp(self):
+        self.rol_bodeguero = Rol.objects.create(nombre='Bodeguero', descripcion='Bodega')
+        self.rol_vendedor = Rol.objects.create(nombre='Vendedor', descripcion='Ventas')
+        self.usuario = Usuario.objects.create(
+            username='bodega', nombre='Bodega', correo='bodega@example.com', contrasena='dummy',
+            id_rol=self.rol_bodeguero,
+        )
+
+    def _usuario_nuevo_request(self):
+        # Igual que AuthenticationMiddleware: la fila del usuario sin el rol cargado
+        return Usuario.objects.get(pk=self.usuario.pk)
+
+    def test_capacidades_se_resuelven_sin_consultar_rol(self):
+        permisos_de(self._usuario_nuevo_request())
+        user = self._usuario_nuevo_request()
+        with self.assertNumQueries(0):
+            permisos = permisos_de(user)
+            self.assertEqual(permisos.rol, 'Bodeguero')
+            self.assertTrue(permisos.can_edit_inventory)
+            self.assertFalse(permisos.can_delete_products)
+            self.assertFalse(permisos.es_admin)
+            self.assertIs(permisos_de(user), permisos)
+        with self.assertRaises(AttributeError):
+            permisos.can_volar
+
+    def test_cambio_de_rol_o_de_nombre_invalida(self):
+        permisos_de(self._usuario_nuevo_request())
+        self.rol_bodeguero.nombre = 'Consulta'
+        self.rol_bodeguero.save()
+        permisos = permisos_de(self._usuario_nuevo_request())
+        self.assertEqual(permisos.rol, 'Consulta')
+        self.assertFalse(permisos.can_view_inventory)
+
+        Usuario.objects.filter(pk=self.usuario.pk).update(id_rol=self.rol_vendedor)
+        permisos = permisos_de(self._usuario_nuevo_request())
+        self.assertEqual(permisos.rol, 'Vendedor')
+        self.assertFalse(permisos.can_edit_inventory)
+
+    def test_vista_usa_capacidades(self):
+        self.usuario.id_rol = self.rol_vendedor
+        self.usuario.set_password('Test1234!')
+        self.usuario.save()
+        self.client.login(username='bodega', password='Test1234!')
+        response = self.client.post(reverse('dashboard:registrar_movimiento_inventario'), {
+            'tipo_movimiento': 'entrada', 'producto': 1, 'cantidad': 1,
+        })
+        self.assertEqual(response.status_code, 403)
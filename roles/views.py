@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from .models import Rol
+from .permisos import permisos_de
 
 
 @login_required
@@ -11,7 +12,7 @@ def lista_roles(request):
     user = request.user
     
     # Solo administradores pueden gestionar roles
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         messages.error(request, 'No tienes permisos para gestionar roles')
         return redirect('dashboard:home')
     
@@ -29,7 +30,7 @@ def crear_rol(request):
     """Vista para crear un nuevo rol"""
     user = request.user
     
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method == 'POST':
@@ -64,7 +65,7 @@ def editar_rol(request, rol_id):
     """Vista para editar un rol"""
     user = request.user
     
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     rol = get_object_or_404(Rol, pk=rol_id)
@@ -98,7 +99,7 @@ def eliminar_rol(request, rol_id):
     """Vista para eliminar un rol"""
     user = request.user
     
-    if not (user.is_superuser or (hasattr(user, 'id_rol') and user.id_rol.nombre == 'Administrador')):
+    if not permisos_de(user).es_admin:
         return JsonResponse({'success': False, 'message': 'No tienes permisos'}, status=403)
     
     if request.method != 'POST':
@@ -3,6 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 from django import forms
 from .models import Usuario
+from roles.permisos import permisos_de
 
 class CustomUserChangeForm(UserChangeForm):
     class Meta(UserChangeForm.Meta):
@@ -28,8 +29,8 @@ class UsuarioAdmin(UserAdmin):
     
     def has_module_permission(self, request):
         """Controlar acceso al módulo de usuarios"""
-        if hasattr(request.user, 'id_rol'):
-            user_role = request.user.id_rol.nombre
+        user_role = permisos_de(request.user).rol
+        if user_role is not None:
             # Solo administradores pueden ver usuarios
             return user_role == 'Administrador'
         return request.user.is_superuser
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
+
+    def ready(self):
+        # Cache de sesión y del login: se descarta al guardar o borrar (también en lote)
+        from .senales import conectar_senales
+        conectar_senales()
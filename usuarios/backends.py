@@ -0,0 +1,112 @@
+"""
+Backend de autenticación que carga al usuario de la sesión con su rol.
+
+`AuthenticationMiddleware` llama a `get_user()` en cada request autenticado.
+Aquí se resuelve con una sola consulta (select_related del rol y solo las
+columnas que usa el dashboard). Con un cache compartido entre procesos
+(SESSION_CACHE_ALIAS no es LocMemCache) el perfil y el rol se memorizan, y los
+requests siguientes solo leen de `usuario` los campos de los que depende la
+autenticación (CAMPOS_CRITICOS: hash de la sesión, activo, cambio de clave
+obligatorio), que nunca se sirven desde el cache.
+
+Las señales post_save/post_delete de Usuario (también los borrados masivos del
+admin) borran la entrada del usuario; los cambios de Rol invalidan todas
+mediante la versión de permisos (roles.permisos).
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+
+from roles.permisos import version_permisos
+
+# Columnas del usuario que necesitan el middleware, las plantillas y el perfil;
+# las demás (contrasena, intentos fallidos, bloqueo...) se cargan al accederlas
+CAMPOS_SESION = (
+    'id_usuario', 'username', 'nombre', 'correo', 'email', 'first_name',
+    'is_staff', 'is_superuser', 'telefono', 'avatar',
+    'last_login', 'date_joined', 'id_rol',
+)
+# Se leen de la base en cada request aunque el resto venga del cache
+CAMPOS_CRITICOS = ('password', 'is_active', 'debe_cambiar_clave')
+CAMPOS_ROL = ('id_rol', 'nombre')
+# Caches propios de cada proceso: una invalidación no llegaría a los demás workers
+CACHES_LOCALES = (LocMemCache, DummyCache)
+
+
+def _cache():
+    return caches[getattr(settings, 'SESSION_CACHE_ALIAS', 'default')]
+
+
+def _clave(user_id, version=None):
+    return f'usuarios:sesion:{user_id}:v{version if version is not None else version_permisos()}'
+
+
+def memoizacion_activa():
+    """Solo se memoriza con un cache compartido entre procesos y un TTL positivo."""
+    return getattr(settings, 'USUARIO_SESION_CACHE_SEGUNDOS', 300) > 0 and \
+        not isinstance(_cache(), CACHES_LOCALES)
+
+
+def olvidar_usuario(user_id):
+    """Descarta el usuario memorizado (desde las señales de Usuario)."""
+    if memoizacion_activa():
+        _cache().delete(_clave(user_id))
+
+
+class UsuarioBackend(ModelBackend):
+    """ModelBackend con `get_user` en una consulta y memorizado en cache."""
+
+    def _desde_cache(self, datos, criticos):
+        from roles.models import Rol
+        from usuarios.models import Usuario
+        db = router.db_for_read(Usuario)
+        valores = {**datos['usuario'], **criticos}
+        # from_db espera los valores en el orden de los campos del modelo
+        attnames = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in valores]
+        usuario = Usuario.from_db(db, attnames, [valores[attname] for attname in attnames])
+        if datos['rol'] is not None:
+            rol = Rol.from_db(db, list(CAMPOS_ROL), list(datos['rol']))  # id_rol, nombre: orden del modelo
+            usuario._state.fields_cache['id_rol'] = rol
+        return usuario
+
+    def _a_cache(self, usuario):
+        from usuarios.models import Usuario
+        valores = {}
+        for campo in CAMPOS_SESION:
+            attname = Usuario._meta.get_field(campo).attname
+            valor = getattr(usuario, attname)
+            # FieldFile no es serializable: se guarda su nombre
+            valores[attname] = getattr(valor, 'name', valor) if campo == 'avatar' else valor
+        rol = usuario._state.fields_cache.get('id_rol')
+        return {'usuario': valores, 'rol': (rol.id_rol, rol.nombre) if rol is not None else None}
+
+    def _consultar(self, user_id):
+        from usuarios.models import Usuario
+        campos = [*CAMPOS_SESION, *CAMPOS_CRITICOS, *(f'id_rol__{campo}' for campo in CAMPOS_ROL)]
+        try:
+            return Usuario._default_manager.select_related('id_rol').only(*campos).get(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+
+    def get_user(self, user_id):
+        from usuarios.models import Usuario
+        if not memoizacion_activa():
+            usuario = self._consultar(user_id)
+        else:
+            cache = _cache()
+            clave = _clave(user_id)
+            datos = cache.get(clave)
+            if datos is not None:
+                criticos = Usuario._default_manager.filter(pk=user_id).values(*CAMPOS_CRITICOS).first()
+                if criticos is None:
+                    cache.delete(clave)
+                    return None
+                usuario = self._desde_cache(datos, criticos)
+            else:
+                usuario = self._consultar(user_id)
+                if usuario is not None:
+                    cache.set(clave, self._a_cache(usuario), getattr(settings, 'USUARIO_SESION_CACHE_SEGUNDOS', 300))
+        return usuario if usuario is not None and self.user_can_authenticate(usuario) else None
@@ -0,0 +1,150 @@
+"""
+Límite de intentos de login sobre el cache de Django.
+
+Los intentos fallidos se cuentan en ventanas deslizantes (dos contadores de
+ventana fija ponderados) por identificador y por IP, sin escribir en la
+tabla `usuario`. Solo cuando un usuario existente cruza el umbral se persiste
+el bloqueo en `Usuario.locked_until`. Los identificadores bloqueados o
+inexistentes se resuelven desde el cache sin consultar la base de datos.
+
+El límite por IP solo se aplica cuando se conoce la IP real del cliente (ver
+`ip_cliente`): detrás de nginx todas las conexiones llegan desde el proxy y
+contarlas juntas dejaría a todos los usuarios bloqueados por un solo atacante.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+MAX_INTENTOS_DEFECTO = 5
+MAX_INTENTOS_IP_DEFECTO = 30
+VENTANA_DEFECTO = 15 * 60
+BLOQUEO_MINUTOS_DEFECTO = 30
+# Segundos que se recuerda que un identificador no corresponde a ningún usuario
+TTL_INEXISTENTE = 60
+# Proxies cuyo X-Forwarded-For se acepta: nginx en el mismo host (DESPLIEGUE.md)
+PROXIES_CONFIABLES_DEFECTO = ('127.0.0.1', '::1')
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def _hash(valor):
+    return hashlib.sha1(valor.strip().lower().encode()).hexdigest()
+
+
+def ip_cliente(request):
+    """IP del cliente, o None si no se puede saber.
+
+    Si REMOTE_ADDR es un proxy de PROXIES_CONFIABLES, la IP del cliente es la
+    última de X-Forwarded-For que no sea otro proxy confiable (las anteriores
+    las puede inventar el cliente). Sin ese encabezado, o con REMOTE_ADDR vacío
+    (gunicorn en un socket unix), la IP real no se conoce.
+    """
+    remota = request.META.get('REMOTE_ADDR') or ''
+    proxies = set(_config('PROXIES_CONFIABLES', PROXIES_CONFIABLES_DEFECTO))
+    if remota not in proxies:
+        return remota or None
+    reenviadas = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    for ip in reversed(reenviadas):
+        if ip not in proxies:
+            return ip
+    return None
+
+
+def _contar(clave, ventana, incrementar):
+    """Cantidad estimada de fallos en los últimos `ventana` segundos."""
+    ahora = time.time()
+    actual = int(ahora // ventana)
+    fraccion = (ahora % ventana) / ventana
+    clave_actual = f'{clave}:{actual}'
+    if incrementar:
+        cache.add(clave_actual, 0, timeout=ventana * 2)
+        try:
+            contador = cache.incr(clave_actual)
+        except ValueError:
+            cache.set(clave_actual, 1, timeout=ventana * 2)
+            contador = 1
+    else:
+        contador = cache.get(clave_actual, 0)
+    anterior = cache.get(f'{clave}:{actual - 1}', 0)
+    return contador + anterior * (1 - fraccion)
+
+
+class LimitadorLogin:
+    """Contadores y bloqueos de un intento de login (identificador + IP; sin IP, solo identificador)."""
+
+    def __init__(self, identificador, ip):
+        self.identificador = _hash(identificador)
+        self.ip = ip
+        self.ventana = _config('LOGIN_VENTANA_SEGUNDOS', VENTANA_DEFECTO)
+        self.max_intentos = _config('LOGIN_MAX_INTENTOS', MAX_INTENTOS_DEFECTO)
+        self.max_intentos_ip = _config('LOGIN_MAX_INTENTOS_IP', MAX_INTENTOS_IP_DEFECTO)
+        self.bloqueo_segundos = _config('LOGIN_BLOQUEO_MINUTOS', BLOQUEO_MINUTOS_DEFECTO) * 60
+
+    # --- Claves ---
+
+    @property
+    def _fallos_id(self):
+        return f'login:fallos:id:{self.identificador}'
+
+    @property
+    def _fallos_ip(self):
+        return f'login:fallos:ip:{self.ip}'
+
+    @property
+    def _bloqueo_id(self):
+        return f'login:bloqueo:id:{self.identificador}'
+
+    @property
+    def _bloqueo_ip(self):
+        return f'login:bloqueo:ip:{self.ip}'
+
+    # --- Consulta ---
+
+    def _claves_bloqueo(self):
+        return [self._bloqueo_id, self._bloqueo_ip] if self.ip else [self._bloqueo_id]
+
+    def minutos_bloqueo(self):
+        """Minutos restantes si el identificador o la IP están bloqueados; si no, 0."""
+        hasta = max(cache.get_many(self._claves_bloqueo()).values(), default=0)
+        restante = hasta - time.time()
+        return max(1, int(restante // 60)) if restante > 0 else 0
+
+    def usuario_inexistente(self):
+        return cache.get(f'login:inexistente:{self.identificador}') is not None
+
+    def marcar_inexistente(self):
+        cache.set(f'login:inexistente:{self.identificador}', 1, timeout=TTL_INEXISTENTE)
+
+    # --- Registro ---
+
+    def registrar_fallo(self):
+        """Cuenta un fallo. Devuelve (fallos del identificador, cruzó el umbral)."""
+        fallos = _contar(self._fallos_id, self.ventana, incrementar=True)
+        hasta = time.time() + self.bloqueo_segundos
+        if self.ip and _contar(self._fallos_ip, self.ventana, incrementar=True) >= self.max_intentos_ip:
+            cache.set(self._bloqueo_ip, hasta, timeout=self.bloqueo_segundos)
+        bloqueado = fallos >= self.max_intentos
+        if bloqueado:
+            cache.set(self._bloqueo_id, hasta, timeout=self.bloqueo_segundos)
+        return int(fallos), bloqueado
+
+    def intentos_restantes(self, fallos):
+        return max(0, self.max_intentos - fallos)
+
+    def limpiar(self):
+        """Login exitoso: olvida los fallos del identificador (los de la IP siguen contando)."""
+        ventana_actual = int(time.time() // self.ventana)
+        cache.delete_many([
+            self._bloqueo_id,
+            f'{self._fallos_id}:{ventana_actual}',
+            f'{self._fallos_id}:{ventana_actual - 1}',
+        ])
+
+
+def olvidar_inexistente(*identificadores):
+    """Se llama al guardar un usuario: su username/correo ya existen."""
+    cache.delete_many([f'login:inexistente:{_hash(i)}' for i in identificadores if i])
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.http import HttpResponseForbidden
 from django.urls import reverse
 from django.shortcuts import redirect
+from roles.permisos import permisos_de
 
 User = get_user_model()
 
@@ -15,7 +16,7 @@ class RolMiddleware:
             if request.path in ['/admin/', '/admin/login/', '/admin/logout/']:
                 return self.get_response(request)
             if request.user.is_authenticated:
-                user_role = getattr(getattr(request.user, 'id_rol', None), 'nombre', None)
+                user_role = permisos_de(request.user).rol
                 if user_role == 'Cliente':
                     return HttpResponseForbidden("No tienes permisos para acceder a esta sección.")
                 elif user_role in ['Vendedor', 'Bodeguero']:
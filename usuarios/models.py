@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from datetime import timedelta
@@ -45,6 +45,18 @@ class Usuario(AbstractUser):
         if not self.email:
             self.email = self.correo
         super().save(*args, **kwargs)
+
+    def _olvidar_sesion(self):
+        """Descarta lo cacheado de este usuario: sesión (UsuarioBackend) y "no existe" del login.
+
+        Se llama desde las señales post_save/post_delete (usuarios/senales.py).
+        """
+        from .backends import olvidar_usuario
+        from .limitador import olvidar_inexistente
+        olvidar_inexistente(self.username, self.correo)
+        usuario_id = self.pk
+        olvidar_usuario(usuario_id)
+        transaction.on_commit(lambda: olvidar_usuario(usuario_id))
     
     def is_account_locked(self):
         """Verifica si la cuenta está bloqueada por intentos fallidos"""
@@ -58,6 +70,12 @@ class Usuario(AbstractUser):
         self.locked_until = None
         self.save(update_fields=['failed_login_attempts', 'locked_until'])
     
+    def bloquear(self, intentos, minutos=30):
+        """Persiste el bloqueo cuando el limitador de login cruza el umbral"""
+        self.failed_login_attempts = intentos
+        self.locked_until = timezone.now() + timedelta(minutes=minutos)
+        self.save(update_fields=['failed_login_attempts', 'locked_until'])
+    
     def increment_failed_attempts(self):
         """Incrementa el contador de intentos fallidos y bloquea si es necesario"""
         self.failed_login_attempts += 1
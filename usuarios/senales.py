@@ -0,0 +1,18 @@
+"""
+Señales que descartan lo cacheado de un usuario al guardarlo o borrarlo.
+
+Se conectan en UsuariosConfig.ready(). A diferencia de sobrescribir
+save()/delete(), post_delete también se emite en los borrados de queryset
+(p. ej. la acción "eliminar seleccionados" del admin).
+"""
+from django.db.models.signals import post_delete, post_save
+
+
+def _olvidar(sender, instance, **kwargs):
+    instance._olvidar_sesion()
+
+
+def conectar_senales():
+    from .models import Usuario
+    post_save.connect(_olvidar, sender=Usuario, dispatch_uid='usuarios_olvidar_guardar')
+    post_delete.connect(_olvidar, sender=Usuario, dispatch_uid='usuarios_olvidar_borrar')
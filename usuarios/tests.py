@@ -1,3 +1,161 @@
 from django.test import TestCase
+from roles.models import Rol
+from roles.permisos import permisos_de
+from usuarios.backends import UsuarioBackend
+from usuarios.models import Usuario
 
-# Create your tests here.
+
+class UsuarioBackendTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from django.test import override_settings
+        # La memoización requiere un cache compartido entre procesos
+        self.directorio_cache = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio_cache.cleanup)
+        ajustes = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.directorio_cache.name,
+        }})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.rol = Rol.objects.create(nombre='Bodeguero', descripcion='Bodega')
+        self.usuario = Usuario.objects.create(
+            username='bodega', nombre='Bodega', correo='bodega@example.com', contrasena='dummy', id_rol=self.rol
+        )
+        self.usuario.set_password('Test1234!')
+        self.usuario.save()
+        self.backend = UsuarioBackend()
+
+    def test_una_consulta_y_luego_cache(self):
+        with self.assertNumQueries(1):
+            usuario = self.backend.get_user(self.usuario.pk)
+            self.assertEqual(usuario.id_rol.nombre, 'Bodeguero')
+        # Desde el cache solo se leen los campos críticos de `usuario`, sin el rol
+        with self.assertNumQueries(1):
+            usuario = self.backend.get_user(self.usuario.pk)
+            self.assertEqual(usuario.nombre, 'Bodega')
+            self.assertEqual(usuario.id_rol.nombre, 'Bodeguero')
+            self.assertTrue(permisos_de(usuario).can_edit_inventory)
+            self.assertEqual(usuario.get_session_auth_hash(), self.usuario.get_session_auth_hash())
+
+    def test_guardar_invalida(self):
+        self.backend.get_user(self.usuario.pk)
+        self.usuario.nombre = 'Otro'
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+        self.rol.nombre = 'Vendedor'
+        self.rol.save()
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=True)
+        self.assertEqual(self.backend.get_user(self.usuario.pk).id_rol.nombre, 'Vendedor')
+
+    def test_campos_criticos_no_salen_del_cache(self):
+        # Cambios hechos por otro proceso (sin invalidar este cache) se ven igual
+        antes = self.backend.get_user(self.usuario.pk).get_session_auth_hash()
+        Usuario.objects.filter(pk=self.usuario.pk).update(password='otro-hash', debe_cambiar_clave=True)
+        usuario = self.backend.get_user(self.usuario.pk)
+        self.assertNotEqual(usuario.get_session_auth_hash(), antes)
+        self.assertTrue(usuario.debe_cambiar_clave)
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+
+    def test_borrado_masivo_invalida(self):
+        from usuarios.backends import _cache, _clave
+        self.backend.get_user(self.usuario.pk)
+        self.assertIsNotNone(_cache().get(_clave(self.usuario.pk)))
+        Usuario.objects.filter(pk=self.usuario.pk).delete()
+        self.assertIsNone(_cache().get(_clave(self.usuario.pk)))
+        self.assertIsNone(self.backend.get_user(self.usuario.pk))
+
+    def test_cache_local_no_memoriza(self):
+        from django.test import override_settings
+        from usuarios.backends import memoizacion_activa
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertFalse(memoizacion_activa())
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    self.assertEqual(self.backend.get_user(self.usuario.pk).id_rol.nombre, 'Bodeguero')
+
+    def test_request_autenticado(self):
+        self.client.login(username='bodega', password='Test1234!')
+        self.client.get('/dashboard/')
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Rol: Bodeguero')
+
+
+class LimitadorLoginTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.addCleanup(cache.clear)
+        rol = Rol.objects.create(nombre='Vendedor', descripcion='Ventas')
+        self.usuario = Usuario.objects.create(
+            username='venta', nombre='Venta', correo='venta@example.com', contrasena='dummy', id_rol=rol
+        )
+        self.usuario.set_password('Test1234!')
+        self.usuario.save()
+
+    def _login(self, username, password, ip='10.0.0.1'):
+        from django.urls import reverse
+        return self.client.post(reverse('dashboard:login'), {'username': username, 'password': password},
+                                REMOTE_ADDR=ip)
+
+    def test_fallos_no_escriben_hasta_el_umbral(self):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(4):
+                response = self._login('venta', 'mala')
+        self.assertEqual(response.context['attempts_remaining'], 1)
+        self.assertFalse([q for q in consultas if q['sql'].startswith('UPDATE')])
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.failed_login_attempts, 0)
+
+        response = self._login('venta', 'mala')
+        self.assertEqual(response.context['error_type'], 'locked')
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.failed_login_attempts, 5)
+        self.assertTrue(self.usuario.is_account_locked())
+        # Bloqueado: ni la contraseña correcta entra, y se responde sin consultar la base
+        with self.assertNumQueries(0):
+            response = self._login('venta', 'Test1234!')
+        self.assertEqual(response.context['error_type'], 'locked')
+
+    def test_inexistente_y_bloqueo_por_ip(self):
+        from django.test import override_settings
+        self._login('nadie', 'x')
+        with self.assertNumQueries(0):
+            self._login('nadie', 'x')
+        with override_settings(LOGIN_MAX_INTENTOS_IP=4):
+            for i in range(2):
+                self._login(f'otro{i}', 'x')
+            response = self._login('venta', 'Test1234!')
+            self.assertEqual(response.context['error_type'], 'locked')
+            response = self._login('venta', 'Test1234!', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 302)
+
+    def test_usuarios_detras_del_proxy_no_comparten_bloqueo(self):
+        from django.test import override_settings
+        from django.urls import reverse
+        otro = Usuario.objects.create(
+            username='otro', nombre='Otro', correo='otro@example.com', contrasena='dummy', id_rol=self.usuario.id_rol
+        )
+        otro.set_password('Test1234!')
+        otro.save()
+        with override_settings(LOGIN_MAX_INTENTOS_IP=3):
+            # nginx en el mismo host sin X-Forwarded-For: no se conoce la IP del cliente
+            for i in range(4):
+                self._login(f'atacante{i}', 'x', ip='127.0.0.1')
+            self.assertEqual(self._login('otro', 'Test1234!', ip='127.0.0.1').status_code, 302)
+            # Con X-Forwarded-For se bloquea solo la IP del atacante
+            self.client.logout()
+            for i in range(3):
+                self.client.post(reverse('dashboard:login'), {'username': f'atacante{i}', 'password': 'x'},
+                                 REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.9')
+            bloqueado = self.client.post(reverse('dashboard:login'), {'username': 'venta', 'password': 'Test1234!'},
+                                         REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.9')
+            self.assertEqual(bloqueado.context['error_type'], 'locked')
+            permitido = self.client.post(reverse('dashboard:login'), {'username': 'venta', 'password': 'Test1234!'},
+                                         REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.7')
+        self.assertEqual(permitido.status_code, 302)
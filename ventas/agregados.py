@@ -0,0 +1,197 @@
+"""
+Totales diarios de ventas por producto, vendedor y cliente.
+
+`agregar_ventas()` procesa solo las ventas con id_venta mayor que la marca
+guardada en `venta_agregacion_marca`: suma sus líneas por día (hora local),
+acumula el resultado en las tablas venta_diaria_* y avanza la marca, todo en
+la misma transacción y con la fila de la marca bloqueada, de modo que dos
+ejecuciones simultáneas no cuentan dos veces una venta.
+
+Solo se toman ventas con más de VENTAS_AGREGACION_MARGEN_SEGUNDOS de
+antigüedad: un id_venta menor puede seguir dentro de un checkout sin
+confirmar y quedaría para siempre detrás de la marca.
+
+Los reportes leen estas tablas (costo proporcional a los días, no a las
+líneas) y suman en vivo solo la cola de ventas posteriores a la marca, desde
+el primer día del período pedido.
+
+El día de cada venta se calcula en Python con la hora local y no con
+TruncDate: en MySQL con USE_TZ eso es CONVERT_TZ(), que devuelve NULL si el
+servidor no tiene cargadas las tablas de zonas horarias.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import MarcaAgregacionVentas, Venta, VentaDiariaCliente, VentaDiariaProducto, VentaDiariaUsuario
+
+TAMANO_LOTE_DEFECTO = 5000
+MARGEN_SEGUNDOS_DEFECTO = 60
+
+# (modelo, campo de agrupación en detalle_venta, campo clave en el modelo, campos acumulados)
+AGREGADOS = (
+    (VentaDiariaProducto, 'id_producto_id', 'id_producto_id', ('num_ventas', 'cantidad', 'total')),
+    (VentaDiariaUsuario, 'id_venta__id_usuario_id', 'id_usuario_id', ('num_ventas', 'total')),
+    (VentaDiariaCliente, 'id_venta__id_cliente_id', 'id_cliente_id', ('num_ventas', 'total')),
+)
+
+
+def margen_segundos():
+    return getattr(settings, 'VENTAS_AGREGACION_MARGEN_SEGUNDOS', MARGEN_SEGUNDOS_DEFECTO)
+
+
+def marca_actual():
+    return MarcaAgregacionVentas.objects.filter(pk=1).values_list('ultimo_id_venta', flat=True).first() or 0
+
+
+def _lineas(desde_id, hasta_id=None, desde_dia=None):
+    from detalle_ventas.models import DetalleVenta
+    lineas = DetalleVenta.objects.filter(id_venta_id__gt=desde_id)
+    if hasta_id is not None:
+        lineas = lineas.filter(id_venta_id__lte=hasta_id)
+    if desde_dia is not None:
+        lineas = lineas.filter(id_venta__fecha__gte=timezone.make_aware(datetime.combine(desde_dia, time.min)))
+    return lineas.order_by()
+
+
+def _totales(lineas, agrupar):
+    """[{dia, agrupar, num_ventas, cantidad, total}]: se suma por venta en SQL y por día local aquí."""
+    # Alias distintos de los campos de detalle_venta: `cantidad` no puede sombrear la columna
+    filas = lineas.values('id_venta_id', 'id_venta__fecha', agrupar).annotate(
+        suma_cantidad=Sum('cantidad'),
+        suma_total=Sum(F('cantidad') * F('precio_unitario')),
+    )
+    totales = {}
+    for fila in filas:
+        dia = timezone.localtime(fila['id_venta__fecha']).date()
+        total = totales.get((dia, fila[agrupar]))
+        if total is None:
+            total = totales[dia, fila[agrupar]] = {
+                'dia': dia, agrupar: fila[agrupar], 'num_ventas': 0, 'cantidad': 0, 'total': 0,
+            }
+        # Una fila por venta y clave: cada una es una venta distinta
+        total['num_ventas'] += 1
+        total['cantidad'] += fila['suma_cantidad'] or 0
+        total['total'] += fila['suma_total'] or 0
+    return list(totales.values())
+
+
+def _acumular(modelo, agrupar, clave, campos, filas):
+    """Suma `filas` a las existentes (bulk_update) y crea las que faltan (bulk_create)."""
+    filas = list(filas)
+    if not filas:
+        return 0
+    existentes = {
+        (fila.fecha, getattr(fila, clave)): fila
+        for fila in modelo.objects.filter(
+            fecha__in={fila['dia'] for fila in filas},
+            **{f'{clave}__in': {fila[agrupar] for fila in filas}},
+        )
+    }
+    nuevas, modificadas = [], []
+    for fila in filas:
+        actual = existentes.get((fila['dia'], fila[agrupar]))
+        if actual is None:
+            nuevas.append(modelo(fecha=fila['dia'], **{clave: fila[agrupar]}, **{c: fila[c] for c in campos}))
+        else:
+            for campo in campos:
+                setattr(actual, campo, getattr(actual, campo) + fila[campo])
+            modificadas.append(actual)
+    modelo.objects.bulk_create(nuevas)
+    modelo.objects.bulk_update(modificadas, list(campos))
+    return len(filas)
+
+
+def agregar_ventas(lote=TAMANO_LOTE_DEFECTO, ahora=None):
+    """Acumula las ventas nuevas en los totales diarios. Devuelve (ventas procesadas, marca final)."""
+    limite = (ahora or timezone.now()) - timedelta(seconds=margen_segundos())
+    procesadas = 0
+    while True:
+        with transaction.atomic():
+            MarcaAgregacionVentas.objects.get_or_create(pk=1)
+            marca = MarcaAgregacionVentas.objects.select_for_update().get(pk=1)
+            ids = list(
+                Venta.objects.filter(id_venta__gt=marca.ultimo_id_venta, fecha__lte=limite)
+                .order_by('id_venta').values_list('id_venta', flat=True)[:lote]
+            )
+            if not ids:
+                return procesadas, marca.ultimo_id_venta
+            lineas = _lineas(marca.ultimo_id_venta, ids[-1])
+            for modelo, agrupar, clave, campos in AGREGADOS:
+                _acumular(modelo, agrupar, clave, campos, _totales(lineas, agrupar))
+            marca.ultimo_id_venta = ids[-1]
+            marca.save(update_fields=['ultimo_id_venta', 'fecha_actualizacion'])
+        procesadas += len(ids)
+        if len(ids) < lote:
+            return procesadas, marca.ultimo_id_venta
+
+
+def reiniciar_agregados():
+    """Vacía los totales diarios y vuelve la marca a cero (para reconstruirlos)."""
+    with transaction.atomic():
+        for modelo, *_ in AGREGADOS:
+            modelo.objects.all().delete()
+        MarcaAgregacionVentas.objects.update_or_create(pk=1, defaults={'ultimo_id_venta': 0})
+
+
+# --- Lectura para reportes ---
+
+def resumen_por_dia(desde, hasta=None):
+    """[{fecha, num_ventas, total}] por día (más reciente primero), incluida la cola sin agregar."""
+    dias = VentaDiariaUsuario.objects.filter(fecha__gte=desde)
+    if hasta is not None:
+        dias = dias.filter(fecha__lte=hasta)
+    por_dia = {
+        fila['fecha']: {'fecha': fila['fecha'], 'num_ventas': fila['num_ventas'], 'total': fila['total']}
+        for fila in dias.values('fecha').annotate(num_ventas=Sum('num_ventas'), total=Sum('total'))
+    }
+    # La cola por vendedor, como VentaDiariaUsuario: cada venta cuenta una sola vez por día
+    for fila in _totales(_lineas(marca_actual(), desde_dia=desde), 'id_venta__id_usuario_id'):
+        if hasta is not None and fila['dia'] > hasta:
+            continue
+        dia = por_dia.setdefault(fila['dia'], {'fecha': fila['dia'], 'num_ventas': 0, 'total': 0})
+        dia['num_ventas'] += fila['num_ventas']
+        dia['total'] += fila['total']
+    return sorted(por_dia.values(), key=lambda dia: dia['fecha'], reverse=True)
+
+
+def _destacados(modelo, campo, agrupar, campos, desde, limite):
+    """Los `limite` con mayor total desde `desde`: días agregados más la cola sin agregar."""
+    clave = f'{campo}_id'
+    cola = {}
+    for fila in _totales(_lineas(marca_actual(), desde_dia=desde), agrupar):
+        acumulado = cola.setdefault(fila[agrupar], dict.fromkeys(campos, 0))
+        for nombre in campos:
+            acumulado[nombre] += fila[nombre]
+    agregados = modelo.objects.filter(fecha__gte=desde).values(clave).annotate(**{c: Sum(c) for c in campos})
+    # Quien no está en la cola no puede superar a los primeros `limite` agregados
+    filas = {fila[clave]: fila for fila in agregados.order_by('-total')[:limite]}
+    if cola:
+        filas.update((fila[clave], fila) for fila in agregados.filter(**{f'{clave}__in': list(cola)}))
+    for id_objeto, extra in cola.items():
+        fila = filas.setdefault(id_objeto, {clave: id_objeto, **dict.fromkeys(campos, 0)})
+        for nombre in campos:
+            fila[nombre] += extra[nombre]
+    destacados = sorted(filas.values(), key=lambda fila: fila['total'], reverse=True)[:limite]
+    nombres = dict(
+        modelo._meta.get_field(campo).related_model.objects
+        .filter(pk__in=[fila[clave] for fila in destacados]).values_list('pk', 'nombre')
+    )
+    for fila in destacados:
+        fila['nombre'] = nombres.get(fila[clave])
+    return destacados
+
+
+def productos_mas_vendidos(desde, limite=5):
+    """Productos con mayor total vendido desde `desde`."""
+    return _destacados(VentaDiariaProducto, 'id_producto', 'id_producto_id', ('cantidad', 'total'), desde, limite)
+
+
+def vendedores_destacados(desde, limite=5):
+    """Vendedores con mayor total vendido desde `desde`."""
+    return _destacados(
+        VentaDiariaUsuario, 'id_usuario', 'id_venta__id_usuario_id', ('num_ventas', 'total'), desde, limite
+    )
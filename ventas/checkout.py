@@ -0,0 +1,170 @@
+"""
+Registro de ventas (checkout) con descuento de stock atómico.
+
+`registrar_venta()` crea la Venta y sus DetalleVenta en una sola transacción:
+
+1. Fuera de la transacción se validan las líneas (productos repetidos se
+   suman) y se leen los precios de Producto, que quedan en `precio_unitario`.
+2. Se bloquean con SELECT ... FOR UPDATE las filas de Inventario con stock de
+   los productos vendidos, siempre en orden de id_inventario: dos cajas que
+   venden los mismos productos toman los bloqueos en el mismo orden y no
+   pueden quedar en deadlock.
+3. Cada producto se descuenta de sus ubicaciones en ese mismo orden. Los
+   inventarios se escriben con un bulk_update, los detalles y las salidas
+   (MovimientoInventario) con bulk_create y StockResumen con un UPDATE por
+   producto.
+
+La transacción solo contiene escrituras ya calculadas, así los bloqueos duran
+lo mínimo; la auditoría y la invalidación de caches corren al confirmar.
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.utils import timezone
+
+MAX_LINEAS = 500
+
+
+class ErrorCheckout(Exception):
+    """Venta rechazada; `status` es el código HTTP sugerido."""
+    status = 400
+
+
+class StockInsuficiente(ErrorCheckout):
+    status = 409
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes  # {id_producto: (pedido, disponible)}
+        detalle = ', '.join(
+            f'producto {producto_id}: pedido {pedido}, disponible {disponible}'
+            for producto_id, (pedido, disponible) in faltantes.items()
+        )
+        super().__init__(f'Stock insuficiente ({detalle})')
+
+
+def normalizar_lineas(lineas):
+    """[{producto, cantidad}] -> OrderedDict {id_producto: cantidad} (repetidos sumados)."""
+    if not lineas:
+        raise ErrorCheckout('La venta no tiene productos')
+    if not isinstance(lineas, list):
+        raise ErrorCheckout('Las líneas deben ser una lista')
+    if len(lineas) > MAX_LINEAS:
+        raise ErrorCheckout(f'La venta supera el máximo de {MAX_LINEAS} líneas')
+    cantidades = OrderedDict()
+    for linea in lineas:
+        try:
+            producto_id = int(linea.get('producto') or linea.get('id_producto'))
+            cantidad = int(linea.get('cantidad'))
+        except (AttributeError, TypeError, ValueError):
+            raise ErrorCheckout('Cada línea debe indicar producto y cantidad enteros')
+        if cantidad <= 0:
+            raise ErrorCheckout('La cantidad debe ser mayor a cero')
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    return cantidades
+
+
+def _asignar(cantidades, inventarios):
+    """Reparte cada cantidad entre las ubicaciones (en orden de id). Devuelve [(inventario, cantidad)]."""
+    por_producto = {}
+    for inventario in inventarios:
+        por_producto.setdefault(inventario.id_producto_id, []).append(inventario)
+    asignaciones = []
+    faltantes = {}
+    for producto_id, pedido in cantidades.items():
+        ubicaciones = por_producto.get(producto_id, [])
+        disponible = sum(inventario.cantidad_actual for inventario in ubicaciones)
+        if disponible < pedido:
+            faltantes[producto_id] = (pedido, disponible)
+            continue
+        restante = pedido
+        for inventario in ubicaciones:
+            tomado = min(restante, inventario.cantidad_actual)
+            if tomado:
+                asignaciones.append((inventario, tomado))
+                restante -= tomado
+            if not restante:
+                break
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+    return asignaciones
+
+
+def registrar_venta(usuario, cliente_id, lineas):
+    """Crea la venta y descuenta el stock. Devuelve (venta, detalles, total)."""
+    from dashboard.models import Cliente
+    from detalle_ventas.models import DetalleVenta
+    from inventarios.models import Inventario, MovimientoInventario, StockResumen
+    from productos.models import Producto
+    from .models import Venta
+
+    cantidades = normalizar_lineas(lineas)
+    if not Cliente.objects.filter(pk=cliente_id).exists():
+        raise ErrorCheckout('Cliente no encontrado')
+    precios = dict(
+        Producto.objects.filter(pk__in=cantidades).values_list('id_producto', 'precio_referencia')
+    )
+    desconocidos = [producto_id for producto_id in cantidades if producto_id not in precios]
+    if desconocidos:
+        raise ErrorCheckout(f'Productos no encontrados: {", ".join(map(str, desconocidos))}')
+
+    with transaction.atomic():
+        # Orden determinista de bloqueo: id_inventario ascendente
+        inventarios = list(
+            Inventario.objects.select_for_update()
+            .filter(id_producto_id__in=cantidades, cantidad_actual__gt=0)
+            .order_by('id_inventario')
+        )
+        asignaciones = _asignar(cantidades, inventarios)
+
+        ahora = timezone.now()
+        cambios = []
+        for inventario, cantidad in asignaciones:
+            anterior = inventario._estado_stock()
+            inventario.cantidad_actual -= cantidad
+            inventario.fecha_ultima_actualizacion = ahora
+            cambios.append((anterior, inventario._estado_stock()))
+        tocados = [inventario for inventario, _ in asignaciones]
+        Inventario.objects.bulk_update(tocados, ['cantidad_actual', 'fecha_ultima_actualizacion'])
+        StockResumen.aplicar_cambios(cambios)
+
+        venta = Venta.objects.create(id_usuario=usuario, id_cliente_id=cliente_id)
+        detalles = DetalleVenta.objects.bulk_create([
+            DetalleVenta(
+                id_venta=venta, id_producto_id=producto_id, cantidad=cantidad, precio_unitario=precios[producto_id]
+            )
+            for producto_id, cantidad in cantidades.items()
+        ])
+        MovimientoInventario.objects.bulk_create([
+            MovimientoInventario(
+                inventario=inventario,
+                usuario=usuario,
+                tipo='salida',
+                cantidad=cantidad,
+                motivo=f'Venta #{venta.id_venta}',
+                detalle=f'Venta #{venta.id_venta}',
+                stock_resultante=inventario.cantidad_actual,
+                fecha_hora=ahora,
+            )
+            for inventario, cantidad in asignaciones
+        ])
+        total = sum(detalle.cantidad * detalle.precio_unitario for detalle in detalles)
+        unidades = [cantidad for _, cantidad in asignaciones]
+        transaction.on_commit(lambda: _despues_de_venta(usuario, venta, len(detalles), total, unidades))
+    return venta, detalles, total
+
+
+def _despues_de_venta(usuario, venta, num_lineas, total, unidades=()):
+    from dashboard.auditoria import registrar_auditoria
+    from dashboard.cache_fragmentos import GRUPO_INVENTARIOS, invalidar_fragmentos
+    from dashboard.metricas import contar
+    # bulk_update no emite post_save
+    invalidar_fragmentos(GRUPO_INVENTARIOS)
+    for cantidad in unidades:
+        contar('dulceria_movimientos_inventario_total', tipo='salida', origen='venta')
+        contar('dulceria_movimientos_inventario_unidades_total', cantidad, tipo='salida', origen='venta')
+    registrar_auditoria(
+        usuario=usuario,
+        accion='CREAR',
+        entidad='Venta',
+        detalle=f'ID: {venta.id_venta}, Líneas: {num_lineas}, Total: {total}',
+    )
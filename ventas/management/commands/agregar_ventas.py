@@ -0,0 +1,23 @@
+"""
+Acumula las ventas nuevas en los totales diarios (venta_diaria_*)
+Uso: python manage.py agregar_ventas [--lote 5000] [--reconstruir]
+"""
+from django.core.management.base import BaseCommand
+from ventas.agregados import TAMANO_LOTE_DEFECTO, agregar_ventas, marca_actual, reiniciar_agregados
+
+
+class Command(BaseCommand):
+    help = 'Suma por día, producto, vendedor y cliente las ventas posteriores a la última marca procesada'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFECTO, help='Ventas por transacción')
+        parser.add_argument('--reconstruir', action='store_true',
+                            help='Vacía los totales y los recalcula desde la primera venta')
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            reiniciar_agregados()
+            self.stdout.write(self.style.WARNING('⚠ Totales diarios reiniciados'))
+        self.stdout.write(f'Agregando ventas posteriores a #{marca_actual()}')
+        procesadas, marca = agregar_ventas(lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesadas} ventas agregadas (marca en #{marca})'))
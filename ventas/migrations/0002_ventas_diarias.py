@@ -0,0 +1,70 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('productos', '0001_initial'),
+        ('ventas', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiariaProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('num_ventas', models.IntegerField(default=0)),
+                ('cantidad', models.IntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('id_producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='productos.producto')),
+            ],
+            options={
+                'db_table': 'venta_diaria_producto',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'id_producto'), name='venta_diaria_producto_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('num_ventas', models.IntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('id_usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'venta_diaria_usuario',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'id_usuario'), name='venta_diaria_usuario_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaDiariaCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('num_ventas', models.IntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('id_cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.cliente')),
+            ],
+            options={
+                'db_table': 'venta_diaria_cliente',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'id_cliente'), name='venta_diaria_cliente_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MarcaAgregacionVentas',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('ultimo_id_venta', models.IntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'venta_agregacion_marca',
+            },
+        ),
+    ]
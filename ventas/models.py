@@ -10,3 +10,56 @@ class Venta(models.Model):
 
     class Meta:
         db_table = 'venta'
+
+
+class VentaDiariaProducto(models.Model):
+    """Totales de venta por día y producto (se llenan con `agregar_ventas`)."""
+    fecha = models.DateField()
+    id_producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE)
+    num_ventas = models.IntegerField(default=0)
+    cantidad = models.IntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'venta_diaria_producto'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'id_producto'], name='venta_diaria_producto_uniq'),
+        ]
+
+
+class VentaDiariaUsuario(models.Model):
+    """Totales de venta por día y vendedor."""
+    fecha = models.DateField()
+    id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    num_ventas = models.IntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'venta_diaria_usuario'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'id_usuario'], name='venta_diaria_usuario_uniq'),
+        ]
+
+
+class VentaDiariaCliente(models.Model):
+    """Totales de venta por día y cliente."""
+    fecha = models.DateField()
+    id_cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    num_ventas = models.IntegerField(default=0)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'venta_diaria_cliente'
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'id_cliente'], name='venta_diaria_cliente_uniq'),
+        ]
+
+
+class MarcaAgregacionVentas(models.Model):
+    """Último id_venta incluido en los totales diarios (una fila)."""
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    ultimo_id_venta = models.IntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'venta_agregacion_marca'
@@ -1,3 +1,182 @@
+import json
+
 from django.test import TestCase
+from django.urls import reverse
+from dashboard.models import Cliente
+from detalle_ventas.models import DetalleVenta
+from inventarios.models import Inventario, MovimientoInventario, StockResumen
+from productos.models import Producto
+from roles.models import Rol
+from usuarios.models import Usuario
+from ventas.models import Venta
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        rol_vendedor = Rol.objects.create(nombre='Vendedor', descripcion='Rol vendedor')
+        rol_bodeguero = Rol.objects.create(nombre='Bodeguero', descripcion='Rol bodeguero')
+        self.vendedor = Usuario.objects.create(
+            username='vendedor', nombre='Vendedor', correo='vendedor@example.com', contrasena='dummy', id_rol=rol_vendedor
+        )
+        self.vendedor.set_password('Test1234!')
+        self.vendedor.save()
+        self.bodeguero = Usuario.objects.create(
+            username='bodeguero', nombre='Bodeguero', correo='bodeguero@example.com', contrasena='dummy', id_rol=rol_bodeguero
+        )
+        self.bodeguero.set_password('Test1234!')
+        self.bodeguero.save()
+        self.cliente = Cliente.objects.create(nombre='Cliente A', contacto='123', direccion='Calle 1')
+        self.trufa = Producto.objects.create(nombre='Trufa', precio_referencia=1000, unidad_medida='unidad')
+        self.bombon = Producto.objects.create(nombre='Bombón', precio_referencia=500, unidad_medida='unidad')
+        self.trufa_a = Inventario.objects.create(id_producto=self.trufa, cantidad_actual=3, stock_minimo=1, ubicacion='A1')
+        self.trufa_b = Inventario.objects.create(id_producto=self.trufa, cantidad_actual=10, stock_minimo=1, ubicacion='B1')
+        self.bombon_a = Inventario.objects.create(id_producto=self.bombon, cantidad_actual=4, stock_minimo=1, ubicacion='A1')
+        self.url = reverse('ventas:checkout')
+
+    def _checkout(self, lineas, usuario='vendedor'):
+        self.client.login(username=usuario, password='Test1234!')
+        return self.client.post(
+            self.url,
+            data=json.dumps({'cliente': self.cliente.pk, 'lineas': lineas}),
+            content_type='application/json',
+        )
+
+    def test_venta_descuenta_varias_ubicaciones(self):
+        response = self._checkout([
+            {'producto': self.trufa.pk, 'cantidad': 4},
+            {'producto': self.bombon.pk, 'cantidad': 2},
+            {'producto': self.trufa.pk, 'cantidad': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        self.assertEqual(datos['total'], 5 * 1000 + 2 * 500)
+
+        venta = Venta.objects.get(pk=datos['venta_id'])
+        detalles = {d.id_producto_id: (d.cantidad, d.precio_unitario) for d in DetalleVenta.objects.filter(id_venta=venta)}
+        self.assertEqual(detalles, {self.trufa.pk: (5, 1000), self.bombon.pk: (2, 500)})
+
+        # La primera ubicación (menor id) se vacía antes de tocar la siguiente
+        self.trufa_a.refresh_from_db()
+        self.trufa_b.refresh_from_db()
+        self.bombon_a.refresh_from_db()
+        self.assertEqual((self.trufa_a.cantidad_actual, self.trufa_b.cantidad_actual), (0, 8))
+        self.assertEqual(self.bombon_a.cantidad_actual, 2)
+
+        salidas = MovimientoInventario.objects.filter(tipo='salida', motivo=f'Venta #{venta.pk}')
+        self.assertEqual(sorted(salidas.values_list('cantidad', flat=True)), [2, 2, 3])
+        self.assertEqual(StockResumen.objects.get(id_producto=self.trufa).total_unidades, 8)
+
+    def test_stock_insuficiente_no_escribe_nada(self):
+        response = self._checkout([
+            {'producto': self.trufa.pk, 'cantidad': 2},
+            {'producto': self.bombon.pk, 'cantidad': 5},
+        ])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['faltantes'], [{'producto': self.bombon.pk, 'pedido': 5, 'disponible': 4}])
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(MovimientoInventario.objects.exists())
+        self.trufa_a.refresh_from_db()
+        self.assertEqual(self.trufa_a.cantidad_actual, 3)
+
+    def test_lineas_que_no_son_lista(self):
+        for lineas in (5, 'x', {'producto': self.trufa.pk, 'cantidad': 1}):
+            response = self._checkout(lineas)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['message'], 'Las líneas deben ser una lista')
+        self.assertFalse(Venta.objects.exists())
+
+    def test_requiere_permiso_de_venta(self):
+        response = self._checkout([{'producto': self.trufa.pk, 'cantidad': 1}], usuario='bodeguero')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Venta.objects.exists())
+
+
+class AgregadosVentasTests(TestCase):
+    def setUp(self):
+        rol = Rol.objects.create(nombre='Administrador', descripcion='Rol administrador')
+        self.admin = Usuario.objects.create(
+            username='admin', nombre='Admin', correo='admin@example.com', contrasena='dummy', id_rol=rol
+        )
+        self.admin.set_password('Test1234!')
+        self.admin.save()
+        self.cliente = Cliente.objects.create(nombre='Cliente A', contacto='123', direccion='Calle 1')
+        self.trufa = Producto.objects.create(nombre='Trufa', precio_referencia=1000, unidad_medida='unidad')
+        self.bombon = Producto.objects.create(nombre='Bombón', precio_referencia=500, unidad_medida='unidad')
+
+    def _venta(self, *lineas):
+        venta = Venta.objects.create(id_usuario=self.admin, id_cliente=self.cliente)
+        for producto, cantidad in lineas:
+            DetalleVenta.objects.create(
+                id_venta=venta, id_producto=producto, cantidad=cantidad, precio_unitario=producto.precio_referencia
+            )
+        return venta
+
+    def test_agrega_solo_ventas_nuevas(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from ventas.agregados import agregar_ventas
+        from ventas.models import VentaDiariaProducto, VentaDiariaUsuario
+
+        self._venta((self.trufa, 2), (self.bombon, 1))
+        self._venta((self.trufa, 1))
+        despues = timezone.now() + timedelta(minutes=5)
+        self.assertEqual(agregar_ventas(ahora=despues)[0], 2)
+        ultima = self._venta((self.trufa, 3))
+        self.assertEqual(agregar_ventas(ahora=despues), (1, ultima.pk))
+        self.assertEqual(agregar_ventas(ahora=despues)[0], 0)
+
+        trufa = VentaDiariaProducto.objects.get(id_producto=self.trufa)
+        self.assertEqual((trufa.num_ventas, trufa.cantidad, trufa.total), (3, 6, 6000))
+        vendedor = VentaDiariaUsuario.objects.get(id_usuario=self.admin)
+        self.assertEqual((vendedor.num_ventas, vendedor.total), (3, 6500))
+
+    def test_ventas_view_suma_totales_y_cola(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from ventas.agregados import agregar_ventas
+
+        self._venta((self.trufa, 2))
+        agregar_ventas(ahora=timezone.now() + timedelta(minutes=5))
+        self._venta((self.bombon, 4))  # aún sin agregar
+
+        self.client.login(username='admin', password='Test1234!')
+        response = self.client.get(reverse('dashboard:ventas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['ventas_dia'], 4000)
+        self.assertEqual(response.context['total_ventas'], 2)
+        # La cola sin agregar también cuenta en los destacados
+        self.assertEqual(
+            [(p['nombre'], p['cantidad'], p['total']) for p in response.context['top_productos']],
+            [('Trufa', 2, 2000), ('Bombón', 4, 2000)],
+        )
+        self.assertEqual([(v['nombre'], v['num_ventas']) for v in response.context['top_vendedores']], [('Admin', 2)])
+        self.assertEqual([v.total for v in response.context['ventas']], [2000, 2000])
+
+    def test_cola_sin_agregar_se_acota_al_periodo(self):
+        from datetime import datetime, time, timedelta
+        from django.utils import timezone
+        from ventas.agregados import agregar_ventas, productos_mas_vendidos, resumen_por_dia
+        from ventas.models import VentaDiariaProducto
+
+        hoy = timezone.localdate()
+        # 23:30 hora local de ayer: en UTC ya es otro día, pero cuenta para ayer
+        ayer = timezone.make_aware(datetime.combine(hoy - timedelta(days=1), time(23, 30)))
+        antigua = self._venta((self.trufa, 5))
+        Venta.objects.filter(pk=antigua.pk).update(fecha=timezone.now() - timedelta(days=40))
+        de_ayer = self._venta((self.bombon, 1))
+        Venta.objects.filter(pk=de_ayer.pk).update(fecha=ayer)
+        self._venta((self.bombon, 2))
+
+        self.assertEqual(
+            [(dia['fecha'], dia['num_ventas'], dia['total']) for dia in resumen_por_dia(hoy - timedelta(days=29))],
+            [(hoy, 1, 1000), (hoy - timedelta(days=1), 1, 500)],
+        )
+        self.assertEqual([p['nombre'] for p in productos_mas_vendidos(hoy - timedelta(days=29))], ['Bombón'])
 
-# Create your tests here.
+        agregar_ventas(ahora=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(
+            VentaDiariaProducto.objects.get(id_producto=self.bombon, fecha=hoy - timedelta(days=1)).cantidad, 1
+        )
+        self.assertEqual(
+            [(p['nombre'], p['cantidad']) for p in productos_mas_vendidos(hoy - timedelta(days=29))], [('Bombón', 3)]
+        )
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'ventas'
+
+urlpatterns = [
+    path('checkout/', views.checkout, name='checkout'),
+]
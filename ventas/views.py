@@ -1,3 +1,63 @@
-from django.shortcuts import render
+import json
+import traceback
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+
+from roles.permisos import permisos_de
+from .checkout import ErrorCheckout, StockInsuficiente, registrar_venta
+
+
+def _datos_checkout(request):
+    """Cuerpo JSON {cliente, lineas: [{producto, cantidad}]} o formulario con `lineas` en JSON."""
+    if request.content_type == 'application/json':
+        datos = json.loads(request.body or b'{}')
+        return datos.get('cliente'), datos.get('lineas')
+    return request.POST.get('cliente'), json.loads(request.POST.get('lineas') or '[]')
+
+
+@login_required
+@never_cache
+@require_POST
+def checkout(request):
+    """Registrar una venta con sus líneas y descontar el stock"""
+    user = request.user
+
+    if not permisos_de(user).can_sell:
+        return JsonResponse({'success': False, 'message': 'No tienes permisos para registrar ventas'}, status=403)
+
+    try:
+        cliente_id, lineas = _datos_checkout(request)
+        cliente_id = int(cliente_id)
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Datos de venta inválidos'}, status=400)
+
+    try:
+        venta, detalles, total = registrar_venta(user, cliente_id, lineas)
+    except StockInsuficiente as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'faltantes': [
+                {'producto': producto_id, 'pedido': pedido, 'disponible': disponible}
+                for producto_id, (pedido, disponible) in e.faltantes.items()
+            ],
+        }, status=e.status)
+    except ErrorCheckout as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=e.status)
+    except Exception as e:
+        print(traceback.format_exc())
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Venta registrada',
+        'venta_id': venta.id_venta,
+        'total': total,
+        'lineas': [
+            {'producto': d.id_producto_id, 'cantidad': d.cantidad, 'precio_unitario': d.precio_unitario}
+            for d in detalles
+        ],
+    }, status=201)